@@ -14,6 +14,7 @@ import atexit
 import gc
 import getopt
 import os
+import queue
 import sys
 import time
 import weakref
@@ -24,14 +25,16 @@ import pyqtgraph.reload as reload
 from pyqtgraph import configfile
 from pyqtgraph.debug import printExc, Profiler
 from pyqtgraph.util.mutex import Mutex
-from . import __version__
+from . import getVersion
 from . import devices, modules
 from .Interfaces import InterfaceDirectory
 from .devices.Device import Device, DeviceTask
 from .util import DataManager, ptime, Qt
 from .util.DataManager import DirHandle
 from .util.HelpfulException import HelpfulException
+from .util.Thread import Thread
 from .util.debug import logExc, logMsg, createLogWindow
+from .util.task_timing import TaskTiming, TaskTimingStats
 
 _ = logExc  # prevent cleanup of logExc; needed by debug
 
@@ -59,6 +62,7 @@ class Manager(Qt.QObject):
     sigLogDirChanged = Qt.Signal(object)  # dir
     sigTaskCreated = Qt.Signal(object, object)  ## for debugger module
     sigAbortAll = Qt.Signal()  # User requested abort all tasks via ESC key
+    sigTaskTiming = Qt.Signal(object)  # TaskTiming record, emitted when each task run finishes
 
     CREATED = False
     single = None
@@ -87,6 +91,8 @@ class Manager(Qt.QObject):
         self.alreadyQuit = False
         self.taskLock = Mutex(Qt.QMutex.Recursive)
         self._folderTypes = None
+        self.taskTiming = TaskTimingStats()  # rolling history of task timing records
+        self.deviceInitTimes = OrderedDict()  # name: seconds spent loading each device
 
         try:
             if Manager.CREATED:
@@ -101,10 +107,7 @@ class Manager(Qt.QObject):
             atexit.register(self.quit)
             self.interfaceDir = InterfaceDirectory()
 
-            # Import all built-in module classes
-            modules.importBuiltinClasses()
-
-            logMsg('ACQ4 version %s started.' % __version__, importance=9)
+            logMsg('ACQ4 version %s started.' % getVersion(), importance=9)
 
         except:
             Manager.CREATED = False
@@ -134,6 +137,7 @@ class Manager(Qt.QObject):
             -n --no-manager    Do not load manager module
             -d --disable=      Disable the device specified
             -D --disable-all   Disable all devices
+               --import-times  Print the time taken to import each module during startup
         """)
                 raise
         else:
@@ -304,27 +308,7 @@ class Manager(Qt.QObject):
 
                 ## configure new devices
                 elif key == 'devices':
-                    for k in cfg['devices']:
-                        if self.disableAllDevs or k in self.disableDevs:
-                            print(f"    --> Ignoring device '{k}' -- disabled by request")
-                            logMsg(f"    --> Ignoring device '{k}' -- disabled by request")
-                            continue
-                        print(f"  === Configuring device '{k}' ===")
-                        logMsg(f"  === Configuring device '{k}' ===")
-                        try:
-                            conf = cfg['devices'][k]
-                            driverName = conf['driver']
-                            if 'config' in conf:  # for backward compatibility
-                                conf = conf['config']
-                            self.loadDevice(driverName, conf, k)
-                        except:
-                            print(f"Error configuring device {k}:")
-                            if self.exitOnError:
-                                raise
-                            else:
-                                printExc()
-                    print("=== Device configuration complete ===")
-                    logMsg("=== Device configuration complete ===")
+                    self._loadDevices(cfg['devices'], self._deviceInitThreads(cfg))
 
                 ## Copy in new module definitions
                 elif key == 'modules':
@@ -354,9 +338,22 @@ class Manager(Qt.QObject):
                     from MetaArray import MetaArray
                     MetaArray.defaultCompression = comp
 
+                elif key == 'indexFormat':
+                    fmt = cfg['indexFormat']
+                    if fmt not in DataManager.index.FORMATS:
+                        raise Exception(f"'indexFormat' option must be one of: {DataManager.index.FORMATS}. Got: '{fmt}'")
+                    print(f"=== Setting default directory index format: {fmt} ===")
+                    DataManager.setIndexFormat(fmt)
+
+                elif key == 'taskTimingHistory':
+                    self.taskTiming.setMaxRecords(int(cfg['taskTimingHistory']))
+
                 elif key == 'folderTypes':
                     self._folderTypes = val
 
+                elif key == 'deviceInitThreads':
+                    pass  # used while loading devices; see _deviceInitThreads
+
                 ## load stylesheet
                 elif key == 'stylesheet':
                     css = open(os.path.join(self.configDir, cfg['stylesheet'])).read()
@@ -393,6 +390,125 @@ class Manager(Qt.QObject):
                 else:
                     printExc("Error in ACQ4 configuration:")
 
+    @staticmethod
+    def _deviceInitThreads(cfg):
+        """Return the number of threads to use for loading the devices in *cfg* (0 loads them serially)."""
+        n = cfg.get('deviceInitThreads', cfg.get('misc', {}).get('deviceInitThreads', 0))
+        return int(n or 0)
+
+    def _loadDevices(self, devConfigs, maxThreads=0):
+        """Load the devices defined in *devConfigs*, a dict of {name: {'driver': ..., ...}}.
+
+        With *maxThreads* > 0, devices are constructed concurrently on a pool of up to that many worker threads.
+        A device is not started until all devices named in its config (see deviceDependencies) have been
+        loaded. Devices configured with ``threadedInit: True``, and devices of classes that declare
+        threadedInit = True themselves (see Device.threadedInit) unless configured with ``threadedInit: False``,
+        are constructed in worker threads; all others are constructed in the main thread. The time taken by each device is stored in self.deviceInitTimes and
+        logged once all devices are loaded.
+        """
+        confs = OrderedDict()
+        for k in devConfigs:
+            if self.disableAllDevs or k in self.disableDevs:
+                print(f"    --> Ignoring device '{k}' -- disabled by request")
+                logMsg(f"    --> Ignoring device '{k}' -- disabled by request")
+                continue
+            conf = devConfigs[k]
+            driverName = conf['driver']
+            if 'config' in conf:  # for backward compatibility
+                conf = conf['config']
+            confs[k] = (driverName, conf)
+
+        start = ptime.time()
+        if maxThreads > 0:
+            self._loadDevicesParallel(confs, maxThreads)
+        else:
+            for k, (driverName, conf) in confs.items():
+                self._initDevice(driverName, conf, k)
+
+        times = sorted([(self.deviceInitTimes[k], k) for k in confs if k in self.deviceInitTimes], reverse=True)
+        report = "\n".join(f"    {dt:8.3f} s  {k}" for dt, k in times)
+        msg = f"=== Device configuration complete ({ptime.time() - start:0.2f} s) ==="
+        print(msg)
+        logMsg(msg)
+        logMsg("Device initialization times:\n" + report)
+
+    def _loadDevicesParallel(self, confs, maxThreads):
+        deps = deviceDependencies({k: c for k, (d, c) in confs.items()})
+        pending = OrderedDict(confs)
+        done = set()
+        running = set()
+        jobs = queue.Queue()
+        results = queue.Queue()
+        threads = []
+        try:
+            while len(pending) > 0 or len(running) > 0:
+                ready = [k for k in pending if deps[k] <= done]
+                if len(ready) == 0 and len(running) == 0:
+                    ## circular references; load the first remaining device and hope for the best
+                    k = next(iter(pending))
+                    logMsg(f"Circular device dependencies among {list(pending)}; loading '{k}' first.",
+                           msgType='warning')
+                    ready = [k]
+
+                mainThread = []
+                for k in ready:
+                    driverName, conf = pending.pop(k)
+                    try:
+                        devClass = devices.getDeviceClass(driverName)
+                    except Exception:
+                        ## let _initDevice report the error
+                        mainThread.append(k)
+                        continue
+                    if not threadedInitAllowed(devClass, conf):
+                        mainThread.append(k)
+                        continue
+                    if len(threads) < maxThreads and len(threads) <= len(running):
+                        thread = DeviceInitThread(self, jobs, results)
+                        thread.start()
+                        threads.append(thread)
+                    jobs.put((driverName, conf, k))
+                    running.add(k)
+
+                for k in mainThread:
+                    self._initDevice(*confs[k], k)
+                    done.add(k)
+                if len(mainThread) > 0 or len(running) == 0:
+                    continue
+
+                k, exc = results.get()
+                running.remove(k)
+                done.add(k)
+                if exc is not None and self.exitOnError:
+                    raise exc
+        finally:
+            ## let devices already started finish loading before returning
+            for thread in threads:
+                jobs.put(None)
+            for thread in threads:
+                thread.wait()
+
+    def _initDevice(self, driverName, conf, name, threaded=False):
+        """Load one device, recording its init time and reporting errors.
+
+        If *threaded*, this is running in a worker thread and the new device is handed over to the main thread.
+        """
+        print(f"  === Configuring device '{name}' ===")
+        logMsg(f"  === Configuring device '{name}' ===")
+        start = ptime.time()
+        try:
+            dev = self.loadDevice(driverName, conf, name)
+            if threaded:
+                moveToMainThread(dev)
+        except:
+            print(f"Error configuring device {name}:")
+            if self.exitOnError:
+                raise
+            else:
+                printExc()
+        finally:
+            with self.lock:
+                self.deviceInitTimes[name] = ptime.time() - start
+
     def listConfigurations(self):
         """Return a list of the named configurations available"""
         return list(self.config.get('configurations', {}).keys())
@@ -454,7 +570,8 @@ class Manager(Qt.QObject):
         """
         devclass = devices.getDeviceClass(devClassName)
         dev = devclass(self, conf, name)
-        self.devices[name] = dev  # just to prevent device being collected
+        with self.lock:
+            self.devices[name] = dev  # just to prevent device being collected
         return dev
 
     def getDevice(self, name):
@@ -666,6 +783,13 @@ class Manager(Qt.QObject):
         self.sigTaskCreated.emit(cmd, t)
         return t
 
+    def taskTimingFinished(self, timing):
+        """Called by tasks when a run finishes; adds its TaskTiming record to the history in
+        self.taskTiming and emits sigTaskTiming.
+        """
+        self.taskTiming.add(timing)
+        self.sigTaskTiming.emit(timing)
+
     def showGUI(self):
         """Show the Manager GUI"""
         if self.gui is None:
@@ -877,6 +1001,85 @@ def getManager() -> Manager:
     return Manager.single
 
 
+def threadedInitAllowed(devClass, conf):
+    """Return True if a device of class *devClass* configured with *conf* may be constructed in a worker thread.
+
+    A ``threadedInit`` value in the device's config takes precedence. Otherwise the class itself (not a base
+    class) must declare threadedInit = True.
+    """
+    return bool(conf.get('threadedInit', vars(devClass).get('threadedInit', False)))
+
+
+def deviceDependencies(devConfigs):
+    """Return {name: set(names)} giving the other devices that each device in *devConfigs* refers to.
+
+    Any string anywhere in a device's config (eg. parentDevice, the 'device' of DAQ channels, clampDevice, lists
+    of recording chambers) that is the name of another device in *devConfigs* counts as a reference. The
+    'driver' value is a class name rather than a device name, and is ignored.
+    """
+    names = set(devConfigs)
+
+    def refs(obj):
+        if isinstance(obj, str):
+            return {obj} & names
+        if isinstance(obj, dict):
+            obj = list(obj.keys()) + list(obj.values())
+        if isinstance(obj, (list, tuple)):
+            found = set()
+            for o in obj:
+                found |= refs(o)
+            return found
+        return set()
+
+    deps = {}
+    for name, conf in devConfigs.items():
+        conf = {k: v for k, v in conf.items() if k != 'driver'}
+        deps[name] = refs(conf) - {name}
+    return deps
+
+
+class DeviceInitThread(Thread):
+    """Worker thread used by Manager to load devices in parallel.
+
+    Loads each (driverName, config, name) taken from *jobs* and puts (name, exception or None) into *results*,
+    until it takes None from *jobs*. This is a QThread so that devices can start Qt timers during init.
+    """
+
+    def __init__(self, manager, jobs, results):
+        Thread.__init__(self, name="DeviceInitThread")
+        self.manager = manager
+        self.jobs = jobs
+        self.results = results
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            driverName, conf, name = job
+            try:
+                self.manager._initDevice(driverName, conf, name, threaded=True)
+                self.results.put((name, None))
+            except Exception as exc:
+                self.results.put((name, exc))
+
+
+def moveToMainThread(dev):
+    """Hand the objects created by the current worker thread while loading *dev* over to the main thread.
+
+    The device itself moves at the start of Device.__init__, but timers and threads that a device keeps as
+    attributes are usually created without a parent; these are moved here so that they run in the main thread.
+    """
+    mainThread = Qt.QCoreApplication.instance().thread()
+    current = Qt.QThread.currentThread()
+    if current == mainThread:
+        return
+    objs = [dev] + [v for v in vars(dev).values() if isinstance(v, Qt.QObject) and not isinstance(v, Qt.QWidget)]
+    for obj in objs:
+        if obj.thread() == current and (obj is dev or obj.parent() is None):
+            obj.moveToThread(mainThread)
+
+
 class DeviceLocker(object):
     def __init__(self, manager, devices, timeout=10.0):
         # make sure we lock devices in a predictable order; this is what prevents deadlocks
@@ -936,6 +1139,7 @@ class Task:
         self.startedDevs = []
         self.startTime = None
         self.stopTime = None
+        self.timing = None  # TaskTiming record for the current (or last) run
 
         # self.reserved = False
         try:
@@ -1022,13 +1226,20 @@ class Task:
 
         If block is true, then the function blocks until the task is complete.
         if processEvents is true, then Qt events are processed while waiting for the task to complete.
+
+        A task may be executed more than once. Each execution re-runs configure() on all device tasks, which
+        allows devices to keep their hardware resources (channels, clocks, buffers) alive between runs and only
+        update what has changed in the command.
         """
         with self.taskLock:
             self.startedDevs = []
+            self.startTime = None
+            self.stopTime = None
             self.stopped = False  # whether sub-tasks have been stopped yet
             self.abortRequested = False
             self._done = False  # cached output of isDone()
-
+            self.timing = TaskTiming(self.id, self.tasks.keys())
+            self._timingReleased = False  # whether the 'release' stage of self.timing has been marked
 
             ## We need to make sure devices are stopped and unlocked properly if anything goes wrong..
             from acq4.util.debug import Profiler
@@ -1039,6 +1250,7 @@ class Task:
                 self.reserveDevices()
 
                 prof.mark('reserve')
+                self.timing.mark('reserve')
 
                 ## Determine order of device configuration.
                 configOrder = self.getConfigOrder()
@@ -1049,11 +1261,13 @@ class Task:
                 for devName in configOrder:
                     self.tasks[devName].configure()
                     prof.mark(f'configure {devName}')
+                    self.timing.mark('configure', devName)
 
                 startOrder = self.getStartOrder()
 
                 if 'leadTime' in self.cfg:
                     time.sleep(self.cfg['leadTime'])
+                    self.timing.mark('leadTime')
 
                 prof.mark('leadSleep')
 
@@ -1069,6 +1283,7 @@ class Task:
                         print(f"Error starting device '{devName}'; aborting task.")
                         raise
                     prof.mark(f'start {devName}')
+                    self.timing.mark('start', devName)
                 self.startTime = ptime.time()
 
                 if not block:
@@ -1094,7 +1309,8 @@ class Task:
                     time.sleep(sleep)
 
                 self.stop()
-            except:
+            except Exception as exc:
+                self.timing.error = f"{type(exc).__name__}: {exc}"
                 printExc("==========  Error in task execution:  ==============")
                 self.abort()
                 self.releaseDevices()
@@ -1172,8 +1388,11 @@ class Task:
 
             prof = Profiler("Manager.Task.stop", disabled=True)
             self.abortRequested = abort
+            timing = self.timing if (self.timing is not None and not self.timing.finished) else None
             try:
                 if not self.stopped:
+                    if timing is not None and self.startTime is not None:
+                        timing.mark('wait')
                     ## Stop all device tasks
                     while len(self.startedDevs) > 0:
                         t = self.startedDevs.pop()
@@ -1182,6 +1401,8 @@ class Task:
                         except:
                             printExc("Error while stopping task %s:" % t)
                         prof.mark("   ..task " + t + " stopped")
+                        if timing is not None:
+                            timing.mark('stop', t)
                     self.stopped = True
 
                 if not abort and not self._tasksDone():
@@ -1197,13 +1418,13 @@ class Task:
                             printExc(f"Error getting result for task {devName} (will set result=None for this task):")
                             result[devName] = None
                         prof.mark("get result: " + devName)
+                        if timing is not None:
+                            timing.mark('getResult', devName)
                     self.result = result
 
-                    ## Store data if requested
-                    if 'storeData' in self.cfg and self.cfg['storeData'] is True:
-                        self.cfg['storageDir'].setInfo(result['protocol'])
-                        for t in self.tasks:
-                            self.tasks[t].storeResult(self.cfg['storageDir'])
+                    ## Store data if requested (unless the caller will do this later)
+                    if self.cfg.get('storeData', False) is True and not self.cfg.get('deferStorage', False):
+                        self.storeResult()
                     prof.mark("store data")
             finally:
                 ## Regardless of any other problems, at least make sure we
@@ -1215,6 +1436,15 @@ class Task:
                 prof.mark("release all")
                 prof.finish()
 
+                # a run is finished once its results are collected or it is aborted; if storage is
+                # deferred, storeResult() finishes the record instead
+                if timing is not None and not self._timingReleased and (abort or self.result is not None):
+                    self._timingReleased = True
+                    timing.mark('release')
+                    if abort or not self._storageDeferred():
+                        timing.finish(error='aborted' if abort else None)
+                        self.dm.taskTimingFinished(timing)
+
             if abort:
                 gc.collect()  ## it is often the case that now is a good time to garbage-collect.
 
@@ -1223,6 +1453,40 @@ class Task:
             self.stop()
             return self.result
 
+    def storeResult(self):
+        """Store the results of all device tasks in the directory given by the 'storageDir' option.
+
+        This is called automatically when the task is stopped if 'storeData' is True. If the 'deferStorage'
+        option is also True, then the caller is responsible for calling storeResult() after the task has
+        finished; this allows storage to happen in the background after devices have been released. The
+        task's timing record is then finished here, with the time spent waiting for storage to begin
+        recorded as the 'storeWait' stage.
+        """
+        with self.taskLock:
+            if self.result is None:
+                raise Exception("Cannot store result; task has not finished.")
+            timing = self.timing if (self.timing is not None and not self.timing.finished) else None
+            deferred = self._storageDeferred()
+            if timing is not None and deferred:
+                timing.mark('storeWait')
+            try:
+                self.cfg['storageDir'].setInfo(self.result['protocol'])
+                for t in self.tasks:
+                    self.tasks[t].storeResult(self.cfg['storageDir'])
+                    if timing is not None:
+                        timing.mark('store', t)
+            except Exception as exc:
+                if timing is not None:
+                    timing.error = f"{type(exc).__name__}: {exc}"
+                raise
+            finally:
+                if timing is not None and deferred:
+                    timing.finish()
+                    self.dm.taskTimingFinished(timing)
+
+    def _storageDeferred(self):
+        return self.cfg.get('storeData', False) is True and self.cfg.get('deferStorage', False)
+
     def reserveDevices(self):
         if self.deviceLock is None:
             try:
@@ -2,16 +2,26 @@ import os
 import sys
 
 __version__ = '0.9.3'
-
-# If we are running from a git repo, generate a more descriptive version number
-from .util.gitversion import getGitVersion
-
-try:
-    gitv = getGitVersion('acq4', os.path.join(os.path.dirname(__file__), '..'))
-    if gitv is not None:
-        __version__ = gitv
-except Exception:
-    pass
+_gitVersion = None
+
+
+def getVersion():
+    """Return the ACQ4 version string.
+
+    If we are running from a git repo, this is a more descriptive version number generated by git (this runs a
+    subprocess, so it is only done when first requested rather than at import time).
+    """
+    global _gitVersion
+    if _gitVersion is None:
+        _gitVersion = __version__
+        from .util.gitversion import getGitVersion
+        try:
+            gitv = getGitVersion('acq4', os.path.join(os.path.dirname(__file__), '..'))
+            if gitv is not None:
+                _gitVersion = gitv
+        except Exception:
+            pass
+    return _gitVersion
 
 # Set up a list of paths to search for configuration files
 # (used if no config is explicitly specified)
@@ -34,4 +44,11 @@ CONFIGPATH.extend([
 ])
 
 
-from .Manager import getManager
+def __getattr__(name):
+    # Importing the Manager pulls in the device and module frameworks; scripts that only need eg. DataManager or
+    # MetaArray should not pay for that, so acq4.Manager and acq4.getManager are imported on first access.
+    if name in ('Manager', 'getManager'):
+        from importlib import import_module
+        Manager = import_module('acq4.Manager')
+        return Manager if name == 'Manager' else Manager.getManager
+    raise AttributeError(f"module 'acq4' has no attribute {name!r}")
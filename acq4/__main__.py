@@ -11,6 +11,15 @@ if __package__ is None:
 
     __package__ = 'acq4'
 
+## Record import times until startup is complete (see acq4.util.import_timing)
+if "--import-times" in sys.argv:
+    sys.argv.pop(sys.argv.index('--import-times'))
+    from .util.import_timing import ImportTimer
+    importTimer = ImportTimer()
+    importTimer.install()
+else:
+    importTimer = None
+
 from .util import pg_setup  
 from .Manager import Manager
 from .util.debug import installExceptionHandler
@@ -101,6 +110,10 @@ gc = GarbageCollector(interval=1.0, debug=False)
 ## Create Manager. This configures devices and creates the main manager window.
 man = Manager.runFromCommandLine(argv=sys.argv[1:])
 
+if importTimer is not None:
+    importTimer.uninstall()
+    print(importTimer.report())
+
 # If example config was loaded, offer more help to the user.
 message = f"""\
 <center><b>Demo mode:</b><br>\
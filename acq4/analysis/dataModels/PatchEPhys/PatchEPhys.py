@@ -270,13 +270,28 @@ def getClampCommand(data, generateEmpty=True):
 
 
 def getClampPrimary(data):
-    """Return primary channel from """
+    """Return primary channel from a clamp MetaArray or clamp file handle.
+    Given a file handle, only the primary channel is read from disk."""
+    if not hasattr(data, 'implements'):
+        try:
+            return data.read(select={'Channel': 'primary'})
+        except ValueError:
+            return data.read(select={'Channel': 'scaled'})
     if data.hasColumn('Channel', 'primary'):
         return data['Channel': 'primary']
     else:
         return data['Channel': 'scaled']
 
 
+def readClampData(data_handle):
+    """Read the channels of a clamp file handle that getClampPrimary and getClampCommand use.
+    The result has the same axes and info as data_handle.read(), but other channels (eg. secondary)
+    are not read from disk."""
+    channels = data_handle.read(readAllData=False).listColumns('Channel')
+    primary = 'primary' if 'primary' in channels else 'scaled'
+    return data_handle.read(select={'Channel': [c for c in channels if c in (primary, 'Command', 'command')]})
+
+
 def getClampMode(data_handle, dir_handle=None):
     """Given a clamp file handle or MetaArray, return the recording mode."""
     if (hasattr(data_handle, 'implements') and data_handle.implements('MetaArray')):
@@ -698,7 +713,7 @@ class GetClamps():
                     continue
             except:
                 raise Exception("Error loading data for protocol %s:" % directory_name)
-            data_file = data_file_handle.read()
+            data_file = readClampData(data_file_handle)
 
             self.data_mode = getClampMode(data_file, dir_handle=dh)
             if self.data_mode is None:
@@ -18,6 +18,8 @@ import acq4.util.DataManager as DataManager
 import acq4.analysis.atlas as atlas
 from acq4.util.Canvas.Canvas import Canvas
 from acq4.util.Canvas import items
+from acq4.util.Canvas.items.ImageCanvasItem import ImageCanvasItem
+from acq4.util.Canvas.items.TiledImageCanvasItem import TiledImageCanvasItem
 import acq4
 
 
@@ -203,13 +205,18 @@ class MosaicEditor(AnalysisModule):
                         item = self.addFile(f)
         self.canvas.autoRange()
 
-    def addFile(self, f, name=None, inheritTransform=True):
+    def addFile(self, f, name=None, inheritTransform=True, state=None):
         """Load a file and add it to the canvas.
         
         The new item will inherit the user transform from the previous item
         (chronologocally) if it does not already have a user transform specified.
+        *state* is the saved item state that will be restored afterward, if any (see useTiles).
         """
-        item = self.canvas.addFile(f, name=name)
+        if self.useTiles(f, state):
+            item = TiledImageCanvasItem(handle=f, name=name)
+            self.canvas.addItem(item)
+        else:
+            item = self.canvas.addFile(f, name=name)
         self.canvas.selectItem(item)
         
         if isinstance(item, list):
@@ -241,6 +248,27 @@ class MosaicEditor(AnalysisModule):
             
         return item
 
+    @staticmethod
+    def useTiles(f, state=None):
+        """Return True if the image file *f* should be displayed with a TiledImageCanvasItem, which loads only
+        the resolution needed for the current view (see acq4.util.Canvas.items.TiledImageCanvasItem).
+
+        Tiled items offer neither the image filter nor the frame slider, so a regular ImageCanvasItem is used
+        for image stacks, for images whose saved item *state* has a filter, and for images no larger than their
+        biggest thumbnail level (which gain nothing from tiling).
+        """
+        if not (f.isFile() and DataManager.thumbnails.isImageFile(f) and 'transform' in f.info()):
+            return False
+        if state is not None and 'filter' in state:
+            return False
+        try:
+            cache = f.parent().thumbnailCache()
+            thumb = cache.getOrBuild(f)
+        except Exception:
+            ## let ImageCanvasItem report whatever is wrong with the file
+            return False
+        return thumb.frameIndex is None and max(thumb.shape[:2]) > cache.maxSize
+
     def addItem(self, item=None, type=None, **kwds):
         """Add an item to the MosaicEditor canvas.
 
@@ -252,66 +280,42 @@ class MosaicEditor(AnalysisModule):
         else:
             return self.canvas.addItem(item, type, **kwds)
 
+    def imageItems(self, selected=True):
+        """Return the (selected) image items on the canvas."""
+        itemList = self.canvas.selectedItems() if selected else self.canvas.items
+        return [item for item in itemList if isinstance(item, ImageCanvasItem)]
+
     def rescaleImages(self):
         """
-        Apply corrections to the images and rescale the data.
-        This does the following:
-        1. compute mean image over entire selected group
-        2. smooth the mean image heavily.
-        3. rescale the images and correct for field flatness from the average image
-        4. apply the scale.
+        Rescale the selected images to a common gain.
+        A histogram of the levels in all selected images is computed from downsampled copies of the
+        displayed images, and each image's display levels are set so that the peak of its own histogram
+        matches the peak of the global histogram. The image data itself is not modified.
         Use the min/max mosaic button to readjust the display scale after this
         automatic operation if the scaling is not to your liking.
         """
-        nsel =  len(self.canvas.selectedItems())
-        if nsel == 0:
+        previews = OrderedDict()
+        for item in self.imageItems():
+            img = item.graphicsItem().image
+            if img is None:
+                continue  # not loaded yet
+            stride = max(1, int(np.ceil(max(img.shape[:2]) / 256.)))
+            previews[item] = np.asarray(img[::stride, ::stride], dtype=float)
+        if len(previews) == 0:
             return
-       # print dir(self.selectedItems()[0].data)
-        nxm = self.canvas.selectedItems()[0].data.shape
-        meanImage = np.zeros((nxm[0], nxm[1]))
+
         nhistbins = 100
         # generate a histogram of the global levels in the image (all images selected)
-        hm = np.histogram(np.dstack([x.data for x in self.canvas.selectedItems()]), nhistbins)
-        print(hm)
-        #$meanImage = np.mean(self.selectedItems().asarray(), axis=0)
-        n = 0
-        self.imageMax = 0.0
-        print('nsel: ', nsel)
-        for i in range(nsel):
-            try:
-                meanImage = meanImage + np.array(self.canvas.selectedItems()[i].data)
-                imagemax = np.amax(np.amax(meanImage, axis=1), axis=0)
-                if imagemax > self.imageMax:
-                    self.imageMax = imagemax
-                n = n + 1
-            except:
-                print('image i = %d failed' % i)
-                print('file name: ', self.canvas.selectedItems()[i].name)
-                print('expected shape of nxm: ', nxm)
-                print(' but got data shape: ', self.canvas.selectedItems()[i].data.shape)
-
-        meanImage = meanImage/n # np.mean(meanImage[0:n], axis=0)
-        filtwidth = np.floor(nxm[0]/10+1)
-        blimg = scipy.ndimage.filters.gaussian_filter(meanImage, filtwidth, order = 0, mode='reflect')
-        #pg.image(blimg)
-        
-        m = np.argmax(hm[0]) # returns the index of the max count
-        print('m = ', m)
-        # now rescale each individually
+        hm = np.histogram(np.concatenate([p.ravel() for p in previews.values()]), nhistbins)
+        m = np.argmax(hm[0])  # returns the index of the max count
+        self.imageMax = max(p.max() for p in previews.values())
+
         # rescaling is done against the global histogram, to keep the gain constant.
-        for i in range(nsel):
-            d = np.array(self.canvas.selectedItems()[i].data)
-#            hmd = np.histogram(d, 512) # return (count, bins)
-            xh = d.shape # capture shape just in case it is not right (have data that is NOT !!)
-            # flatten the illumination using the blimg average illumination pattern
-            newImage = d # / blimg[0:xh[0], 0:xh[1]] # (d - imin)/(blimg - imin) # rescale image.
-            hn = np.histogram(newImage, bins = hm[1]) # use bins from global image
+        for item, preview in previews.items():
+            hn = np.histogram(preview, bins=hm[1])  # use bins from global image
             n = np.argmax(hn[0])
-            newImage = (hm[1][m]/hn[1][n])*newImage # rescale to the global max.
-            self.canvas.selectedItems()[i].updateImage(newImage)
-         #   self.canvas.selectedItems()[i].levelRgn.setRegion([0, 2.0])
-            self.canvas.selectedItems()[i].levelRgn.setRegion([0., self.imageMax])
-        print("MosaicEditor::self imageMax: ", self.imageMax)
+            gain = hm[1][m] / hn[1][n]
+            item.histogram.setLevels(0., self.imageMax / gain)
 
     def normalizeImages(self):
         self.canvas.view.autoRange()
@@ -320,36 +324,31 @@ class MosaicEditor(AnalysisModule):
         """
         Set all the selected images to have the scaling in the editor bar (absolute values)
         """
-        nsel =  len(self.canvas.selectedItems())
-        if nsel == 0:
-            return
-        for i in range(nsel):
-            self.canvas.selectedItems()[i].levelRgn.setRegion([self.ui.mosaicDisplayMin.value(),
-                                                               self.ui.mosaicDisplayMax.value()])
+        for item in self.imageItems():
+            item.histogram.setLevels(self.ui.mosaicDisplayMin.value(), self.ui.mosaicDisplayMax.value())
 
     def flipUD(self):
         """
         flip each image array up/down, in place. Do not change position.
         Note: arrays are rotated, so use lr to do ud, etc.
         """
-        nsel =  len(self.canvas.selectedItems())
-        if nsel == 0:
-            return
-        for i in range(nsel):
-            self.canvas.selectedItems()[i].data = np.fliplr(self.canvas.selectedItems()[i].data)
-            self.canvas.selectedItems()[i].graphicsItem().updateImage(self.canvas.selectedItems()[i].data)
-           # print dir(self.canvas.selectedItems()[i])
+        for item in self.imageItems():
+            if isinstance(item, TiledImageCanvasItem):
+                item.flipImage(1)
+                continue
+            item.data = np.fliplr(item.data)
+            item.graphicsItem().updateImage(item.data)
 
     def flipLR(self):
         """
         Flip each image array left/right, in place. Do not change position.
         """
-        nsel =  len(self.canvas.selectedItems())
-        if nsel == 0:
-            return
-        for i in range(nsel):
-            self.canvas.selectedItems()[i].data = np.flipud(self.canvas.selectedItems()[i].data)
-            self.canvas.selectedItems()[i].graphicsItem().updateImage(self.canvas.selectedItems()[i].data)
+        for item in self.imageItems():
+            if isinstance(item, TiledImageCanvasItem):
+                item.flipImage(0)
+                continue
+            item.data = np.flipud(item.data)
+            item.graphicsItem().updateImage(item.data)
 
     def itemMoved(self, canvas, item):
         """Save an item's transformation if the user has moved it. 
@@ -443,7 +442,7 @@ class MosaicEditor(AnalysisModule):
                     fh = DataManager.getHandle(fh)
                 else:
                     fh = root[fname]
-                item = self.addFile(fh, name=itemState['name'], inheritTransform=False)
+                item = self.addFile(fh, name=itemState['name'], inheritTransform=False, state=itemState)
             item.restoreState(itemState)
 
         self.canvas.view.setState(state['view'])
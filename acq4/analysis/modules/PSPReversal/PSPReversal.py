@@ -623,11 +623,11 @@ class PSPReversal(AnalysisModule):
             except:
                 print("Error loading data for protocol %s:" % directory_name)
                 continue  # If something goes wrong here, we just carry on
-            data_file = data_file_handle.read()
+            data_file = self.dataModel.readClampData(data_file_handle)
             self.devicesUsed = self.dataModel.getDevices(data_dir_handle)
             self.holding = self.dataModel.getClampHoldingLevel(data_file_handle)
-            self.amp_settings = self.dataModel.getWCCompSettings(data_file)
-            self.clamp_state = self.dataModel.getClampState(data_file)
+            self.amp_settings = self.dataModel.getWCCompSettings(data_file_handle)
+            self.clamp_state = self.dataModel.getClampState(data_file_handle)
             # print self.devicesUsed
             cmd = self.dataModel.getClampCommand(data_file)
             data = self.dataModel.getClampPrimary(data_file)
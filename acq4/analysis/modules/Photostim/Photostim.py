@@ -12,6 +12,8 @@ import pyqtgraph as pg
 import acq4.util.ColorMapper as ColorMapper
 import acq4.util.debug as debug
 from acq4.analysis.AnalysisModule import AnalysisModule
+from acq4.analysis.tools.BatchProcessor import shutdownBatchProcessor
+from acq4.analysis.tools.ResultCache import stateHash
 from pyqtgraph import multiprocess
 from pyqtgraph.flowchart import Flowchart
 from acq4.util import Qt
@@ -35,6 +37,7 @@ class Photostim(AnalysisModule):
             raise Exception("Photostim analysis module requires a data model, but none is loaded yet.")
         self.dbIdentity = "Photostim"  ## how we identify to the database; this determines which tables we own
         self.selectedSpot = None
+        self._cacheStates = {}  ## 'events'/'stats': hash of the flowchart state(s) that produce them
         
         ## setup analysis flowchart
         modPath = os.path.abspath(os.path.split(__file__)[0])
@@ -127,6 +130,7 @@ class Photostim(AnalysisModule):
     def quit(self):
         self.scans = []
         self.maps = []
+        shutdownBatchProcessor()
         return AnalysisModule.quit(self)
         
     def elementChanged(self, element, old, new):
@@ -341,6 +345,7 @@ class Photostim(AnalysisModule):
     def detectorStateChanged(self):
         #print "STATE CHANGE"
         #print "Detector state changed"
+        self._cacheStates = {}
         for scan in self.scans:
             scan.invalidateEvents()
         
@@ -356,6 +361,7 @@ class Photostim(AnalysisModule):
 
     def analyzerStateChanged(self):
         #print "Analyzer state changed."
+        self._cacheStates.pop('stats', None)
         for scan in self.scans:
             scan.invalidateStats()
         
@@ -403,6 +409,28 @@ class Photostim(AnalysisModule):
         return ret
         
 
+    def cacheState(self, kind):
+        """Return a hash of the analysis state that determines results of *kind* ('events' or 'stats').
+
+        Scan uses this as part of the key when caching results on disk.
+        """
+        if kind not in self._cacheStates:
+            state = [self.detector.flowchart.saveState()]
+            if kind == 'stats':
+                state.append(self.flowchart.saveState())
+            self._cacheStates[kind] = stateHash(state)
+        return self._cacheStates[kind]
+
+    def spotPosition(self, spot):
+        """Return the (x, y) position of *spot* as recorded in its stats."""
+        try:
+            pos = spot.viewPos()
+            return pos.x(), pos.y()
+        except:
+            # just try substituting with spot.pos:
+            p = spot.pos()
+            return p[0], p[1]
+
     def processStats(self, data=None, spot=None):
         ## Process output of stats flowchart for a single spot, add spot position fields.
         ## data  is the input to the stats flowchart
@@ -429,15 +457,12 @@ class Photostim(AnalysisModule):
         if stats is None:
             raise Exception('No data returned from analysis (check flowchart for errors).')
             
-        try:
-            pos = spot.viewPos()
-            stats['xPos'] = pos.x()
-            stats['yPos'] = pos.y()
-        except:
-            # just try substituting with spot.pos:
-            p = spot.pos()
-            stats['xPos'] = p[0]
-            stats['yPos'] = p[1]
+        return self.annotateStats(stats, spot)
+
+    def annotateStats(self, stats, spot):
+        """Add spot position and protocol directory fields to the stats computed for *spot*."""
+        dh = spot.data()
+        stats['xPos'], stats['yPos'] = self.spotPosition(spot)
         #d = spot.data.parent()
         #size = d.info().get('Scanner', {}).get('spotSize', 100e-6)
         #stats['spotSize'] = size
@@ -454,6 +479,17 @@ class Photostim(AnalysisModule):
         
         return stats
 
+    def batchCharts(self):
+        """Return (charts, params) used by Scan to run detection and analysis in the batch worker pool
+        (see BatchProcessor.detectAndAnalyze).
+        """
+        charts = {'detector': self.detector.flowchart, 'analyzer': self.flowchart}
+        params = {}
+        output = self.detector.flowchart.output()
+        if 'regions' in output:
+            params['regions'] = output['regions']
+        return charts, params
+
 
 
     def storeDBSpot(self):
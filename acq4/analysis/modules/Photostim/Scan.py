@@ -5,6 +5,8 @@ import acq4.util.Canvas as Canvas
 import acq4.util.functions as fn
 import pyqtgraph as pg
 import pyqtgraph.multiprocess as mp
+from acq4.analysis.tools.BatchProcessor import detectAndAnalyze, getBatchProcessor
+from acq4.analysis.tools.ResultCache import getResultCache
 from acq4.util import Qt
 
 
@@ -277,33 +279,72 @@ class Scan(Qt.QObject):
             return
         spots = self.spots()
         handles = [(spot.data(), self.host.dataModel.getClampFile(spot.data())) for spot in spots]
-        result = []
+        msg = "Processing scan (%d / %d)" % (n+1, nMax)
         
-        ## This can be very slow; try to run in parallel (requires fork(); runs serially on windows).
+        ## This can be very slow; if requested, analyze all uncached spots in the batch worker pool first.
         start = time.time()
-        workers = None if parallel else 1
-        msg = "Processing scan (%d / %d)" % (n+1, nMax)
-        with mp.Parallelize(tasks=enumerate(handles), result=result, workers=workers, progressDialog=msg) as tasker:
-            for i, dhfh in tasker:
-                dh, fh = dhfh
-                events = self.getEvents(fh, signal=False)
+        if parallel and hasattr(self.host, 'batchCharts'):
+            self.processBatch(handles, msg)
+        
+        colors = []
+        with pg.ProgressDialog(msg, 0, len(spots)) as dlg:
+            for i, (dh, fh) in enumerate(handles):
+                self.getEvents(fh, signal=False)
                 stats = self.getStats(dh, signal=False)
-                color = self.host.getColor(stats)
-                tasker.result.append((i, color, stats, events))
+                colors.append(self.host.getColor(stats))
+                dlg.setValue(i)
+                if dlg.wasCanceled():
+                    raise mp.CanceledError()
                 
         print("recolor took %0.2fsec" % (time.time() - start))
         
-        ## Collect all results, store to caches, and recolor spots
-        for i, color, stats, events in result:
-            dh, fh = handles[i]
-            self.updateStatCache(dh, stats)
-            self.updateEventCache(fh, events, signal=False)
-            spot = spots[i]
+        for spot, color in zip(spots, colors):
             spot.setBrush(color)
         
         self.sigEventsChanged.emit(self)  ## it's possible events didn't actually change, but meh.
         
+    def processBatch(self, handles, msg):
+        """Run event detection and stats analysis for all of *handles* [(dh, fh), ...] whose results are
+        neither in memory nor in the on-disk cache, using the shared BatchProcessor worker pool.
+        
+        Results are stored to the same caches that getEvents and getStats use. Spots that fail are left
+        uncached, so they are analyzed again (and their errors reported) by the serial path.
+        """
+        if self.eventsLocked:
+            return  ## events come from the DB; nothing to detect
+        cache = getResultCache()
+        todo = []
+        for dh, fh in handles:
+            needEvents = fh not in self.events or fh not in self.eventCacheValid
+            needStats = dh not in self.stats or (not self.statsLocked and dh not in self.statCacheValid)
+            if not (needEvents or needStats):
+                continue
+            evKey = self.cacheKey('events', fh)
+            statsKey = self.cacheKey('stats', fh, dh.name())
+            if evKey is not None and evKey in cache and statsKey in cache:
+                continue
+            todo.append((dh, fh, evKey, statsKey, needStats))
+        if len(todo) == 0:
+            return
         
+        charts, params = self.host.batchCharts()
+        results = getBatchProcessor().run(detectAndAnalyze, [(fh, dh) for dh, fh, _, _, _ in todo],
+                                          charts, params, progressDialog=msg)
+        for (dh, fh, evKey, statsKey, needStats), (ok, result) in zip(todo, results):
+            if not ok:
+                print("Batch analysis of %s failed; will retry serially:\n%s" % (fh.name(), result))
+                continue
+            events, stats = result
+            if evKey is not None:
+                cache.set(evKey, events)
+            self.updateEventCache(fh, events, signal=False)
+            if stats is None:
+                continue
+            self.host.annotateStats(stats, self.getSpot(dh))
+            if statsKey is not None:
+                cache.set(statsKey, stats)
+            if needStats:
+                self.updateStatCache(dh, stats)
             
     def getStats(self, dh, signal=True):
         ## Return stats for a single file. (cached if available)
@@ -318,10 +359,17 @@ class Scan(Qt.QObject):
             fh = self.host.dataModel.getClampFile(dh)
             events = self.getEvents(fh, signal=signal)
             try:
-                stats = self.host.processStats(events, spot)
+                if self.eventsLocked:
+                    ## events came from the DB rather than the current detector state; don't cache stats derived from them
+                    stats = self.host.processStats(events, spot)
+                else:
+                    stats = self.cachedResult('stats', fh, lambda: self.host.processStats(events, spot), dh.name())
             except:
                 print(events)
                 raise
+            if hasattr(self.host, 'spotPosition'):
+                ## cached stats may come from a scan that has since been moved
+                stats['xPos'], stats['yPos'] = self.host.spotPosition(spot)
             
             ## NOTE: Cache update must be taken care of elsewhere if this function is run in a parallel process!
             self.updateStatCache(dh, stats)
@@ -344,13 +392,35 @@ class Scan(Qt.QObject):
             
             if process:
                 #print "No event cache for", fh.name(), "compute.."
-                events = self.host.processEvents(fh)  ## need ALL output from the flowchart; not just events
+                events = self.cachedResult('events', fh, lambda: self.host.processEvents(fh))  ## need ALL output from the flowchart; not just events
                 ## NOTE: Cache update must be taken care of elsewhere if this function is run in a parallel process!
                 self.updateEventCache(fh, events, signal)
             else:
                 return None
         return self.events[fh]
         
+    def cachedResult(self, kind, fh, compute, *keys):
+        """Return a result of *kind* ('events' or 'stats') for clamp file *fh*, computing it with compute()
+        only if it is not already in the on-disk analysis cache.
+
+        Results are keyed by the identity of *fh* (path, modification time, size), the host's analysis state
+        (see Photostim.cacheState) and any extra *keys*. Hosts without a cacheState() method are not cached.
+        """
+        key = self.cacheKey(kind, fh, *keys)
+        if key is None:
+            return compute()
+        return getResultCache().getOrCompute(key, compute)
+
+    def cacheKey(self, kind, fh, *keys):
+        """Return the on-disk cache key for a result of *kind* computed from clamp file *fh* (see cachedResult),
+        or None if such results are not cached.
+        """
+        cacheState = getattr(self.host, 'cacheState', None)
+        cache = getResultCache()
+        if cache is None or cacheState is None or fh is None:
+            return None
+        return cache.makeKey(kind, cache.fileIdentity(fh), cacheState(kind), *keys)
+
     def updateEventCache(self, fh, events, signal=True):
         self.events[fh] = events
         self.eventCacheValid.add(fh)
@@ -883,7 +883,7 @@ class pbm_ImageAnalysis(AnalysisModule):
         if dh is None:
             return
         self.clearPhysiologyInfo()
-        data = self.dataModel.getClampFile(dh).read()  # retrieve the physiology traces
+        data = self.dataModel.readClampData(self.dataModel.getClampFile(dh))  # retrieve the physiology traces
         self.physData = self.dataModel.getClampPrimary(data).asarray()
         if self.dataModel.getClampMode(data) == 'IC':
             self.physData = self.physData * 1e3  # convert to mV
@@ -0,0 +1,190 @@
+"""
+BatchProcessor.py - run analysis flowcharts over many files in a pool of worker processes.
+
+The pool is persistent: worker processes are started once and reused for every batch. Each
+worker keeps its own copies of the flowcharts used by a job, rebuilt from their saved state only
+when that state changes, so repeated batches (for example, recoloring a map after adjusting
+the color scheme) do not pay the cost of starting Python, importing acq4 and restoring the
+flowcharts again. Workers are started with the 'spawn' method, so the pool works the same way
+on all platforms.
+
+Files are sent to the workers in chunks; results come back as each chunk finishes, which lets
+the caller show progress and cancel a batch that is still running.
+"""
+import concurrent.futures
+import multiprocessing
+import os
+import traceback
+
+import pyqtgraph as pg
+from pyqtgraph.multiprocess import CanceledError
+
+from acq4.analysis.tools.ResultCache import stateHash
+from acq4.util import Qt
+
+_defaultProcessor = None
+
+## in worker processes: {chart name: (state hash, Flowchart)}
+_workerCharts = {}
+
+
+def _initWorker():
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    pg.mkQApp()
+    import acq4.util.flowchart  # registers acq4's flowchart node types
+
+
+def _getCharts(states, keys):
+    from pyqtgraph.flowchart import Flowchart
+
+    charts = {}
+    for name, state in states.items():
+        cached = _workerCharts.get(name)
+        if cached is None or cached[0] != keys[name]:
+            fc = Flowchart()
+            fc.restoreState(state)
+            cached = (keys[name], fc)
+            _workerCharts[name] = cached
+        charts[name] = cached[1]
+    return charts
+
+
+def _runChunk(job, states, keys, params, items):
+    """Run job(charts, params, item) for each item in a worker process.
+
+    Returns a list of (True, result) or (False, formatted traceback), one per item.
+    """
+    charts = _getCharts(states, keys)
+    results = []
+    for item in items:
+        try:
+            results.append((True, job(charts, params, item)))
+        except Exception:
+            results.append((False, traceback.format_exc()))
+    return results
+
+
+class BatchProcessor:
+    """Persistent pool of worker processes that run flowchart-based analysis jobs.
+
+    A job is a picklable (module-level) function ``job(charts, params, item)``, where *charts* is
+    a dict of Flowcharts restored from the states passed to run(). See detectAndAnalyze for the
+    job used by Photostim.
+    """
+
+    def __init__(self, workers=None):
+        if workers is None:
+            workers = max(1, (os.cpu_count() or 2) - 1)
+        self.workers = workers
+        self._pool = None
+
+    def pool(self):
+        if self._pool is None:
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_initWorker,
+            )
+        return self._pool
+
+    def run(self, job, items, charts, params=None, chunkSize=None, progressDialog=None):
+        """Run *job* on each of *items* and return the results in the same order.
+
+        *charts* is a dict {name: Flowchart or Flowchart.saveState()} describing the flowcharts the
+        job needs. Each result is (True, value) or (False, traceback string) if the job raised an
+        exception for that item.
+
+        If *progressDialog* is a string, a progress dialog with that label is displayed. Canceling
+        the dialog stops the batch and raises pyqtgraph.multiprocess.CanceledError.
+        """
+        items = list(items)
+        if len(items) == 0:
+            return []
+        params = params or {}
+        states = {name: (fc if isinstance(fc, dict) else fc.saveState()) for name, fc in charts.items()}
+        keys = {name: stateHash(state) for name, state in states.items()}
+        if chunkSize is None:
+            ## a few chunks per worker balances the load without too much messaging overhead
+            chunkSize = max(1, min(16, len(items) // (self.workers * 4)))
+
+        pool = self.pool()
+        futures = {}
+        for start in range(0, len(items), chunkSize):
+            fut = pool.submit(_runChunk, job, states, keys, params, items[start:start + chunkSize])
+            futures[fut] = start
+
+        results = [None] * len(items)
+        done = 0
+        label = progressDialog if isinstance(progressDialog, str) else "Processing.."
+        with pg.ProgressDialog(label, 0, len(items), disable=progressDialog is None) as dlg:
+            pending = set(futures)
+            try:
+                while len(pending) > 0:
+                    finished, pending = concurrent.futures.wait(
+                        pending, timeout=0.1, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for fut in finished:
+                        chunk = fut.result()
+                        start = futures[fut]
+                        results[start:start + len(chunk)] = chunk
+                        done += len(chunk)
+                    dlg.setValue(done)
+                    Qt.QApplication.processEvents()
+                    if dlg.wasCanceled():
+                        raise CanceledError()
+            except BaseException:
+                ## chunks already running will finish, but their results are discarded
+                for fut in pending:
+                    fut.cancel()
+                raise
+        return results
+
+    def shutdown(self):
+        """Stop all worker processes. The pool is restarted if run() is called again."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def detectAndAnalyze(charts, params, item):
+    """Batch job that runs event detection and stats analysis on one photostimulation site.
+
+    *item* is (clamp file handle, protocol dir handle). The 'detector' chart is given the clamp file
+    as its 'dataIn' input. If there is an 'analyzer' chart, it is given all detector outputs, the
+    protocol dir as 'fileHandle', and any extra inputs in *params* (eg. 'regions') that the
+    detector did not produce. Returns (events, stats); stats is None if there is no analyzer.
+    """
+    fh, dh = item
+    events = charts['detector'].process(dataIn=fh)
+    if 'analyzer' not in charts:
+        return events, None
+    data = dict(params)
+    data.update(events)
+    data['fileHandle'] = dh
+    stats = charts['analyzer'].process(**data)['dataOut']
+    return events, stats
+
+
+def getBatchProcessor():
+    """Return the BatchProcessor shared by all analysis modules.
+
+    The number of worker processes is given by the 'analysisWorkers' config option (at the top
+    level or under 'misc'); by default one fewer than the number of CPUs is used.
+    """
+    global _defaultProcessor
+    if _defaultProcessor is None:
+        from acq4 import getManager
+
+        config = {}
+        try:
+            config = getManager().config.copy()
+            config.update(config.get('misc', {}))
+        except Exception:
+            pass  # no manager running (eg. in scripts); use defaults
+        _defaultProcessor = BatchProcessor(workers=config.get('analysisWorkers', None))
+    return _defaultProcessor
+
+
+def shutdownBatchProcessor():
+    """Stop the worker processes of the shared BatchProcessor, if it was started."""
+    if _defaultProcessor is not None:
+        _defaultProcessor.shutdown()
@@ -0,0 +1,205 @@
+"""
+ResultCache.py - persistent, content-addressed cache for analysis results.
+
+Results are stored on disk (one pickle file per entry) under a key computed from everything the
+result depends on: typically the identity of the source data file (path, modification time and
+size) and a hash of the analysis state (for example, the state of a flowchart). Because keys
+are content-based, entries never need to be invalidated; changing the data or the analysis
+simply leads to a different key. The cache is shared by all modules and sessions that use the
+same cache directory. Its size may be limited, in which case the least recently used entries are
+removed to make room for new ones.
+"""
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+from acq4.util.debug import printExc
+
+_NO_VALUE = object()
+_defaultCache = None
+
+
+class ResultCache:
+    """Persistent cache of picklable analysis results, stored in *path*.
+
+    If *maxBytes* is given, storing an entry that brings the total size of the cache above it removes the
+    least recently used entries, down to 80% of *maxBytes*. Reading an entry marks it as used by updating
+    its modification time, so all processes sharing the directory see the same order.
+    """
+
+    def __init__(self, path, maxBytes=None):
+        self.path = path
+        self.maxBytes = maxBytes
+        self._size = None  ## running estimate of the total size of the entries; counted on first set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fileIdentity(fh):
+        """Return a tuple identifying the current content of the file (or directory) handle *fh*."""
+        name = fh.name()
+        st = os.stat(name)
+        return (name, st.st_mtime_ns, st.st_size)
+
+    @staticmethod
+    def makeKey(*parts):
+        """Return a cache key for *parts*, which may be numpy arrays, or any objects with a stable repr()
+        (dicts, lists and tuples of these included).
+        """
+        return hashlib.sha1(repr(_canonical(parts)).encode()).hexdigest()
+
+    def _entryPath(self, key):
+        return os.path.join(self.path, key[:2], key + '.pkl')
+
+    def get(self, key, default=None):
+        """Return the value stored for *key*, or *default* if there is none (or it cannot be read)."""
+        fileName = self._entryPath(key)
+        if not os.path.exists(fileName):
+            return default
+        try:
+            with open(fileName, 'rb') as fh:
+                value = pickle.load(fh)
+        except Exception:
+            printExc("Ignoring unreadable analysis cache entry %s:" % fileName)
+            return default
+        try:
+            os.utime(fileName)
+        except OSError:
+            pass  ## removed by another process in the meantime; the value is still good
+        return value
+
+    def __contains__(self, key):
+        return os.path.exists(self._entryPath(key))
+
+    def set(self, key, value):
+        """Store *value* for *key*. Failures (eg. unpicklable values) are reported but not raised."""
+        fileName = self._entryPath(key)
+        try:
+            os.makedirs(os.path.dirname(fileName), exist_ok=True)
+            # write to a temporary file first so that concurrent readers never see a partial entry
+            fd, tmpName = tempfile.mkstemp(dir=os.path.dirname(fileName), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as fh:
+                    pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmpName, fileName)
+            except Exception:
+                os.remove(tmpName)
+                raise
+            self._added(os.path.getsize(fileName))
+        except Exception:
+            printExc("Could not store analysis cache entry:")
+
+    def _added(self, nbytes):
+        if self.maxBytes is None:
+            return
+        with self._lock:
+            if self._size is None:
+                self._size = self.size()
+            else:
+                self._size += nbytes
+            if self._size > self.maxBytes:
+                self._size = self.prune(int(self.maxBytes * 0.8))
+
+    def entries(self):
+        """Return a list of (modification time, size, file name) for all entries, least recently used first."""
+        entries = []
+        if not os.path.isdir(self.path):
+            return entries
+        for subdir in os.scandir(self.path):
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                if not entry.name.endswith('.pkl'):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue  ## removed by another process
+                entries.append((st.st_mtime_ns, st.st_size, entry.path))
+        entries.sort()
+        return entries
+
+    def size(self):
+        """Return the total size in bytes of the entries in the cache."""
+        return sum(size for _, size, _ in self.entries())
+
+    def prune(self, maxBytes):
+        """Remove the least recently used entries until the rest hold at most *maxBytes*, and return their
+        total size. The most recently used entry is always kept.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, fileName in entries[:-1]:
+            if total <= maxBytes:
+                break
+            try:
+                os.remove(fileName)
+            except OSError:
+                pass  ## removed by another process
+            total -= size
+        return total
+
+    def getOrCompute(self, key, func):
+        """Return the value stored for *key*; if there is none, call func(), store and return its result."""
+        value = self.get(key, _NO_VALUE)
+        if value is _NO_VALUE:
+            value = func()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        if os.path.isdir(self.path):
+            shutil.rmtree(self.path)
+        with self._lock:
+            self._size = None
+
+
+def stateHash(state):
+    """Return a hash of a saved state (eg. Flowchart.saveState()), ignoring 'pos' entries that only
+    record where items were placed in the GUI.
+    """
+    return hashlib.sha1(repr(_canonical(state, ignore=('pos',))).encode()).hexdigest()
+
+
+def _canonical(obj, ignore=()):
+    ## Return a structure whose repr() identifies *obj*: dicts are ordered by key (without the keys in
+    ## *ignore*), and arrays are reduced to their dtype, shape and a hash of their content, because
+    ## repr() abbreviates large arrays.
+    if isinstance(obj, dict):
+        return tuple(sorted((str(k), _canonical(v, ignore)) for k, v in obj.items() if k not in ignore))
+    if isinstance(obj, (list, tuple)):
+        return tuple(_canonical(v, ignore) for v in obj)
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.hasobject:
+            content = tuple(_canonical(v, ignore) for v in obj.ravel())
+        else:
+            content = hashlib.sha1(np.ascontiguousarray(obj).tobytes()).hexdigest()
+        return ('ndarray', obj.dtype.str, obj.shape, content)
+    return obj
+
+
+def getResultCache():
+    """Return the ResultCache shared by all analysis modules, or None if caching is disabled.
+
+    The cache lives in the directory given by the 'analysisCacheDir' config option (at the top level
+    or under 'misc'); by default it is kept in the user's acq4 application data directory. Set
+    analysisCacheDir to None to disable caching. Its size is limited to 'analysisCacheMaxSize' bytes
+    (2 GB by default; None for no limit).
+    """
+    global _defaultCache
+    if _defaultCache is None:
+        from acq4 import getManager
+
+        man = getManager()
+        config = man.config.copy()
+        config.update(config.get('misc', {}))
+        path = config.get('analysisCacheDir', os.path.join(man._appDataDir(), 'analysisCache'))
+        if path is None:
+            return None
+        _defaultCache = ResultCache(path, maxBytes=config.get('analysisCacheMaxSize', 2e9))
+    return _defaultCache
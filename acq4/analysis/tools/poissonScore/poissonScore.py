@@ -124,6 +124,16 @@ def poissonProb(n, t, l, clip=False):
     For a poisson process, return the probability of seeing at least *n* events in *t* seconds given
     that the process has a mean rate *l*.
     """
+    if not np.isscalar(l):
+        ## one rate per value of n; rates of 0 are handled as below
+        l = np.asarray(l)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            p = stats.poisson.sf(n, l*t)
+        p = np.where(l == 0, np.where(n==0, 1.0, 1e-25), p)
+        if clip:
+            p = np.clip(p, 0, 1.0-1e-25)
+        return p
+    
     if l == 0:
         if np.isscalar(n):
             if n == 0:
@@ -148,6 +158,10 @@ def poissonProb(n, t, l, clip=False):
     #p = stats.norm(mean, stdev).sf(amps)
     #return 1.0 / (p.prod() ** (1./len(amps)))
 
+def eventCounts(times):
+    """For each event time, return the number of *other* events that occur at or before that time."""
+    return np.searchsorted(np.sort(times), times, side='right') - 1
+
 def gaussProb(amps, mean, stdev):
     ## Return the survival function for gaussian distribution 
     if len(amps) == 0:
@@ -194,7 +208,7 @@ class PoissonScore:
             #ev = np.concatenate(ev)   ## mix events together
             ev = events['time']
             
-            nVals = np.array([(ev<=t).sum()-1 for t in ev]) ## looks like arange, but consider what happens if two events occur at the same time.
+            nVals = eventCounts(ev) ## looks like arange, but consider what happens if two events occur at the same time.
             pi = poissonProb(nVals, ev, rate*nSets)  ## note that by using n=0 to len(ev)-1, we correct for the fact that the time window always ends at the last event
             pi = 1.0 / pi
             
@@ -233,6 +247,58 @@ class PoissonScore:
         """
         return np.ones(len(events))
 
+    @classmethod
+    def scoreMany(cls, evSets, rates, tMax=None, normalize=True, **kwds):
+        """
+        Compute poisson scores for many sites at once; equivalent to
+        ``[cls.score(ev, rate, tMax, normalize, **kwds) for ev, rate in zip(evSets, rates)]``.
+        
+        evSets is a list with one item per site; each item is a list of record arrays as accepted by score().
+        rates is a list of rates (each may be a single value or a list) with one item per site.
+        
+        The events of all sites are processed together, so amplitudeScore must compute its score
+        independently for each event.
+        """
+        nSites = len(evSets)
+        nSets = np.array([len(ev) for ev in evSets], dtype=float)
+        rates = np.array([r if np.isscalar(r) else np.mean(r) for r in rates], dtype=float)
+        siteEvents = [np.concatenate(ev) for ev in evSets]
+        nEvents = np.array([len(ev) for ev in siteEvents])
+        
+        scores = np.ones(nSites)
+        hasEvents = nEvents > 0
+        if hasEvents.any():
+            events = np.concatenate([ev for ev in siteEvents if len(ev) > 0])
+            times = events['time']
+            starts = np.concatenate([[0], np.cumsum(nEvents[hasEvents])[:-1]])
+            
+            ## count events per site with a single sort: order by (site, time), then compare each event
+            ## against the last event in its site with the same time
+            site = np.repeat(np.arange(nSites), nEvents)
+            order = np.lexsort((times, site))
+            sortedTimes = times[order]
+            sortedSite = site[order]
+            last = np.empty(len(times), dtype=bool)
+            last[:-1] = (sortedTimes[1:] != sortedTimes[:-1]) | (sortedSite[1:] != sortedSite[:-1])
+            last[-1] = True
+            lastInd = np.flatnonzero(last)
+            ## index of the last event (in sorted order) with the same site and time as each event
+            rank = np.empty(len(times), dtype=int)
+            rank[order] = lastInd[np.searchsorted(lastInd, np.arange(len(times)))]
+            firstInSite = np.repeat(np.cumsum(np.concatenate([[0], nEvents]))[:-1], nEvents)
+            nVals = rank - firstInSite
+            
+            pi = 1.0 / poissonProb(nVals, times, np.repeat(rates * nSets, nEvents))
+            pi *= cls.amplitudeScore(events, **kwds)
+            scores[hasEvents] = np.maximum.reduceat(pi, starts)
+        
+        if normalize:
+            ret = cls.mapScores(scores, rates * tMax * nSets)
+        else:
+            ret = scores
+        assert not np.any(np.isnan(ret))
+        return ret
+
     #@staticmethod
     #def maxPoissonProb(ev, rate):
         #"""
@@ -251,33 +317,40 @@ class PoissonScore:
         """
         Map score x to probability given we expect n events per set
         """
+        return cls.mapScores(np.array([x], dtype=float), np.array([n], dtype=float))[0]
+
+    @classmethod
+    def mapScores(cls, x, n):
+        """
+        Map an array of scores x to probabilities given we expect n[i] events per set for score x[i]
+        """
         if cls.normalizationTable is None:
             cls.normalizationTable = cls.generateNormalizationTable()
             cls.extrapolateNormTable()
-            
-        nind = max(0, np.log(n)/np.log(2))
-        n1 = np.clip(int(np.floor(nind)), 0, cls.normalizationTable.shape[1]-2)
-        n2 = n1+1
+        table = cls.normalizationTable
         
-        mapped1 = []
-        for i in [n1, n2]:
-            norm = cls.normalizationTable[:,i]
-            ind = np.argwhere(norm[0] > x)
-            if len(ind) == 0:
-                ind = len(norm[0])-1
-            else:
-                ind = ind[0,0]
-            if ind == 0:
-                ind = 1
-            x1, x2 = norm[0, ind-1:ind+1]
-            y1, y2 = norm[1, ind-1:ind+1]
-            if x1 == x2:
-                s = 0.0
-            else:
-                s = (x-x1) / float(x2-x1)
-            mapped1.append(y1 + s*(y2-y1))
+        x = np.asarray(x, dtype=float)
+        with np.errstate(divide='ignore'):
+            nind = np.maximum(0, np.log(n)/np.log(2))
+        n1 = np.clip(np.floor(nind).astype(int), 0, table.shape[1]-2)
         
-        mapped = mapped1[0] + (mapped1[1]-mapped1[0]) * (nind-n1)/float(n2-n1)
+        ## linearly interpolate (or extrapolate) within the two table columns bracketing each n
+        mapped1 = np.empty((2, len(x)))
+        for col in np.unique(np.concatenate([n1, n1+1])):
+            for j, mask in enumerate([n1 == col, n1+1 == col]):
+                if not mask.any():
+                    continue
+                norm = table[:,col]
+                xm = x[mask]
+                ind = np.searchsorted(norm[0], xm, side='right')  ## index of the first table value > x
+                ind = np.clip(ind, 1, norm.shape[1]-1)
+                x1, x2 = norm[0, ind-1], norm[0, ind]
+                y1, y2 = norm[1, ind-1], norm[1, ind]
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    s = np.where(x1 == x2, 0.0, (xm-x1) / (x2-x1))
+                mapped1[j, mask] = y1 + s*(y2-y1)
+        
+        mapped = mapped1[0] + (mapped1[1]-mapped1[0]) * (nind-n1)
         
         ## doesn't handle points outside of the original data.
         #mapped = scipy.interpolate.griddata(poissonScoreNorm[0], poissonScoreNorm[1], [x], method='cubic')[0]
@@ -285,8 +358,8 @@ class PoissonScore:
         #spline = scipy.interpolate.RectBivariateSpline(tVals, xVals, normTable)
         #mapped = spline.ev(n, x)[0]
         #raise Exception()
-        assert not (np.isinf(mapped) or np.isnan(mapped))
-        assert mapped>0
+        assert not np.any(np.isinf(mapped) | np.isnan(mapped))
+        assert np.all(mapped>0)
         return mapped
 
     #@classmethod
@@ -66,6 +66,7 @@ class AxoPatch200(DAQGeneric):
     
     sigShowModeDialog = Qt.Signal(object)
     sigHideModeDialog = Qt.Signal()
+    threadedInit = False  # creates the mode switch dialog in __init__
     #sigHoldingChanged = Qt.Signal(object)  ## provided by DAQGeneric
     sigModeChanged = Qt.Signal(object)
 
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import concurrent.futures
 from collections import deque
 
 import numpy as np
@@ -52,6 +53,7 @@ class Camera(DAQGeneric, OptomechDevice):
         exposeChannel: 'DAQ', '/Dev1/port0/line14'  # Channel for recording expose signal
         triggerOutChannel: 'DAQ', '/Dev1/PFI5'  # Channel the DAQ should trigger off of to sync with camera
         triggerInChannel: 'DAQ', '/Dev1/port0/line13'  # Channel the DAQ should raise to trigger the camera
+        decimateDisplay: False  # display live frames decimated to about one pixel per screen pixel
         params:
             GAIN_INDEX: 2
             CLEAR_MODE: 'CLEAR_PRE_SEQUENCE'  # Overlap mode for QuantEM
@@ -63,9 +65,15 @@ class Camera(DAQGeneric, OptomechDevice):
     sigNewFrame = Qt.Signal(object)  # (frame data)
     sigParamsChanged = Qt.Signal(object)
 
+    # Drivers that call notifyNewFrames() whenever frames arrive should set this to True, allowing
+    # waitForFrames() to block until then instead of polling newFrames().
+    notifiesNewFrames = False
+
     def __init__(self, dm, config, name):
         # Generate config to use for DAQ
         self.camLock = RecursiveMutex()  ## Lock to protect access to camera
+        self._newFramesCond = threading.Condition()
+        self._newFramesPending = False
         daqConfig = {}
         if "exposeChannel" in config:
             daqConfig["exposure"] = config["exposeChannel"]
@@ -112,7 +120,7 @@ class Camera(DAQGeneric, OptomechDevice):
         self.acqThread.started.connect(self.acqThreadStarted)
         self.acqThread.sigShowMessage.connect(self.showMessage)
 
-        self._processingThread = FrameProcessingThread()
+        self._processingThread = FrameProcessingThread(**config.get("frameProcessing", {}))
         self._processingThread.sigFrameFullyProcessed.connect(self.sigNewFrame, type=Qt.Qt.DirectConnection)
         self._processingThread.start()
         self._processingThread.addFrameProcessor(self.addFrameInfo)
@@ -239,9 +247,39 @@ class Camera(DAQGeneric, OptomechDevice):
         data should be a permanent copy of the image (ie, not directly from a circular buffer)
         time is the time of arrival of the frame. Optionally, 'exposeStartTime' and 'exposeDoneTime' 
             may be specified if they are available.
+        hwTimestamp may optionally give a precise per-frame timestamp in seconds from the camera's
+            clock (any epoch). If present, it is used to measure the interval between frames; otherwise
+            exposeDoneTime is used, if given.
         """
         raise NotImplementedError("Function must be reimplemented in subclass.")
 
+    def waitForFrames(self, timeout):
+        """Return a list of new frames (as for newFrames()), waiting up to *timeout* seconds for some to arrive.
+
+        Returns an empty list if no frames arrive in time. If the driver sets notifiesNewFrames, this blocks
+        until notifyNewFrames() is called; otherwise it polls newFrames() every millisecond. Drivers with
+        their own blocking wait may reimplement this method.
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            with self._newFramesCond:
+                self._newFramesPending = False
+            frames = self.newFrames()
+            remaining = deadline - time.perf_counter()
+            if len(frames) > 0 or remaining <= 0:
+                return frames
+            if self.notifiesNewFrames:
+                with self._newFramesCond:
+                    self._newFramesCond.wait_for(lambda: self._newFramesPending, remaining)
+            else:
+                time.sleep(min(1e-3, remaining))
+
+    def notifyNewFrames(self):
+        """Wake any thread waiting in waitForFrames(). Drivers may call this from any thread when frames arrive."""
+        with self._newFramesCond:
+            self._newFramesPending = True
+            self._newFramesCond.notify_all()
+
     def startCamera(self):
         """Calls the camera driver to start the camera's acquisition. Call start instead of this to actually record frames."""
         raise NotImplementedError("Function must be reimplemented in subclass.")
@@ -533,12 +571,18 @@ class Camera(DAQGeneric, OptomechDevice):
     def showMessage(self, msg):
         self.sigShowMessage.emit(msg)
 
-    def addFrameProcessor(self, processor: Callable[[Frame], None], final: bool = False):
-        self._processingThread.addFrameProcessor(processor, final)
+    def addFrameProcessor(
+            self, processor: Callable[[Frame], None], final: bool = False, parallel: bool = False, dependsOn=()):
+        """Register *processor* to be called with every new frame; see FrameProcessingThread."""
+        self._processingThread.addFrameProcessor(processor, final, parallel=parallel, dependsOn=dependsOn)
 
     def removeFrameProcessor(self, processor: Callable[[Frame], None]):
         self._processingThread.removeFrameProcessor(processor)
 
+    def frameProcessingStats(self) -> dict:
+        """Return latency and queue-depth metrics for this camera's frame processors."""
+        return self._processingThread.stats()
+
     def isRunning(self):
         return self.acqThread.isRunning()
 
@@ -824,54 +868,281 @@ class CameraTaskResult:
         return self._frameTimes, self._frameTimesPrecise
 
 
+class FrameProcessorInfo:
+    """A frame processor registered with FrameProcessingThread, along with its runtime metrics."""
+
+    def __init__(self, fn: Callable[[Frame], None], parallel=False, dependsOn=()):
+        self.fn = fn
+        self.parallel = parallel
+        self.dependsOn = list(dependsOn)
+        self.name = getattr(fn, '__qualname__', repr(fn))
+        self.calls = 0
+        self.errors = 0
+        self.skipped = 0
+        self.inFlight = 0  # frames submitted to this processor but not yet finished
+        self.lastLatency = None
+        self.meanLatency = None  # exponentially-weighted moving average
+        self.maxLatency = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, frame):
+        start = time.perf_counter()
+        try:
+            self.fn(frame)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            printExc(f"Frame processing callback failed ({self.name})")
+        finally:
+            latency = time.perf_counter() - start
+            with self._lock:
+                self.calls += 1
+                self.inFlight -= 1
+                self.lastLatency = latency
+                self.maxLatency = max(self.maxLatency, latency)
+                if self.meanLatency is None:
+                    self.meanLatency = latency
+                else:
+                    self.meanLatency += 0.1 * (latency - self.meanLatency)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'parallel': self.parallel,
+                'calls': self.calls,
+                'errors': self.errors,
+                'skipped': self.skipped,
+                'inFlight': self.inFlight,
+                'lastLatency': self.lastLatency,
+                'meanLatency': self.meanLatency,
+                'maxLatency': self.maxLatency,
+            }
+
+
+class _FrameJob:
+    """Runs the parallel processors for one frame on the thread pool, respecting their dependencies."""
+
+    def __init__(self, frame, processors: list[FrameProcessorInfo], pool, onFinished):
+        self.frame = frame
+        self._pool = pool
+        self._onFinished = onFinished
+        self._lock = threading.Lock()
+        self._waiting = list(processors)
+        self._running = set()
+        self._done = set()
+        self.finished = len(processors) == 0
+
+    def start(self):
+        if self.finished:
+            self._onFinished()
+        else:
+            self._submitReady()
+
+    def _submitReady(self):
+        with self._lock:
+            pending = {p.fn for p in self._waiting} | {p.fn for p in self._running}
+            ready = [p for p in self._waiting if not any(dep in pending for dep in p.dependsOn)]
+            for p in ready:
+                self._waiting.remove(p)
+                self._running.add(p)
+        for p in ready:
+            self._pool.submit(self._run, p)
+
+    def _run(self, proc):
+        proc(self.frame)
+        with self._lock:
+            self._running.discard(proc)
+            self._done.add(proc)
+            finished = len(self._waiting) == 0 and len(self._running) == 0
+            self.finished = finished
+        if finished:
+            self._onFinished()
+        else:
+            self._submitReady()
+
+
 class FrameProcessingThread(Thread):
+    """Runs registered frame processors on every new frame, then emits sigFrameFullyProcessed.
+
+    Processors run in three stages:
+
+    1. Serial processors (the default), in the order they were added, on this thread.
+    2. Processors added with ``parallel=True``. These must not depend on each other's side effects
+       (except as declared with *dependsOn*), and run concurrently on a pool of *workers* threads;
+       several frames may be in flight at once. With ``workers=0``, they run serially like stage 1.
+    3. The ``final`` processor, followed by sigFrameFullyProcessed. These always see frames in the
+       order they arrived.
+
+    Under load, *dropPolicy* decides what gives:
+
+    * ``None`` -- process every frame, however far behind that gets (the original behavior).
+    * ``'drop-oldest'`` -- at most *maxQueueSize* frames wait to be processed; when more arrive, the oldest
+      waiting frames are discarded entirely and counted in droppedFrames.
+    * ``'skip-processor'`` -- every frame reaches the final processor, but a parallel processor that
+      already has *maxQueueSize* frames in flight is skipped for new frames.
+
+    Per-processor latency and queue-depth metrics are available from stats().
+    """
     sigFrameFullyProcessed = Qt.Signal(object)  # Frame
 
-    def __init__(self):
-        super().__init__()
+    dropPolicies = (None, 'drop-oldest', 'skip-processor')
+
+    def __init__(self, workers=0, dropPolicy=None, maxQueueSize=10):
+        super().__init__(name="FrameProcessingThread")
+        if dropPolicy not in self.dropPolicies:
+            raise ValueError(f"dropPolicy must be one of {self.dropPolicies}; got {dropPolicy!r}")
         self._stop = False
-        self._processors = []
+        self._processors: list[FrameProcessorInfo] = []
         self._final_processor = None
-        self._queue = queue.Queue()
-
-    def addFrameProcessor(self, processor: Callable[[Frame], None], final=False):
+        self._workers = workers
+        self._pool = None
+        self.dropPolicy = dropPolicy
+        self.maxQueueSize = maxQueueSize
+        self.droppedFrames = 0
+        self._cond = threading.Condition()
+        self._queue = deque()  # frames waiting to be processed
+        self._pending = deque()  # jobs for frames whose parallel processors are running, in arrival order
+
+    def addFrameProcessor(self, processor: Callable[[Frame], None], final=False, parallel=False, dependsOn=()):
+        """Register *processor* to be called with every new frame.
+
+        If *parallel* is True, the processor may run concurrently with other parallel processors (see class
+        docs); *dependsOn* lists other processors that must finish with a frame before this one starts on it.
+        These must already be registered, which also rules out dependency cycles.
+        """
         if final:
             if self._final_processor is not None:
                 raise RuntimeError("Only one `final` processor can be added.")
-            self._final_processor = processor
+            self._final_processor = FrameProcessorInfo(processor)
         else:
-            self._processors.append(processor)
+            with self._cond:
+                if len(dependsOn) > 0 and not parallel:
+                    raise ValueError("dependsOn is only supported for parallel frame processors.")
+                registered = [p.fn for p in self._processors]
+                missing = [dep for dep in dependsOn if dep not in registered]
+                if len(missing) > 0:
+                    raise ValueError(f"Frame processor dependencies must be registered first: {missing}")
+                self._processors.append(FrameProcessorInfo(processor, parallel=parallel, dependsOn=dependsOn))
 
     def removeFrameProcessor(self, processor: Callable[[Frame], None]):
-        if processor in self._processors:
-            self._processors.remove(processor)
-        if processor == self._final_processor:
+        with self._cond:
+            dependents = [p.fn for p in self._processors if processor in p.dependsOn]
+            if len(dependents) > 0:
+                raise ValueError(f"Cannot remove frame processor {processor}; {dependents} depend on it.")
+            self._processors = [p for p in self._processors if p.fn != processor]
+        if self._final_processor is not None and processor == self._final_processor.fn:
             self._final_processor = None
 
     def stop(self):
-        self._stop = True
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
 
     @property
     def processors(self):
+        procs = [p.fn for p in self._processors]
+        if self._final_processor is not None:
+            return procs + [self._final_processor.fn]
+        return procs
+
+    def stats(self) -> dict:
+        """Return processing metrics: queue depth, frames in flight, dropped frames and per-processor stats
+        (calls, errors, skipped, inFlight, last/mean/max latency in seconds), keyed by processor name."""
+        with self._cond:
+            procs = list(self._processors)
+            stats = {
+                'queueDepth': len(self._queue),
+                'framesInFlight': len(self._pending),
+                'droppedFrames': self.droppedFrames,
+                'processors': {},
+            }
         if self._final_processor is not None:
-            return self._processors + [self._final_processor]
-        return self._processors
+            procs.append(self._final_processor)
+        for p in procs:
+            stats['processors'][p.name] = p.stats()
+        return stats
 
     def handleNewRawFrame(self, frame):
-        self._queue.put(frame)
+        with self._cond:
+            self._queue.append(frame)
+            if self.dropPolicy == 'drop-oldest':
+                while len(self._queue) > self.maxQueueSize:
+                    self._queue.popleft()
+                    self.droppedFrames += 1
+            self._cond.notify_all()
+
+    def _canStartFrame(self):
+        if len(self._queue) == 0:
+            return False
+        if self.dropPolicy == 'skip-processor':
+            # slow processors are skipped instead, so frames never need to wait here
+            return True
+        # limit the number of frames in flight; excess frames wait in the queue (where they may be dropped)
+        return len(self._pending) < max(1, self.maxQueueSize)
+
+    def _headFinished(self):
+        return len(self._pending) > 0 and self._pending[0].finished
+
+    def _jobFinished(self):
+        with self._cond:
+            self._cond.notify_all()
 
     def run(self):
-        while not self._stop:
-            try:
-                frame = self._queue.get(timeout=0.1)
-            except queue.Empty:
-                continue
-            for callback in self.processors:
-                try:
-                    callback(frame)
-                except Exception:
-                    printExc("Frame processing callback failed")
-            self.sigFrameFullyProcessed.emit(frame)
+        if self._workers > 0:
+            self._pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self._workers, thread_name_prefix="FrameProcessingWorker")
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._stop or self._canStartFrame() or self._headFinished())
+                    if self._stop:
+                        break
+                    frame = self._queue.popleft() if self._canStartFrame() else None
+                    procs = list(self._processors)
+                if frame is not None:
+                    self._startFrame(frame, procs)
+                self._finishFrames()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+    def _startFrame(self, frame, procs):
+        parallel = []
+        skipped = set()
+        for proc in procs:
+            if proc.parallel and self._pool is not None:
+                with proc._lock:
+                    busy = self.dropPolicy == 'skip-processor' and proc.inFlight >= self.maxQueueSize
+                    if busy or any(dep in skipped for dep in proc.dependsOn):
+                        # skip this processor (and anything depending on it) for this frame
+                        proc.skipped += 1
+                        skipped.add(proc.fn)
+                        continue
+                    proc.inFlight += 1
+                parallel.append(proc)
+            else:
+                with proc._lock:
+                    proc.inFlight += 1
+                proc(frame)
+        job = _FrameJob(frame, parallel, self._pool, self._jobFinished)
+        with self._cond:
+            self._pending.append(job)
+        job.start()
+
+    def _finishFrames(self):
+        # deliver completed frames to the final processor strictly in arrival order
+        while True:
+            with self._cond:
+                if not self._headFinished():
+                    return
+                job = self._pending.popleft()
+            final = self._final_processor
+            if final is not None:
+                with final._lock:
+                    final.inFlight += 1
+                final(job.frame)
+            self.sigFrameFullyProcessed.emit(job.frame)
 
 
 class AcquireThread(Thread):
@@ -914,12 +1185,14 @@ class AcquireThread(Thread):
             self.dev.startCamera()
             self.cameraStartEvent.set()
 
-            lastFrameTime = lastStopCheck = ptime.time()
+            lastFrameTime = ptime.time()
+            lastStamp = None
             frameInfo = {}
 
             while True:
+                # wake up when frames arrive, or after 10 ms to check for stop requests
+                frames = self.dev.waitForFrames(timeout=10e-3)
                 now = ptime.time()
-                frames = self.dev.newFrames()
 
                 # If a new frame is available, process it and inform other threads
                 if len(frames) > 0:
@@ -931,16 +1204,22 @@ class AcquireThread(Thread):
                     # Build meta-info for this frame(s)
                     info = camState.copy()
 
-                    # Process all waiting frames. If there is more than one frame waiting, guess the frame times.
+                    # Without per-frame timestamps, guess the frame interval if more than one frame is waiting.
                     dt = (now - lastFrameTime) / len(frames)
                     if dt > 0:
                         info["fps"] = 1.0 / dt
-                        self._recentFPS.append(info["fps"])
                     else:
                         info["fps"] = None
 
                     for frame in frames:
                         frameInfo = info.copy()
+                        stamp = frame.get("hwTimestamp", frame.get("exposeDoneTime"))
+                        if stamp is not None and lastStamp is not None and stamp > lastStamp:
+                            frameInfo["fps"] = 1.0 / (stamp - lastStamp)
+                        if stamp is not None:
+                            lastStamp = stamp
+                        if frameInfo["fps"] is not None:
+                            self._recentFPS.append(frameInfo["fps"])
                         data = frame.pop("data")
                         frameInfo.update(frame)  # copies 'time' key supplied by camera
                         f = Frame(data, frameInfo)
@@ -949,27 +1228,21 @@ class AcquireThread(Thread):
                     lastFrameTime = now
                     lastFrameId = frames[-1]["id"]
 
-                time.sleep(1e-3)
-
-                # check for stop request every 10ms
-                if now - lastStopCheck > 10e-3:
-                    lastStopCheck = now
-
-                    # If no frame has arrived yet, do NOT allow the camera to stop (this can hang the driver)   << bug should be fixed in pvcam driver, not here.
-                    self.lock.lock()
-                    if self.stopThread:
-                        self.stopThread = False
-                        self.lock.unlock()
-                        break
+                # If no frame has arrived yet, do NOT allow the camera to stop (this can hang the driver)   << bug should be fixed in pvcam driver, not here.
+                self.lock.lock()
+                if self.stopThread:
+                    self.stopThread = False
                     self.lock.unlock()
+                    break
+                self.lock.unlock()
 
-                    diff = ptime.time() - lastFrameTime
-                    if diff > (10 + exposure):
-                        if mode == "Normal":
-                            self.dev.noFrameWarning(diff)
-                            break
-                        else:
-                            pass  # do not exit loop if there is a possibility we are waiting for a trigger
+                diff = ptime.time() - lastFrameTime
+                if diff > (10 + exposure):
+                    if mode == "Normal":
+                        self.dev.noFrameWarning(diff)
+                        break
+                    else:
+                        pass  # do not exit loop if there is a possibility we are waiting for a trigger
 
             with self.camLock:
                 self.dev.stopCamera()
@@ -41,7 +41,7 @@ class CameraInterface(CameraModuleInterface):
 
         # takes care of displaying image data, 
         # contrast & background subtraction user interfaces
-        self.imagingCtrl = ImagingCtrl()
+        self.imagingCtrl = ImagingCtrl(decimate=camera.camConfig.get('decimateDisplay', False))
         self.frameDisplay = self.imagingCtrl.frameDisplay
 
         # Move control panels into docks
@@ -114,7 +114,10 @@ class CameraInterface(CameraModuleInterface):
 
         # We get new frames by adding a processing step to the camera.
         # This allows us to attach metadata (background+contrast info) to the frames before
-        # they are consumed by anyone else
+        # they are consumed by anyone else. Display prep does not need frames in order, so it
+        # runs alongside other parallel processors instead of holding up the final step.
+        self.frameDisplay.drawOnNewFrame = False
+        self.cam.addFrameProcessor(self.frameDisplay.checkForDraw, parallel=True)
         self.cam.addFrameProcessor(self.newFrame, final=True)
 
         # Signals from Camera device
@@ -220,6 +223,7 @@ class CameraInterface(CameraModuleInterface):
 
         with contextlib.suppress(TypeError):
             self.cam.removeFrameProcessor(self.newFrame)
+            self.cam.removeFrameProcessor(self.frameDisplay.checkForDraw)
             self.cam.sigCameraStopped.disconnect(self.cameraStopped)
             self.cam.sigCameraStarted.disconnect(self.cameraStarted)
             self.cam.sigShowMessage.disconnect(self.showMessage)
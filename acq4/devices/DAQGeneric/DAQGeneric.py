@@ -81,6 +81,7 @@ class DAQGeneric(Device):
         
     """
     sigHoldingChanged = Qt.Signal(object, object)
+    threadedInit = True  # sets holding values through the DAQ; creates no Qt objects
 
     def __init__(self, dm, config, name):
         Device.__init__(self, dm, config, name)
@@ -347,7 +348,8 @@ class DAQGenericTask(DeviceTask):
                 if 'command' not in self._DAQCmd[ch]:
                     continue
 
-            self.bufferedChannels.append(ch)
+            if ch not in self.bufferedChannels:  ## createChannels is called again each time the task is re-armed
+                self.bufferedChannels.append(ch)
             # _DAQCmd[ch]['task'] = daqTask  ## ALSO DON't FORGET TO DELETE IT, ASS.
             if chConf['type'] in ['ao', 'do']:
                 # scale = self.getChanScale(ch)
@@ -455,7 +457,9 @@ class DAQGenericTask(DeviceTask):
         info = [axis(name='Channel', cols=cols), axis(name='Time', units='s', values=timeVals)] + [
             {'DAQ': daqState}]
 
-        protInfo = self._DAQCmd.copy()  ## copy everything but the command arrays and low-level configuration info
+        ## copy everything but the command arrays and low-level configuration info
+        ## (copy per-channel dicts as well; the command must survive for the task to be re-armed)
+        protInfo = {ch: self._DAQCmd[ch].copy() for ch in self._DAQCmd}
         for ch in protInfo:
             protInfo[ch].pop('command', None)
             protInfo[ch].pop('lowLevelConf', None)
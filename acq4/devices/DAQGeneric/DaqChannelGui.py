@@ -106,6 +106,9 @@ class DaqChannelGui(Qt.QWidget):
     def taskStarted(self, params):
         pass
 
+    def prepareSequenceStart(self):
+        pass
+
     def taskSequenceStarted(self):
         pass
 
@@ -264,6 +267,16 @@ class OutputChannelGui(DaqChannelGui):
         plot = self.plot.plot(y=data, x=self.timeVals, pen=mkPen(color))
         return plot
 
+    def prepareSequenceStart(self):
+        ## Generate any waveforms in the sequence that are not cached yet in the background, while
+        ## the task runner generates the commands of the other devices
+        if not self.ui.functionCheck.isChecked():
+            return
+        h = self.getHoldingValue()
+        if h is not None:
+            self.ui.waveGeneratorWidget.setOffset(h)
+        self.ui.waveGeneratorWidget.flatParamSpace(self.rate, self.numPts)
+
     def getSingleWave(self, params=None):
         state = self.stateGroup.state()
         h = self.getHoldingValue()
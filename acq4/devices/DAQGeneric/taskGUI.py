@@ -115,6 +115,10 @@ class DAQGenericTaskGui(TaskGui):
                     chParams[k[len(search):]] = params[k]
             self.channels[ch].taskStarted(chParams)
             
+    def prepareSequenceStart(self):  ## automatically invoked from TaskGui
+        for ch in self.channels:
+            self.channels[ch].prepareSequenceStart()
+
     def taskSequenceStarted(self):  ## automatically invoked from TaskGui
         for ch in self.channels:
             self.channels[ch].taskSequenceStarted()
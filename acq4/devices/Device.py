@@ -20,9 +20,22 @@ class Device(InterfaceMixin, Qt.QObject):  # QObject calls super, which is disas
     # used to ensure devices are shut down in the correct order
     _deviceCreationOrder = []
 
+    # Whether __init__ may run in a worker thread when the Manager loads devices in parallel (see the
+    # deviceInitThreads config option). Only classes that declare threadedInit = True themselves are loaded
+    # in a worker thread; the setting is not inherited, because subclasses often create widgets, timers or
+    # QObjects parented to the device at init time, and these must be created in the main thread. A device's
+    # config may override this with 'threadedInit: True' or 'threadedInit: False'.
+    threadedInit = False
+
     def __init__(self, deviceManager: acq4.Manager.Manager, config: dict, name: str):
         Qt.QObject.__init__(self)
 
+        # When loaded by a worker thread (see threadedInit), move to the main thread before any signals are
+        # connected: PyQt delivers signals to python slots in the thread the receiver belonged to at connect time.
+        app = Qt.QCoreApplication.instance()
+        if app is not None and Qt.QThread.currentThread() != app.thread():
+            self.moveToThread(app.thread())
+
         # task reservation lock -- this is a recursive lock to allow a task to run its own subtasks
         # (for example, setting a holding value before exiting a task).
         # However, under some circumstances we might try to run two concurrent tasks from the same 
@@ -334,6 +347,11 @@ class TaskGui(Qt.QWidget):
     def prepareTaskStart(self):
         """Called once before the start of each task or task sequence. Allows the device to execute any one-time preparations it needs."""
         pass
+
+    def prepareSequenceStart(self):
+        """Called once before the commands of a task sequence are generated (after prepareTaskStart, and not
+        for single runs). Allows the device to start work for the whole sequence, such as generating waveforms."""
+        pass
         
     def saveState(self):
         """Return a dictionary representing the current state of the widget."""
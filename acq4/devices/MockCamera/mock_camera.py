@@ -235,6 +235,20 @@ class MockCamera(Camera):
     def _cameraRunning(self):
         return self.lastFrameTime is not None
 
+    def _framePeriod(self):
+        exp = self.getParam("exposure")
+        bin = self.getParam("binning")
+        return exp + (40e-3 / (bin[0] * bin[1]))
+
+    def waitForFrames(self, timeout):
+        # Simulated frames arrive on a fixed schedule, so sleep until the next one is due rather than polling.
+        if self.lastFrameTime is None:
+            time.sleep(timeout)
+        else:
+            due = self.lastFrameTime + self._framePeriod() - ptime.time()
+            time.sleep(max(0.0, min(timeout, due)))
+        return self.newFrames()
+
     def newFrames(self):
         """Return a list of all frames acquired since the last call to newFrames."""
         prof = pg.debug.Profiler(disabled=True)
@@ -243,14 +257,16 @@ class MockCamera(Camera):
             return []
 
         now = ptime.time()
-        dt = now - self.lastFrameTime
         exp = self.getParam("exposure")
         bin = self.getParam("binning")
-        fps = 1.0 / (exp + (40e-3 / (bin[0] * bin[1])))
-        nf = int(dt * fps)
+        period = self._framePeriod()
+        nf = int((now - self.lastFrameTime) / period)
         if nf == 0:
             return []
-        self.lastFrameTime = now + exp
+        # each simulated frame is timestamped exactly when it was due
+        frameTimes = self.lastFrameTime + period * np.arange(1, nf + 1)
+        dt = frameTimes[-1] - self.lastFrameTime
+        self.lastFrameTime = frameTimes[-1]
 
         prof()
         region = self.getParam("region")
@@ -300,8 +316,11 @@ class MockCamera(Camera):
         data = data.astype(np.uint16)
         prof()
 
-        self.frameId += 1
-        frames = [{"data": data, "time": now + (i / fps), "id": self.frameId} for i in range(nf)]
+        frames = [
+            {"data": data, "time": t, "hwTimestamp": t, "id": self.frameId + i + 1}
+            for i, t in enumerate(frameTimes)
+        ]
+        self.frameId += nf
         prof()
         return frames
 
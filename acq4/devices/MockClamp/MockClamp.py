@@ -225,6 +225,8 @@ class MockClampTask(DAQGenericTask):
 
         self.cmd = cmd
         self.clampDev = dev
+        # if no holding was requested, follow the clamp's current holding each time the task is (re)configured
+        self._followHolding = 'command' in cmd and 'holding' not in cmd
 
         modPath = os.path.abspath(os.path.split(__file__)[0])
 
@@ -235,6 +237,8 @@ class MockClampTask(DAQGenericTask):
         if 'mode' in self.cmd:
             self.clampDev.setMode(self.cmd['mode'])
         mode = self.clampDev.getMode()
+        if self._followHolding:
+            self._DAQCmd['command']['holding'] = self.clampDev.getHolding(self.cmd['mode'])
         self.ampState = {
             'mode': mode,
             'primaryUnits': 'A' if mode == 'VC' else 'V',
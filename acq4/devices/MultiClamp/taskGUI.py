@@ -231,6 +231,14 @@ class MultiClampTaskGui(TaskGui):
         #print "Task:", task
         return task
     
+    def prepareSequenceStart(self):
+        ## Generate any command waveforms in the sequence that are not cached yet in the background,
+        ## while the task runner generates the commands of the other devices
+        if self.getMode() == 'I=0':
+            return
+        self.ui.waveGeneratorWidget.setOffset(self.stateGroup.state()['holdingSpin'])
+        self.ui.waveGeneratorWidget.flatParamSpace(self.rate, self.numPts)
+
     def getSingleWave(self, params=None):
         state = self.stateGroup.state()
         h = state['holdingSpin']
@@ -15,6 +15,8 @@ class NiDAQ(Device):
         defaultAIRange: [-10, 10]  # default voltage range to use for AI ports
         defaultAORange: [-10, 10]  # default voltage range to use for AO ports
     """
+    threadedInit = True  # loads the driver library; creates no Qt objects
+
     def __init__(self, dm, config, name):
         Device.__init__(self, dm, config, name)
         self.config = config
@@ -112,6 +114,15 @@ class NiDAQ(Device):
         
     def taskInterface(self, taskRunner):
         return NiDAQTask(self, taskRunner)
+
+    def createStream(self, rate, chunkSize, bufferChunks=20):
+        """Return a DAQStream for continuous (ring-buffered) acquisition from this DAQ.
+
+        Chunks of *chunkSize* samples per channel are delivered to consumers as they are acquired; the most
+        recent *bufferChunks* chunks are retained in memory. See DAQStream for usage.
+        """
+        from .stream import DAQStream
+        return DAQStream(self, rate, chunkSize, bufferChunks=bufferChunks)
         
     #def listTriggerPorts(self):
         #p = self.n.listDILines()
@@ -267,6 +278,9 @@ class Task(DeviceTask):
 
     def addChannel(self, channel, type, mode=None, **kwargs):
         #print "Adding channel:", args, kwargs
+        if self.st.hasChannel(channel):
+            ## channel was created during a previous configure(); the task is being re-armed.
+            return
         ## set default channel mode before adding
         if type == 'ai':
             if mode is None:
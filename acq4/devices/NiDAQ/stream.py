@@ -0,0 +1,281 @@
+import queue
+import threading
+
+import numpy as np
+
+from acq4.util import ptime
+from acq4.util.Thread import Thread
+from acq4.util.debug import printExc
+
+
+def digitalSamples(data):
+    """Convert samples for a digital output line to the form written by DAQGeneric: any value above 0 sets
+    every bit (so the line is driven high whatever its position in the port), anything else clears them.
+    """
+    return np.where(np.asarray(data) > 0, np.uint32(0xFFFFFFFF), np.uint32(0))
+
+
+class RingBuffer:
+    """Preallocated circular buffer holding the most recent samples of one or more channels.
+
+    Samples are addressed by their absolute index since the start of acquisition; only the last *size*
+    samples are retained.
+    """
+    def __init__(self, nChannels, size, dtype=float):
+        self.data = np.zeros((nChannels, size), dtype=dtype)
+        self.size = size
+        self.count = 0  # total number of samples ever written
+        self.lock = threading.Lock()
+
+    def write(self, chunk):
+        """Append *chunk* (shape: nChannels, nPts) to the buffer."""
+        with self.lock:
+            n = chunk.shape[1]
+            if n > self.size:
+                # only the tail of the chunk fits
+                self.count += n - self.size
+                chunk = chunk[:, -self.size:]
+                n = self.size
+            start = self.count % self.size
+            first = min(n, self.size - start)
+            self.data[:, start:start + first] = chunk[:, :first]
+            if first < n:
+                self.data[:, :n - first] = chunk[:, first:]
+            self.count += n
+
+    def read(self, start, nPts):
+        """Return a copy of *nPts* samples beginning at absolute sample index *start*."""
+        with self.lock:
+            if start < self.count - self.size or start + nPts > self.count:
+                raise IndexError(
+                    "Samples %d-%d are not in the buffer (available: %d-%d)"
+                    % (start, start + nPts, max(0, self.count - self.size), self.count)
+                )
+            idx = np.arange(start, start + nPts) % self.size
+            return self.data[:, idx]
+
+    def latest(self, nPts):
+        """Return a copy of the most recent *nPts* samples."""
+        nPts = min(nPts, self.count, self.size)
+        return self.read(self.count - nPts, nPts)
+
+
+class DAQStream(Thread):
+    """Continuous, gap-free acquisition from a NiDAQ device.
+
+    Input channels are sampled continuously into a hardware buffer; a background thread reads fixed-size
+    chunks, copies them into a preallocated RingBuffer, and delivers them to registered consumers. Output
+    channels either regenerate a fixed waveform for the duration of the stream, or are fed new samples chunk by
+    chunk from a callback.
+
+    Example::
+
+        stream = daq.createStream(rate=50e3, chunkSize=5000)
+        stream.addInput('/Dev1/ai0')
+        stream.addInput('/Dev1/ai1', mode='diff')
+        stream.start()
+        for chunk in stream.chunks():
+            # chunk is {'index': first sample index, 'time': start time, 'data': {channel: array}}
+            ...
+        stream.stop()
+
+    Consumers registered with addCallback() are invoked from the stream thread with the same chunk dicts.
+    """
+    def __init__(self, dev, rate, chunkSize, bufferChunks=20):
+        Thread.__init__(self, name=f"DAQStream({dev.name()})")
+        self.dev = dev
+        self.rate = rate
+        self.chunkSize = int(chunkSize)
+        self.bufferChunks = bufferChunks
+        self.st = dev.n.createSuperTask()
+        self.inputs = []
+        self.outputs = {}
+        self.buffers = {}
+        self._callbacks = []
+        self._queues = []
+        self._outputCallback = None
+        self._stopRequested = False
+        self._reserved = False
+        self.startTime = None
+        self.error = None
+
+    def addInput(self, chan, type='ai', mode=None, **kwargs):
+        """Add an input channel ('ai' or 'di') to be sampled continuously."""
+        if type == 'ai':
+            if mode is None:
+                mode = self.dev.config.get('defaultAIMode', None)
+            kwargs.setdefault('vRange', self.dev._defaultAIRange)
+        self.st.addChannel(chan, type, mode, **kwargs)
+        self.inputs.append(self.st.absChanName(chan))
+
+    def addOutput(self, chan, type='ao', waveform=None, **kwargs):
+        """Add an output channel ('ao' or 'do').
+
+        If *waveform* is given, it is written once and regenerated for as long as the stream runs. Otherwise,
+        samples must be supplied by the function given to setOutputCallback().
+        """
+        if type == 'ao':
+            kwargs.setdefault('vRange', self.dev._defaultAORange)
+        self.st.addChannel(chan, type, **kwargs)
+        chan = self.st.absChanName(chan)
+        if waveform is not None and type == 'do':
+            waveform = digitalSamples(waveform)
+        self.outputs[chan] = waveform
+        if waveform is not None:
+            self.st.setWaveform(chan, waveform)
+
+    def setOutputCallback(self, fn):
+        """Stream output samples rather than regenerating a fixed waveform.
+
+        *fn(index, nPts)* is called before the stream starts and once per chunk thereafter; it must return a
+        dict mapping each output channel name to an array of *nPts* samples beginning at sample *index*.
+        """
+        self._outputCallback = fn
+
+    def addCallback(self, fn):
+        """Register *fn(chunk)* to be called from the stream thread for every chunk acquired."""
+        self._callbacks.append(fn)
+
+    def removeCallback(self, fn):
+        self._callbacks.remove(fn)
+
+    def chunks(self, timeout=None, maxQueued=100):
+        """Generator yielding chunks as they are acquired, until the stream stops.
+
+        If the consumer falls more than *maxQueued* chunks behind, the oldest chunks are dropped (they remain
+        available from the ring buffers for as long as the buffers hold them).
+        """
+        q = queue.Queue(maxsize=maxQueued)
+        self._queues.append(q)
+        try:
+            while True:
+                try:
+                    chunk = q.get(timeout=timeout)
+                except queue.Empty:
+                    return
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            self._queues.remove(q)
+
+    def start(self):
+        """Reserve the DAQ, configure continuous sampling, and begin streaming.
+
+        The DAQ remains reserved until stop() is called (from the same thread).
+        """
+        if len(self.inputs) == 0:
+            raise ValueError("DAQStream requires at least one input channel.")
+        self.dev.reserve()
+        self._reserved = True
+        try:
+            bufSize = self.chunkSize * self.bufferChunks
+            self.st.configureClocks(rate=self.rate, nPts=bufSize, continuous=True)
+            for key in self.st.tasks:
+                if self.st.tasks[key].isInputTask():
+                    dtype = float if key[1] == 'ai' else np.uint32
+                    self.buffers[key] = RingBuffer(len(self.st.taskInfo[key]['chans']), bufSize, dtype=dtype)
+
+            if self._outputCallback is not None:
+                self.st.setRegeneration(False)
+                # prime the output buffer with two chunks so the hardware never starves
+                self._outputIndex = 0
+                for i in range(2):
+                    self._writeNextOutputChunk()
+            self._stopRequested = False
+            self.st.start()
+            self.startTime = self.st.startTime
+            Thread.start(self)
+        except Exception:
+            self._release()
+            raise
+
+    def _writeNextOutputChunk(self):
+        data = self._outputCallback(self._outputIndex, self.chunkSize)
+        data = {
+            ch: digitalSamples(d) if self.st.channelInfo[self.st.absChanName(ch)]['task'][1] == 'do' else d
+            for ch, d in data.items()
+        }
+        self.st.writeChunk(data)
+        self._outputIndex += self.chunkSize
+
+    def run(self):
+        index = 0
+        try:
+            while not self._stopRequested:
+                try:
+                    raw = self.st.readChunk(self.chunkSize, timeout=max(1.0, 4 * self.chunkSize / self.rate))
+                except Exception:
+                    if self._stopRequested:
+                        break
+                    raise
+                for key, arr in raw.items():
+                    self.buffers[key].write(arr)
+                if self._outputCallback is not None:
+                    self._writeNextOutputChunk()
+
+                chunk = {
+                    'index': index,
+                    'time': self.startTime + index / self.rate,
+                    'data': {ch: self.st.chunkChannel(raw, ch) for ch in self.inputs},
+                }
+                index += self.chunkSize
+                self._deliver(chunk)
+        except Exception as exc:
+            self.error = exc
+            printExc("Error in DAQ stream thread; stopping acquisition:")
+        finally:
+            for q in self._queues[:]:
+                self._put(q, None)
+
+    def _deliver(self, chunk):
+        for fn in self._callbacks[:]:
+            try:
+                fn(chunk)
+            except Exception:
+                printExc("Error in DAQ stream consumer callback:")
+        for q in self._queues[:]:
+            self._put(q, chunk)
+
+    @staticmethod
+    def _put(q, item):
+        while True:
+            try:
+                q.put_nowait(item)
+                return
+            except queue.Full:
+                # consumer is lagging; drop the oldest chunk
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def getBuffer(self, chan):
+        """Return (RingBuffer, row) holding the recent history of input channel *chan*."""
+        info = self.st.channelInfo[self.st.absChanName(chan)]
+        return self.buffers[info['task']], info['index']
+
+    def latest(self, chan, nPts):
+        """Return the most recent *nPts* samples of input channel *chan*."""
+        buf, row = self.getBuffer(chan)
+        return buf.latest(nPts)[row]
+
+    def stop(self, timeout=10.0):
+        """Stop streaming, wait for the stream thread to exit and release the DAQ."""
+        self._stopRequested = True
+        try:
+            self.wait(int(timeout * 1000))
+            self.st.stop(abort=True)
+        finally:
+            self._release()
+
+    def _release(self):
+        if self._reserved:
+            self._reserved = False
+            self.dev.release()
+
+    def elapsed(self):
+        """Return the time since streaming began, or None if it has not started."""
+        if self.startTime is None:
+            return None
+        return ptime.time() - self.startTime
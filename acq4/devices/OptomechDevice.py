@@ -135,6 +135,9 @@ class OptomechDevice(InterfaceMixin):
         # and might not be cacheable.
         self.__globalTransform = 0
         self.__inverseGlobalTransform = 0
+        # The same transforms as 4x4 numpy arrays, used for mapping arrays of points
+        self.__globalMatrix = 0
+        self.__inverseGlobalMatrix = 0
 
         # Transformation from this device to its parent (or to global if there is no parent)
         self.__transform = pg.SRTTransform3D()
@@ -313,6 +316,67 @@ class OptomechDevice(InterfaceMixin):
         else:
             return self.parentDevice().mapToGlobal(obj, subdev)
         
+    def mapToGlobalArray(self, points, subdev=None):
+        """Map an array of points with shape (..., 2) or (..., 3) from local to global coordinates.
+
+        This is much faster than mapToGlobal for many points: the transform is applied as a single
+        matrix product, using a 4x4 array that is cached until the transform changes.
+        2D points are assumed to have z=0, and are returned as 2D points.
+        """
+        m = self.globalMatrix(subdev)
+        if m is None:
+            return self._mapArrayNonAffine(self.mapToGlobal, points, subdev)
+        return self._mapArray(points, m)
+
+    def mapFromGlobalArray(self, points, subdev=None):
+        """Map an array of points with shape (..., 2) or (..., 3) from global to local coordinates.
+
+        See mapToGlobalArray.
+        """
+        m = self.inverseGlobalMatrix(subdev)
+        if m is None:
+            return self._mapArrayNonAffine(self.mapFromGlobal, points, subdev)
+        return self._mapArray(points, m)
+
+    def mapToDeviceArray(self, device, points, subdev=None):
+        """Map an array of points with shape (..., 2) or (..., 3) from local coordinates to
+        *device*'s coordinate system.
+
+        See mapToGlobalArray.
+        """
+        m1 = self.globalMatrix(subdev)
+        m2 = device.inverseGlobalMatrix(subdev)
+        if m1 is None or m2 is None:
+            return device.mapFromGlobalArray(self.mapToGlobalArray(points, subdev), subdev)
+        return self._mapArray(points, np.dot(m2, m1))
+
+    def mapFromDeviceArray(self, device, points, subdev=None):
+        """Map an array of points with shape (..., 2) or (..., 3) from the coordinate system of
+        *device* to local coordinates.
+
+        See mapToGlobalArray.
+        """
+        return device.mapToDeviceArray(self, points, subdev)
+
+    @staticmethod
+    def _mapArray(points, m):
+        """Map *points* (..., 2 or 3) through the 4x4 array *m*, ignoring perspective."""
+        points = np.asarray(points, dtype=float)
+        if points.shape[-1] == 2:
+            ## 2D points are mapped with z=0
+            return np.dot(points, m[:2, :2].T) + m[:2, 3]
+        elif points.shape[-1] == 3:
+            return np.dot(points, m[:3, :3].T) + m[:3, 3]
+        else:
+            raise TypeError(f"Cannot map array with shape {points.shape}; last axis must have length 2 or 3.")
+
+    @staticmethod
+    def _mapArrayNonAffine(mapFn, points, subdev):
+        ## map methods take coordinates along the first axis
+        points = np.asarray(points, dtype=float)
+        mapped = mapFn(np.moveaxis(points, -1, 0), subdev)
+        return np.moveaxis(np.asarray(mapped), 0, -1)
+
     def _mapTransform(self, obj, tr):
         """Map an object through a transform.
 
@@ -469,6 +533,39 @@ class OptomechDevice(InterfaceMixin):
         else:
             return self.__computeGlobalTransform(subdev, inverse=True)
 
+    def globalMatrix(self, subdev=None):
+        """
+        Return globalTransform as a 4x4 numpy array, or None if the transform is non-affine.
+        The array is cached until the transform changes; it must not be modified.
+        """
+        if subdev is not None:
+            tr = self.globalTransform(subdev)
+            return None if tr is None else pg.transformToArray(tr)
+        m = self.__globalMatrix
+        if isinstance(m, int):  ## 0 marks an invalid cache
+            tr = self.globalTransform()
+            m = None if tr is None else pg.transformToArray(tr)
+            self.__globalMatrix = m
+        return m
+
+    def inverseGlobalMatrix(self, subdev=None):
+        """
+        Return the inverse of globalMatrix, or None if the transform is non-affine.
+        The inverse is computed in double precision, so points mapped to global and back with
+        the array methods are recovered exactly. The array is cached until the transform changes;
+        it must not be modified.
+        """
+        if subdev is not None:
+            m = self.globalMatrix(subdev)
+            return None if m is None else np.linalg.inv(m)
+        m = self.__inverseGlobalMatrix
+        if isinstance(m, int):  ## 0 marks an invalid cache
+            m = self.globalMatrix()
+            if m is not None:
+                m = np.linalg.inv(m)
+            self.__inverseGlobalMatrix = m
+        return m
+
     def listOptics(self, port='default'):
         """Return a list of Optics this device adds to the optical
         path from its children to its parent, in physical order.
@@ -575,6 +672,8 @@ class OptomechDevice(InterfaceMixin):
                 self.__inverseTransform = 0
             self.__globalTransform = 0
             self.__inverseGlobalTransform = 0
+            self.__globalMatrix = 0
+            self.__inverseGlobalMatrix = 0
 
         # child global transforms must also be invalidated before any change signals are emitted
         for ch in self.__children:
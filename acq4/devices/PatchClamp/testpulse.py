@@ -49,6 +49,7 @@ class TestPulseThread(Thread):
             'icPostDuration': 80e-3,
             'icAmplitude': -10e-12,
             'icAverage': 4,
+            'reuseTask': True,  # keep the configured task armed between pulses
             '_index': 0,
         }
         self._lastTask = None
@@ -128,8 +129,8 @@ class TestPulseThread(Thread):
         params = self._params
         runMode = currentMode if params['clampMode'] is None else params['clampMode']
 
-        # Can't reuse tasks yet; remove this when we can.
-        self._lastTask = None
+        if not params['reuseTask']:
+            self._lastTask = None
 
         if self._lastTask is None or self._lastTask._paramIndex != params['_index'] or self._lastTask._clampMode != runMode:
             taskParams = self.paramsForMode(runMode)
@@ -139,7 +140,10 @@ class TestPulseThread(Thread):
             self._lastTask = task
             self._lastTaskParams = taskParams
         else:
+            # re-arm the previous task; only the command waveform may need to be updated (eg. holding
+            # changed by auto bias). Channels, clocks and buffers are kept by the device tasks.
             task = self._lastTask
+            self._updateCommand(task, self._lastTaskParams)
 
         # if clamp mode changed while we were fiddling around, then abort.
         task.reserveDevices()
@@ -234,12 +238,7 @@ class TestPulseThread(Thread):
         mode = params['clampMode']
 
         cmdData = np.empty(numPts * params['average'])
-        cmdData[:] = self._clampDev.getHolding(mode)
-
-        for i in range(params['average']):
-            start = (numPts * i) + int(params['preDuration'] * params['sampleRate'])
-            stop = start + int(params['pulseDuration'] * params['sampleRate'])
-            cmdData[start:stop] += params['amplitude']
+        self._fillCommand(cmdData, params, self._clampDev.getHolding(mode))
 
         cmd = {
             'protocol': {'duration': duration * params['average']},
@@ -251,7 +250,30 @@ class TestPulseThread(Thread):
             }
         }
 
-        return self._manager.createTask(cmd)
+        task = self._manager.createTask(cmd)
+        task._holding = cmdData[0]
+        return task
+
+    def _fillCommand(self, cmdData: np.ndarray, params: dict, holding: float):
+        """Write the test pulse waveform into *cmdData* in place."""
+        numPts = params['numPts']
+        cmdData[:] = holding
+        for i in range(params['average']):
+            start = (numPts * i) + int(params['preDuration'] * params['sampleRate'])
+            stop = start + int(params['pulseDuration'] * params['sampleRate'])
+            cmdData[start:stop] += params['amplitude']
+
+    def _updateCommand(self, task: Task, params: dict):
+        """Refresh the command waveform of a re-armed task if the holding level has changed since it was built.
+
+        The command array is shared with the device task, so updating it in place is enough for the new
+        waveform to be written when the task is next configured.
+        """
+        holding = self._clampDev.getHolding(params['clampMode'])
+        if holding == task._holding:
+            return
+        self._fillCommand(task.command[self._clampName]['command'], params, holding)
+        task._holding = holding
 
     def checkStop(self):
         if self._stop:
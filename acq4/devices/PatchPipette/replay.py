@@ -0,0 +1,215 @@
+"""
+Replay recorded test pulse series through the analysis classes of patch pipette states.
+
+While a state runs, its analysis object (see PatchPipetteState.createAnalysis) is fed each test pulse as it arrives
+from the clamp, so the only way to see how it behaves is to patch a cell. The MultiPatch log records the analysis
+of every test pulse along with each pipette's state changes, which is all an analyzer needs. A replay reads those
+series, splits them at state changes, and feeds each segment recorded in a state through a new analyzer for that
+state in a single call, so that thresholds can be tuned against many archived patch attempts at once and the
+analyzers' cost per pulse can be measured.
+
+Series can also be read from the TestPulses hdf5 files saved alongside the log; these hold the raw test pulses,
+which are analyzed again on loading (slowly), and carry no state information.
+
+Example::
+
+    replay = AnalysisReplay('cell detect', {'slowDetectionThreshold': 0.3e6})
+    result = replay.run(readLogFiles(['/data/2024.01.01_000']))
+    print(result.report())
+"""
+import glob
+import os
+import time
+
+import numpy as np
+
+from .statemanager import PatchPipetteStateManager
+
+
+class ReplaySegment(object):
+    """The test pulses recorded from one pipette while it was in a single state.
+
+    *measurements* is an array of (start time, steady state resistance) rows, as passed to
+    SteadyStateAnalysisBase.process_measurements. *state* is None if the state is not known.
+    """
+
+    def __init__(self, source, device, state, startTime, measurements):
+        self.source = source
+        self.device = device
+        self.state = state
+        self.startTime = startTime
+        self.measurements = measurements
+
+    def __repr__(self):
+        return f"<ReplaySegment {self.device} {self.state!r} @ {self.startTime}: {len(self.measurements)} pulses>"
+
+
+def findLogFiles(paths):
+    """Return the MultiPatch log and TestPulses hdf5 files in *paths*; directories are searched recursively."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for pattern in ['MultiPatch_*.log', 'TestPulses*.hdf5']:
+                files.extend(glob.glob(os.path.join(path, '**', pattern), recursive=True))
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def readLogFiles(paths, state=None):
+    """Yield the ReplaySegments found in *paths* (see findLogFiles), optionally only those recorded in *state*.
+
+    TestPulses hdf5 files that have a MultiPatch log in the same directory are skipped, as the log already holds
+    the analysis of the same pulses.
+    """
+    files = findLogFiles(paths)
+    logDirs = {os.path.dirname(f) for f in files if f.endswith('.log')}
+    for fileName in files:
+        if fileName.endswith('.hdf5'):
+            if os.path.dirname(fileName) in logDirs:
+                continue
+            if state is not None:
+                continue
+            yield from readTestPulseFile(fileName)
+        else:
+            yield from readMultiPatchLog(fileName, state)
+
+
+def readMultiPatchLog(fileName, state=None):
+    """Yield a ReplaySegment for each period that a pipette in the MultiPatch log *fileName* spent in one state.
+
+    If *state* is given, only segments recorded in that state are returned. Test pulses logged before a
+    pipette's first state change are replayed as a segment with unknown state.
+    """
+    from acq4.filetypes.MultiPatchLog import MultiPatchLogData
+
+    log = MultiPatchLogData(fileName)
+    for dev in log.devices():
+        tps = log[dev]['test_pulse']
+        if len(tps) == 0:
+            continue
+        ## live analysis uses the start time of each pulse; older logs do not record it
+        times = tps['start_time'] if np.any(tps['start_time'] != 0) else tps['event_time']
+        measurements = np.column_stack([times, tps['steady_state_resistance']])
+        changes = [(t, s) for t, s, info in log[dev]['state'] if info == '']
+        bounds = np.searchsorted(tps['event_time'], [t for t, s in changes])
+        starts = [0] + list(bounds)
+        stops = list(bounds) + [len(tps)]
+        names = [None] + [s for t, s in changes]
+        for name, start, stop in zip(names, starts, stops):
+            if stop <= start or (state is not None and name != state):
+                continue
+            yield ReplaySegment(fileName, dev, name, times[start], measurements[start:stop])
+
+
+def readTestPulseFile(fileName, field='steady_state_resistance'):
+    """Yield a ReplaySegment of unknown state for each device in the TestPulses hdf5 file *fileName*.
+
+    Every pulse is analyzed again to recover *field*, which makes this much slower than reading the log.
+    """
+    import h5py
+    from neuroanalysis.test_pulse_stack import H5BackedTestPulseStack
+
+    with h5py.File(fileName, 'r') as h5:
+        for dev, group in h5['test_pulses'].items():
+            stack = H5BackedTestPulseStack(group)
+            times = np.sort([float(key) for key in group])
+            if len(times) == 0:
+                continue
+            values = [stack[t].analysis[field] for t in times]
+            yield ReplaySegment(fileName, dev, None, times[0], np.column_stack([times, values]))
+
+
+class ReplayResult(object):
+    """Outcome of AnalysisReplay.run.
+
+    *segments* holds one dict per replayed segment, with the number of pulses, and for each boolean output of the
+    analyzer ("detection"), the time after the segment start at which it was first True (or None).
+    """
+
+    def __init__(self, state, config, detections):
+        self.state = state
+        self.config = config
+        self.detections = detections
+        self.segments = []
+        self.pulseCount = 0
+        self.processTime = 0.0
+
+    def addSegment(self, segment, output, processTime):
+        record = {'source': segment.source, 'device': segment.device, 'state': segment.state,
+                  'startTime': segment.startTime, 'pulses': len(output)}
+        for name in self.detections:
+            hits = np.flatnonzero(output[name])
+            record[name] = None if len(hits) == 0 else output['time'][hits[0]] - segment.startTime
+        self.segments.append(record)
+        self.pulseCount += len(output)
+        self.processTime += processTime
+
+    def detectionCounts(self):
+        """Return {detection: number of segments in which it occurred}."""
+        return {name: sum(s[name] is not None for s in self.segments) for name in self.detections}
+
+    def throughput(self):
+        """Return the number of test pulses analyzed per second."""
+        return self.pulseCount / self.processTime if self.processTime > 0 else float('inf')
+
+    def report(self, segments=False):
+        lines = [f"Replayed {self.pulseCount} test pulses in {len(self.segments)} segments through {self.state!r}: "
+                 f"{self.processTime * 1e3:0.1f} ms, {self.throughput():0.3g} pulses/s, "
+                 f"{self.processTime * 1e6 / max(self.pulseCount, 1):0.3g} us/pulse"]
+        for name, count in self.detectionCounts().items():
+            times = [s[name] for s in self.segments if s[name] is not None]
+            median = f", median first at {np.median(times):0.2f} s" if times else ""
+            lines.append(f"  {name}: {count} / {len(self.segments)} segments{median}")
+        if segments:
+            for s in self.segments:
+                hits = ", ".join(f"{name} {s[name]:0.2f} s" for name in self.detections if s[name] is not None)
+                lines.append(f"  {s['device']} {s['startTime']:0.3f} ({s['pulses']} pulses): {hits or '-'}")
+        return "\n".join(lines)
+
+
+class AnalysisReplay(object):
+    """Feed recorded test pulse series through the analysis class of patch pipette state *state*.
+
+    *config* overrides the default configuration of the state, or of *profile* (a patch profile name) if given.
+    """
+
+    def __init__(self, state, config=None, profile=None):
+        self.state = state
+        self.stateClass = PatchPipetteStateManager.getStateClass(state)
+        self.config = self.stateClass.defaultConfig()
+        if profile is not None:
+            self.config.update(PatchPipetteStateManager.getProfileConfig(profile).get(state, {}))
+        self.config.update(config or {})
+        if self.stateClass.createAnalysis(self.config) is None:
+            raise ValueError(f"Patch pipette state {state!r} does not analyze test pulses")
+
+    def run(self, segments, batchSize=None):
+        """Replay each of *segments* (ReplaySegments, or arrays of measurements) through a new analyzer and
+        return a ReplayResult.
+
+        By default each segment is processed in one call. Setting *batchSize* processes segments a few pulses
+        at a time instead, as happens live, to measure the per-call overhead.
+        """
+        result = None
+        for segment in segments:
+            if not isinstance(segment, ReplaySegment):
+                segment = ReplaySegment(None, None, self.state, segment[0][0], np.asarray(segment))
+            analysis = self.stateClass.createAnalysis(self.config)
+            measurements = segment.measurements
+            start = time.perf_counter()
+            if batchSize is None:
+                output = analysis.process_measurements(measurements)
+            else:
+                output = np.concatenate([
+                    analysis.process_measurements(measurements[i:i + batchSize])
+                    for i in range(0, len(measurements), batchSize)
+                ])
+            elapsed = time.perf_counter() - start
+            if result is None:
+                detections = [name for name in output.dtype.names if output.dtype[name] == bool]
+                result = ReplayResult(self.state, self.config, detections)
+            result.addSegment(segment, output, elapsed)
+        if result is None:
+            result = ReplayResult(self.state, self.config, [])
+        return result
@@ -81,6 +81,14 @@ class PatchPipetteState(Future):
     def defaultConfig(cls) -> dict[str, Any]:
         return {c['name']: c.get('default', None) for c in cls.parameterTreeConfig()}
 
+    @classmethod
+    def createAnalysis(cls, config: dict[str, Any]) -> Optional[SteadyStateAnalysisBase]:
+        """Return a new test pulse analysis object configured from *config*, or None if this state does not
+        analyze test pulses. Used by the state itself and to replay recorded test pulses
+        (see acq4.devices.PatchPipette.replay).
+        """
+        return None
+
     def __init__(self, dev, config=None):
         from acq4.devices.PatchPipette import PatchPipette
 
@@ -235,6 +243,10 @@ class PatchPipetteState(Future):
 
 
 class SteadyStateAnalysisBase(object):
+    # batches at least this long (as when replaying logs; see acq4.devices.PatchPipette.replay) are analyzed with
+    # whole-array operations. The few pulses that arrive at a time during live analysis are faster to loop over.
+    _batchThreshold = 16
+
     def __init__(self, **kwds):
         self._last_measurement: Optional[np.void] = None
 
@@ -252,4 +264,58 @@ class SteadyStateAnalysisBase(object):
         ratio = np.log10(avg / prev_avg)
         return avg, ratio
 
+    @classmethod
+    def _exponential_decay_avg_series(cls, dt, prev_avg, resistance, tau):
+        """Apply _exponential_decay_avg to each element of the arrays *dt*, *resistance* and *tau* (which may also
+        be a scalar) in turn, starting from *prev_avg*. Return arrays of the average and ratio after each step.
+
+        Series of at least _batchThreshold steps are evaluated in closed form when every decay factor is well
+        defined.
+        """
+        n = len(resistance)
+        if n >= cls._batchThreshold:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                log_decay = -np.asarray(dt, dtype=float) / tau
+            if np.all(np.isfinite(log_decay) & (log_decay <= 0)):
+                avg = _decay_filter(log_decay, prev_avg, np.asarray(resistance, dtype=float))
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    ratio = np.log10(avg / np.concatenate([[prev_avg], avg[:-1]]))
+                return avg, ratio
+
+        avg = np.empty(n)
+        ratio = np.empty(n)
+        taus = tau if np.ndim(tau) > 0 else [tau] * n
+        for i in range(n):
+            prev_avg, ratio[i] = cls._exponential_decay_avg(dt[i], prev_avg, resistance[i], taus[i])
+            avg[i] = prev_avg
+        return avg, ratio
+
+
+def _decay_filter(log_decay, initial, values, max_range=300.0):
+    """Return y, where y[i] = d[i] * y[i-1] + (1 - d[i]) * values[i], d = exp(log_decay) and y[-1] = *initial*.
+
+    The recurrence is solved in closed form with a cumulative sum, scaled by exp(-cumsum(log_decay)). The scale
+    factors grow without bound over a long series, so the series is solved in blocks over which they stay below
+    exp(*max_range*). *log_decay* must be finite and <= 0.
+    """
+    out = np.empty(len(values))
+    cum = np.cumsum(-log_decay)
+    weighted = -np.expm1(log_decay) * values
+    start = 0
+    base = 0.0
+    y = initial
+    while start < len(values):
+        stop = np.searchsorted(cum, base + max_range, side='right')
+        if stop <= start:
+            ## a single step decays by more than the whole range; no need to scale
+            stop = start + 1
+            out[start] = np.exp(log_decay[start]) * y + weighted[start]
+        else:
+            scale = np.exp(cum[start:stop] - base)
+            out[start:stop] = (y + np.cumsum(weighted[start:stop] * scale)) / scale
+        y = out[stop - 1]
+        base = cum[stop - 1]
+        start = stop
+    return out
+
 
@@ -40,6 +40,10 @@ class CellDetectAnalysis(SteadyStateAnalysisBase):
                 ('obstacle_detected', bool),
                 ('tip_is_broken', bool),
             ])
+        if len(ret_array) == 0:
+            return ret_array
+        if len(ret_array) >= self._batchThreshold:
+            return self._process_measurement_batch(np.asarray(measurements, dtype=float), ret_array)
         for i, measurement in enumerate(measurements):
             start_time, resistance = measurement
             self._measurment_count += 1
@@ -76,6 +80,36 @@ class CellDetectAnalysis(SteadyStateAnalysisBase):
         self._last_measurement = ret_array[-1]
         return ret_array
 
+    def _process_measurement_batch(self, measurements: np.ndarray, ret_array: np.ndarray) -> np.ndarray:
+        ret_array['time'] = measurements[:, 0]
+        ret_array['resistance'] = measurements[:, 1]
+        if self._last_measurement is None:
+            ret_array['resistance_avg'][0] = measurements[0, 1]
+            self._initial_resistance = measurements[0, 1]
+            self._measurment_count += 1
+            self._last_measurement = ret_array[0]
+            rows = ret_array[1:]
+        else:
+            rows = ret_array
+
+        if len(rows) > 0:
+            last_measurement = self._last_measurement
+            resistance = rows['resistance']
+            dt = rows['time'] - np.concatenate([[last_measurement['time']], rows['time'][:-1]])
+            rows['resistance_avg'], _ = self._exponential_decay_avg_series(
+                dt, last_measurement['resistance_avg'], resistance, dt * self._slow_detection_steps)
+            count = self._measurment_count + np.arange(1, len(rows) + 1)
+            self._measurment_count += len(rows)
+            rows['cell_detected_fast'] = resistance > self._cell_threshold_fast + self._initial_resistance
+            rows['cell_detected_slow'] = (
+                    (count >= self._slow_detection_steps) &
+                    (rows['resistance_avg'] > self._cell_threshold_slow + self._initial_resistance)
+            )
+            rows['obstacle_detected'] = resistance > self._obstacle_threshold + self._initial_resistance
+            rows['tip_is_broken'] = resistance < self._initial_resistance + self._break_threshold
+        self._last_measurement = ret_array[-1]
+        return ret_array
+
     def cell_detected_fast(self):
         return self._last_measurement and self._last_measurement['cell_detected_fast']
 
@@ -208,19 +242,23 @@ class CellDetectState(PatchPipetteState):
         'minDetectionDistance': {'default': 15e-6, 'type': 'float', 'suffix': 'm'},
     }
 
+    @classmethod
+    def createAnalysis(cls, config):
+        return CellDetectAnalysis(
+            config['fastDetectionThreshold'],
+            config['slowDetectionThreshold'],
+            config['slowDetectionSteps'],
+            config['obstacleResistanceThreshold'],
+            config['breakThreshold'],
+        )
+
     def __init__(self, *args, **kwds):
         super().__init__(*args, **kwds)
         self._continuousAdvanceFuture = None
         self.lastMove = 0.0
         self.stepCount = 0
         self.advanceSteps = None
-        self._analysis = CellDetectAnalysis(
-            self.config['fastDetectionThreshold'],
-            self.config['slowDetectionThreshold'],
-            self.config['slowDetectionSteps'],
-            self.config['obstacleResistanceThreshold'],
-            self.config['breakThreshold'],
-        )
+        self._analysis = self.createAnalysis(self.config)
         self._lastTestPulse = None
         self._startTime = None
         self.direction = self._calc_direction()
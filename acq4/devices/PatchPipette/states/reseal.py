@@ -38,6 +38,10 @@ class ResealAnalysis(SteadyStateAnalysisBase):
                 ('stretching', bool),
                 ('tearing', bool),
             ])
+        if len(ret_array) == 0:
+            return ret_array
+        if len(ret_array) >= self._batchThreshold:
+            return self._process_measurement_batch(np.asarray(measurements, dtype=float), ret_array)
         for i, measurement in enumerate(measurements):
             start_time, resistance = measurement
             if i == 0:
@@ -72,6 +76,30 @@ class ResealAnalysis(SteadyStateAnalysisBase):
             self._last_measurement = ret_array[i]
         return ret_array
 
+    def _process_measurement_batch(self, measurements: np.ndarray, ret_array: np.ndarray) -> np.ndarray:
+        ret_array['time'] = measurements[:, 0]
+        ret_array['resistance'] = measurements[:, 1]
+        if self._last_measurement is None:
+            ret_array[0] = (measurements[0, 0], measurements[0, 1], 1, 1, 0, 0, False, False)
+            self._last_measurement = ret_array[0]
+            rows = ret_array[1:]
+        else:
+            rows = ret_array
+
+        if len(rows) > 0:
+            last_measurement = self._last_measurement
+            dt = rows['time'] - np.concatenate([[last_measurement['time']], rows['time'][:-1]])
+            rows['detect_avg'], rows['detect_ratio'] = self._exponential_decay_avg_series(
+                dt, last_measurement['detect_avg'], rows['resistance'], self._detection_tau)
+            rows['repair_avg'], rows['repair_ratio'] = self._exponential_decay_avg_series(
+                dt, last_measurement['repair_avg'], rows['resistance'], self._repair_tau)
+            rows['stretching'] = ((rows['detect_ratio'] > self._stretch_threshold) |
+                                  (rows['repair_ratio'] > self._stretch_threshold))
+            rows['tearing'] = ((rows['detect_ratio'] < self._tear_threshold) |
+                               (rows['repair_ratio'] < self._tear_threshold))
+        self._last_measurement = ret_array[-1]
+        return ret_array
+
 
 class ResealState(PatchPipetteState):
     """State that retracts pipette slowly to attempt to reseal the cell.
@@ -172,18 +200,22 @@ class ResealState(PatchPipetteState):
         'slurpHeight': {'type': 'float', 'default': 50e-6, 'suffix': 'm'},
     }
 
+    @classmethod
+    def createAnalysis(cls, config):
+        return ResealAnalysis(
+            stretch_threshold=config['stretchDetectionThreshold'],
+            tear_threshold=config['tearDetectionThreshold'],
+            detection_tau=config['detectionTau'],
+            repair_tau=config['repairTau'],
+        )
+
     def __init__(self, *args, **kwds):
         super().__init__(*args, **kwds)
         self._pressureFuture = None
         self._lastResistance = None
         self._firstSuccessTime = None
         self._startPosition = np.array(self.dev.pipetteDevice.globalPosition())
-        self._analysis = ResealAnalysis(
-            stretch_threshold=self.config['stretchDetectionThreshold'],
-            tear_threshold=self.config['tearDetectionThreshold'],
-            detection_tau=self.config['detectionTau'],
-            repair_tau=self.config['repairTau'],
-        )
+        self._analysis = self.createAnalysis(self.config)
 
     def nuzzle(self):
         """Wiggle the pipette around inside the cell to clear space for a nucleus to be extracted."""
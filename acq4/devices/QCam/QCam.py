@@ -11,6 +11,8 @@ from acq4.util.Mutex import Mutex
 
 
 class QCam(Camera):
+    notifiesNewFrames = True
+
     def setupCamera(self):
         self.qcd = QCamDriverClass()
         cams = self.qcd.listCameras()
@@ -23,6 +25,7 @@ class QCam(Camera):
         if serial not in cams:
             raise Exception('QCam camera "%s" not found. Options are: %s' % (serial, list(cams.keys())))
         self.cam = self.qcd.getCamera(cams[serial]) #open first camera
+        self.cam.newFrameCallback = self.notifyNewFrames
             
     def listParams(self, params=None):
         """List properties of specified parameters, or of all parameters if None"""
@@ -26,6 +26,9 @@ class Scanner(Device, OptomechDevice):
         self.devGui = None
         self.lastRunTime = None
         self.calibrationIndex = None
+        self._mapCache = {}  ## (laser, opticState): calibration params; see _mappingParams()
+        self._parentTransform = None  ## (parent inverse global transform as a 2x3 array or None,); see _mappingParams()
+        self._mapCacheVersion = 0
         self.targetList = [1.0, {}]  ## stores the grids and points used by TaskGui so that they persist
         self.currentCommand = [0,0] ## The last requested voltage values (but not necessarily the current voltage applied to the mirrors)
         self.currentVoltage = [0, 0]
@@ -33,6 +36,10 @@ class Scanner(Device, OptomechDevice):
         if 'offVoltage' in config:
             self.setShutterOpen(False)
         dm.declareInterface(name, ['scanner'], self)
+
+        self.sigGlobalTransformChanged.connect(self._invalidateMapCache)
+        self.sigGlobalSubdeviceTransformChanged.connect(self._invalidateMapCache)
+        self.sigGlobalSubdeviceChanged.connect(self._invalidateMapCache)
     
     #def quit(self):
         #Device.quit(self)
@@ -135,32 +142,81 @@ class Scanner(Device, OptomechDevice):
         """Convert global coordinates to voltages required to set scan mirrors
         *laser* and *opticState* are used to look up the correct calibration data.
         If *opticState* is not given, then the current optical state is used instead.
+
+        *x* and *y* may be scalars or arrays of the same shape; see also mapArrayToScanner().
+        """
+        scalar = np.isscalar(x)
+        pos = np.stack(np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float)), axis=-1)
+        v = self.mapArrayToScanner(pos, laser, opticState)
+        if scalar:
+            return [float(v[0]), float(v[1])]
+        return v[..., 0], v[..., 1]
+
+    def mapArrayToScanner(self, pos, laser, opticState=None):
+        """Convert an array of global (x, y) positions with shape (..., 2) to the mirror voltages
+        required to reach them, returned as an array of the same shape.
+
+        The calibration for each (*laser*, *opticState*) and the global-to-parent transform are
+        cached, so mapping a whole scan path costs only a few array operations.
         """
         if opticState is None:
             opticState = self.getDeviceStateKey() ## this tells us about objectives, filters, etc
-        cal = self.getCalibration(laser, opticState)
-        
-        if cal is None:
-            raise HelpfulException("The scanner device '%s' is not calibrated for this combination of laser and objective (%s, %s)" % (self.name(), laser, str(opticState)))
-            
+        tr, cal = self._mappingParams(laser, opticState)
+
         ## map from global coordinates to parent
-        parentPos = self.mapGlobalToParent((x,y))
-        if isinstance(parentPos, Qt.QPointF):
-            x = parentPos.x()
-            y = parentPos.y()
+        pos = np.asarray(pos, dtype=float)
+        if tr is None:
+            ## parent transform is not affine; let the parent do the mapping
+            parentPos = self.mapGlobalToParent(np.moveaxis(pos, -1, 0))
+            x, y = parentPos[0], parentPos[1]
         else:
-            x = parentPos[0]
-            y = parentPos[1]
-            
+            x = tr[0, 0] * pos[..., 0] + tr[0, 1] * pos[..., 1] + tr[0, 2]
+            y = tr[1, 0] * pos[..., 0] + tr[1, 1] * pos[..., 1] + tr[1, 2]
+
         ## map to voltages using calibration
-        cal = cal['params']
         x2 = x**2
         y2 = y**2
-        x1 = cal[0][0] + cal[0][1] * x + cal[0][2] * y + cal[0][3] * x2 + cal[0][4] * y2
-        y1 = cal[1][0] + cal[1][1] * x + cal[1][2] * y + cal[1][3] * x2 + cal[1][4] * y2
-        #print "voltage:", x1, y1
-        return [x1, y1]
-        
+        out = np.empty(x.shape + (2,))
+        out[..., 0] = cal[0, 0] + cal[0, 1] * x + cal[0, 2] * y + cal[0, 3] * x2 + cal[0, 4] * y2
+        out[..., 1] = cal[1, 0] + cal[1, 1] * x + cal[1, 2] * y + cal[1, 3] * x2 + cal[1, 4] * y2
+        return out
+
+    def mappingStateKey(self, laser, opticState=None):
+        """Return a hashable key that changes whenever the result of mapToScanner() for
+        *laser* and *opticState* might change. Used to cache generated mirror commands.
+        """
+        if opticState is None:
+            opticState = self.getDeviceStateKey()
+        return (laser, opticState, self._mapCacheVersion)
+
+    def _mappingParams(self, laser, opticState):
+        with self.lock:
+            cal = self._mapCache.get((laser, opticState))
+            if cal is None:
+                cal = self.getCalibration(laser, opticState)
+                if cal is None:
+                    raise HelpfulException("The scanner device '%s' is not calibrated for this combination of laser and objective (%s, %s)" % (self.name(), laser, str(opticState)))
+                cal = np.array(cal['params'], dtype=float)
+                self._mapCache[(laser, opticState)] = cal
+
+            if self._parentTransform is None:
+                parent = self.parentDevice()
+                if parent is None:
+                    tr = np.array([[1., 0., 0.], [0., 1., 0.]])
+                else:
+                    tr = parent.inverseGlobalMatrix()
+                    if tr is not None:
+                        ## mapping 2D points through a 3D transform ignores z
+                        tr = tr[:2, [0, 1, 3]]
+                self._parentTransform = (tr,)
+            return self._parentTransform[0], cal
+
+    def _invalidateMapCache(self, *args):
+        with self.lock:
+            self._mapCache = {}
+            self._parentTransform = None
+            self._mapCacheVersion += 1
+
     def getCalibrationIndex(self):
         with self.lock:
             if self.calibrationIndex is None:
@@ -181,6 +237,7 @@ class Scanner(Device, OptomechDevice):
         with self.lock:
             self.writeConfigFile(index, 'index')
             self.calibrationIndex = index
+            self._invalidateMapCache()
 
     def getCalibration(self, laser, opticState=None):
         with self.lock:
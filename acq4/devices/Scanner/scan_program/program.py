@@ -1,4 +1,5 @@
 import importlib
+import weakref
 from collections import OrderedDict
 
 import numpy as np
@@ -57,6 +58,9 @@ class ScanProgram:
 
         self._visible = True  # whether graphics items should be displayed
 
+        # {component: (key, mask, voltages)}; see generateVoltageArray()
+        self._voltageCache = weakref.WeakKeyDictionary()
+
         self.preview = ScanProgramPreview(self)
         
     def addComponent(self, component):
@@ -82,6 +86,7 @@ class ScanProgram:
         """Remove a component from this program.
         """
         self.components.remove(component)
+        self._voltageCache.pop(component, None)
         self.clearGraphicsItems(component)
         
     def ctrlParameter(self):
@@ -164,9 +169,33 @@ class ScanProgram:
     def generateVoltageArray(self):
         """Generate an array of x,y voltage commands needed to drive the scanner
         for this program.
+
+        The voltages generated by each component are cached, so components whose
+        state, sampling and scanner calibration have not changed since the last
+        call are copied rather than regenerated.
         """
         return self.generatePositionArray(_voltage=True)
 
+    def _componentVoltageKey(self, component):
+        return (
+            repr(component.saveState()),
+            self.sampleRate,
+            self.numSamples,
+            self.downsample,
+            self.scanner.mappingStateKey(component.laser.name()),
+        )
+
+    def _writeComponentVoltages(self, component, arr):
+        key = self._componentVoltageKey(component)
+        cached = self._voltageCache.get(component)
+        if cached is None or cached[0] != key:
+            tmp = np.zeros_like(arr)
+            component.generateVoltageArray(tmp)
+            mask = component.scanMask()
+            cached = (key, mask, tmp[mask])
+            self._voltageCache[component] = cached
+        arr[cached[1]] = cached[2]
+
     def generatePositionArray(self, _voltage=False):
         """Generate an array of x,y position values for this scan program.
         """
@@ -178,7 +207,7 @@ class ScanProgram:
                 continue
             
             if _voltage:
-                component.generateVoltageArray(arr)
+                self._writeComponentVoltages(component, arr)
             else:
                 component.generatePositionArray(arr)
 
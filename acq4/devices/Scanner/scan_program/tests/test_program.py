@@ -0,0 +1,89 @@
+import numpy as np
+
+import pyqtgraph as pg
+from acq4.devices.Scanner.scan_program.component import ScanProgramComponent
+from acq4.devices.Scanner.scan_program.program import ScanProgram
+from pyqtgraph.parametertree import Parameter
+
+
+class MockLaser:
+    def name(self):
+        return 'laser'
+
+
+class MockScanner:
+    def __init__(self):
+        self.version = 0
+
+    def mapToScanner(self, x, y, laser):
+        return x * 2 + self.version, y * 2 + self.version
+
+    def mappingStateKey(self, laser):
+        return (laser, self.version)
+
+    def getVoltage(self):
+        return [0, 0]
+
+
+class StepComponent(ScanProgramComponent):
+    type = 'test'
+
+    def __init__(self, program, start, stop, pos):
+        ScanProgramComponent.__init__(self, program)
+        self.param = Parameter.create(name='test', type='bool', value=True)
+        self.start, self.stop, self.pos = start, stop, pos
+        self.generated = 0
+
+    def ctrlParameter(self):
+        return self.param
+
+    def graphicsItems(self):
+        return []
+
+    def generateVoltageArray(self, array):
+        self.generated += 1
+        x, y = self.mapToScanner(np.full(self.stop - self.start, self.pos[0]), np.full(self.stop - self.start, self.pos[1]))
+        array[self.start:self.stop, 0] = x
+        array[self.start:self.stop, 1] = y
+
+    def scanMask(self):
+        mask = np.zeros(self.program().numSamples, dtype=bool)
+        mask[self.start:self.stop] = True
+        return mask
+
+    def saveState(self):
+        state = ScanProgramComponent.saveState(self)
+        state.update({'start': self.start, 'stop': self.stop, 'pos': self.pos})
+        return state
+
+
+def test_voltageCache():
+    pg.mkQApp()
+    prg = ScanProgram()
+    scanner = MockScanner()
+    prg.setDevices(scanner=scanner, laser=MockLaser())
+    prg.numSamples = 100
+    c1 = StepComponent(prg, 10, 20, (1., 2.))
+    c2 = StepComponent(prg, 50, 60, (3., 4.))
+    prg.components.extend([c1, c2])
+
+    first = prg.generateVoltageArray()
+    assert np.all(first[10:20] == [2, 4])
+    assert np.all(first[50:60] == [6, 8])
+
+    # unchanged components are not regenerated
+    assert np.all(prg.generateVoltageArray() == first)
+    assert (c1.generated, c2.generated) == (1, 1)
+
+    # changing one component regenerates only that component
+    c2.pos = (5., 6.)
+    second = prg.generateVoltageArray()
+    assert (c1.generated, c2.generated) == (1, 2)
+    assert np.all(second[10:20] == [2, 4])
+    assert np.all(second[50:60] == [10, 12])
+
+    # a change in the scanner mapping regenerates everything
+    scanner.version = 1
+    third = prg.generateVoltageArray()
+    assert (c1.generated, c2.generated) == (2, 3)
+    assert np.all(third[10:20] == [3, 5])
@@ -7,6 +7,8 @@ from acq4.devices.Device import Device
 class Trigger(Device):
     """A device only used to trigger a DAQ; for example, a foot switch.
     """
+    threadedInit = True
+
     def __init__(self, dm, config, name):
         Device.__init__(self, dm, config, name)
         self.config = config
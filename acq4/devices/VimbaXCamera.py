@@ -15,6 +15,8 @@ class VimbaXCamera(Camera):
     """Camera class for VimbaX cameras. See https://github.com/alliedvision/VmbPy for driver install instructions.
     This isn't necessarily production-ready code, and has only been written for use on a test rig."""
 
+    notifiesNewFrames = True
+
     @classmethod
     def listCameras(cls):
         with VmbSystem.get_instance() as vmb:
@@ -29,6 +31,7 @@ class VimbaXCamera(Camera):
         self._region = ()
         self._frameQueue = queue.Queue()
         self._doParamUpdates = True
+        self._timestampFrequency = 1e9
         super().__init__(dm, config, name)
 
     def setupCamera(self):
@@ -65,8 +68,18 @@ class VimbaXCamera(Camera):
                 elif hasattr(f, "get_all_entries"):
                     rng = [str(e) for e in f.get_all_entries()]
                 self._paramProperties[_featureNameToParamName(name)] = (rng, f.is_writeable(), True, [])
+        self._timestampFrequency = self._guessTimestampFrequency()
         self._region = self._guessInitialRegion()
 
+    def _guessTimestampFrequency(self):
+        """Return the rate (Hz) at which the camera's frame timestamps tick."""
+        for name in ('DeviceTimestampFrequency', 'GevTimestampTickFrequency', 'TimestampFrequency'):
+            freq = self._paramValuesOnDev.get(name)
+            if freq:
+                return float(freq)
+        # Alvium cameras count nanoseconds, and not all of them report the frequency
+        return 1e9
+
     def _guessInitialRegion(self):
         bin_x, bin_y = self.getParam('binning')
         x = self.getParam('regionX')
@@ -195,6 +208,7 @@ class VimbaXCamera(Camera):
                         # MC: color data will blow this up
                         'data': arr.reshape(arr.shape[:-1]).T,
                         'time': f.get_timestamp(),
+                        'hwTimestamp': f.get_timestamp() / self._timestampFrequency,
                     })
                     with contextlib.suppress(ValueError):
                         # ValueErrors from "wrong queue for frame" at restart are fine
@@ -203,7 +217,12 @@ class VimbaXCamera(Camera):
 
     def startCamera(self):
         with self._lock:
-            self._dev.start_streaming(lambda _, __, f: self._frameQueue.put(f))
+            self._dev.start_streaming(self._frameArrived)
+
+    def _frameArrived(self, cam, stream, frame):
+        # called from the Vimba streaming thread
+        self._frameQueue.put(frame)
+        self.notifyNewFrames()
 
     def stopCamera(self):
         with self._lock:
@@ -5,6 +5,70 @@ from importlib import import_module
 
 from . import Device
 
+# Built-in device classes and the modules that define them. Looking up one of these imports only its own module,
+# without searching all imported Device subclasses.
+BUILTIN_DEVICE_CLASSES = {
+    'AccesOdorDelivery': 'acq4.devices.AccesOdorDelivery',
+    'AxoPatch200': 'acq4.devices.AxoPatch200.AxoPatch200',
+    'Camera': 'acq4.devices.Camera.Camera',
+    'CoherentLaser': 'acq4.devices.CoherentLaser.CoherentLaser',
+    'CoolLEDLightSource': 'acq4.devices.CoolLEDLightSource',
+    'DAQGeneric': 'acq4.devices.DAQGeneric.DAQGeneric',
+    'DAQPressureControl': 'acq4.devices.DAQPressureControl.pressurecontrol',
+    'DIOSwitch': 'acq4.devices.DIOSwitch.DIOSwitch',
+    'FalconTurret': 'acq4.devices.FalconTurret.falconturret',
+    'FilterSet': 'acq4.devices.FilterSet',
+    'FilterWheel': 'acq4.devices.FilterWheel.filterwheel',
+    'Joystick': 'acq4.devices.Joystick',
+    'Keyboard': 'acq4.devices.Keyboard',
+    'LEDLightSource': 'acq4.devices.LEDLightSource.LEDLightSource',
+    'Laser': 'acq4.devices.Laser.Laser',
+    'LightSource': 'acq4.devices.LightSource',
+    'MIESPatchPipette': 'acq4.devices.MIESPatchPipette.miespatchpipette',
+    'MicroManagerCamera': 'acq4.devices.MicroManagerCamera.mmcamera',
+    'MicroManagerStage': 'acq4.devices.MicroManagerStage.mmstage',
+    'Microscope': 'acq4.devices.Microscope.Microscope',
+    'MockCamera': 'acq4.devices.MockCamera.mock_camera',
+    'MockClamp': 'acq4.devices.MockClamp.MockClamp',
+    'MockFilterWheel': 'acq4.devices.MockFilterWheel',
+    'MockKeyboard': 'acq4.devices.MockKeyboard',
+    'MockLightSource': 'acq4.devices.MockLightSource',
+    'MockOdorDelivery': 'acq4.devices.MockOdorDelivery',
+    'MockPressureControl': 'acq4.devices.MockPressureControl',
+    'MockStage': 'acq4.devices.MockStage',
+    'MultiClamp': 'acq4.devices.MultiClamp.multiclamp',
+    'NewScaleMPM': 'acq4.devices.NewScaleMPM',
+    'NiDAQ': 'acq4.devices.NiDAQ.nidaq',
+    'OdorDelivery': 'acq4.devices.OdorDelivery',
+    'PMT': 'acq4.devices.PMT.PMT',
+    'PVCam': 'acq4.devices.PVCam.PVCam',
+    'PatchClamp': 'acq4.devices.PatchClamp.patchclamp',
+    'PatchPipette': 'acq4.devices.PatchPipette.patchpipette',
+    'Pipette': 'acq4.devices.Pipette.pipette',
+    'PressureControl': 'acq4.devices.PressureControl.device',
+    'QCam': 'acq4.devices.QCam.QCam',
+    'RecordingChamber': 'acq4.devices.RecordingChamber',
+    'Scanner': 'acq4.devices.Scanner.Scanner',
+    'Scientifica': 'acq4.devices.Scientifica.scientifica',
+    'Screen': 'acq4.devices.Screen',
+    'Sensapex': 'acq4.devices.Sensapex',
+    'SensapexObjectiveChanger': 'acq4.devices.SensapexObjectiveChanger',
+    'SensapexPressureControl': 'acq4.devices.SensapexPressureControl',
+    'SerialMouse': 'acq4.devices.SerialMouse.SerialMouse',
+    'Stage': 'acq4.devices.Stage.Stage',
+    'StageSwitch': 'acq4.devices.StageSwitch',
+    'SutterMP285': 'acq4.devices.SutterMP285.SutterMP285',
+    'SutterMPC200': 'acq4.devices.SutterMPC200.SutterMPC200',
+    'ThorlabsMFC1': 'acq4.devices.ThorlabsMFC1.MFC1',
+    'Trigger': 'acq4.devices.Trigger.Trigger',
+    'VimbaXCamera': 'acq4.devices.VimbaXCamera',
+    'XKeys': 'acq4.devices.XKeys',
+    'ZeissLamp': 'acq4.devices.zeiss.ZeissLamp',
+    'ZeissMicroscope': 'acq4.devices.zeiss.ZeissMicroscope',
+    'ZeissShutter': 'acq4.devices.zeiss.ZeissShutter',
+    'ZeissTurret': 'acq4.devices.zeiss.ZeissTurret',
+}
+
 
 def getDeviceClass(name):
     """Return a device class given its name.
@@ -16,6 +80,9 @@ def getDeviceClass(name):
     - The name of an importable module that defines a Device subclass
       (for example name='mymodule.MyDevice' would attempt to import MyDevice from mymodule.MyDevice)
     """
+    if name in BUILTIN_DEVICE_CLASSES:
+        return getattr(import_module(BUILTIN_DEVICE_CLASSES[name]), name)
+
     devClasses = getDeviceClasses()
 
     # If we don't recognize the class name, try importing from builtin devices
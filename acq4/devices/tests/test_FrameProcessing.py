@@ -0,0 +1,154 @@
+import threading
+import time
+
+import pytest
+
+import pyqtgraph as pg
+from acq4.devices.Camera.Camera import FrameProcessingThread
+
+pg.mkQApp()
+
+
+class _Delivered:
+    """Final processor that records the frames it receives and lets tests wait for them."""
+
+    def __init__(self):
+        self.frames = []
+        self._cond = threading.Condition()
+
+    def __call__(self, frame):
+        with self._cond:
+            self.frames.append(frame[0])
+            self._cond.notify_all()
+
+    def waitFor(self, n, timeout=5):
+        with self._cond:
+            assert self._cond.wait_for(lambda: len(self.frames) >= n, timeout), self.frames
+        return self.frames
+
+
+def _start(thread):
+    delivered = _Delivered()
+    thread.addFrameProcessor(delivered, final=True)
+    thread.start()
+    return delivered
+
+
+def _stop(thread):
+    thread.stop()
+    thread.wait(2000)
+
+
+def _procStats(thread, name):
+    return next(s for procName, s in thread.stats()['processors'].items() if procName.endswith(name))
+
+
+def _waitUntil(condition, timeout=5):
+    # poll for a state change that has no event to wait on
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, "timed out"
+        time.sleep(1e-3)
+
+
+def test_parallel_processors_deliver_in_order():
+    frame1Done = threading.Event()
+    finishOrder = []
+
+    def gated(frame):
+        if frame[0] == 0:
+            # frame 0 cannot finish until frame 1 has
+            assert frame1Done.wait(5)
+        frame.append('gated')
+        finishOrder.append(frame[0])
+        if frame[0] == 1:
+            frame1Done.set()
+
+    def afterGated(frame):
+        assert 'gated' in frame
+
+    thread = FrameProcessingThread(workers=4)
+    thread.addFrameProcessor(gated, parallel=True)
+    thread.addFrameProcessor(afterGated, parallel=True, dependsOn=[gated])
+    delivered = _start(thread)
+    try:
+        for i in range(20):
+            thread.handleNewRawFrame([i])
+        assert delivered.waitFor(20) == list(range(20))
+    finally:
+        _stop(thread)
+    assert finishOrder.index(1) < finishOrder.index(0)
+    assert _procStats(thread, 'gated')['calls'] == 20
+    assert _procStats(thread, 'afterGated')['errors'] == 0
+
+
+def test_drop_policies():
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocked(frame):
+        started.set()
+        assert release.wait(5)
+
+    # drop-oldest: while frame 0 is held up, only the newest maxQueueSize frames are kept
+    thread = FrameProcessingThread(dropPolicy='drop-oldest', maxQueueSize=2)
+    thread.addFrameProcessor(blocked)
+    delivered = _start(thread)
+    try:
+        thread.handleNewRawFrame([0])
+        assert started.wait(5)
+        for i in range(1, 40):
+            thread.handleNewRawFrame([i])
+        release.set()
+        assert delivered.waitFor(3) == [0, 38, 39]
+        assert thread.stats()['droppedFrames'] == 37
+    finally:
+        _stop(thread)
+
+    # skip-processor: every frame is delivered, but a processor with maxQueueSize frames in flight is skipped
+    entered = threading.Semaphore(0)
+    release.clear()
+
+    def slow(frame):
+        entered.release()
+        assert release.wait(5)
+
+    thread = FrameProcessingThread(workers=2, dropPolicy='skip-processor', maxQueueSize=2)
+    thread.addFrameProcessor(slow, parallel=True)
+    delivered = _start(thread)
+    try:
+        thread.handleNewRawFrame([0])
+        thread.handleNewRawFrame([1])
+        assert entered.acquire(timeout=5) and entered.acquire(timeout=5)
+        for i in range(2, 10):
+            thread.handleNewRawFrame([i])
+        _waitUntil(lambda: thread.stats()['framesInFlight'] == 10)
+        release.set()
+        assert delivered.waitFor(10) == list(range(10))
+    finally:
+        _stop(thread)
+    assert _procStats(thread, 'slow')['calls'] == 2
+    assert _procStats(thread, 'slow')['skipped'] == 8
+
+
+def test_processor_dependencies_checked():
+    def first(frame):
+        pass
+
+    def second(frame):
+        pass
+
+    thread = FrameProcessingThread(workers=2)
+    with pytest.raises(ValueError):
+        thread.addFrameProcessor(second, parallel=True, dependsOn=[first])
+    with pytest.raises(ValueError):
+        thread.addFrameProcessor(first, parallel=True, dependsOn=[first])
+    thread.addFrameProcessor(first, parallel=True)
+    with pytest.raises(ValueError):
+        thread.addFrameProcessor(second, dependsOn=[first])
+    thread.addFrameProcessor(second, parallel=True, dependsOn=[first])
+    with pytest.raises(ValueError):
+        thread.removeFrameProcessor(first)
+    thread.removeFrameProcessor(second)
+    thread.removeFrameProcessor(first)
+    assert thread.processors == []
@@ -0,0 +1,45 @@
+import time
+
+import numpy as np
+
+from acq4.drivers.nidaq.mock import MockNIDAQ
+
+
+def runTask(st):
+    st.start()
+    while not st.isDone():
+        time.sleep(1e-3)
+    st.stop()
+
+
+def test_rerun_same_waveform():
+    outputs = []
+
+    def mockFunc(data=None, dt=None):
+        # called with the samples written to (or regenerated by) the channel; with no arguments to read
+        if data is None:
+            return 0
+        outputs.append(np.array(data))
+
+    st = MockNIDAQ().createSuperTask()
+    st.addChannel('/Dev1/ao0', 'ao', mockFunc=mockFunc)
+    st.addChannel('/Dev1/ai0', 'ai')
+    wave = np.linspace(0, 1, 100)
+    key = st.getTaskKey('/Dev1/ao0')
+    caches = []
+    for i in range(3):
+        # a re-armed task sets an identical waveform before each run
+        st.setWaveform('/Dev1/ao0', wave.copy())
+        st.configureClocks(rate=100000, nPts=100)
+        runTask(st)
+        assert len(outputs) == i + 1
+        assert np.array_equal(outputs[-1], wave)
+        caches.append(st.getTaskData(key))
+    # the output buffer is written again after each run, but it is not reassembled
+    assert caches[0] is caches[1] is caches[2]
+
+    # a changed waveform is output on the next run
+    st.setWaveform('/Dev1/ao0', wave * 2)
+    st.configureClocks(rate=100000, nPts=100)
+    runTask(st)
+    assert np.array_equal(outputs[-1], wave * 2)
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from acq4.devices.NiDAQ.stream import DAQStream, RingBuffer, digitalSamples
+from acq4.drivers.nidaq.mock import MockNIDAQ
+
+
+class MockDAQDevice:
+    """The parts of the NiDAQ device used by DAQStream, backed by the mock driver."""
+    def __init__(self):
+        self.n = MockNIDAQ()
+        self.config = {}
+        self._defaultAIRange = [-10, 10]
+        self._defaultAORange = [-10, 10]
+        self.reserved = 0
+
+    def name(self):
+        return 'DAQ'
+
+    def reserve(self):
+        self.reserved += 1
+
+    def release(self):
+        self.reserved -= 1
+
+
+def test_ring_buffer_wraps():
+    buf = RingBuffer(2, 10)
+    data = np.vstack([np.arange(25), -np.arange(25)]).astype(float)
+    for i in range(0, 25, 4):
+        buf.write(data[:, i:i + 4])
+    assert buf.count == 25
+    assert np.all(buf.latest(10) == data[:, 15:])
+    assert np.all(buf.read(18, 5) == data[:, 18:23])
+    with pytest.raises(IndexError):
+        buf.read(10, 5)  # already overwritten
+    with pytest.raises(IndexError):
+        buf.read(20, 10)  # not yet acquired
+
+
+def test_ring_buffer_oversized_chunk():
+    buf = RingBuffer(1, 5)
+    buf.write(np.arange(12)[np.newaxis, :])
+    assert buf.count == 12
+    assert np.all(buf.latest(5)[0] == np.arange(7, 12))
+
+
+def test_digital_samples():
+    out = digitalSamples(np.array([0, 1, 5, -1, 0.5]))
+    assert out.dtype == np.uint32
+    assert list(out) == [0, 0xFFFFFFFF, 0xFFFFFFFF, 0, 0xFFFFFFFF]
+
+
+def test_stream_mock():
+    dev = MockDAQDevice()
+    stream = DAQStream(dev, rate=20000, chunkSize=200, bufferChunks=5)
+    stream.addInput('/Dev1/ai0')
+    stream.addInput('/Dev1/ai1')
+    stream.addOutput('/Dev1/ao0')
+    stream.addOutput('/Dev1/port0/line0', type='do')
+    requests = []
+
+    def output(index, nPts):
+        requests.append((index, nPts))
+        # digital samples are given as 0/1 floats; the stream converts them for the driver
+        return {'/Dev1/ao0': np.zeros(nPts), '/Dev1/port0/line0': (np.arange(nPts) % 2).astype(float)}
+
+    stream.setOutputCallback(output)
+    received = []
+    stream.addCallback(received.append)
+    stream.start()
+    try:
+        assert dev.reserved == 1
+        chunks = []
+        for chunk in stream.chunks(timeout=5):
+            chunks.append(chunk)
+            if len(chunks) == 3:
+                break
+    finally:
+        stream.stop()
+    assert dev.reserved == 0
+    assert stream.error is None
+
+    assert [c['index'] for c in chunks] == [c['index'] for c in received[:3]]
+    assert all(c['data']['/Dev1/ai0'].shape == (200,) for c in chunks)
+    # two chunks primed before starting, then one per chunk acquired
+    assert requests[:3] == [(0, 200), (200, 200), (400, 200)]
+    assert len(requests) >= 2 + len(received)
+    buf, row = stream.getBuffer('/Dev1/ai1')
+    assert buf.count >= 600
+    assert stream.latest('/Dev1/ai1', 100).shape == (100,)
+
+
+def test_stream_mock_regenerated_digital():
+    dev = MockDAQDevice()
+    stream = DAQStream(dev, rate=20000, chunkSize=100)
+    stream.addInput('/Dev1/ai0')
+    stream.addOutput('/Dev1/port0/line1', type='do', waveform=np.array([0, 1] * 1000))
+    assert stream.outputs['/Dev1/port0/line1'].dtype == np.uint32
+    stream.start()
+    try:
+        chunk = next(stream.chunks(timeout=5))
+        assert chunk['data']['/Dev1/ai0'].shape == (100,)
+    finally:
+        stream.stop()
+    assert stream.error is None
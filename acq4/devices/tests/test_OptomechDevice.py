@@ -0,0 +1,39 @@
+import numpy as np
+
+import pyqtgraph as pg
+from acq4.devices.OptomechDevice import OptomechDevice
+
+
+def makeDevice(name, transform, parent=None):
+    dev = OptomechDevice(None, {'transform': transform}, name)
+    if parent is not None:
+        dev.setParentDevice(parent)
+    return dev
+
+
+def test_mapArrays():
+    pg.mkQApp()
+    stage = makeDevice('stage', {'pos': (1e-3, 2e-3, 3e-3), 'angle': 30, 'axis': (0, 0, 1)})
+    camera = makeDevice('camera', {'pos': (5e-6, -5e-6, 0), 'scale': (1e-6, 2e-6, 1)}, stage)
+    pipette = makeDevice('pipette', {'pos': (0, 1e-4, -1e-4), 'angle': 45, 'axis': (0, 1, 0)}, stage)
+
+    pts3 = np.random.normal(size=(50, 3))
+    pts2 = pts3[:, :2]
+
+    expect = np.array([camera.mapToGlobal(tuple(p)) for p in pts3])
+    assert np.allclose(camera.mapToGlobalArray(pts3), expect)
+    assert np.allclose(camera.mapToGlobalArray(pts2), [camera.mapToGlobal(tuple(p)) for p in pts2])
+    assert np.allclose(camera.mapFromGlobalArray(camera.mapToGlobalArray(pts3)), pts3)
+
+    # arrays of any shape are mapped along the last axis
+    assert camera.mapToGlobalArray(pts3.reshape(5, 10, 3)).shape == (5, 10, 3)
+
+    # mapping between devices matches mapping through global coordinates
+    expect = pipette.mapFromGlobalArray(camera.mapToGlobalArray(pts3))
+    assert np.allclose(camera.mapToDeviceArray(pipette, pts3), expect)
+    assert np.allclose(pipette.mapFromDeviceArray(camera, pts3), expect)
+
+    # cached matrices are invalidated when a parent moves
+    stage.setDeviceTransform({'pos': (0, 0, 0)})
+    expect = np.array([camera.mapToGlobal(tuple(p)) for p in pts3])
+    assert np.allclose(camera.mapToGlobalArray(pts3), expect)
@@ -0,0 +1,186 @@
+import json
+import os
+
+import numpy as np
+
+from acq4.devices.PatchPipette.replay import AnalysisReplay, readLogFiles
+from acq4.devices.PatchPipette.states import CellDetectState, ResealState
+from acq4.devices.PatchPipette.states.cell_detect import CellDetectAnalysis
+from acq4.devices.PatchPipette.states.reseal import ResealAnalysis
+from acq4.devices.PatchPipette.states._base import SteadyStateAnalysisBase
+
+
+def _reference_avg(dt, prev_avg, resistance, tau):
+    # one measurement at a time, as the analyzers did before being vectorized
+    avg = np.empty(len(resistance))
+    ratio = np.empty(len(resistance))
+    for i in range(len(resistance)):
+        prev_avg, ratio[i] = SteadyStateAnalysisBase._exponential_decay_avg(dt[i], prev_avg, resistance[i], tau[i])
+        avg[i] = prev_avg
+    return avg, ratio
+
+
+def _series(rng, n):
+    times = np.cumsum(rng.uniform(0.05, 0.15, size=n))
+    resistance = rng.normal(5e6, 0.2e6, size=n)
+    resistance[n // 2:] += 1e6
+    return np.column_stack([times, resistance])
+
+
+def test_exponential_decay_avg_series():
+    rng = np.random.default_rng(1)
+    for n in [1, 10, 100, 5000]:
+        dt = rng.uniform(0, 0.2, size=n)
+        resistance = rng.normal(5e6, 1e6, size=n)
+        # long time constants as well as ones that decay completely within a step or over the series
+        for tau in [rng.uniform(1e-3, 10, size=n), np.full(n, 1e-4), np.full(n, 0.01)]:
+            avg, ratio = SteadyStateAnalysisBase._exponential_decay_avg_series(dt, 4e6, resistance, tau)
+            ref_avg, ref_ratio = _reference_avg(dt, 4e6, resistance, tau)
+            assert np.allclose(avg, ref_avg, rtol=1e-9)
+            assert np.allclose(ratio, ref_ratio, rtol=1e-6, atol=1e-12)
+
+    # zero time steps leave the average undefined, as they always have
+    avg, _ = SteadyStateAnalysisBase._exponential_decay_avg_series(np.zeros(20), 4e6, np.ones(20), np.zeros(20))
+    assert np.all(np.isnan(avg))
+
+
+def _compare_batched(state, rng):
+    config = state.defaultConfig()
+    measurements = _series(rng, 500)
+    whole = state.createAnalysis(config).process_measurements(measurements)
+    analysis = state.createAnalysis(config)
+    batches = np.split(measurements, [1, 2, 5, 40, 41, 300])
+    batched = np.concatenate([analysis.process_measurements(b) for b in batches])
+    assert whole.dtype == batched.dtype
+    for name in whole.dtype.names:
+        if whole.dtype[name] == bool:
+            assert np.all(whole[name] == batched[name]), name
+        else:
+            assert np.allclose(whole[name], batched[name], rtol=1e-9), name
+    assert analysis._last_measurement['time'] == measurements[-1, 0]
+    return whole
+
+
+def test_cell_detect_analysis():
+    rng = np.random.default_rng(2)
+    result = _compare_batched(CellDetectState, rng)
+    config = CellDetectState.defaultConfig()
+    assert result['resistance_avg'][0] == result['resistance'][0]
+    assert not result['cell_detected_slow'][:config['slowDetectionSteps'] - 1].any()
+    assert len(CellDetectState.createAnalysis(config).process_measurements(np.zeros((0, 2)))) == 0
+
+
+def test_reseal_analysis():
+    rng = np.random.default_rng(3)
+    result = _compare_batched(ResealState, rng)
+    assert tuple(result[0])[2:] == (1, 1, 0, 0, False, False)
+
+
+def _reference_measurements():
+    t = np.array([i * 0.1 + 0.003 * (i % 5) for i in range(24)])
+    r = np.array([5e6 + 2e4 * (i % 3) for i in range(24)])
+    r[5] = 3.5e6
+    r[12:] += 1.5e6
+    r[20] = 8e6
+    r[17] = 3e6
+    return np.column_stack([t, r])
+
+
+# output of the per-measurement process_measurements implementations before whole-batch analysis was added
+CELL_DETECT_REFERENCE = {
+    'resistance_avg': [
+        5000000.0, 5003625.38493844, 5010218.984017728, 5008366.596480526, 5010475.374775641, 4736672.641095807,
+        4784405.793138334, 4827111.7775953375, 4865701.865349198, 4890045.98708038, 4913602.653136814,
+        4936514.605015645, 5219926.425138033, 5455589.782996478, 5652160.006387248, 5805847.3235398,
+        5935301.241389084, 5403221.395873219, 5602033.627483463, 5768432.700529272, 6172947.224360133,
+        6232231.834704127, 6284395.353315441, 6330728.6151297195],
+    'cell_detected_fast': '000000000000111110111111',
+    'cell_detected_slow': '000000000000111111111111',
+    'obstacle_detected': '000000000000000000001000',
+    'tip_is_broken': '000001000000000001000000',
+}
+
+RESEAL_REFERENCE = {
+    'detect_avg': [
+        1.0, 491323.4952497607, 936516.2314231838, 1334221.6860625297, 1694959.964723783, 1847014.954774749,
+        2155607.1437184624, 2435953.94170066, 2690819.810619944, 2916826.2645310946, 3093995.776105523,
+        3284457.099115828, 3599172.0147253866, 3885042.289584097, 4144891.0359810856, 4343283.3503310755,
+        4556325.1967073465, 4404002.9394586235, 4609144.515347652, 4796165.724870021, 5066053.91533073,
+        5206398.558501641, 5334964.707220128, 5452905.1583860805],
+    'repair_avg': [
+        1.0, 51441.615751772326, 102560.05521747646, 152744.79158235202, 202620.2208288568, 231509.86203003384,
+        280373.2321031013, 328940.8352787591, 377215.70232082246, 424586.0047372654, 464848.23426042317,
+        511730.4396129446, 573093.0561142438, 634031.8242319208, 694551.0871982842, 745414.9085761067,
+        804587.8711232804, 827084.5592179052, 885215.6989614718, 942956.1037053457, 1004785.6410224444,
+        1061095.8534973445, 1117033.9902631082, 1172603.8640303733],
+    'detect_ratio': [
+        0.0, 5.691367532735152, 0.28014777610523856, 0.15371268643341462, 0.10393144926831402, 0.03731096727595563,
+        0.06709920236754206, 0.053099458340757716, 0.043215543901980756, 0.03502594550019826, 0.025609154540381516,
+        0.02594387710919258, 0.03973900974631146, 0.03319314723412968, 0.028117367417190474, 0.020305045135280905,
+        0.02079655012205376, -0.014767113062754474, 0.0197727250585637, 0.01727385590205294, 0.02377562631449848,
+        0.011867603567980924, 0.010594139736697513, 0.009496393379421314],
+    'repair_ratio': [
+        0.0, 4.711314601072047, 0.29966364492327696, 0.17298816424097593, 0.12271637410573258, 0.05788671180674282,
+        0.08316705200163058, 0.06938124273993691, 0.059471971884779255, 0.05137591201587922, 0.039345510826838764,
+        0.04173006555936879, 0.0491838951804941, 0.04388591080075559, 0.039593138303686194, 0.030693879094108263,
+        0.033175406893091286, 0.011976431639354803, 0.02949919428116347, 0.027442368652442085, 0.027581944091679803,
+        0.023681197307300627, 0.02231177105610606, 0.02108493248541095],
+    'stretching': '011111111100000000000000',
+    'tearing': '000000000000000001000000',
+}
+
+
+def _check_reference(makeAnalysis, reference):
+    measurements = _reference_measurements()
+    whole = makeAnalysis().process_measurements(measurements)
+    analysis = makeAnalysis()
+    rows = np.concatenate([analysis.process_measurements(measurements[i:i + 1]) for i in range(len(measurements))])
+    for result in (whole, rows):
+        assert np.all(result['time'] == measurements[:, 0])
+        assert np.all(result['resistance'] == measurements[:, 1])
+        for name, expected in reference.items():
+            if isinstance(expected, str):
+                assert ''.join('1' if v else '0' for v in result[name]) == expected, name
+            else:
+                assert np.allclose(result[name], expected, rtol=1e-9), name
+
+
+def test_cell_detect_reference():
+    _check_reference(lambda: CellDetectAnalysis(1e6, 0.2e6, 5, 2e6, -1e6), CELL_DETECT_REFERENCE)
+
+
+def test_reseal_reference():
+    _check_reference(lambda: ResealAnalysis(0.05, -0.01, 1.0, 10.0), RESEAL_REFERENCE)
+
+
+def test_replay_log(tmp_path):
+    tmp = str(tmp_path)
+    fn = os.path.join(tmp, 'MultiPatch_000.log')
+    tp_fields = ['baseline_potential', 'baseline_current', 'input_resistance', 'access_resistance',
+                 'fit_amplitude', 'time_constant', 'fit_yoffset', 'fit_xoffset', 'capacitance']
+    events = [{'device': 'pip1', 'event_time': 0.0, 'event': 'state_change', 'state': 'bath', 'old_state': 'out'},
+              {'device': 'pip1', 'event_time': 10.0, 'event': 'state_change', 'state': 'cell detect',
+               'old_state': 'bath'}]
+    for i in range(200):
+        t = i * 0.1
+        resistance = 5e6 if t < 15 else 7e6
+        events.append(dict({f: 0.0 for f in tp_fields}, device='pip1', event='test_pulse', event_time=t,
+                           start_time=t, steady_state_resistance=resistance))
+    events.sort(key=lambda ev: ev['event_time'])
+    with open(fn, 'wb') as fh:
+        for ev in events:
+            fh.write(json.dumps(ev).encode('utf8') + b",\n")
+
+    segments = list(readLogFiles([tmp], state='cell detect'))
+    assert len(segments) == 1
+    assert segments[0].startTime == 10.0
+    assert len(segments[0].measurements) == 100
+
+    result = AnalysisReplay('cell detect').run(segments)
+    assert result.pulseCount == 100
+    assert result.segments[0]['cell_detected_fast'] is not None
+    assert abs(result.segments[0]['cell_detected_fast'] - 5.0) < 0.05
+    assert result.segments[0]['tip_is_broken'] is None
+
+    result = AnalysisReplay('cell detect', {'fastDetectionThreshold': 5e6}).run(segments)
+    assert result.detectionCounts()['cell_detected_fast'] == 0
@@ -0,0 +1,34 @@
+import os
+
+import acq4.devices
+from acq4.devices import BUILTIN_DEVICE_CLASSES, getDeviceClass
+
+# modules and packages in acq4/devices that do not define a device class of the same name
+NON_DEVICE_MODULES = {'Device', 'OptomechDevice', 'tests', 'ThorlabsFilterWheel', 'zeiss'}
+# zeiss modules that only re-export another class
+ZEISS_ALIASES = {'ZeissReflectorChanger'}
+
+
+def _listModules(path):
+    modules = set()
+    for name in os.listdir(path):
+        if name.endswith('.py') and name != '__init__.py':
+            modules.add(name[:-3])
+        elif os.path.isfile(os.path.join(path, name, '__init__.py')):
+            modules.add(name)
+    return modules
+
+
+def test_builtin_device_classes_match_directory():
+    path = os.path.dirname(acq4.devices.__file__)
+    expected = (_listModules(path) - NON_DEVICE_MODULES) | (_listModules(os.path.join(path, 'zeiss')) - ZEISS_ALIASES)
+    assert set(BUILTIN_DEVICE_CLASSES) == expected
+
+    for name, modName in BUILTIN_DEVICE_CLASSES.items():
+        assert modName.startswith((f'acq4.devices.{name}', f'acq4.devices.zeiss.{name}')), modName
+
+
+def test_getDeviceClass():
+    cls = getDeviceClass('MockStage')
+    assert cls.__name__ == 'MockStage'
+    assert cls.__module__ == BUILTIN_DEVICE_CLASSES['MockStage']
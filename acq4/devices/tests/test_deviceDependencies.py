@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+
+from acq4.Manager import deviceDependencies, threadedInitAllowed
+
+
+def test_deviceDependencies():
+    devs = {
+        'DAQ': {'driver': 'NiDAQ', 'mock': True},
+        'Clamp1': {'driver': 'MockClamp', 'Command': {'device': 'DAQ', 'channel': '/Dev1/ao0'}},
+        'Stage': {'driver': 'MockStage'},
+        'Pipette1': {'driver': 'Pipette', 'parentDevice': 'Stage', 'recordingChambers': ['Chamber']},
+        'Chamber': {'driver': 'RecordingChamber'},
+        'PatchPipette1': {'driver': 'PatchPipette', 'clampDevice': 'Clamp1', 'pipetteDevice': 'Pipette1',
+                          'pressureDevice': 'Missing'},
+        'Loop': {'driver': 'Stage', 'parentDevice': 'Loop'},
+    }
+    deps = deviceDependencies(devs)
+    assert deps['DAQ'] == set()
+    assert deps['Clamp1'] == {'DAQ'}
+    assert deps['Pipette1'] == {'Stage', 'Chamber'}
+    # names that are not configured devices are ignored
+    assert deps['PatchPipette1'] == {'Clamp1', 'Pipette1'}
+    assert deps['Loop'] == set()
+
+
+def test_threadedInitAllowed():
+    from acq4.devices.AxoPatch200.AxoPatch200 import AxoPatch200
+    from acq4.devices.DAQGeneric import DAQGeneric
+    from acq4.devices.MockStage import MockStage
+
+    assert threadedInitAllowed(DAQGeneric, {})
+    assert not threadedInitAllowed(DAQGeneric, {'threadedInit': False})
+    # opting in is not inherited by subclasses, and is off by default
+    assert not threadedInitAllowed(AxoPatch200, {})
+    assert not threadedInitAllowed(MockStage, {})
+    # the device config can opt in as well as out
+    assert threadedInitAllowed(MockStage, {'threadedInit': True})
+    assert threadedInitAllowed(AxoPatch200, {'threadedInit': True})
+
+
+def test_deviceWithoutApp():
+    # devices can be constructed in scripts that have not created a QApplication; run in a fresh process
+    # because other tests create one
+    code = (
+        "from acq4.devices.Device import Device\n"
+        "class MockManager:\n"
+        "    def declareInterface(self, name, types, obj): pass\n"
+        "assert Device(MockManager(), {}, 'NoApp').name() == 'NoApp'\n"
+    )
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..')
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, os.environ.get('PYTHONPATH', '')]))
+    proc = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
@@ -174,6 +174,7 @@ class QCameraClass:
         self.fnp1 = lib.AsyncCallback(self.callBack1)
         self.fnpNull = lib.AsyncCallback(self.doNothing)
         self.counter = 0
+        self.newFrameCallback = None  # called (from the driver's callback thread) whenever a frame arrives
         
         
         ## Some parameters can be accessed as groups
@@ -863,6 +864,8 @@ class QCameraClass:
             #else:
             #    self.mutex.unlock()
         #print "Mutex released from qcam.callBack1()"
+        if self.newFrameCallback is not None:
+            self.newFrameCallback()
             
     def doNothing(self, *args):
         #dict = {}
@@ -22,6 +22,10 @@ class SuperTask:
         self.dataWrtten = False
         self.devs = daq.listDevices()
         self.triggerChannel = None
+        self.clockSource = None
+        self._clockConfig = None
+        self._triggerConfig = None
+        self.continuous = False
         self.result = None
 
     def absChanName(self, chan):
@@ -120,14 +124,21 @@ class SuperTask:
         # For now, all ao waveforms must be between -10 and 10
 
         typ = self.channelInfo[chan]["task"][1]
-        if typ in "ao" and (np.any(data > 10.0) or np.any(data < -10.0)):
-            self.channelInfo[chan]["data"] = np.clip(data, -10.0, 10.0)
-            self.channelInfo[chan]["clipped"] = True
-        else:
-            self.channelInfo[chan]["data"] = data
-            self.channelInfo[chan]["clipped"] = False
+        clipped = typ in "ao" and (np.any(data > 10.0) or np.any(data < -10.0))
+        if clipped:
+            data = np.clip(data, -10.0, 10.0)
+
+        prev = self.channelInfo[chan].get("data")
+        self.channelInfo[chan]["data"] = data
+        self.channelInfo[chan]["clipped"] = clipped
+
+        # If the waveform is unchanged, there is no need to rebuild the cache. Whether it must be written to
+        # the device again is decided by dataWritten, which stop() clears when the task is unreserved.
+        if prev is not None and prev is not data and prev.shape == data.shape and np.array_equal(prev, data):
+            return
 
         key = self.getTaskKey(chan)
+        self.taskInfo[key]["cache"] = None
         self.taskInfo[key]["dataWritten"] = False
 
         # if info is not None:
@@ -166,13 +177,27 @@ class SuperTask:
     def hasTasks(self):
         return len(self.tasks) > 0
 
-    def configureClocks(self, rate, nPts):
-        """Configure sample clock and triggering for all tasks"""
+    def hasChannel(self, chan):
+        """Return True if *chan* has already been added to this SuperTask."""
+        return self.absChanName(chan) in self.channelInfo
+
+    def configureClocks(self, rate, nPts, continuous=False):
+        """Configure sample clock and triggering for all tasks.
+
+        For finite tasks, *nPts* is the number of samples to acquire / generate per channel. If *continuous* is
+        True, the tasks sample until stopped and *nPts* is the size (per channel) of the hardware buffer; use
+        readChunk() / writeChunk() to stream data while the task runs.
+        """
         if len(self.tasks) == 0:
             raise Exception("No tasks to configure.")
+        if self._clockConfig == (rate, nPts, continuous, frozenset(self.tasks)):
+            # clocks are already configured for these tasks (re-armed task); nothing to do
+            return
         keys = list(self.tasks.keys())
         self.numPts = nPts
         self.rate = rate
+        self.continuous = continuous
+        sampleMode = self.daq.Val_ContSamps if continuous else self.daq.Val_FiniteSamps
 
         # Make sure we're only using 1 DAQ device (not sure how to tie 2 together yet)
         # ndevs = len(set([k[0] for k in keys]))
@@ -219,13 +244,17 @@ class SuperTask:
             if k[1] != clkSource:
                 # print "%s CfgSampClkTiming(%s, %f, Val_Rising, Val_FiniteSamps, %d)" % (str(k), clk, rate, nPts)
 
-                self.tasks[k].CfgSampClkTiming(clk, rate, self.daq.Val_Rising, self.daq.Val_FiniteSamps, nPts)
+                self.tasks[k].CfgSampClkTiming(clk, rate, self.daq.Val_Rising, sampleMode, nPts)
             else:
                 # print "%s CfgSampClkTiming('', %f, Val_Rising, Val_FiniteSamps, %d)" % (str(k), rate, nPts)
-                self.tasks[k].CfgSampClkTiming("", rate, self.daq.Val_Rising, self.daq.Val_FiniteSamps, nPts)
+                self.tasks[k].CfgSampClkTiming("", rate, self.daq.Val_Rising, sampleMode, nPts)
+
+        self._clockConfig = (rate, nPts, continuous, frozenset(self.tasks))
 
     def setTrigger(self, trig):
         # self.tasks[self.clockSource].CfgDigEdgeStartTrig(trig, Val_Rising)
+        if self._triggerConfig == (trig, frozenset(self.tasks)):
+            return
 
         for t in self.tasks:
             if t[1] in ["di", "do"]:  # M-series DAQ does not have trigger for digital acquisition
@@ -238,6 +267,7 @@ class SuperTask:
             # print "  trigger %s %s" % (str(t), trig)
             self.tasks[t].CfgDigEdgeStartTrig(trig, self.daq.Val_Rising)
         self.triggerChannel = trig
+        self._triggerConfig = (trig, frozenset(self.tasks))
 
     def start(self):
         self.writeTaskData()  # Only writes if needed.
@@ -268,6 +298,57 @@ class SuperTask:
             # Set up callback to record time when trigger starts
             pass
 
+    def setRegeneration(self, regenerate):
+        """Set whether continuous output tasks repeatedly regenerate the waveform set with setWaveform() (True,
+        the default), or expect new samples to be streamed with writeChunk() while the task runs (False).
+        """
+        mode = self.daq.Val_AllowRegen if regenerate else self.daq.Val_DoNotAllowRegen
+        for k in self.tasks:
+            if self.tasks[k].isOutputTask():
+                self.tasks[k].SetWriteRegenMode(mode)
+
+    def availableSamples(self):
+        """Return the minimum number of samples per channel that can currently be read from any input task
+        without blocking."""
+        avail = [self.tasks[k].GetReadAvailSampPerChan() for k in self.tasks if self.tasks[k].isInputTask()]
+        return min(avail) if len(avail) > 0 else 0
+
+    def readChunk(self, nPts, timeout=10.0):
+        """Read the next *nPts* samples from every input task of a continuous SuperTask.
+
+        Blocks until the samples are available (or *timeout* elapses). Returns a dict mapping task keys to
+        arrays of shape (nChannels, nPts); use chunkChannel() to extract single channels.
+        """
+        data = {}
+        for k in self.tasks:
+            if self.tasks[k].isInputTask():
+                data[k] = self.tasks[k].read(nPts, timeout=timeout, fromStart=False)[0]
+        return data
+
+    def chunkChannel(self, chunk, chan):
+        """Return the data for a single channel from a chunk returned by readChunk()."""
+        info = self.channelInfo[self.absChanName(chan)]
+        return chunk[info["task"]][info["index"]]
+
+    def writeChunk(self, data, timeout=10.0):
+        """Append samples to the buffers of continuous output tasks that do not regenerate (see setRegeneration).
+
+        *data* maps channel names to 1D arrays of equal length. Every channel of each output task being written
+        must be included. Analog samples are clipped to +/-10 V and digital samples are converted to uint32.
+        """
+        data = {self.absChanName(ch): d for ch, d in data.items()}
+        for k in self.tasks:
+            chans = self.taskInfo[k]["chans"]
+            if not self.tasks[k].isOutputTask() or chans[0] not in data:
+                continue
+            waves = np.concatenate([np.atleast_2d(data[c]) for c in chans])
+            if k[1] == "ao":
+                waves = np.clip(waves, -10.0, 10.0)
+            elif k[1] == "do":
+                waves = waves.astype(np.uint32)
+            self.tasks[k].write(waves, timeout)
+            self.taskInfo[k]["dataWritten"] = True
+
     def isDone(self):
         for t in self.tasks:
             if not self.tasks[t].isDone():
@@ -287,12 +368,12 @@ class SuperTask:
         # print "ST stopping, wait=",wait, " abort:", abort
         # need to be very careful about stopping and unreserving all hardware, even if there is a failure at some point.
         try:
-            if wait:
+            if wait and not self.continuous:
                 while not self.isDone():
                     # print "Sleeping..", time.time()
                     time.sleep(10e-6)
 
-            if not abort and self.isDone():
+            if not abort and not self.continuous and self.isDone():
                 # data must be read before stopping the task,
                 # but should only be read if we know the task is complete.
                 self.getResult()
@@ -304,8 +385,11 @@ class SuperTask:
                     self.tasks[t].stop()
                     # print "    ..done"
                 finally:
-                    # unreserve hardware
+                    # unreserve hardware. DAQmx does not promise to keep the output buffer of an unreserved
+                    # task, so output data is written again (from the cache) the next time the task starts.
                     self.tasks[t].TaskControl(self.daq.Val_Task_Unreserve)
+                    if self.tasks[t].isOutputTask():
+                        self.taskInfo[t]["dataWritten"] = False
         # print "ST stop complete."
 
     def getResult(self, channel=None):
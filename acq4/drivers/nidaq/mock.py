@@ -25,11 +25,16 @@ class MockNIDAQ:
             }
         }
         self.sampleRate = 20000.
+        self.Val_AllowRegen = 10097
         self.Val_Cfg_Default = -1
         self.Val_ChanForAllLines = 1
         self.Val_ChanPerLine = 0
+        self.Val_ContSamps = 10123
+        self.Val_CurrReadPos = 10425
         self.Val_Diff = 10106
+        self.Val_DoNotAllowRegen = 10158
         self.Val_FiniteSamps = 10178
+        self.Val_FirstSample = 10424
         self.Val_NRSE = 10078
         self.Val_RSE = 10083
         self.Val_Rising = 10280
@@ -172,7 +177,12 @@ class Task:
         self.clock = None
         self.nativeClock = None
         self.data = None
+        self.dataIsNew = False
         self.mode = None
+        self.continuous = False
+        self.regenerate = True
+        self.startTime = None
+        self.readPos = 0
 
     # def __getattr__(self, attr):
     #     return lambda *args: self
@@ -208,6 +218,7 @@ class Task:
         self.clock = clock
         self.rate = rate
         self.nPts = nPts
+        self.continuous = c == self.nd.Val_ContSamps
         # print self.chans, self.clock
 
     def GetSampClkMaxRate(self):
@@ -216,18 +227,38 @@ class Task:
     def device(self):
         return '/' + self.chans[0].split('/')[1]
 
-    def write(self, data):
+    def SetWriteRegenMode(self, mode):
+        self.regenerate = mode == self.nd.Val_AllowRegen
+
+    def GetReadAvailSampPerChan(self):
+        if self.startTime is None:
+            return 0
+        return int((time.time() - self.startTime) * self.rate) - self.readPos
+
+    def write(self, data, timeout=10.0):
+        # accept the same dtypes as the real driver (see nidaq.Task.write)
+        allowed = {'ao': [np.float64, np.int16, np.uint16], 'do': [np.uint8, np.uint16, np.uint32]}[self.mode]
+        if data.dtype not in allowed:
+            raise Exception("dtype %s not allowed for %s channels" % (data.dtype, self.mode.upper()))
+        if self.continuous and not self.regenerate and self.startTime is not None:
+            # streamed output; samples are consumed by the (imaginary) hardware
+            return data.shape[-1]
         self.data = data
+        self.dataIsNew = True
+        self._sendToMockFuncs()
+        return len(data)
 
+    def _sendToMockFuncs(self):
         # Send data off to callbacks if they were specified
         # print "write:", self.chOpts
         for i in range(len(self.chOpts)):
             if 'mockFunc' in self.chOpts[i]:
-                self.chOpts[i]['mockFunc'](data[i], 1.0 / self.rate)
+                self.chOpts[i]['mockFunc'](self.data[i], 1.0 / self.rate)
 
-        return len(data)
+    def read(self, samples=None, timeout=10.0, dtype=None, fromStart=True):
+        if self.continuous and not fromStart:
+            return self._readContinuous(samples, timeout)
 
-    def read(self):
         dur = self.nPts / self.rate
         tVals = np.linspace(0, dur, self.nPts)
         if 'd' in self.mode:
@@ -242,19 +273,46 @@ class Task:
                 data[i] = 0
         return (data, self.nPts)
 
+    def _readContinuous(self, samples, timeout):
+        # block until the requested samples would have been acquired
+        deadline = time.time() + timeout
+        while self.GetReadAvailSampPerChan() < samples:
+            if time.time() > deadline:
+                raise RuntimeError("Timed out waiting for %d samples" % samples)
+            time.sleep(min(0.01, samples / self.rate))
+        dtype = np.int32 if 'd' in self.mode else float
+        data = np.zeros((len(self.chans), samples), dtype=dtype)
+        if 'd' not in self.mode:
+            data += np.random.normal(scale=1e-3, size=data.shape)
+        self.readPos += samples
+        return (data, samples)
+
     def start(self):
+        self.startTime = time.time()
+        self.readPos = 0
+
+        # restarting an output task without a new write regenerates the previous buffer
+        if self.isOutputTask() and self.data is not None and not self.dataIsNew:
+            self._sendToMockFuncs()
+        self.dataIsNew = False
+
         # only start clock if it matches the native clock for this channel
         if self.clock is None or self.clock == self.nativeClock:
             dur = self.nPts / self.rate
             self.nd.startClock(self.nativeClock, dur)
 
     def stop(self):
+        self.startTime = None
+        if self.continuous:
+            return
         if self.clock is None:
             self.nd.stopClock(self.nativeClock)
         else:
             self.nd.stopClock(self.clock)
 
     def isDone(self):
+        if self.continuous:
+            return self.startTime is None
         if self.clock is None:
             return self.nd.checkClock(self.nativeClock)
         else:
@@ -269,8 +327,10 @@ class Task:
     def isInputTask(self):
         return self.mode in ['ai', 'di']
 
-    def TaskControl(self, *args):
-        pass
+    def TaskControl(self, action):
+        # assume the worst case for hardware: unreserving a task discards its output buffer
+        if action == self.nd.Val_Task_Unreserve:
+            self.data = None
 
     def WriteAnalogScalarF64(self, a, timeout, val, b):
         pass
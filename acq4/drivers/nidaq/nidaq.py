@@ -266,7 +266,12 @@ class Task:
     def isDone(self):
         return self.IsTaskDone()
 
-    def read(self, samples=None, timeout=10.0, dtype=None):
+    def read(self, samples=None, timeout=10.0, dtype=None, fromStart=True):
+        """Read samples from this task.
+
+        By default, all samples are read starting from the first sample acquired. For continuous tasks, use
+        *fromStart* = False to read the next *samples* from the current read position in the hardware buffer.
+        """
         # reqSamps = samples
         # if samples is None:
         #    samples = self.GetSampQuantSampPerChan()
@@ -317,7 +322,10 @@ class Task:
 
         fName += dataTypeConversions[np.dtype(dtype).descr[0][1]]
 
-        self.SetReadRelativeTo(PyDAQmx.Val_FirstSample)
+        if fromStart:
+            self.SetReadRelativeTo(PyDAQmx.Val_FirstSample)
+        else:
+            self.SetReadRelativeTo(PyDAQmx.Val_CurrReadPos)
         self.SetReadOffset(0)
 
         nPts = getattr(self, fName)(reqSamps, timeout, PyDAQmx.Val_GroupByChannel, buf, buf.size, None)
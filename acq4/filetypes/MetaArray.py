@@ -1,6 +1,7 @@
 import os
 
 from MetaArray import MetaArray as MA
+import numpy as np
 from numpy import ndarray
 from .FileType import FileType
 
@@ -39,6 +40,80 @@ class MetaArray(FileType):
         return fileName
         
     @classmethod
-    def read(cls, fileHandle, *args, **kargs):
-        """Read a file, return a data object"""
-        return MA(file=fileHandle.name(), *args, **kargs)
+    def read(cls, fileHandle, *args, select=None, mmap=False, **kargs):
+        """Read a file, return a data object.
+
+        *select* may be a dict {axis: selection} describing the part of the array to read, where each axis is
+        given by name or number and each selection may be:
+
+        * a column name or list of column names (eg. {'Channel': 'primary'})
+        * an integer index or a slice of indexes
+        * a (start, stop) tuple of axis values; eg. {'Time': (0.1, 0.2)} selects samples with
+          0.1 <= t < 0.2. Either end may be None.
+
+        For HDF5 files, only the selected hyperslab is read from disk. If *mmap* is True, the returned array is
+        a read-only memory-mapped view of the file rather than a copy in memory (this requires contiguous,
+        uncompressed storage; other HDF5 files are read lazily through h5py instead).
+        Older (non-HDF5) files are read in full before the selection is applied.
+        """
+        if select is None and not mmap:
+            return MA(file=fileHandle.name(), *args, **kargs)
+
+        kargs.pop('readAllData', None)
+        ma = MA(file=fileHandle.name(), *args, readAllData=False, **kargs)
+        if not ma._isHDF:
+            ma = MA(file=fileHandle.name(), *args, **kargs)
+            return ma if select is None else cls._select(ma, select)
+
+        openFile = ma._openFile
+        try:
+            if mmap:
+                try:
+                    ma._data = MA.mapHDF5Array(ma._data)
+                except Exception:
+                    ## chunked / compressed storage; read the selection lazily instead
+                    mmap = False
+            if select is not None:
+                ma = cls._select(ma, select)
+            elif not mmap:
+                ma = MA(ma[:].asarray(), info=ma.infoCopy())
+        finally:
+            openFile.close()
+        return ma
+
+    @staticmethod
+    def _select(ma, select):
+        """Return the part of *ma* described by *select* (see read())."""
+        names = [ma.axisName(i) for i in range(ma.ndim)]
+        index = [slice(None)] * ma.ndim
+        reorder = None
+        for axis, sel in select.items():
+            ax = names.index(axis) if isinstance(axis, str) else axis
+            if isinstance(sel, str):
+                sel = ma.listColumns(ax).index(sel)
+            elif isinstance(sel, list):
+                cols = [ma.listColumns(ax).index(c) if isinstance(c, str) else int(c) for c in sel]
+                ## h5py requires increasing indexes; read sorted and restore the requested order afterward
+                sel = sorted(cols)
+                if sel != cols:
+                    reorder = (ax, [sel.index(c) for c in cols])
+            elif isinstance(sel, tuple):
+                vals = ma.axisValues(ax)
+                start = None if sel[0] is None else int(np.searchsorted(vals, sel[0], side='left'))
+                stop = None if sel[1] is None else int(np.searchsorted(vals, sel[1], side='left'))
+                sel = slice(start, stop)
+            elif not isinstance(sel, slice):
+                sel = int(sel)
+            index[ax] = sel
+
+        data = ma[tuple(index)]
+        if not isinstance(data, MA):
+            return data
+        if reorder is not None:
+            ax, order = reorder
+            ## integer selections before this axis remove dimensions from the result
+            ax -= sum(1 for i in index[:ax] if isinstance(i, int))
+            idx = [slice(None)] * data.ndim
+            idx[ax] = order
+            data = data[tuple(idx)]
+        return data
@@ -3,6 +3,7 @@ from __future__ import annotations
 import json
 import os
 import re
+from collections.abc import Mapping
 from typing import Any
 
 import h5py
@@ -11,6 +12,7 @@ import numpy as np
 import pyqtgraph as pg
 from acq4.filetypes.FileType import FileType
 from acq4.util import Qt
+from acq4.util.DataManager import INDEX_CACHE_SUFFIX
 from acq4.util.target import Target
 from neuroanalysis.test_pulse import PatchClampTestPulse
 from neuroanalysis.test_pulse_stack import H5BackedTestPulseStack
@@ -42,13 +44,13 @@ for info in TEST_PULSE_METAARRAY_INFO:
 class IrregularTimeSeries(object):
     """An irregularly-sampled time series.
 
-    Allows efficient retrieval of the series value at any time using a lookup table.
-    Intended for cases where the lookup table would be reasonably-sized (for example,
-    an hour of events indexed at 1-second resolution). For larger data sets, a
-    b-tree would be a more reasonable approach.
+    Times are stored in a sorted array and looked up by binary search, so single lookups
+    are O(log n) and many lookups can be done at once with values_at().
 
-    If enabled, values are interpolated linearly. Values may be of any type,
-    but only scalar, array, and tuple-of-scalar types may be interpolated.
+    If enabled, values are interpolated linearly. Values may be of any type, but only
+    scalar and fixed-length tuple / list / array-of-scalar values may be interpolated.
+    Such numeric values are stored as columns of a float array; anything else is stored
+    as objects.
 
     Example::
 
@@ -64,79 +66,183 @@ class IrregularTimeSeries(object):
         series[5.0]   # returns None because the series begins at 10.0
         series[14.0]  # returns 0.6; interpolated between 2nd and 3rd timepoints
         series[50]    # returns 1.2; the last value in the time series
+
+        # Look up many times at once
+        series.values_at([5.0, 14.0, 50])  # returns array([nan, 0.6, 1.2])
     """
 
-    def __init__(self, data=None, interpolate=False, resolution=1.0):
+    def __init__(self, data=None, interpolate=False, resolution=None):
+        # *resolution* is accepted for backward compatibility; lookups no longer use a fixed-resolution table.
         self.interpolate = interpolate
-        self._resolution = resolution
-
-        self.events = []
-        # each value maps a time in seconds to the index of the value recorded immediately after the time
-        self.index = []
-        self._startTime = None
+        self._count = 0
+        self._times = np.empty(0, dtype=float)
+        self._values = None
+        # 'scalar', 'vector' (fixed-length sequences of scalars) or 'object'; None until the first value is added
+        self._kind = None
+        self._vectorType = None
+        self._width = None
 
         if data is not None:
             self.extend(data)
 
+    @classmethod
+    def fromArrays(cls, times, values, interpolate=False):
+        """Create a series directly from an array of *times* and an array of numeric *values*
+        with shape (len(times),) or (len(times), width). Vector values are returned as tuples."""
+        times = np.array(times, dtype=float)
+        values = np.array(values, dtype=float)
+        if len(times) != len(values):
+            raise ValueError("times and values must have the same length")
+        if np.any(np.diff(times) < 0):
+            raise ValueError("Time points must be in increasing order.")
+        series = cls(interpolate=interpolate)
+        series._times = times
+        series._values = values
+        series._count = len(times)
+        if values.ndim == 1:
+            series._kind = 'scalar'
+        else:
+            series._kind = 'vector'
+            series._vectorType = tuple
+            series._width = values.shape[1]
+        return series
+
     def __setitem__(self, time, value):
         """Set the value of this series at a specific time.
 
         Points in the series must be added in increasing chronological order.
         It is allowed to add multiple values for the same time point.
         """
-        if len(self.events) > 0 and time < self.events[-1][0]:
-            raise ValueError("Time points must be added in increasing order.")
+        self.extend([(time, value)])
 
-        if self._startTime is None:
-            self._startTime = time
-        i = self._getIndex(time)
-
-        # Extend index
-        dif = i + 1 - len(self.index)
-        if dif > 0:
-            self.index.extend([len(self.events)] * dif)
-        self.index[i] = len(self.events)
+    def extend(self, data):
+        """Append a sequence of (time, value) pairs, in increasing chronological order."""
+        data = list(data)
+        if len(data) == 0:
+            return
+        times = np.array([t for t, v in data], dtype=float)
+        values = [v for t, v in data]
+        if (self._count > 0 and times[0] < self._times[self._count - 1]) or np.any(np.diff(times) < 0):
+            raise ValueError("Time points must be added in increasing order.")
 
-        self.events.append((float(time), value))
+        n = self._count + len(times)
+        kind, vectorType, width = self._classify(values)
+        if self._kind is None:
+            self._kind, self._vectorType, self._width = kind, vectorType, width
+        elif (kind, vectorType, width) != (self._kind, self._vectorType, self._width):
+            self._convertToObjects()
+        self._reserve(n)
+        self._times[self._count:n] = times
+        if self._kind == 'object':
+            for i, v in enumerate(values):
+                self._values[self._count + i] = v
+        else:
+            self._values[self._count:n] = values
+        self._count = n
 
-    def extend(self, data):
-        for t, v in data:
-            self[t] = v
+    @staticmethod
+    def _classify(values):
+        def isScalar(v):
+            return isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, bool)
+
+        if all(isScalar(v) for v in values):
+            return 'scalar', None, None
+        first = values[0]
+        if isinstance(first, (tuple, list, np.ndarray)) and np.ndim(first) == 1:
+            vectorType, width = type(first), len(first)
+            if all(type(v) is vectorType and np.ndim(v) == 1 and len(v) == width and all(isScalar(x) for x in v)
+                   for v in values):
+                return 'vector', vectorType, width
+        return 'object', None, None
+
+    def _reserve(self, n):
+        capacity = len(self._times)
+        if n <= capacity and self._values is not None:
+            return
+        capacity = max(n, 2 * capacity, 16)
+        times = np.empty(capacity, dtype=float)
+        times[:self._count] = self._times[:self._count]
+        if self._kind == 'object':
+            values = np.empty(capacity, dtype=object)
+        elif self._kind == 'vector':
+            values = np.empty((capacity, self._width), dtype=float)
+        else:
+            values = np.empty(capacity, dtype=float)
+        if self._values is not None:
+            values[:self._count] = self._values[:self._count]
+        self._times, self._values = times, values
+
+    def _convertToObjects(self):
+        values = np.empty(len(self._times), dtype=object)
+        for i in range(self._count):
+            values[i] = self._value(i)
+        self._values = values
+        self._kind, self._vectorType, self._width = 'object', None, None
+
+    def _value(self, i):
+        v = self._values[i]
+        if self._kind == 'scalar':
+            return float(v)
+        if self._kind == 'vector':
+            return v.copy() if self._vectorType is np.ndarray else self._vectorType(v.tolist())
+        return v
+
+    @property
+    def events(self):
+        """List of (time, value) pairs in the series."""
+        return [(float(self._times[i]), self._value(i)) for i in range(self._count)]
 
     def __getitem__(self, time):
         """Return the value of this series at the given time.
         """
-        events = self.events
-        if len(events) == 0:
+        n = self._count
+        if n == 0 or time <= self._times[0]:
             return None
-        if time <= self._startTime:
-            return None
-        if time >= events[-1][0]:
-            return events[-1][1]
-
-        # Use index to find a nearby event
-        i = self.index[min(self._getIndex(time), len(self.index) - 1)]
-
-        if events[i][0] > time:
-            # walk backward to the requested event
-            while self.events[i][0] > time:
-                i -= 1
-        elif events[i][0] < time:
-            # walk forward to the requested event
-            while i + 1 < len(self.events) and self.events[i + 1][0] <= time:
-                i += 1
-        else:
-            return events[i][1]
-
-        # interpolate if requested
-        if not self.interpolate:
-            return events[i][1]
-        t1, v1 = events[i]
-        t2, v2 = events[i + 1]
-        return self._interpolate(time, v1, v2, t1, t2)
-
-    def _getIndex(self, t):
-        return int((t - self._startTime) / self._resolution)
+        if time >= self._times[n - 1]:
+            return self._value(n - 1)
+
+        # last event at or before the requested time
+        i = int(np.searchsorted(self._times[:n], time, side='right')) - 1
+        t1 = self._times[i]
+        if not self.interpolate or t1 == time or self._kind == 'object':
+            return self._value(i)
+        return self._interpolate(time, self._value(i), self._value(i + 1), t1, self._times[i + 1])
+
+    def values_at(self, times) -> np.ndarray:
+        """Return the values of this series at each of *times*; equivalent to ``[series[t] for t in times]``.
+
+        For numeric series, returns a float array of shape (len(times),) or (len(times), width) with
+        NaN wherever the series has no value. Otherwise returns an object array with None wherever the
+        series has no value.
+        """
+        times = np.asarray(times, dtype=float)
+        n = self._count
+        if n == 0:
+            if self._kind == 'vector':
+                return np.full((len(times), self._width), np.nan)
+            if self._kind == 'scalar':
+                return np.full(len(times), np.nan)
+            return np.full(len(times), None, dtype=object)
+        ts = self._times[:n]
+        valid = times > ts[0]
+        idx = np.clip(np.searchsorted(ts, times, side='right') - 1, 0, n - 1)
+
+        if self._kind == 'object':
+            out = np.full(len(times), None, dtype=object)
+            out[valid] = self._values[idx[valid]]
+            return out
+
+        vals = self._values[:n]
+        out = vals[idx]
+        if self.interpolate:
+            interp = np.flatnonzero(valid & (times < ts[-1]) & (times != ts[idx]))
+            i1 = idx[interp]
+            s = (times[interp] - ts[i1]) / (ts[i1 + 1] - ts[i1])
+            if self._kind == 'vector':
+                s = s[:, np.newaxis]
+            out[interp] = vals[i1] * (1.0 - s) + vals[i1 + 1] * s
+        out[~valid] = np.nan
+        return out
 
     @staticmethod
     def _interpolate(t, v1, v2, t1, t2):
@@ -147,115 +253,321 @@ class IrregularTimeSeries(object):
         else:
             return v1 * (1.0 - s) + v2 * s
 
-    def times(self):
-        """Return a list of the time points in the series.
+    def times(self) -> np.ndarray:
+        """Return an array of the time points in the series.
         """
-        return [ev[0] for ev in self.events]
+        return self._times[:self._count].copy()
 
-    def values(self):
-        """Return a list of the values at each point in the series.
+    def values(self) -> np.ndarray:
+        """Return an array of the values at each point in the series.
         """
-        return [ev[1] for ev in self.events]
+        if self._values is None:
+            return np.zeros(0, dtype=object)
+        return self._values[:self._count].copy()
 
     def firstValue(self):
-        if len(self.events) == 0:
+        if self._count == 0:
             return None
         else:
-            return self.events[0][1]
+            return self._value(0)
 
     def lastValue(self):
-        if len(self.events) == 0:
+        if self._count == 0:
             return None
         else:
-            return self.events[-1][1]
+            return self._value(self._count - 1)
 
     def firstTime(self):
-        if len(self.events) == 0:
+        if self._count == 0:
             return None
         else:
-            return self.events[0][0]
+            return float(self._times[0])
 
     def lastTime(self):
-        if len(self.events) == 0:
+        if self._count == 0:
             return None
         else:
-            return self.events[-1][0]
+            return float(self._times[self._count - 1])
+
+    def __len__(self):
+        return self._count
+
+
+# Event types that contribute to each per-device data structure (None means every event type)
+EVENT_TYPES_BY_USE = {
+    'event': None,
+    'position': {'pipette_transform_changed', 'move_start', 'move_stop'},
+    'pressure': {'pressure_changed'},
+    'state': {'state_change', 'state_event'},
+    'auto_bias_change': {'auto_bias_change'},
+    'target': {'target_changed'},
+    # currently ignored:
+    # 'move_request': {'move_requested'},
+    'test_pulse': {'test_pulse'},
+    'full_test_pulse': {'test_pulse'},
+}
+
+
+def possible_uses_for_type(event_type: str) -> list[str]:
+    return [use for use, types in EVENT_TYPES_BY_USE.items() if types is None or event_type in types]
+
+
+class MultiPatchLogIndex(object):
+    """Compact index of the events in a MultiPatch log file.
+
+    Records the byte offset, length, time, device and type of every event so that events can be
+    selected by device, type and time window and then decoded individually, without parsing the
+    rest of the file. The index is cached in a hidden file next to the log, and is extended
+    incrementally when the log has grown since the index was built.
+    """
+    VERSION = 1
+    # MultiPatch writes these keys first on every line (see PatchPipette.emitNewEvent), so most lines
+    # can be indexed without decoding the JSON.
+    _linePrefix = re.compile(
+        rb'\{"device": "((?:[^"\\]|\\.)*)", "event_time": ([-+0-9.eE]+|NaN), "event": "((?:[^"\\]|\\.)*)"')
+    _fullTestPulse = re.compile(rb'"full_test_pulse": "((?:[^"\\]|\\.)*)"')
+
+    def __init__(self, filename: str, useCache: bool = True):
+        self.filename = filename
+        self._reset()
+        if useCache:
+            self._readCache()
+        stat = os.stat(filename)
+        if stat.st_size != self._indexedSize or stat.st_mtime != self._mtime:
+            if stat.st_size <= self._indexedSize:
+                # file was rewritten rather than appended to
+                self._reset()
+            self._scan()
+            self._mtime = stat.st_mtime
+            if useCache:
+                self._writeCache()
+
+    def _reset(self):
+        self.deviceNames: list[str] = []
+        self.eventNames: list[str] = []
+        self.offsets = np.zeros(0, dtype=np.int64)
+        self.lengths = np.zeros(0, dtype=np.int64)
+        self.times = np.zeros(0, dtype=float)
+        self.devices = np.zeros(0, dtype=np.int16)
+        self.events = np.zeros(0, dtype=np.int16)
+        # {device: set of hdf5 files referenced by its full_test_pulse events}
+        self.testPulseFiles: dict[str, set[str]] = {}
+        self._indexedSize = 0
+        self._mtime = None
+
+    def cacheFileName(self) -> str:
+        dirname, basename = os.path.split(self.filename)
+        return os.path.join(dirname, f".{basename}{INDEX_CACHE_SUFFIX}")
+
+    def _readCache(self) -> bool:
+        try:
+            with np.load(self.cacheFileName()) as cache:
+                if int(cache['version']) != self.VERSION:
+                    return False
+                self.deviceNames = list(cache['deviceNames'])
+                self.eventNames = list(cache['eventNames'])
+                for name in ('offsets', 'lengths', 'times', 'devices', 'events'):
+                    setattr(self, name, cache[name])
+                for dev, fn in zip(cache['testPulseDevices'], cache['testPulseFiles']):
+                    self.testPulseFiles.setdefault(str(dev), set()).add(str(fn))
+                self._indexedSize = int(cache['indexedSize'])
+                self._mtime = float(cache['mtime'])
+        except (OSError, KeyError, ValueError):
+            self._reset()
+            return False
+        return True
+
+    def _writeCache(self):
+        tpFiles = [(dev, fn) for dev, fns in self.testPulseFiles.items() for fn in sorted(fns)]
+        try:
+            with open(self.cacheFileName(), 'wb') as fh:
+                np.savez(
+                    fh,
+                    version=self.VERSION,
+                    indexedSize=self._indexedSize,
+                    mtime=self._mtime,
+                    deviceNames=np.array(self.deviceNames, dtype=str),
+                    eventNames=np.array(self.eventNames, dtype=str),
+                    offsets=self.offsets,
+                    lengths=self.lengths,
+                    times=self.times,
+                    devices=self.devices,
+                    events=self.events,
+                    testPulseDevices=np.array([dev for dev, fn in tpFiles], dtype=str),
+                    testPulseFiles=np.array([fn for dev, fn in tpFiles], dtype=str),
+                )
+        except OSError:
+            # read-only data directory; the index will simply be rebuilt next time
+            pass
+
+    def _scan(self):
+        """Index every complete line after the currently indexed part of the file."""
+        devCodes = {name: i for i, name in enumerate(self.deviceNames)}
+        evCodes = {name: i for i, name in enumerate(self.eventNames)}
+        offsets, lengths, times, devices, events = [], [], [], [], []
+        offset = self._indexedSize
+        with open(self.filename, 'rb') as fh:
+            fh.seek(offset)
+            for line in fh:
+                if not line.endswith(b'\n'):
+                    break  # incomplete line is still being written
+                entry = self._parseLine(line)
+                if entry is not None:
+                    dev, event_time, event_type, tp_file = entry
+                    offsets.append(offset)
+                    lengths.append(len(line))
+                    times.append(event_time)
+                    devices.append(devCodes.setdefault(dev, len(devCodes)))
+                    events.append(evCodes.setdefault(event_type, len(evCodes)))
+                    if tp_file:
+                        self.testPulseFiles.setdefault(dev, set()).add(tp_file.split(":")[0])
+                offset += len(line)
+        self._indexedSize = offset
+        self.deviceNames = list(devCodes)
+        self.eventNames = list(evCodes)
+        self.offsets = np.concatenate((self.offsets, np.array(offsets, dtype=np.int64)))
+        self.lengths = np.concatenate((self.lengths, np.array(lengths, dtype=np.int64)))
+        self.times = np.concatenate((self.times, np.array(times, dtype=float)))
+        self.devices = np.concatenate((self.devices, np.array(devices, dtype=np.int16)))
+        self.events = np.concatenate((self.events, np.array(events, dtype=np.int16)))
+
+    def _parseLine(self, line: bytes):
+        m = self._linePrefix.match(line)
+        if m is None:
+            text = line.rstrip(b',\r\n')
+            if not text.strip():
+                return None
+            ev = json.loads(text)
+            return ev.get('device', ''), float(ev.get('event_time', np.nan)), ev.get('event', ''), \
+                ev.get('full_test_pulse')
+        dev = json.loads(b'"' + m.group(1) + b'"')
+        event_type = json.loads(b'"' + m.group(3) + b'"')
+        tp_file = None
+        if event_type == 'test_pulse':
+            tp = self._fullTestPulse.search(line, m.end())
+            if tp is not None:
+                tp_file = json.loads(b'"' + tp.group(1) + b'"')
+        return dev, float(m.group(2)), event_type, tp_file
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def timeRange(self) -> tuple[float | None, float | None]:
+        times = self.times[np.isfinite(self.times)]
+        if len(times) == 0:
+            return None, None
+        return float(times.min()), float(times.max())
+
+    def select(self, device=None, eventTypes=None, start=None, stop=None) -> np.ndarray:
+        """Return the indexes of all events matching the given device, event types and time window (inclusive),
+        in file order."""
+        mask = np.ones(len(self), dtype=bool)
+        if device is not None:
+            if device not in self.deviceNames:
+                return np.zeros(0, dtype=int)
+            mask &= self.devices == self.deviceNames.index(device)
+        if eventTypes is not None:
+            codes = [i for i, name in enumerate(self.eventNames) if name in eventTypes]
+            mask &= np.isin(self.events, codes)
+        if start is not None:
+            mask &= self.times >= start
+        if stop is not None:
+            mask &= self.times <= stop
+        return np.flatnonzero(mask)
+
+    def read(self, indexes) -> list[dict[str, Any]]:
+        """Decode the events at the given *indexes*."""
+        events = []
+        with open(self.filename, 'rb') as fh:
+            for offset, length in zip(self.offsets[indexes], self.lengths[indexes]):
+                fh.seek(offset)
+                events.append(json.loads(fh.read(length).rstrip(b',\r\n')))
+        return events
+
+
+class MultiPatchDeviceLog(Mapping):
+    """The logged data for one device, as a read-only mapping of {use: data}.
+
+    Each data structure is decoded from the log file the first time it is accessed, so only the
+    event types actually being displayed are ever parsed.
+    """
+
+    def __init__(self, index: MultiPatchLogIndex, device: str):
+        self._index = index
+        self._device = device
+        self._data = {}
+
+    def __getitem__(self, use: str):
+        if use not in self._data:
+            if use == 'position_ITS':
+                # 'position_ITS' is a special case, to support Canvas
+                position = self['position']
+                self._data[use] = IrregularTimeSeries.fromArrays(position[:, 0], position[:, 1:], interpolate=True)
+            elif use in EVENT_TYPES_BY_USE:
+                self._data[use] = self._decode(use)
+            else:
+                raise KeyError(use)
+        return self._data[use]
+
+    def __iter__(self):
+        return iter(['position_ITS', *EVENT_TYPES_BY_USE])
 
     def __len__(self):
-        return len(self.events)
+        return len(EVENT_TYPES_BY_USE) + 1
+
+    def _decode(self, use: str):
+        rows = self._index.select(self._device, EVENT_TYPES_BY_USE[use])
+        return MultiPatchLogData._build_data_structure(use, self._index.read(rows))
+
+    def loadAll(self):
+        """Decode all data structures at once, parsing each event only once."""
+        events = self._index.read(self._index.select(self._device))
+        for use, types in EVENT_TYPES_BY_USE.items():
+            if use not in self._data:
+                self._data[use] = MultiPatchLogData._build_data_structure(
+                    use, [ev for ev in events if types is None or ev['event'] in types])
 
 
 class MultiPatchLogData(object):
-    def __init__(self, filename=None):
-        self._devices = {}
+    def __init__(self, filename=None, lazy=True):
+        self._devices: dict[str, MultiPatchDeviceLog] = {}
         self.fullTestPulseStacks: dict[str, H5BackedTestPulseStack] = {}
+        self._index = None
         self._minTime = None
         self._maxTime = None
 
         if filename is not None:
-            self.process(filename)
-
-    def process(self, filename) -> None:
-        def possible_uses_for_type(event_type: str) -> list[str]:
-            uses = ['event']
-            if event_type in {'pipette_transform_changed', 'move_start', 'move_stop'}:
-                uses.append('position')
-            if event_type in {'pressure_changed'}:
-                uses.append('pressure')
-            if event_type in {'state_change', 'state_event'}:
-                uses.append('state')
-            if event_type in {'auto_bias_change'}:
-                uses.append('auto_bias_change')
-            if event_type in {'target_changed'}:
-                uses.append('target')
-            # currently ignored:
-            # if event_type in {'move_requested'}:
-            #     uses.append('move_request')
-            if event_type in {'test_pulse'}:
-                uses += ['test_pulse', 'full_test_pulse']
-            return uses
-
-        with open(filename, 'rb') as fh:
-            events: list[dict[str, Any]] = [json.loads(line.rstrip(b',\r\n')) for line in fh]
-
-            events_by_dev_and_use = {}
-            bool_fields = ('clean', 'broken', 'active', 'enabled')
-            for ev in events:
-                is_true = [ev[f] for f in bool_fields if f in ev]
-                ev["is_true"] = not is_true or any(is_true)  # empty should mean True
-                for use in possible_uses_for_type(ev['event']):
-                    events_by_dev_and_use.setdefault(ev['device'], {}).setdefault(use, [])
-                    events_by_dev_and_use[ev['device']][use].append(ev)
-            for dev in events_by_dev_and_use:
-                self._devices[dev] = self._initial_data_structures(events_by_dev_and_use[dev])
-                for use in events_by_dev_and_use[dev]:
-                    for i, event in enumerate(events_by_dev_and_use[dev][use]):
-                        if self._minTime is None or event['event_time'] < self._minTime:
-                            self._minTime = event['event_time']
-                        if self._maxTime is None or event['event_time'] > self._maxTime:
-                            self._maxTime = event['event_time']
-                        self._devices[dev][use][i] = self._prepare_event_for_use(event, use)
-                        if use == 'position':
-                            time, *pos = self._prepare_event_for_use(event, use)
-                            self._devices[dev]['position_ITS'][time] = pos
-                if 'full_test_pulse' in self._devices[dev]:
-                    h5_fns = {loc.split(":")[0] for loc in self._devices[dev]['full_test_pulse'] if loc}
-                    for h5_fn in h5_fns:
-                        h5_fn = os.path.join(os.path.dirname(filename), h5_fn)
-                        # TODO only open the file once, not once per device
-                        h5_file = h5py.File(h5_fn, 'r')
-                        # TODO find a way to stop duplicating the "test_pulses/{dev}" part
-                        dataset = h5_file[f"test_pulses/{dev}"]
-                        stack = H5BackedTestPulseStack(dataset)
-                        if dev in self.fullTestPulseStacks:
-                            self.fullTestPulseStacks[dev].merge(stack)
-                        else:
-                            self.fullTestPulseStacks[dev] = stack
+            self.process(filename, lazy=lazy)
+
+    def process(self, filename, lazy=True) -> None:
+        """Index the log file at *filename*.
+
+        If *lazy* is True, the events for each device and use are only decoded when first accessed.
+        Otherwise, all events are decoded immediately.
+        """
+        self._index = MultiPatchLogIndex(filename)
+        self._minTime, self._maxTime = self._index.timeRange()
+        for dev in self._index.deviceNames:
+            self._devices[dev] = MultiPatchDeviceLog(self._index, dev)
+            if not lazy:
+                self._devices[dev].loadAll()
+        for dev, h5_fns in self._index.testPulseFiles.items():
+            for h5_fn in sorted(h5_fns):
+                h5_fn = os.path.join(os.path.dirname(filename), h5_fn)
+                # TODO only open the file once, not once per device
+                h5_file = h5py.File(h5_fn, 'r')
+                # TODO find a way to stop duplicating the "test_pulses/{dev}" part
+                dataset = h5_file[f"test_pulses/{dev}"]
+                stack = H5BackedTestPulseStack(dataset)
+                if dev in self.fullTestPulseStacks:
+                    self.fullTestPulseStacks[dev].merge(stack)
+                else:
+                    self.fullTestPulseStacks[dev] = stack
 
     def devices(self) -> list[str]:
         return list(self._devices.keys())
 
-    def __getitem__(self, dev: str) -> dict[str, Any]:
+    def __getitem__(self, dev: str) -> MultiPatchDeviceLog:
         return self._devices[dev]
 
     def state(self, time):
@@ -265,12 +577,29 @@ class MultiPatchLogData(object):
             for dev in self.devices()
         }
 
+    def positionsAt(self, times) -> dict[str, np.ndarray]:
+        """Return the interpolated (x, y, z) position of each device at every time in *times*.
+
+        Each array has shape (len(times), 3) and is NaN before the device's first recorded position.
+        """
+        return {dev: self._devices[dev]['position_ITS'].values_at(times) for dev in self.devices()}
+
     def firstTime(self):
         return self._minTime
 
     def lastTime(self):
         return self._maxTime
 
+    @classmethod
+    def _build_data_structure(cls, use: str, events: list[dict[str, Any]]):
+        data = cls._initial_data_structures({use: events})[use]
+        bool_fields = ('clean', 'broken', 'active', 'enabled')
+        for i, event in enumerate(events):
+            is_true = [event[f] for f in bool_fields if f in event]
+            event["is_true"] = not is_true or any(is_true)  # empty should mean True
+            data[i] = cls._prepare_event_for_use(event, use)
+        return data
+
     @staticmethod
     def _initial_data_structures(events_by_use: dict[str, list]) -> dict[str, Any]:
         def count_for_use(use: str):
@@ -7,9 +7,23 @@ Functions for accessing available fileTypes. Generally these are used by DataMan
 and should not be accessed directly.
 """
 import os
+
 import acq4.util.debug as debug
 
-KNOWN_FILE_TYPES = None
+## Built-in file types: name of each FileType subclass and the module defining it. These are only imported
+## when first needed, so that eg. reading a MetaArray file does not import the libraries used by every other type.
+## Modules in this directory that are missing from the map are still found by listFileTypes.
+BUILTIN_FILE_TYPES = {
+    'Analyze75': 'acq4.filetypes.Analyze75',
+    'CSVFile': 'acq4.filetypes.CSVFile',
+    'ImageFile': 'acq4.filetypes.ImageFile',
+    'MetaArray': 'acq4.filetypes.MetaArray',
+    'MultiPatchLog': 'acq4.filetypes.MultiPatchLog',
+    'YamlFile': 'acq4.filetypes.YamlFile',
+}
+
+KNOWN_FILE_TYPES = {}
+UNLISTED_FILE_TYPES = None
 
 
 def suggestReadType(fileHandle):
@@ -79,34 +93,30 @@ def registerFileType(name, cls):
 
 
 def getFileType(typName):
-    """Return the fileType class for the given name.
+    """Return the fileType class for the given name, importing it if necessary.
     (this is generally only for internal use)"""
     global KNOWN_FILE_TYPES
     if typName not in KNOWN_FILE_TYPES:
-        mod = __import__(f'acq4.filetypes.{typName}', fromlist=['*'])
+        modName = BUILTIN_FILE_TYPES.get(typName, f'acq4.filetypes.{typName}')
+        mod = __import__(modName, fromlist=['*'])
         cls = getattr(mod, typName)
         registerFileType(typName, cls)
 
     return KNOWN_FILE_TYPES[typName]
-    
-    
+
+
 def listFileTypes():
-    """Return a list of the names of all available fileType subclasses."""
-    global KNOWN_FILE_TYPES
-    if KNOWN_FILE_TYPES is None:
-        KNOWN_FILE_TYPES = {}
+    """Return a list of the names of all available fileType subclasses.
+
+    Built-in types are listed without being imported; see getFileType.
+    """
+    global UNLISTED_FILE_TYPES
+    if UNLISTED_FILE_TYPES is None:
         files = os.listdir(os.path.dirname(__file__))
-        for f in ['filetypes.py', '__init__.py', 'FileType.py']:
-            if f in files:
-                files.remove(f)
         typs = [os.path.splitext(f)[0] for f in files if f[-3:] == '.py']
-        for typ in typs:
-            try:
-                getFileType(typ)
-            except Exception:
-                debug.printExc(f"Error loading file type library '{typ}':")
-    return list(KNOWN_FILE_TYPES.keys())
-
-
-# initialize:
-listFileTypes()
+        UNLISTED_FILE_TYPES = [
+            typ for typ in sorted(typs)
+            if typ not in BUILTIN_FILE_TYPES and typ not in ('filetypes', '__init__', 'FileType')
+        ]
+    typs = list(BUILTIN_FILE_TYPES) + UNLISTED_FILE_TYPES
+    return typs + [typ for typ in KNOWN_FILE_TYPES if typ not in typs]
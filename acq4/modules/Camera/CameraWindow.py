@@ -10,6 +10,7 @@ import pyqtgraph.dockarea as dockarea
 from acq4.util import Qt, ptime
 from acq4.util.StatusBar import StatusBar
 from acq4.util.debug import Profiler
+from acq4.util.imaging.frame_display import DisplayImageItem
 from acq4.util.imaging.sequencer import ImageSequencerCtrl
 from pyqtgraph.graphicsItems.ROI import RulerROI
 
@@ -526,7 +527,11 @@ class ROIPlotter(Qt.QWidget):
         for r in self.ROIs:
             if isinstance(r["roi"], pg.graphicsItems.ROI.RulerROI):
                 continue
-            d = r["roi"].getArrayRegion(frame.data(), imageItem, axes=(0, 1))
+            if isinstance(imageItem, DisplayImageItem):
+                # displayed image may be decimated; sample the full-resolution frame
+                d = imageItem.getArrayRegion(r["roi"], frame.data(), axes=(0, 1))
+            else:
+                d = r["roi"].getArrayRegion(frame.data(), imageItem, axes=(0, 1))
             prof.mark("get array rgn")
             if d is None:
                 continue
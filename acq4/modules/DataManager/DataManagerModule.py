@@ -5,7 +5,7 @@ import time
 from acq4.Manager import logMsg
 from acq4.modules.Module import Module
 from acq4.util import Qt
-from acq4.util.DataManager import getDataManager, getHandle, DirHandle
+from acq4.util.DataManager import getDataManager, getHandle, DirHandle, thumbnails
 from acq4.util.StatusBar import StatusBar
 from acq4.util.debug import printExc
 from pyqtgraph import FileDialog
@@ -246,6 +246,9 @@ class DataManager(Module):
         self.selFile = fh
         if fh is not None:
             self.selFile.sigChanged.connect(self.selectedFileAltered)
+            if fh.isDir():
+                ## prepare previews so that pinning or mosaicking images from this folder is fast
+                thumbnails.buildInBackground([fh])
 
     def loadFile(self, fh):
         if fh is None:
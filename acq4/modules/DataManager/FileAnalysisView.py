@@ -88,9 +88,13 @@ class FileAnalysisView(Qt.QWidget):
             
         
         self.dbFile = fileName
-        self.db = database.AnalysisDatabase(self.dbFile, dataModel=self.currentModel)
+        self.db = database.AnalysisDatabase(self.dbFile, dataModel=self.currentModel, wal=self.walMode())
         self.sigDbChanged.emit()
         
+    def walMode(self):
+        """Return the journal mode option for analysis databases from the module config (see SqliteDatabase)."""
+        return (self.mod.config or {}).get('analysisDbWal', None)
+
     def dbComboChanged(self):
         fn = self.ui.databaseCombo.currentText()
         if fn == '':
@@ -121,7 +125,8 @@ class FileAnalysisView(Qt.QWidget):
             return
             
         self.dbFile = fileName
-        self.db = database.AnalysisDatabase(self.dbFile, dataModel=self.currentModel, baseDir=self.man.getBaseDir())
+        self.db = database.AnalysisDatabase(self.dbFile, dataModel=self.currentModel, baseDir=self.man.getBaseDir(),
+                                            wal=self.walMode())
         self.ui.databaseCombo.blockSignals(True)
         try:
             self.ui.databaseCombo.addItem(fileName)
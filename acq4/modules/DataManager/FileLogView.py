@@ -21,7 +21,7 @@ class FileLogView(LogWidget):
         until a log.txt file is found, and passes that file on to be displayed. If no log.txt file is found, then nothing is displayed."""
         ## make sure a file is actually selected
         if dh is None:
-            self.clear()
+            self.unloadFile()
             self.currentLogDir = None
             self.dirFilter = False
             return
@@ -53,10 +53,10 @@ class FileLogView(LogWidget):
                 self.ui.dirLabel.setText("Currently displaying " + self.currentLogDir.name(relativeTo=self.manager.baseDir)+'/log.txt')    
             except:
                 debug.printExc("Error loading log file:")
-                self.clear()
+                self.unloadFile()
                 self.ui.dirLabel.setText("")
         else:
-            self.clear()
+            self.unloadFile()
             self.ui.dirLabel.setText("")
         
     def orderLogEntries(self):
@@ -154,6 +154,7 @@ class Manager(Module):
             root.addChild(item)
 
         # if a module has no defined configurations, then just give it a default entry without configuration.
+        modules.importBuiltinClasses()
         for name, cls in modules.getModuleClasses().items():
             if cls is Manager or cls in confMods:
                 continue
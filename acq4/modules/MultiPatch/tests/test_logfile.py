@@ -1,6 +1,11 @@
+import json
+import os
+import tempfile
+
 import numpy as np
 
-from acq4.util.MultiPatchLog import IrregularTimeSeries
+from acq4.filetypes.MultiPatchLog import IrregularTimeSeries, MultiPatchLogData
+from acq4.util.DataManager import getDirHandle
 
 
 def test_timeseries_index():
@@ -65,6 +70,56 @@ def test_timeseries_index():
                 ts = IrregularTimeSeries(interpolate=interp, resolution=res)
                 for t,v in tsdata:
                     ts[t] = v
-                for t in np.arange(-1, 40, 0.05):
+                times = np.arange(-1, 40, 0.05)
+                for t in times:
                     assert ts[t] == lookup(t, ts)
-    
\ No newline at end of file
+
+                # vectorized lookup must agree with item lookup
+                vals = ts.values_at(times)
+                for t, v in zip(times, vals):
+                    expected = ts[t]
+                    if expected is None:
+                        assert v is None or np.all(np.isnan(v))
+                    else:
+                        assert np.allclose(v, expected) if not isinstance(expected, str) else v == expected
+
+
+def _write_events(fh, events):
+    for ev in events:
+        fh.write(json.dumps(ev).encode("utf8") + b",\n")
+
+
+def test_lazy_log_index():
+    events = [
+        {'device': 'pip1', 'event_time': 10.0, 'event': 'state_change', 'state': 'bath', 'old_state': 'out'},
+        {'device': 'pip1', 'event_time': 11.0, 'event': 'move_start', 'position': [1, 2, 3]},
+        {'device': 'pip2', 'event_time': 11.5, 'event': 'pressure_changed', 'source': 'regulator', 'pressure': -1.5},
+        # keys out of the usual order; must still be indexed
+        {'event': 'move_stop', 'position': [4, 5, 6], 'device': 'pip1', 'event_time': 12.0},
+    ]
+    tmp = tempfile.mkdtemp()
+    fn = os.path.join(tmp, 'MultiPatch_000.log')
+    with open(fn, 'wb') as fh:
+        _write_events(fh, events)
+
+    lazy = MultiPatchLogData(fn)
+    eager = MultiPatchLogData(fn, lazy=False)
+    assert os.path.isfile(os.path.join(tmp, '.MultiPatch_000.log.index.npz'))
+    assert getDirHandle(tmp).ls() == ['MultiPatch_000.log']  # index cache is hidden
+    assert sorted(lazy.devices()) == ['pip1', 'pip2']
+    assert (lazy.firstTime(), lazy.lastTime()) == (10.0, 12.0)
+    for log in (lazy, eager):
+        assert np.all(log['pip1']['position'] == [[11, 1, 2, 3], [12, 4, 5, 6]])
+        assert log['pip1']['state'] == [(10.0, 'bath', '')]
+        assert log['pip2']['pressure']['pressure'][0] == -1.5
+        assert log['pip1']['position_ITS'][11.5] == (2.5, 3.5, 4.5)
+
+    # appended events are picked up incrementally from the cached index
+    with open(fn, 'ab') as fh:
+        _write_events(fh, [{'device': 'pip2', 'event_time': 13.0, 'event': 'target_changed',
+                            'target_position': [7, 8, 9]}])
+    log = MultiPatchLogData(fn)
+    assert log.lastTime() == 13.0
+    assert np.all(log['pip2']['target'] == [[13, 7, 8, 9]])
+    assert len(log['pip1']['event']) == 3
+
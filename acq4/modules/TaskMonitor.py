@@ -1,4 +1,5 @@
 from __future__ import print_function
+import pyqtgraph as pg
 from acq4.modules.Module import Module
 from acq4.util import Qt
 from pyqtgraph import DataTreeWidget
@@ -7,27 +8,37 @@ class TaskMonitor(Module):
     """Simple module that displays information about tasks submitted to the manager
     and the results they generate.
 
-    Useful for debugging issues in task generation and execution.
+    Useful for debugging issues in task generation and execution. The Timing tab shows how
+    long recent tasks spent in each stage (reserve, configure/start/stop/getResult/store per
+    device, wait, ...), which helps to find the source of dead time between task runs.
     """
     moduleDisplayName = "Task Monitor"
     moduleCategory = "Utilities"
 
     def __init__(self, manager, name, config):
-        Module.__init__(self, manager, name, config) 
+        Module.__init__(self, manager, name, config)
         self.man = manager
         self.win = Qt.QMainWindow()
+        self.tabs = Qt.QTabWidget()
+        self.win.setCentralWidget(self.tabs)
+
         self.cw = Qt.QSplitter()
         self.taskTree = DataTreeWidget()
         self.resultTree = DataTreeWidget()
-        self.win.setCentralWidget(self.cw)
         self.cw.addWidget(self.taskTree)
         self.cw.addWidget(self.resultTree)
+        self.tabs.addTab(self.cw, 'Tasks')
+
+        self.timingWidget = TaskTimingWidget(self.man.taskTiming)
+        self.tabs.addTab(self.timingWidget, 'Timing')
+
         self.win.show()
         self.win.setWindowTitle('Task Monitor')
         self.man.sigTaskCreated.connect(self.showTask)
+        self.man.sigTaskTiming.connect(self.timingWidget.timingUpdated)
         self.taskTimer = Qt.QTimer()
         self.taskTimer.timeout.connect(self.checkResult)
-        
+
     def showTask(self, cmd, task):
         self._lastTask = task
         self.taskTree.setData(cmd)
@@ -43,6 +54,99 @@ class TaskMonitor(Module):
         except Exception:
             self.resultTree.setData("Task failed.")
             self.taskTimer.stop()
-    
 
+    def quit(self):
+        self.man.sigTaskTiming.disconnect(self.timingWidget.timingUpdated)
+        Module.quit(self)
+
+
+class TaskTimingWidget(Qt.QWidget):
+    """Displays summary statistics and histograms from a TaskTimingStats history."""
+
+    def __init__(self, stats):
+        Qt.QWidget.__init__(self)
+        self.stats = stats
+        self._selected = None  # (stage, device) whose histogram is displayed
+
+        self.layout = Qt.QGridLayout()
+        self.setLayout(self.layout)
+        self.splitter = Qt.QSplitter(Qt.Qt.Vertical)
+        self.layout.addWidget(self.splitter, 0, 0, 1, 4)
+        self.table = pg.TableWidget(sortable=False)
+        self.table.setSelectionBehavior(Qt.QAbstractItemView.SelectRows)
+        self.splitter.addWidget(self.table)
+        self.plot = pg.PlotWidget(labels={'bottom': ('duration', 's'), 'left': 'tasks'})
+        self.splitter.addWidget(self.plot)
+
+        self.countLabel = Qt.QLabel()
+        self.layout.addWidget(self.countLabel, 1, 0)
+        self.clearBtn = Qt.QPushButton('Clear')
+        self.layout.addWidget(self.clearBtn, 1, 2)
+        self.exportBtn = Qt.QPushButton('Export...')
+        self.layout.addWidget(self.exportBtn, 1, 3)
+
+        # tasks may finish very rapidly; redraw at most a few times per second
+        self.updateTimer = Qt.QTimer()
+        self.updateTimer.setSingleShot(True)
+        self.updateTimer.timeout.connect(self.updateDisplay)
+
+        self.table.itemSelectionChanged.connect(self.selectionChanged)
+        self.clearBtn.clicked.connect(self.clearClicked)
+        self.exportBtn.clicked.connect(self.exportClicked)
+        self.updateDisplay()
+
+    def timingUpdated(self, timing):
+        if not self.updateTimer.isActive():
+            self.updateTimer.start(300)
+
+    def updateDisplay(self):
+        rows = self.stats.summary()
+        self._rows = [(r['stage'], r['device']) for r in rows]
+        data = [
+            {
+                'stage': r['stage'],
+                'device': r['device'] or '',
+                'count': r['count'],
+                'mean (ms)': r['mean'] * 1000,
+                'median (ms)': r['median'] * 1000,
+                '95% (ms)': r['p95'] * 1000,
+                'max (ms)': r['max'] * 1000,
+            }
+            for r in rows
+        ]
+        self.table.blockSignals(True)
+        try:
+            self.table.setData(data)
+            if self._selected in self._rows:
+                self.table.selectRow(self._rows.index(self._selected))
+        finally:
+            self.table.blockSignals(False)
+        self.countLabel.setText(f"{len(self.stats)} tasks recorded")
+        self.updatePlot()
+
+    def selectionChanged(self):
+        rows = self.table.selectionModel().selectedRows()
+        if len(rows) > 0:
+            self._selected = self._rows[rows[0].row()]
+        self.updatePlot()
+
+    def updatePlot(self):
+        self.plot.clear()
+        if self._selected is None:
+            return
+        stage, device = self._selected
+        counts, edges = self.stats.histogram(stage, device)
+        if len(counts) == 0:
+            return
+        self.plot.plot(edges, counts, stepMode='center', fillLevel=0, brush=(100, 100, 255, 150))
+        self.plot.setTitle(stage if device is None else f"{stage}: {device}")
+
+    def clearClicked(self):
+        self.stats.clear()
+        self.updateDisplay()
 
+    def exportClicked(self):
+        fileName, _ = Qt.QFileDialog.getSaveFileName(
+            self, 'Export task timing', '', 'CSV files (*.csv);;JSON files (*.json)')
+        if fileName:
+            self.stats.export(fileName)
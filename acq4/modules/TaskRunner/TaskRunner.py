@@ -2,8 +2,10 @@ from collections import OrderedDict
 from functools import reduce
 
 import gc
+import itertools
 import numpy as np
 import os
+import queue
 import six
 import sys
 import time
@@ -82,6 +84,11 @@ class TaskRunner(Module):
         # Since most modern systems have adequate memory, this is now disabled by default.
         self._reduceMemoryUsage = config.get('reduceMemoryUsage', False)
 
+        # In pipelined mode, each task in a sequence is created while the previous one is still running, and
+        # data storage / result handling runs in a background thread so that sweeps can follow each other
+        # with no setup delay beyond the cycle time.
+        self._pipelineSequences = config.get('pipelineSequences', False)
+
         self.lastProtoTime = None
         self.loopEnabled = False
         self.devListItems = {}
@@ -132,6 +139,7 @@ class TaskRunner(Module):
             item.setCheckState(Qt.Qt.Unchecked)
 
         self.taskThread = TaskThread(self)
+        self.taskThread.pipelined = self._pipelineSequences
 
         self.newTask()
 
@@ -637,6 +645,7 @@ class TaskRunner(Module):
             for d in self.currentTask.devices:
                 if self.currentTask.deviceEnabled(d):
                     self.docks[d].widget().prepareTaskStart()
+                    self.docks[d].widget().prepareSequenceStart()
 
             # print params, linkedParams
             ## Generate the complete array of command structures. This can take a long time, so we start a progress dialog.
@@ -963,6 +972,9 @@ class TaskThread(Thread):
         self._currentTask = None
         self._currentFuture = None
         self._systrace = None
+        self.pipelined = False  # see TaskRunner.__init__
+        self._nextTask = None  # (params, cmd, task) prepared ahead of time in pipelined mode
+        self._writer = None  # ResultWriter used in pipelined mode
 
     def startTask(self, task, paramSpace=None):
         with self.lock:
@@ -1004,6 +1016,8 @@ class TaskThread(Thread):
                 except Exception as e:
                     if e.args[0] != 'stop':
                         raise
+            elif self.pipelined:
+                self.runPipelined()
             else:
                 runSequence(self.runOnce, self.paramSpace, list(self.paramSpace.keys()))
 
@@ -1018,7 +1032,72 @@ class TaskThread(Thread):
             self._currentFuture._taskDone()
             self._currentFuture = None
 
-    def runOnce(self, params=None):
+    def runPipelined(self):
+        """Run the sequence with each task prepared while the previous one runs, and results
+        stored / handled by a background ResultWriter.
+        """
+        keys = list(self.paramSpace.keys())
+        points = [dict(zip(keys, inds)) for inds in itertools.product(*[self.paramSpace[k] for k in keys])]
+        self._writer = ResultWriter(self)
+        self._writer.start()
+        try:
+            for i, params in enumerate(points):
+                nextParams = points[i + 1] if i + 1 < len(points) else None
+                try:
+                    self.runOnce(params, nextParams)
+                except Exception as e:
+                    if len(e.args) > 0 and e.args[0] == 'stop':
+                        break
+                    raise
+                with self.lock:
+                    if self.abortThread:
+                        break
+        finally:
+            self._nextTask = None
+            # wait for all results to be stored before the sequence is reported as finished
+            self._writer.finish()
+            self._writer = None
+
+    def selectCommand(self, params):
+        """Return the command structure for the sequence point given by *params*."""
+        cmd = self.task
+        for p in params:
+            cmd = cmd[p: params[p]]
+
+        if type(cmd) is not dict:
+            print("========= TaskRunner.runOnce cmd: ==================")
+            print(cmd)
+            print("========= TaskRunner.runOnce params: ==================")
+            print("Params:", params)
+            print("===========================")
+            raise TypeError(
+                "TaskRunner.runOnce failed to generate a proper command structure. Object type was '%s', should have been 'dict'." % type(
+                    cmd))
+        return cmd
+
+    def createTask(self, cmd):
+        if self._writer is not None and cmd['protocol'].get('storeData', False):
+            # the ResultWriter stores data after the task has released its devices
+            cmd = cmd.copy()
+            cmd['protocol'] = dict(cmd['protocol'], deferStorage=True)
+        return self.dm.createTask(cmd)
+
+    def prepareNextTask(self, params):
+        """Create the task for the next sequence point while the current one is running."""
+        try:
+            cmd = self.selectCommand(params)
+            task = self.createTask(cmd)
+        except Exception:
+            # leave it to runOnce to raise the error when this point is reached
+            cmd = task = None
+        self._nextTask = (params, cmd, task)
+
+    def runOnce(self, params=None, nextParams=None):
+        """Run the task for one sequence point.
+
+        If *nextParams* is given (pipelined mode), the task for that point is created while this
+        one is running.
+        """
         # good time to collect garbage
         if self.ui._reduceMemoryUsage:
             gc.collect()
@@ -1028,10 +1107,12 @@ class TaskThread(Thread):
             params = {}
 
         ## Select correct command to execute
-        cmd = self.task
-        if params is not None:
-            for p in params:
-                cmd = cmd[p: params[p]]
+        task = None
+        if self._nextTask is not None and self._nextTask[0] == params and self._nextTask[2] is not None:
+            _, cmd, task = self._nextTask
+        else:
+            cmd = self.selectCommand(params)
+        self._nextTask = None
         prof.mark('select command')
 
         ## Wait before starting if we've already run too recently
@@ -1058,17 +1139,8 @@ class TaskThread(Thread):
 
         prof.mark('pause')
 
-        if type(cmd) is not dict:
-            print("========= TaskRunner.runOnce cmd: ==================")
-            print(cmd)
-            print("========= TaskRunner.runOnce params: ==================")
-            print("Params:", params)
-            print("===========================")
-            raise TypeError(
-                "TaskRunner.runOnce failed to generate a proper command structure. Object type was '%s', should have been 'dict'." % type(
-                    cmd))
-
-        task = self.dm.createTask(cmd)
+        if task is None:
+            task = self.createTask(cmd)
         prof.mark('create task')
 
         self.lastRunTime = ptime.time()
@@ -1107,6 +1179,9 @@ class TaskThread(Thread):
                         # NO -- task.stop() is not thread-safe.
                         task.stop(abort=True)
                         return
+                if nextParams is not None and self._nextTask is None:
+                    self.prepareNextTask(nextParams)
+                    continue
                 # adjust sleep time based on estimated time remaining in the task.
                 sleep = np.clip((endTime - time.time()) * 0.5, 1e-3, 20e-3)
                 time.sleep(sleep)
@@ -1126,8 +1201,10 @@ class TaskThread(Thread):
         prof.mark('getResult')
 
         frame = {'params': params, 'cmd': cmd, 'result': result}
-        self._currentFuture.newFrame(frame)
-        self.sigNewFrame.emit(frame)
+        if self._writer is not None:
+            self._writer.put(task, frame)
+        else:
+            self.handleResult(task, frame)
         prof.mark('emit newFrame')
         if self.stopThread:
             raise Exception('stop', result)
@@ -1137,6 +1214,13 @@ class TaskThread(Thread):
         prof.mark('yield')
         prof.finish()
 
+    def handleResult(self, task, frame):
+        """Store data if the task deferred it, then hand the result to the future and to the UI."""
+        if task.cfg.get('storeData', False) and task.cfg.get('deferStorage', False):
+            task.storeResult()
+        self._currentFuture.newFrame(frame)
+        self.sigNewFrame.emit(frame)
+
     def checkStop(self):
         with self.lock:
             if self.stopThread:
@@ -1159,6 +1243,39 @@ class TaskThread(Thread):
                 self.abortThread = True
 
 
+class ResultWriter(Thread):
+    """Background thread that stores and emits task results in order while the TaskThread
+    goes on to run the next task of a pipelined sequence.
+
+    At most *maxQueued* results wait to be handled; if storage falls further behind, put() blocks
+    so that acquisition waits for the disk rather than piling results up in memory.
+    """
+
+    def __init__(self, taskThread, maxQueued=4):
+        Thread.__init__(self)
+        self.taskThread = taskThread
+        self.queue = queue.Queue(maxsize=maxQueued)
+
+    def put(self, task, frame):
+        self.queue.put((task, frame))
+
+    def finish(self):
+        """Wait for all queued results to be handled, then stop the thread."""
+        self.queue.put(None)
+        self.wait()
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            task, frame = item
+            try:
+                self.taskThread.handleResult(task, frame)
+            except Exception:
+                printExc("Error handling task result:")
+
+
 class TaskFuture(Future):
     """Used to check on progress for a running task or task sequence.
 
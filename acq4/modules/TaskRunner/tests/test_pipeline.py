@@ -0,0 +1,155 @@
+import time
+
+import pyqtgraph as pg
+import acq4.util.DataManager as dm
+from acq4.Manager import DeviceLocker, Task
+from acq4.devices.Device import Device, DeviceTask
+from acq4.modules.TaskRunner.TaskRunner import ResultWriter, TaskThread
+
+app = pg.mkQApp()
+
+
+class MockManager:
+    """The parts of the Manager used by Manager.Task and TaskThread."""
+    def __init__(self):
+        self.devices = {}
+        self.timings = []
+        self.started = []  # sequence points in the order their tasks started
+        self.stored = []  # sequence points in the order their results were stored
+        self.failStore = set()  # points whose storage raises an exception
+        self.storeDelay = 0
+        self.onStart = None
+
+    def declareInterface(self, name, types, obj):
+        self.devices[name] = obj
+
+    def getDevice(self, name):
+        return self.devices[name]
+
+    def reserveDevices(self, devices):
+        return DeviceLocker(self, [self.getDevice(d) for d in devices])
+
+    def createTask(self, cmd):
+        return Task(self, cmd)
+
+    def taskTimingFinished(self, timing):
+        self.timings.append(timing)
+
+
+class MockTask(DeviceTask):
+    def __init__(self, dev, cmd, parentTask):
+        DeviceTask.__init__(self, dev, cmd, parentTask)
+        self.point = cmd['point']
+
+    def start(self):
+        self.dev.dm.started.append(self.point)
+        if self.dev.dm.onStart is not None:
+            self.dev.dm.onStart(self.point)
+
+    def getResult(self):
+        return self.point
+
+    def storeResult(self, dirHandle):
+        time.sleep(self.dev.dm.storeDelay)
+        if self.point in self.dev.dm.failStore:
+            raise ValueError(f"could not store point {self.point}")
+        self.dev.dm.stored.append(self.point)
+
+
+class MockDevice(Device):
+    def createTask(self, cmd, task):
+        return MockTask(self, cmd, task)
+
+
+class MockUI:
+    def __init__(self, manager):
+        self.manager = manager
+        self._reduceMemoryUsage = False
+
+
+class SequenceCommand:
+    """A one-parameter task sequence, indexed the way TaskThread selects commands."""
+    def __init__(self, storageDir):
+        self.storageDir = storageDir
+
+    def __getitem__(self, sl):
+        protocol = {'duration': 0, 'cycleTime': 0, 'storeData': True, 'storageDir': self.storageDir}
+        return {'protocol': protocol, 'Dev': {'point': sl.stop}}
+
+
+class RecordingTaskThread(TaskThread):
+    def __init__(self, ui):
+        TaskThread.__init__(self, ui)
+        self.handled = []
+
+    def handleResult(self, task, frame):
+        TaskThread.handleResult(self, task, frame)
+        self.handled.append(frame['params']['point'])
+
+
+def runSequence(man, tmp_path, nPoints):
+    MockDevice(man, {}, 'Dev')
+    thread = RecordingTaskThread(MockUI(man))
+    thread.pipelined = True
+    thread.startTask(SequenceCommand(dm.getDirHandle(str(tmp_path))), {'point': list(range(nPoints))})
+    assert thread.wait(20000)
+    return thread
+
+
+def test_pipelined_order_and_errors(tmp_path):
+    man = MockManager()
+    man.failStore = {3}
+    thread = runSequence(man, tmp_path, 8)
+
+    assert man.started == list(range(8))
+    # results are handled in order; a failure to store one does not stop the others
+    assert man.stored == [0, 1, 2, 4, 5, 6, 7]
+    assert thread.handled == [0, 1, 2, 4, 5, 6, 7]
+
+    # storage done by the writer is part of each task's timing record, which is reported once stored
+    assert len(man.timings) == 8
+    for timing in man.timings:
+        assert timing.finished
+        stages = [(s, d) for s, d, _ in timing.stages]
+        assert stages[stages.index(('release', None)) + 1] == ('storeWait', None)
+        if timing.error is None:
+            assert stages[-1] == ('store', 'Dev')
+    assert [t.error for t in man.timings if t.error is not None] == ["ValueError: could not store point 3"]
+
+
+def test_pipelined_backpressure(tmp_path):
+    man = MockManager()
+    man.storeDelay = 0.05
+    pending = []
+
+    def onStart(point):
+        pending.append(point - len(man.stored))
+
+    man.onStart = onStart
+    runSequence(man, tmp_path, 12)
+    assert man.stored == list(range(12))
+    # acquisition waits for storage once the writer's queue is full
+    maxQueued = ResultWriter(None).queue.maxsize
+    assert maxQueued > 0
+    assert max(pending) <= maxQueued + 1
+
+
+def test_pipelined_abort(tmp_path):
+    man = MockManager()
+    thread = None
+
+    def onStart(point):
+        if point == 2:
+            thread.abort()
+
+    man.onStart = onStart
+    MockDevice(man, {}, 'Dev')
+    thread = RecordingTaskThread(MockUI(man))
+    thread.pipelined = True
+    thread.startTask(SequenceCommand(dm.getDirHandle(str(tmp_path))), {'point': list(range(8))})
+    assert thread.wait(20000)
+
+    # no tasks are started after the abort, and results already acquired are still stored
+    assert man.started == [0, 1, 2]
+    assert man.stored == thread.handled
+    assert man.stored[:2] == [0, 1]
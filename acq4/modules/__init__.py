@@ -1,14 +1,35 @@
 from __future__ import print_function
 from collections import OrderedDict
 from importlib import import_module
-import os
 from ..util.debug import printExc
 from . import Module
 
+# Built-in module classes and the modules that define them. These are imported when first requested, rather
+# than all at startup.
+BUILTIN_MODULE_CLASSES = {
+    'AutomationDebug': 'acq4.modules.AutomationDebug',
+    'CCFViewer': 'acq4.modules.CCFViewer',
+    'Camera': 'acq4.modules.Camera.Camera',
+    'Console': 'acq4.modules.Console.Console',
+    'DataManager': 'acq4.modules.DataManager.DataManagerModule',
+    'Imager': 'acq4.modules.Imager.Imager',
+    'Manager': 'acq4.modules.Manager.Manager',
+    'MosaicEditorModule': 'acq4.modules.MosaicEditor.MosaicEditor',
+    'MultiPatch': 'acq4.modules.MultiPatch.multipatch',
+    'NoiseMonitor': 'acq4.modules.NoiseMonitor',
+    'Patch': 'acq4.modules.Patch.Patch',
+    'SolutionEditor': 'acq4.modules.SolutionEditor',
+    'TaskMonitor': 'acq4.modules.TaskMonitor',
+    'TaskRunner': 'acq4.modules.TaskRunner.TaskRunner',
+}
+
 
 def getModuleClass(name):
     """Return a registered module class given its name.
     """
+    if name in BUILTIN_MODULE_CLASSES:
+        return getattr(import_module(BUILTIN_MODULE_CLASSES[name]), name)
+
     modClasses = getModuleClasses()
     
     try:
@@ -38,24 +59,17 @@ def getModuleClasses():
 
 _builtin_imported = False
 def importBuiltinClasses():
-    """Import all builtin module classes under acq4/modules.
+    """Import all builtin module classes under acq4/modules (see BUILTIN_MODULE_CLASSES).
+
+    This is only needed to list every available module class; getModuleClass imports classes as needed.
     """
     global _builtin_imported
     if _builtin_imported:
         return
     _builtin_imported = True
 
-    path = os.path.dirname(__file__)
-    for f in os.listdir(path):
-        ff = os.path.join(path, f)
-        if not (os.path.isdir(ff) or ff.endswith('.py')):
-            continue
-        # skip a few known files
-        if f in ['__init__.py', 'Module.py', '__pycache__']:
-            continue
-        if f[-3:] == '.py':
-            f = f[:-3]
+    for modName in BUILTIN_MODULE_CLASSES.values():
         try:
-            mod = import_module('acq4.modules.' + f)
+            import_module(modName)
         except Exception:
-            printExc('Error importing builtin module from %s' % ff)
+            printExc('Error importing builtin module from %s' % modName)
@@ -22,6 +22,7 @@ class ImageCanvasItem(CanvasItem):
 
     """
     _typeName = "Image"
+    _filterable = True  # whether to offer the flowchart image filter controls
     
     def __init__(self, image=None, **opts):
 
@@ -44,36 +45,7 @@ class ImageCanvasItem(CanvasItem):
             if 'name' not in opts:
                 opts['name'] = self.handle.shortName()
 
-            try:
-                if 'transform' in self.handle.info():
-                    tr = pg.SRTTransform3D(self.handle.info()['transform'])
-                    tr = pg.SRTTransform(tr)  ## convert to 2D
-                    opts['pos'] = tr.getTranslation()
-                    opts['scale'] = tr.getScale()
-                    opts['angle'] = tr.getRotation()
-                else:  ## check for older info formats
-                    if 'imagePosition' in self.handle.info():
-                        opts['scale'] = self.handle.info()['pixelSize']
-                        opts['pos'] = self.handle.info()['imagePosition']
-                    elif 'Downsample' in self.handle.info():
-                        ### Needed to support an older format stored by 2p imager
-                        if 'pixelSize' in self.handle.info():
-                            opts['scale'] = self.handle.info()['pixelSize']
-                        if 'microscope' in self.handle.info():
-                            m = self.handle.info()['microscope']
-                            opts['pos'] = m['position'][0:2]
-                        else:
-                            info = self.data._info[-1]
-                            opts['pos'] = info.get('imagePosition', None)
-                    elif hasattr(self.data, '_info'):
-                        info = self.data._info[-1]
-                        opts['scale'] = info.get('pixelSize', None)
-                        opts['pos'] = info.get('imagePosition', None)
-                    else:
-                        opts['defaultUserTransform'] = {'scale': (1e-5, 1e-5)}
-                        opts['scalable'] = True
-            except:
-                debug.printExc('Error reading transformation for image file %s:' % image.name())
+            opts.update(self.transformOptsFromFile(self.handle, self.data))
 
         if item is None:
             item = pg.ImageItem()
@@ -83,15 +55,17 @@ class ImageCanvasItem(CanvasItem):
         self.splitter.setOrientation(Qt.Qt.Vertical)
         self.layout.addWidget(self.splitter, self.layout.rowCount(), 0, 1, 2)
         
-        self.filterGroup = pg.GroupBox("Image Filter")
-        fgl = Qt.QGridLayout()
-        fgl.setContentsMargins(3, 3, 3, 3)
-        fgl.setSpacing(1)
-        self.filterGroup.setLayout(fgl)
-        self.filter = ImageFilterWidget()
-        self.filter.sigStateChanged.connect(self.filterStateChanged)
-        fgl.addWidget(self.filter)
-        self.splitter.addWidget(self.filterGroup)
+        self.filter = None
+        if self._filterable:
+            self.filterGroup = pg.GroupBox("Image Filter")
+            fgl = Qt.QGridLayout()
+            fgl.setContentsMargins(3, 3, 3, 3)
+            fgl.setSpacing(1)
+            self.filterGroup.setLayout(fgl)
+            self.filter = ImageFilterWidget()
+            self.filter.sigStateChanged.connect(self.filterStateChanged)
+            fgl.addWidget(self.filter)
+            self.splitter.addWidget(self.filterGroup)
 
         self.histogram = pg.HistogramLUTWidget()
         self.histogram.setImageItem(self.graphicsItem())
@@ -130,6 +104,43 @@ class ImageCanvasItem(CanvasItem):
             # Why doesn't this work?
             #self.selectBoxFromUser() ## move select box to match new bounds
             
+    @staticmethod
+    def transformOptsFromFile(handle, data=None):
+        """Return the position, scale and angle options for displaying an image file, read from its meta-info.
+        """
+        opts = {}
+        try:
+            if 'transform' in handle.info():
+                tr = pg.SRTTransform3D(handle.info()['transform'])
+                tr = pg.SRTTransform(tr)  ## convert to 2D
+                opts['pos'] = tr.getTranslation()
+                opts['scale'] = tr.getScale()
+                opts['angle'] = tr.getRotation()
+            else:  ## check for older info formats
+                if 'imagePosition' in handle.info():
+                    opts['scale'] = handle.info()['pixelSize']
+                    opts['pos'] = handle.info()['imagePosition']
+                elif 'Downsample' in handle.info():
+                    ### Needed to support an older format stored by 2p imager
+                    if 'pixelSize' in handle.info():
+                        opts['scale'] = handle.info()['pixelSize']
+                    if 'microscope' in handle.info():
+                        m = handle.info()['microscope']
+                        opts['pos'] = m['position'][0:2]
+                    else:
+                        info = data._info[-1]
+                        opts['pos'] = info.get('imagePosition', None)
+                elif hasattr(data, '_info'):
+                    info = data._info[-1]
+                    opts['scale'] = info.get('pixelSize', None)
+                    opts['pos'] = info.get('imagePosition', None)
+                else:
+                    opts['defaultUserTransform'] = {'scale': (1e-5, 1e-5)}
+                    opts['scalable'] = True
+        except:
+            debug.printExc('Error reading transformation for image file %s:' % handle.name())
+        return opts
+
     @classmethod
     def checkFile(cls, fh):
         if not fh.isFile():
@@ -182,13 +193,19 @@ class ImageCanvasItem(CanvasItem):
     def saveState(self, **kwds):
         state = CanvasItem.saveState(self, **kwds)
         state['imagestate'] = self.histogram.saveState()
-        state['filter'] = self.filter.saveState()
+        if self.filter is not None:
+            state['filter'] = self.filter.saveState()
         state['composition'] = self.imgModeCombo.currentText()
         return state
     
     def restoreState(self, state):
         CanvasItem.restoreState(self, state)
-        self.filter.restoreState(state['filter'])
+        if 'filter' in state:
+            if self.filter is not None:
+                self.filter.restoreState(state['filter'])
+            else:
+                debug.logMsg("Image filter saved for %r was not restored; %s items have no filter." % (
+                    state.get('name'), self._typeName), msgType='warning')
         self.imgModeCombo.setCurrentIndex(self.imgModeCombo.findText(state['composition']))
         self.histogram.restoreState(state['imagestate'])
 
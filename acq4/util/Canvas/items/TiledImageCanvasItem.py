@@ -0,0 +1,348 @@
+"""
+Image items that load only the resolution needed for the current view, for displaying large mosaics.
+
+Each TiledImageCanvasItem shows one image file. Its downsampled levels come from the thumbnail cache of the
+file's directory (see acq4.util.DataManager.thumbnails); the full resolution image is read only when the view
+is zoomed in far enough to need it. All reading is done by a single background TileLoader, which keeps recently
+used levels in an LRU cache with a fixed memory budget. Items that are scrolled out of view drop back to their
+smallest level, so memory use follows what is on screen rather than the number of files loaded.
+"""
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+import pyqtgraph as pg
+from acq4.util import Qt
+from acq4.util.debug import printExc
+from acq4.util.Mutex import Mutex
+from .ImageCanvasItem import ImageCanvasItem
+from .itemtypes import registerItemType
+
+_loader = None
+
+
+def chooseLevel(scales, pixelSize):
+    """Return the index of the coarsest level that still shows at least one image pixel per screen pixel.
+
+    *scales* is the downsampling factor of each level (increasing) and *pixelSize* the number of full-resolution
+    image pixels covered by one screen pixel.
+    """
+    for i in reversed(range(len(scales))):
+        if scales[i] <= pixelSize:
+            return i
+    return 0
+
+
+class TileCache:
+    """LRU cache of image arrays holding at most *maxBytes* in total."""
+
+    def __init__(self, maxBytes):
+        self.maxBytes = maxBytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = Mutex()
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def set(self, key, data):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self._entries[key] = data
+            self.nbytes += data.nbytes
+            while self.nbytes > self.maxBytes and len(self._entries) > 1:
+                _, old = self._entries.popitem(last=False)
+                self.nbytes -= old.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+class TileLoader(threading.Thread):
+    """Background thread that loads image levels for TiledImageCanvasItems.
+
+    Each item has at most one pending request, and the most recent requests are served first so that the tiles
+    in the current view load before those the user has already scrolled past. Loaded levels are delivered
+    through the item's sigLevelLoaded signal.
+    """
+
+    def __init__(self, maxBytes=1e9):
+        threading.Thread.__init__(self, name="TileLoader", daemon=True)
+        self.cache = TileCache(maxBytes)
+        self._requests = OrderedDict()
+        self._cond = threading.Condition()
+
+    def request(self, item, key):
+        """Request level *key* of *item*: 'thumbnail' for its Thumbnail, 'full' for the full resolution image or
+        the index of a thumbnail level.
+
+        If the level is already cached, it is returned immediately. Otherwise, return None and load it in the
+        background.
+        """
+        if key != 'thumbnail':
+            data = self.cache.get((item.handle.name(), key))
+            if data is not None:
+                self.cancel(item)
+                return data
+        with self._cond:
+            self._requests.pop(id(item), None)
+            self._requests[id(item)] = (weakref.ref(item), key)
+            self._cond.notify()
+        return None
+
+    def cancel(self, item):
+        with self._cond:
+            self._requests.pop(id(item), None)
+
+    def run(self):
+        while True:
+            with self._cond:
+                while len(self._requests) == 0:
+                    self._cond.wait()
+                _, (ref, key) = self._requests.popitem(last=True)
+            item = ref()
+            if item is None:
+                continue
+            try:
+                data = self.load(item.handle, item.thumbnail, key)
+                if key != 'thumbnail':
+                    self.cache.set((item.handle.name(), key), data)
+                item.sigLevelLoaded.emit(key, data)
+            except Exception:
+                printExc("Error loading %s of %s:" % (key, item.handle.name()))
+
+    @staticmethod
+    def load(fh, thumbnail, key):
+        if key == 'thumbnail':
+            cache = fh.parent().thumbnailCache()
+            thumb = cache.get(fh)
+            if thumb is None:
+                thumb = cache.build(fh)
+                ## re-read the stored entry so that its levels are loaded only on request
+                thumb = cache.get(fh) or thumb
+            return thumb
+        elif key == 'full':
+            return TileLoader.loadFullResolution(fh, thumbnail)
+        else:
+            return thumbnail.levelData(key, keep=False)
+
+    @staticmethod
+    def loadFullResolution(fh, thumbnail):
+        """Return the full resolution image shown by *thumbnail*, with the same background removal applied."""
+        from acq4.util.imaging import Frame
+
+        if thumbnail.frameIndex is None:
+            frame = Frame.loadFromFileHandle(fh)
+        else:
+            ## read only the representative frame of the stack
+            data = fh.read(select={0: thumbnail.frameIndex})
+            info = fh.info().deepcopy()
+            info.update(thumbnail.frameInfo)
+            frame = Frame(data.asarray(), info)
+            frame.loadLinkedFiles(fh.parent())
+        return frame.displayImage()
+
+
+def tileLoader():
+    """Return the TileLoader shared by all TiledImageCanvasItems."""
+    global _loader
+    if _loader is None:
+        _loader = TileLoader()
+        _loader.start()
+    return _loader
+
+
+class LODImageItem(pg.ImageItem):
+    """ImageItem that displays a downsampled level of an image stretched to the size of the full resolution
+    image, so that its coordinates do not depend on the level shown.
+    """
+
+    sigViewChanged = Qt.Signal(object)
+
+    def __init__(self):
+        pg.ImageItem.__init__(self)
+        self.fullShape = None
+
+    def setFullShape(self, shape):
+        self.prepareGeometryChange()
+        self.fullShape = tuple(shape[:2])
+        self.informViewBoundsChanged()
+        self.update()
+
+    def _fullSize(self):
+        if self.axisOrder == 'col-major':
+            return self.fullShape
+        return self.fullShape[::-1]
+
+    def width(self):
+        if self.fullShape is None:
+            return pg.ImageItem.width(self)
+        return self._fullSize()[0]
+
+    def height(self):
+        if self.fullShape is None:
+            return pg.ImageItem.height(self)
+        return self._fullSize()[1]
+
+    def boundingRect(self):
+        if self.fullShape is None:
+            return pg.ImageItem.boundingRect(self)
+        return Qt.QRectF(0, 0, *self._fullSize())
+
+    def paint(self, p, *args):
+        if self.fullShape is None or self.image is None:
+            return pg.ImageItem.paint(self, p, *args)
+        w, h = self._fullSize()
+        p.save()
+        p.scale(w / pg.ImageItem.width(self), h / pg.ImageItem.height(self))
+        pg.ImageItem.paint(self, p, *args)
+        p.restore()
+
+    def viewTransformChanged(self):
+        pg.ImageItem.viewTransformChanged(self)
+        self.sigViewChanged.emit(self)
+
+    def screenPixelSize(self):
+        """Return the number of full resolution image pixels covered by one screen pixel, or None if this item
+        is not currently in view.
+        """
+        if self.fullShape is None or not self.isVisible():
+            return None
+        ## not viewRect(), which is cached and not updated when the item itself moves
+        view = self.getViewBox()
+        if view is None:
+            return None
+        vr = self.mapRectFromView(view.viewRect())
+        if vr is None or not vr.normalized().intersects(self.boundingRect()):
+            return None
+        pv = self.pixelVectors()
+        if pv[0] is None:
+            return None
+        return min(pv[0].length(), pv[1].length())
+
+
+class TiledImageCanvasItem(ImageCanvasItem):
+    """CanvasItem displaying an image file at the resolution needed for the current view.
+
+    Image stacks are shown by their representative frame (see acq4.util.DataManager.thumbnails), and the
+    filter and time controls of ImageCanvasItem are not available. Options are the same as ImageCanvasItem,
+    except that *handle* is required.
+    """
+    _typeName = "Tiled Image"
+    _filterable = False
+
+    sigLevelLoaded = Qt.Signal(object, object)  # level key, data
+
+    def __init__(self, handle, **opts):
+        self.handle = handle
+        self.thumbnail = None
+        self._levelKeys = []
+        self._scales = []
+        self._currentKey = None
+        self._requestedKey = None
+        self._flipAxes = set()
+
+        opts.update(self.transformOptsFromFile(handle))
+        ImageCanvasItem.__init__(self, LODImageItem(), handle=handle, **opts)
+
+        for widget in self.timeControls:
+            widget.hide()
+
+        self.sigLevelLoaded.connect(self._levelLoaded)
+        self._lodTimer = Qt.QTimer()
+        self._lodTimer.setSingleShot(True)
+        self._lodTimer.timeout.connect(self.updateLevel)
+        self.graphicsItem().sigViewChanged.connect(self._viewChanged)
+
+        thumb = handle.parent().thumbnailCache().get(handle)
+        if thumb is None:
+            tileLoader().request(self, 'thumbnail')
+        else:
+            self._setThumbnail(thumb)
+
+    @classmethod
+    def checkFile(cls, fh):
+        ## only created on request (see MosaicEditor.addFile)
+        return 0
+
+    def _setThumbnail(self, thumb):
+        self.thumbnail = thumb
+        keys = list(range(len(thumb.scales)))
+        scales = list(thumb.scales)
+        if scales[0] > 1:
+            keys.insert(0, 'full')
+            scales.insert(0, 1)
+        self._levelKeys = keys
+        self._scales = scales
+        self.graphicsItem().setFullShape(thumb.shape)
+
+        # Needed to ensure selection box wraps the image properly
+        tr = self.saveTransform()
+        self.resetUserTransform()
+        self.restoreTransform(tr)
+
+        self.updateLevel()
+
+    def _viewChanged(self):
+        self._lodTimer.start(100)
+
+    def updateLevel(self):
+        """Display the level that best matches the current view, loading it if necessary."""
+        if self.thumbnail is None:
+            return
+        pxSize = self.graphicsItem().screenPixelSize()
+        if pxSize is None:
+            key = self._levelKeys[-1]
+        else:
+            key = self._levelKeys[chooseLevel(self._scales, pxSize)]
+        if key == self._currentKey:
+            if self._requestedKey is not None:
+                tileLoader().cancel(self)
+                self._requestedKey = None
+            return
+        if key == self._requestedKey:
+            return
+        self._requestedKey = key
+        data = tileLoader().request(self, key)
+        if data is not None:
+            self._levelLoaded(key, data)
+
+    def _levelLoaded(self, key, data):
+        if key == 'thumbnail':
+            self._setThumbnail(data)
+            return
+        if key != self._requestedKey:
+            return
+        self._requestedKey = None
+        self._currentKey = key
+        self._showLevel(data)
+
+    def _showLevel(self, data):
+        if len(self._flipAxes) > 0:
+            data = np.flip(data, axis=tuple(self._flipAxes))
+        img = self.graphicsItem()
+        autoLevels = img.image is None and self.autoBtn.isChecked()
+        img.setImage(data, autoLevels=autoLevels)
+
+    def updateImage(self):
+        self.updateLevel()
+
+    def flipImage(self, axis):
+        """Mirror the displayed image along *axis* without moving it."""
+        self._flipAxes ^= {axis}
+        img = self.graphicsItem()
+        if img.image is not None:
+            img.setImage(np.flip(img.image, axis=axis), autoLevels=False)
+
+
+registerItemType(TiledImageCanvasItem)
@@ -6,5 +6,6 @@ from . import (
     MultiPatchLogCanvasItem,
     ScanCanvasItem,
     simpleitems,
+    TiledImageCanvasItem,
 )
 from .itemtypes import registerItemType, getItemType, itemTypes
@@ -8,12 +8,12 @@ to easily store and retrieve data files along with metadata. The objects
 probably only need to be created via functions in the Manager class.
 """
 import contextlib
+import heapq
 import os
 import re
 import shutil
 import time
 import weakref
-from collections import OrderedDict
 from typing import Callable
 
 from acq4 import filetypes
@@ -21,12 +21,19 @@ from acq4.util import Qt, advancedTypes as advancedTypes
 from acq4.util.Mutex import Mutex
 from acq4.util.debug import printExc
 from pyqtgraph import SignalProxy, BusyCursor
-from pyqtgraph.configfile import readConfigFile, writeConfigFile, appendConfigFile
+from . import index as dirIndex
+from . import logindex
+from . import thumbnails
+from .index import setDefaultFormat as setIndexFormat, migrateIndex
 
 if not hasattr(Qt.QtCore, 'Signal'):
     Qt.Signal = Qt.pyqtSignal
     Qt.Slot = Qt.pyqtSlot
 
+# Suffix of hidden index caches kept next to individual data files (".<name>.index.npz"; see
+# acq4.filetypes.MultiPatchLog). Like directory indexes, these are not listed by DirHandle.ls().
+INDEX_CACHE_SUFFIX = '.index.npz'
+
 
 def abspath(fileName):
     """Return an absolute path string which is guaranteed to uniquely identify a file."""
@@ -335,6 +342,12 @@ class FileHandle(Qt.QObject):
             parent._childChanged()
 
     def read(self, *args, **kargs):
+        """Read and return the contents of this file.
+
+        Extra arguments are passed to the reader for this file's type. For MetaArray files, use
+        *select* to read only part of the array and *mmap* to return a memory-mapped view; eg.
+        ``fh.read(select={'Channel': 'primary', 'Time': (0, 0.1)})``. See acq4.filetypes.MetaArray.
+        """
         self.checkExists()
         with self.lock:
             typ = self.fileType()
@@ -425,21 +438,31 @@ class FileHandle(Qt.QObject):
 class DirHandle(FileHandle):
     def __init__(self, path, manager, create=False):
         FileHandle.__init__(self, path, manager)
-        self._index = None
+        self._index = None  # index storage backend; see DataManager.index
         self.lsCache = {}  # sortMode: [files...]
         self.cTimeCache = {}
         self._indexFileExists = False
+        self._thumbnails = None  # see thumbnailCache()
 
         if not os.path.isdir(self.path) and create:
             os.mkdir(self.path)
             self.createIndex()
 
         # Let's avoid reading the index unless we really need to.
-        self._indexFileExists = os.path.isfile(self._indexFile())
+        self._indexFileExists = dirIndex.hasIndex(self.path)
 
     def _indexFile(self):
         """Return the name of the index file for this directory. NOT the same as indexFile()"""
-        return os.path.join(self.path, '.index')
+        return self._indexBackend().fileName()
+
+    def _indexBackend(self):
+        """Return the backend that stores this directory's index, opening it if needed."""
+        with self.lock:
+            if self._index is None or self._index.path != self.path or not self._index.exists():
+                if isinstance(self._index, dirIndex.SqliteIndex):
+                    self._index.close()
+                self._index = dirIndex.openIndex(self.path)
+            return self._index
 
     def _logFile(self):
         return os.path.join(self.path, '.log')
@@ -452,7 +475,9 @@ class DirHandle(FileHandle):
     def createIndex(self):
         if self.isManaged():
             raise Exception("Directory is already managed!")
-        self._writeIndex(OrderedDict([('.', {})]))
+        with self.lock:
+            self._indexBackend().create()
+            self._indexFileExists = True
 
     def logMsg(self, msg, tags=None):
         """Write a message into the log for this directory."""
@@ -469,32 +494,43 @@ class DirHandle(FileHandle):
             fd.close()
             self.emitChanged('log', tags)
 
-    def readLog(self, recursive=0):
-        """Return a list containing one dict for each log line"""
+    def readLog(self, recursive=0, **query):
+        """Return a list containing one dict for each log line.
+
+        The log is read through a DirLogIndex (see logindex.py); keyword arguments are passed to
+        LogIndex.query to select entries (eg. by start and stop time) without decoding the rest of the log.
+        If *recursive* > 0, the logs of subdirectories (to that depth) are merged in by timestamp, and their
+        entries are given a 'subdir' key holding the subdirectory path relative to this directory.
+        """
+        if recursive > 0:
+            ## logs are merged below, so each one (including those of subdirectories) must be in time order
+            query['order'] = 'timestamp'
         with self.lock:
             logf = self._logFile()
             if not os.path.exists(logf):
                 log = []
             else:
+                logIndex = logindex.DirLogIndex(logf)
                 try:
-                    fd = open(logf, 'r')
-                    lines = fd.readlines()
-                    fd.close()
-                    log = [eval(l.strip()) for l in lines]
+                    log = logIndex.entries(**query)
                 except:
                     print("****************** Error reading log file %s! *********************" % logf)
                     raise
+                finally:
+                    logIndex.close()
 
             if recursive > 0:
+                logs = [log]
                 for d in self.subDirs():
                     dh = self[d]
-                    subLog = dh.readLog(recursive=recursive-1)
+                    subLog = dh.readLog(recursive=recursive-1, **query)
                     for msg in subLog:
                         if 'subdir' not in msg:
                             msg['subdir'] = ''
                         msg['subdir'] = os.path.join(dh.shortName(), msg['subdir'])
-                    log  = log + subLog
-                log.sort(key=lambda a: a['__timestamp__'])
+                    logs.append(subLog)
+                ## each log is already in time order
+                log = list(heapq.merge(*logs, key=lambda a: a['__timestamp__']))
 
             return log
 
@@ -590,9 +626,10 @@ class DirHandle(FileHandle):
         except Exception:
             printExc(f"Error while listing files in {self.name()}:")
             files = []
-        for i in ['.index', '.log']:
+        for i in dirIndex.indexFileNames() + logindex.indexFileNames() + ['.log', thumbnails.THUMBNAIL_DIR]:
             if i in files:
                 files.remove(i)
+        files = [f for f in files if not (f.startswith('.') and f.endswith(INDEX_CACHE_SUFFIX))]
 
         if sortMode == 'date':
             # Sort files by creation time
@@ -617,9 +654,8 @@ class DirHandle(FileHandle):
 
     def _getFileCTime(self, fileName):
         if self.isManaged():
-            index = self._readIndex()
-            with contextlib.suppress(KeyError):
-                return index[fileName]['__timestamp__']
+            with contextlib.suppress(KeyError, TypeError):
+                return self._indexBackend().get(fileName)['__timestamp__']
             # try getting time directly from file
             with contextlib.suppress(Exception):
                 return self[fileName].info()['__timestamp__']
@@ -642,7 +678,6 @@ class DirHandle(FileHandle):
         return len(self.ls()) > 0
 
     def info(self):
-        self._readIndex(unmanagedOk=True)  ## returns None if this directory has no index file
         return advancedTypes.ProtectedDict(self._fileInfo('.'))
 
     def _fileInfo(self, file):
@@ -650,11 +685,10 @@ class DirHandle(FileHandle):
         with self.lock:
             if not self.isManaged():
                 return {}
-            index = self._readIndex()
-            if file in index:
-                return index[file]
-            else:
+            info = self._indexBackend().get(file)
+            if info is None:
                 return {}
+            return info
 
     def isDir(self, path=None):
         with self.lock:
@@ -727,7 +761,11 @@ class DirHandle(FileHandle):
                 info['__timestamp__'] = t
             self._setFileInfo(fileName, info)
             self.emitChanged('children', fileName)
-            return self[fileName]
+            fh = self[fileName]
+        if fileType == "ImageFile":
+            ## MetaArray stacks are often appended to after they are written; their thumbnails are built when browsed
+            thumbnails.buildInBackground([fh])
+        return fh
 
     def indexFile(self, fileName, info=None, protect=False):
         """Add a pre-existing file into the index. Overwrites any pre-existing info for the file unless protect is True"""
@@ -737,12 +775,11 @@ class DirHandle(FileHandle):
         with self.lock:
             if not self.isManaged():
                 self.createIndex()
-            index = self._readIndex()
             fn = os.path.join(self.path, fileName)
             if not (os.path.isfile(fn) or os.path.isdir(fn)):
                 raise Exception("File %s does not exist." % fn)
 
-            if fileName in index:
+            if self._indexBackend().contains(fileName):
                 if protect:
                     raise Exception("File %s is already indexed." % fileName)
 
@@ -754,15 +791,8 @@ class DirHandle(FileHandle):
         with self.lock:
             if not self.isManaged(fileName):
                 return
-            index = self._readIndex(lock=False)
-            if fileName in index:
-                try:
-                    del index[fileName]
-                except:
-                    print(type(index))
-                    raise
-                self._writeIndex(index, lock=False)
-                self.emitChanged('meta', fileName)
+            self._indexBackend().remove(fileName)
+            self.emitChanged('meta', fileName)
 
     def isManaged(self, fileName=None):
         with self.lock:
@@ -771,10 +801,9 @@ class DirHandle(FileHandle):
             if fileName is None:
                 return True
             else:
-                ind = self._readIndex(unmanagedOk=True)
-                if ind is None:
+                if not self._indexBackend().exists():
                     return False
-                return (fileName in ind)
+                return self._indexBackend().contains(fileName)
 
     def setInfo(self, *args, **kargs):
         self._setFileInfo('.', *args, **kargs)
@@ -799,23 +828,35 @@ class DirHandle(FileHandle):
         with self.lock:
             return any(test(self[f]) for f in self.ls())
 
-    def representativeFramesForAllImages(self):
+    def representativeFramesForAllImages(self, maxSize=None, fullResolution=False):
+        """Return one Frame for each image file in this directory (and in its ImageSequence_ subdirectories).
+
+        For z-stacks, the frame nearest the sample surface is used. Frames are loaded from the thumbnail
+        cache (see thumbnails.ThumbnailCache), which is built for any files that do not have one yet. By
+        default, the largest cached preview is returned; if *maxSize* is given, the smallest preview at least
+        that large is used instead. If *fullResolution* is True, the original frames are loaded from disk.
+        """
         from acq4.util.imaging import Frame
-        from acq4.util.surface import find_surface
 
         frames = []
-        for f in self:
-            if f.fileType() == "ImageFile" and 'background' not in f.shortName().lower():
-                frames.append(Frame.loadFromFileHandle(f))
-            elif f.fileType() == "MetaArray" and 'pixelSize' in f.info():
-                frame_s = Frame.loadFromFileHandle(f)
-                if not isinstance(frame_s, Frame):
-                    frame_s = frame_s[find_surface(frame_s) or len(frame_s) // 2]
-                frames.append(frame_s)
-            elif f.shortName().startswith("ImageSequence_"):
-                frames.extend(f.representativeFramesForAllImages())
+        for f in thumbnails.listImageFiles(self):
+            thumb = f.parent().thumbnailCache().getOrBuild(f)
+            if not fullResolution:
+                frames.append(thumb.frame(f, maxSize))
+                continue
+            frame = Frame.loadFromFileHandle(f)
+            if not isinstance(frame, Frame):
+                frame = frame[thumb.frameIndex]
+            frames.append(frame)
         return frames
 
+    def thumbnailCache(self):
+        """Return the ThumbnailCache holding image previews for files in this directory."""
+        with self.lock:
+            if self._thumbnails is None:
+                self._thumbnails = thumbnails.ThumbnailCache(self)
+            return self._thumbnails
+
     def _setFileInfo(self, fileName, info=None, **args):
         """Set or update meta-information array for fileName. If merge is false, the info dict is completely overwritten."""
         if info is None:
@@ -823,67 +864,57 @@ class DirHandle(FileHandle):
         with self.lock:
             if not self.isManaged():
                 self.createIndex()
-            index = self._readIndex(lock=False)
-            append = False
-            if fileName not in index:
-                index[fileName] = {}
-                append = True
-
-            for k in info:
-                index[fileName][k] = info[k]
-
-            if append:
-                self._appendIndex({fileName: info})
-
-            else:
-                self._writeIndex(index, lock=False)
+            self._indexBackend().update(fileName, info)
             self.emitChanged('meta', fileName)
 
     def _readIndex(self, lock=True, unmanagedOk=False):
+        """Return the entire index for this directory as an OrderedDict.
+
+        This reads every entry; prefer _fileInfo() / isManaged() for single-file lookups.
+        """
         with self.lock:
-            indexFile = self._indexFile()
-            if self._index is None or os.path.getmtime(indexFile) != self._indexMTime:
-                if not os.path.isfile(indexFile):
-                    if unmanagedOk:
-                        return None
-                    else:
-                        raise Exception("Directory '%s' is not managed!" % (self.name()))
-                try:
-                    self._index = readConfigFile(indexFile)
-                    self._indexMTime = os.path.getmtime(indexFile)
-                except:
-                    print("***************Error while reading index file %s!*******************" % indexFile)
-                    raise
-            return self._index
+            backend = self._indexBackend()
+            if not backend.exists():
+                if unmanagedOk:
+                    return None
+                else:
+                    raise Exception("Directory '%s' is not managed!" % (self.name()))
+            return backend.readAll()
 
     def _writeIndex(self, newIndex, lock=True):
         with self.lock:
-            writeConfigFile(newIndex, self._indexFile())
-            self._index = newIndex
-            self._indexMTime = os.path.getmtime(self._indexFile())
+            self._indexBackend().writeAll(newIndex)
             self._indexFileExists = True
 
-    def _appendIndex(self, info):
+    def indexFormat(self):
+        """Return the storage format of this directory's index ('text' or 'sqlite'), or None if unmanaged."""
         with self.lock:
-            indexFile = self._indexFile()
-            appendConfigFile(info, indexFile)
-            self._indexFileExists = True
-            for k in info:
-                self._index[k] = info[k]
-            self._indexMTime = os.path.getmtime(indexFile)
+            if not self.isManaged():
+                return None
+            return self._indexBackend().format
+
+    def migrateIndex(self, fmt='sqlite', recursive=False, keepOld=True):
+        """Convert this directory's index (and optionally those of all subdirectories) to *fmt*.
+
+        See DataManager.index.migrateIndex.
+        """
+        with self.lock:
+            self._index = None
+            converted = migrateIndex(self.path, fmt=fmt, recursive=recursive, keepOld=keepOld)
+            for path in converted:
+                if self.manager._cacheHasName(path):
+                    self.manager._getCache(path)._index = None
+            self._childChanged()
+            return converted
 
     def checkIndex(self):
-        ind = self._readIndex(unmanagedOk=True)
-        if ind is None:
+        if not self.isManaged():
             return
-        changed = False
-        for f in ind:
+        backend = self._indexBackend()
+        for f in backend.names():
             if not self.exists(f):
                 print("File %s is no more, removing from index." % (os.path.join(self.name(), f)))
-                del ind[f]
-                changed = True
-        if changed:
-            self._writeIndex(ind)
+                backend.remove(f)
 
     def _childChanged(self):
         self.lsCache = {}
@@ -0,0 +1,317 @@
+"""
+Storage backends for the per-directory meta-info index used by DirHandle.
+
+Two formats are supported:
+
+* ``text`` -- the original human-readable ``.index`` file written with pyqtgraph's configfile format. New entries
+  are appended, but updating an existing entry rewrites (and re-parsing re-reads) the entire file.
+* ``sqlite`` -- an ``.index.sqlite`` sidecar database holding one row per entry. Lookups and updates touch only the
+  affected entry, so their cost does not grow with the number of files in the directory. Entries are stored
+  in the same text format as ``.index`` files, so the two formats can be converted losslessly.
+
+A directory uses whichever index file it has (sqlite takes precedence); directories created by the DataManager use
+the format selected with setDefaultFormat(). Use migrateIndex() (or tools/migrate-index.py) to convert existing
+directories.
+"""
+import datetime
+import os
+import sqlite3
+from collections import OrderedDict
+
+import numpy as np
+from pyqtgraph import Point, units
+from pyqtgraph.configfile import readConfigFile, writeConfigFile, appendConfigFile, genString, parseString
+
+TEXT_INDEX_NAME = '.index'
+SQLITE_INDEX_NAME = '.index.sqlite'
+BACKUP_SUFFIX = '.bak'  # previous index files kept by migrateIndex
+FORMATS = ('text', 'sqlite')
+
+_defaultFormat = 'text'
+
+
+def setDefaultFormat(fmt):
+    """Set the index format ('text' or 'sqlite') used for newly created directory indexes."""
+    global _defaultFormat
+    if fmt not in FORMATS:
+        raise ValueError(f"Index format must be one of {FORMATS}; got {fmt!r}")
+    _defaultFormat = fmt
+
+
+def defaultFormat():
+    return _defaultFormat
+
+
+def indexFileNames():
+    """Return the names of all files used to store directory indexes (these are hidden from directory listings)."""
+    names = [TEXT_INDEX_NAME, SQLITE_INDEX_NAME]
+    return names + [SQLITE_INDEX_NAME + '-journal'] + [n + BACKUP_SUFFIX for n in names]
+
+
+def hasIndex(path):
+    """Return True if the directory at *path* has an index in any format."""
+    return os.path.isfile(os.path.join(path, SQLITE_INDEX_NAME)) or os.path.isfile(os.path.join(path, TEXT_INDEX_NAME))
+
+
+def openIndex(path, fmt=None):
+    """Return the index backend for the directory at *path*.
+
+    Existing indexes are opened in whatever format they were written; if the directory has no index yet,
+    *fmt* (or the default format) determines which backend will be created.
+    """
+    if os.path.isfile(os.path.join(path, SQLITE_INDEX_NAME)):
+        return SqliteIndex(path)
+    if os.path.isfile(os.path.join(path, TEXT_INDEX_NAME)):
+        return TextIndex(path)
+    fmt = fmt or _defaultFormat
+    return SqliteIndex(path) if fmt == 'sqlite' else TextIndex(path)
+
+
+def _parseScope():
+    # mirror the namespace readConfigFile() provides so that entries round-trip identically
+    scope = dict(units.allUnits)
+    scope.update({
+        'OrderedDict': OrderedDict,
+        'Point': Point,
+        'datetime': datetime,
+        'array': np.array,
+    })
+    for dtype in ['int8', 'uint8', 'int16', 'uint16', 'float16', 'int32', 'uint32', 'float32', 'int64', 'uint64',
+                  'float64']:
+        scope[dtype] = getattr(np, dtype)
+    return scope
+
+
+class IndexBackend:
+    """Interface shared by all index formats. All *info* values are dicts of meta-information for one entry
+    (file name, or '.' for the directory itself)."""
+    format = None
+
+    def __init__(self, path):
+        self.path = path
+
+    def fileName(self):
+        raise NotImplementedError()
+
+    def exists(self):
+        return os.path.isfile(self.fileName())
+
+    def create(self):
+        """Create an empty index containing only the '.' entry."""
+        self.writeAll(OrderedDict([('.', {})]))
+
+    def get(self, name):
+        """Return the info dict for *name*, or None if it is not indexed."""
+        raise NotImplementedError()
+
+    def contains(self, name):
+        return self.get(name) is not None
+
+    def names(self):
+        raise NotImplementedError()
+
+    def update(self, name, info):
+        """Merge *info* into the entry for *name*, creating the entry if needed."""
+        raise NotImplementedError()
+
+    def remove(self, name):
+        raise NotImplementedError()
+
+    def readAll(self):
+        """Return the entire index as an OrderedDict."""
+        raise NotImplementedError()
+
+    def writeAll(self, index):
+        """Replace the entire index."""
+        raise NotImplementedError()
+
+
+class TextIndex(IndexBackend):
+    """The original ``.index`` file format. The parsed file is cached until its mtime changes."""
+    format = 'text'
+
+    def __init__(self, path):
+        IndexBackend.__init__(self, path)
+        self._index = None
+        self._mtime = None
+
+    def fileName(self):
+        return os.path.join(self.path, TEXT_INDEX_NAME)
+
+    def _read(self):
+        indexFile = self.fileName()
+        if self._index is None or os.path.getmtime(indexFile) != self._mtime:
+            try:
+                self._index = readConfigFile(indexFile)
+                self._mtime = os.path.getmtime(indexFile)
+            except:
+                print("***************Error while reading index file %s!*******************" % indexFile)
+                raise
+        return self._index
+
+    def get(self, name):
+        return self._read().get(name, None)
+
+    def contains(self, name):
+        return name in self._read()
+
+    def names(self):
+        return list(self._read().keys())
+
+    def update(self, name, info):
+        index = self._read()
+        if name not in index:
+            index[name] = dict(info)
+            appendConfigFile({name: info}, self.fileName())
+            self._mtime = os.path.getmtime(self.fileName())
+        else:
+            index[name].update(info)
+            self.writeAll(index)
+
+    def remove(self, name):
+        index = self._read()
+        if name in index:
+            del index[name]
+            self.writeAll(index)
+
+    def readAll(self):
+        return self._read()
+
+    def writeAll(self, index):
+        writeConfigFile(index, self.fileName())
+        self._index = index
+        self._mtime = os.path.getmtime(self.fileName())
+
+
+class SqliteIndex(IndexBackend):
+    """Index stored in an ``.index.sqlite`` database with one row per entry.
+
+    Rows hold the entry's meta-info in the same text format used by ``.index`` files. Decoded entries are cached
+    until another connection modifies the database.
+    """
+    format = 'sqlite'
+
+    def __init__(self, path):
+        IndexBackend.__init__(self, path)
+        self._conn = None
+        self._cache = {}
+        self._dataVersion = None
+        self._scope = _parseScope()
+
+    def fileName(self):
+        return os.path.join(self.path, SQLITE_INDEX_NAME)
+
+    def _db(self):
+        # One connection is shared by all threads; callers (DirHandle) serialize access with their own lock.
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.fileName(), check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS entries (seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                               "name TEXT UNIQUE NOT NULL, info TEXT NOT NULL)")
+            self._conn.commit()
+        return self._conn
+
+    def _checkCache(self, db):
+        # data_version changes whenever another connection commits to the database
+        version = db.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._dataVersion:
+            self._cache = {}
+            self._dataVersion = version
+
+    def _encode(self, info):
+        return genString(info)
+
+    def _decode(self, text):
+        if text == '':
+            return {}
+        return parseString(text, **self._scope)[1]
+
+    def get(self, name):
+        db = self._db()
+        self._checkCache(db)
+        if name not in self._cache:
+            row = db.execute("SELECT info FROM entries WHERE name=?", (name,)).fetchone()
+            if row is None:
+                return None
+            self._cache[name] = self._decode(row[0])
+        return self._cache[name]
+
+    def contains(self, name):
+        db = self._db()
+        self._checkCache(db)
+        if name in self._cache:
+            return True
+        return db.execute("SELECT 1 FROM entries WHERE name=?", (name,)).fetchone() is not None
+
+    def names(self):
+        return [r[0] for r in self._db().execute("SELECT name FROM entries ORDER BY seq")]
+
+    def update(self, name, info):
+        current = self.get(name)
+        merged = {} if current is None else dict(current)
+        merged.update(info)
+        db = self._db()
+        with db:
+            if current is None:
+                db.execute("INSERT INTO entries (name, info) VALUES (?, ?)", (name, self._encode(merged)))
+            else:
+                db.execute("UPDATE entries SET info=? WHERE name=?", (self._encode(merged), name))
+        self._cache[name] = merged
+
+    def remove(self, name):
+        db = self._db()
+        with db:
+            db.execute("DELETE FROM entries WHERE name=?", (name,))
+        self._cache.pop(name, None)
+
+    def readAll(self):
+        index = OrderedDict()
+        for name, text in self._db().execute("SELECT name, info FROM entries ORDER BY seq"):
+            index[name] = self._decode(text)
+        return index
+
+    def writeAll(self, index):
+        db = self._db()
+        with db:
+            db.execute("DELETE FROM entries")
+            db.executemany("INSERT INTO entries (name, info) VALUES (?, ?)",
+                           [(name, self._encode(info)) for name, info in index.items()])
+        self._cache = {}
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def migrateIndex(path, fmt='sqlite', recursive=False, keepOld=True):
+    """Convert the index of the directory at *path* to *fmt* ('sqlite' or 'text').
+
+    If *keepOld* is True, the previous index file is renamed with a ``.bak`` suffix rather than deleted (like the
+    index files themselves, these backups are hidden from directory listings).
+    Returns the list of directories that were converted.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Index format must be one of {FORMATS}; got {fmt!r}")
+    converted = []
+    if hasIndex(path):
+        old = openIndex(path)
+        if old.format != fmt:
+            new = SqliteIndex(path) if fmt == 'sqlite' else TextIndex(path)
+            if new.exists():
+                raise FileExistsError(f"Cannot migrate {path}: {new.fileName()} already exists.")
+            new.writeAll(old.readAll())
+            if isinstance(old, SqliteIndex):
+                old.close()
+            if isinstance(new, SqliteIndex):
+                new.close()
+            if keepOld:
+                os.replace(old.fileName(), old.fileName() + BACKUP_SUFFIX)
+            else:
+                os.remove(old.fileName())
+            converted.append(path)
+    if recursive:
+        for name in sorted(os.listdir(path)):
+            sub = os.path.join(path, name)
+            if os.path.isdir(sub):
+                converted.extend(migrateIndex(sub, fmt=fmt, recursive=True, keepOld=keepOld))
+    return converted
@@ -0,0 +1,233 @@
+"""
+Indexed access to the text logs kept in data directories.
+
+Two kinds of log are written as plain text, and remain the primary record:
+
+* ``.log`` -- written by DirHandle.logMsg; one python dict repr per line.
+* ``log.txt`` -- written by LogWindow in pyqtgraph's configfile format; one ``LogEntry_N`` block per message.
+
+Reading either one means parsing every entry. A LogIndex mirrors a text log into an SQLite sidecar (``.log.sqlite``
+or ``.log.txt.sqlite``) that holds the timestamp, importance, message type and directory of each entry in indexed
+columns, so that a long log can be filtered with a query and only the matching entries decoded. Entries are stored
+in the same text format as the log, so decoded entries are identical to those read from the log itself.
+
+The index records how much of the log it has imported and reads only text appended since then; logs that were
+truncated or rewritten are imported again from the start. If the sidecar cannot be written (eg. for read-only
+data), the index is built in memory instead.
+"""
+import datetime
+import os
+import sqlite3
+
+import numpy as np
+from pyqtgraph.configfile import parseString
+
+from acq4.util.Mutex import Mutex
+from .index import _parseScope
+
+INDEX_SUFFIX = '.sqlite'
+_HEAD_SIZE = 256  # bytes of the log compared to detect rewritten files
+
+
+def indexFileNames():
+    """Return the names of log index files (these are hidden from directory listings)."""
+    names = []
+    for log in ['.log', '.log.txt']:
+        names.extend([log + INDEX_SUFFIX, log + INDEX_SUFFIX + '-journal'])
+    return names
+
+
+class LogIndex:
+    """Index of the entries in the text log *logFile*.
+
+    Subclasses define how the log is split into entries and which values are indexed.
+    """
+
+    def __init__(self, logFile):
+        self.logFile = logFile
+        self._conn = None
+        self._lock = Mutex()
+        self._scope = _parseScope()
+
+    def fileName(self):
+        """Return the name of the sidecar file holding this index."""
+        path, name = os.path.split(self.logFile)
+        if not name.startswith('.'):
+            name = '.' + name
+        return os.path.join(path, name + INDEX_SUFFIX)
+
+    def _db(self):
+        if self._conn is None:
+            try:
+                conn = sqlite3.connect(self.fileName(), check_same_thread=False, timeout=10)
+                self._createTables(conn)
+            except sqlite3.Error:
+                ## not writable; index in memory for this session
+                conn = sqlite3.connect(':memory:', check_same_thread=False)
+                self._createTables(conn)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _createTables(conn):
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (seq INTEGER PRIMARY KEY, name TEXT, entryId INTEGER, "
+                         "timestamp REAL, importance INTEGER, msgType TEXT, directory TEXT, entry TEXT NOT NULL)")
+            for col in ['timestamp', 'importance', 'msgType', 'directory']:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS entries_{col} ON entries ({col})")
+            conn.execute("CREATE TABLE IF NOT EXISTS source (key TEXT PRIMARY KEY, value)")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def sync(self):
+        """Import any entries that were appended to the log since it was last read."""
+        with self._lock:
+            db = self._db()
+            with db:
+                db.execute("BEGIN IMMEDIATE")  # serialize with other processes importing the same log
+                source = dict(db.execute("SELECT key, value FROM source"))
+                offset = source.get('offset', 0)
+                head = source.get('head', b'')
+                if not os.path.exists(self.logFile):
+                    return
+                with open(self.logFile, 'rb') as fd:
+                    size = os.fstat(fd.fileno()).st_size
+                    if size < offset or fd.read(len(head)) != head:
+                        db.execute("DELETE FROM entries")
+                        offset = 0
+                    fd.seek(offset)
+                    data = fd.read(size - offset)
+
+                ## leave any partially written line for the next sync
+                data = data[:data.rfind(b'\n') + 1]
+                if len(data) == 0:
+                    return
+                rows = [self._row(text) for text in self._split(data.decode('utf-8'))]
+                db.executemany("INSERT INTO entries (name, entryId, timestamp, importance, msgType, directory, entry) "
+                               "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                if offset == 0:
+                    db.execute("INSERT OR REPLACE INTO source VALUES ('head', ?)", (data[:_HEAD_SIZE],))
+                db.execute("INSERT OR REPLACE INTO source VALUES ('offset', ?)", (offset + len(data),))
+
+    def query(self, start=None, stop=None, minImportance=None, msgTypes=None, directory=None, order='seq'):
+        """Return the sequence numbers of the entries that match all of the given criteria.
+
+        *start* and *stop* are unix timestamps (stop is exclusive), *minImportance* the lowest importance to
+        include, *msgTypes* a list of message types and *directory* a path that entry directories must begin with.
+        Results are in log order, or sorted by timestamp if *order* is 'timestamp'.
+        """
+        where = []
+        args = []
+        if start is not None:
+            where.append("timestamp >= ?")
+            args.append(start)
+        if stop is not None:
+            where.append("timestamp < ?")
+            args.append(stop)
+        if minImportance is not None:
+            where.append("importance >= ?")
+            args.append(minImportance)
+        if msgTypes is not None:
+            where.append("msgType IN (%s)" % ','.join('?' * len(msgTypes)))
+            args.extend(msgTypes)
+        if directory is not None:
+            ## prefix match that can use the directory index
+            where.append("directory >= ? AND directory < ?")
+            args.extend([directory, directory + '\U0010ffff'])
+        sql = "SELECT seq FROM entries"
+        if len(where) > 0:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY timestamp, seq" if order == 'timestamp' else " ORDER BY seq"
+        with self._lock:
+            return [r[0] for r in self._db().execute(sql, args)]
+
+    def load(self, seqs):
+        """Return the decoded entries for the sequence numbers *seqs* (see query), in the same order."""
+        with self._lock:
+            db = self._db()
+            texts = {}
+            for i in range(0, len(seqs), 500):
+                chunk = seqs[i:i + 500]
+                sql = "SELECT seq, entry FROM entries WHERE seq IN (%s)" % ','.join('?' * len(chunk))
+                texts.update(db.execute(sql, chunk))
+        return [self._decode(texts[s]) for s in seqs]
+
+    def entries(self, **query):
+        """Sync the index and return the decoded entries selected by *query* (see query())."""
+        self.sync()
+        return self.load(self.query(**query))
+
+    def maxEntryId(self):
+        """Return the largest entry id in the log, or None if it has no entries with ids."""
+        with self._lock:
+            return self._db().execute("SELECT MAX(entryId) FROM entries").fetchone()[0]
+
+    def _split(self, text):
+        """Return the text of each entry in *text*."""
+        raise NotImplementedError()
+
+    def _row(self, text):
+        """Return (name, entryId, timestamp, importance, msgType, directory, text) for one entry."""
+        raise NotImplementedError()
+
+    def _decode(self, text):
+        raise NotImplementedError()
+
+
+class DirLogIndex(LogIndex):
+    """Index of a directory's ``.log`` file (see DirHandle.logMsg). Entries are the tag dicts stored with each
+    message; importance and msgType are indexed if they were given as tags.
+    """
+
+    def __init__(self, logFile):
+        LogIndex.__init__(self, logFile)
+        self._scope['np'] = np
+
+    def _split(self, text):
+        return [line for line in text.split('\n') if line.strip() != '']
+
+    def _row(self, text):
+        entry = self._decode(text)
+        return (None, None, entry.get('__timestamp__'), entry.get('importance'), entry.get('msgType'), None, text)
+
+    def _decode(self, text):
+        return eval(text.strip(), self._scope)
+
+
+class LogWindowIndex(LogIndex):
+    """Index of a ``log.txt`` file written by LogWindow. Decoded entries are (name, entry) tuples, where name
+    is the entry's ``LogEntry_N`` key. Missing importance and msgType values are indexed as 5 and 'status'.
+    """
+
+    def _split(self, text):
+        ## each entry starts with an unindented line; values spanning several lines end with a backslash
+        blocks = []
+        lines = text.split('\n')[:-1]
+        for i, line in enumerate(lines):
+            if line == '':
+                continue
+            if len(blocks) == 0 or (not line[0].isspace() and not lines[i - 1].endswith('\\')):
+                blocks.append([])
+            blocks[-1].append(line)
+        return ['\n'.join(b) + '\n' for b in blocks]
+
+    def _row(self, text):
+        name, entry = self._decode(text)
+        try:
+            timestamp = datetime.datetime.fromisoformat(entry['timestamp']).timestamp()
+        except Exception:
+            timestamp = None
+        entryId = entry.get('id')
+        if not isinstance(entryId, int):
+            entryId = None
+        directory = entry.get('currentDir') or ''
+        return (name, entryId, timestamp, entry.get('importance', 5), entry.get('msgType', 'status'),
+                str(directory), text)
+
+    def _decode(self, text):
+        data = parseString(text, **self._scope)[1]
+        return next(iter(data.items()))
@@ -0,0 +1,284 @@
+"""
+Persistent cache of image previews for DataManager directories.
+
+Finding a representative image for a file means reading all of it: a z-stack must be loaded in full and
+scored to find the focal plane of the sample surface. ThumbnailCache does this once per file and
+stores the result in a ``.thumbnails`` folder inside the file's directory. Each entry stores the index
+of the representative frame, with its background already removed, as a multi-resolution pyramid (each
+level is half the size of the previous one). Entries are keyed on the file's modification time and size,
+so files that change are rebuilt automatically. Directory listings hide the cache folder.
+
+Each entry file holds a small header followed by the pyramid levels, smallest first, so that a preview at low
+resolution can be loaded without reading the larger levels.
+
+Entries are built in a background thread (see buildInBackground) when single images are written through
+DirHandle.writeFile and when a directory is selected in the DataManager module. They are also built on
+demand by DirHandle.representativeFramesForAllImages.
+"""
+import os
+import pickle
+import queue
+import tempfile
+import threading
+
+import numpy as np
+
+import pyqtgraph as pg
+from acq4.util.debug import printExc
+
+THUMBNAIL_DIR = '.thumbnails'
+_VERSION = 2
+_builder = None
+
+
+def isImageFile(fh):
+    """Return True if *fh* is an image file that can be previewed (backgrounds are excluded)."""
+    if fh.isDir():
+        return False
+    if fh.fileType() == "ImageFile":
+        return 'background' not in fh.shortName().lower()
+    return fh.fileType() == "MetaArray" and 'pixelSize' in fh.info()
+
+
+class Thumbnail:
+    """Preview of one image file, as loaded from a ThumbnailCache.
+
+    *shape* is the shape of the original image, *shapes* the shape of each level and *scales* the
+    downsampling factor of each level relative to the original image. *frameIndex* is the index of the
+    representative frame in an image stack (None for single images) and *frameInfo* holds the meta-info of
+    that frame that differs from the file's info.
+
+    Level data is given by *levels*, or else read from *fileName* as it is requested (see levelData).
+    """
+
+    def __init__(self, shape, shapes, scales, frameIndex=None, frameInfo=None, levels=None, fileName=None):
+        self.shape = shape
+        self.shapes = shapes
+        self.scales = scales
+        self.frameIndex = frameIndex
+        self.frameInfo = frameInfo or {}
+        self.fileName = fileName
+        self._levels = {} if levels is None else dict(enumerate(levels))
+
+    @property
+    def levels(self):
+        return [self.levelData(i) for i in range(len(self.shapes))]
+
+    def levelData(self, i, keep=True):
+        """Return the image data for level *i*, reading it from disk if needed.
+
+        If *keep* is False, data read from disk is not kept by this Thumbnail.
+        """
+        i = i % len(self.shapes)
+        if i in self._levels:
+            return self._levels[i]
+        with open(self.fileName, 'rb') as f:
+            pickle.load(f)  # header
+            for j in range(len(self.shapes) - 1, i - 1, -1):
+                data = pickle.load(f)
+        if keep:
+            self._levels[i] = data
+        return data
+
+    def level(self, maxSize=None):
+        """Return the index of the smallest level whose largest dimension is at least *maxSize*
+        (or the largest level if *maxSize* is None or no level is that large).
+        """
+        if maxSize is not None:
+            for i in reversed(range(len(self.shapes))):
+                if max(self.shapes[i][:2]) >= maxSize:
+                    return i
+        return 0
+
+    def frame(self, fh, maxSize=None):
+        """Return a Frame showing this preview for the file *fh*.
+
+        The frame's transform and pixel size are scaled to match the resolution of the selected level, so it
+        is displayed in the same place as the original image.
+        """
+        from acq4.util.imaging import Frame
+
+        i = self.level(maxSize)
+        scale = self.scales[i]
+        info = fh.info().deepcopy()
+        info.update(self.frameInfo)
+        info.pop('backgroundInfo', None)  # already removed from the preview
+        if scale != 1:
+            if 'transform' in info:
+                tr = pg.SRTTransform3D(info['transform'])
+                tr.setScale(np.array(tr.getScale()) * [scale, scale, 1])
+                info['transform'] = tr.saveState()
+            if 'pixelSize' in info:
+                info['pixelSize'] = [p * scale for p in info['pixelSize']]
+        return Frame(self.levelData(i), info)
+
+
+class ThumbnailCache:
+    """Thumbnails for the image files in one directory.
+
+    *maxSize* is the largest dimension of the first stored level, and *minSize* the smallest level to keep.
+    """
+
+    def __init__(self, dirHandle, maxSize=1024, minSize=64):
+        self.dirHandle = dirHandle
+        self.maxSize = maxSize
+        self.minSize = minSize
+
+    def _entryPath(self, fh):
+        return os.path.join(self.dirHandle.name(), THUMBNAIL_DIR, fh.shortName() + '.pkl')
+
+    @staticmethod
+    def _sourceKey(fh):
+        st = os.stat(fh.name())
+        return (_VERSION, st.st_mtime_ns, st.st_size)
+
+    def get(self, fh):
+        """Return the cached Thumbnail for *fh*, or None if there is none or it is out of date."""
+        fileName = self._entryPath(fh)
+        if not os.path.exists(fileName):
+            return None
+        try:
+            with open(fileName, 'rb') as f:
+                header = pickle.load(f)
+            if header['source'] != self._sourceKey(fh):
+                return None
+            return Thumbnail(
+                header['shape'], header['shapes'], header['scales'], header['frameIndex'], header['frameInfo'],
+                fileName=fileName,
+            )
+        except Exception:
+            printExc("Ignoring unreadable thumbnail %s:" % fileName)
+            return None
+
+    def getOrBuild(self, fh):
+        """Return the Thumbnail for *fh*, building it first if needed."""
+        thumb = self.get(fh)
+        if thumb is None:
+            thumb = self.build(fh)
+        return thumb
+
+    def build(self, fh):
+        """Read *fh*, select its representative frame and store a new thumbnail for it."""
+        from acq4.util.imaging import Frame
+        from acq4.util.surface import find_surface
+
+        source = self._sourceKey(fh)
+        frames = Frame.loadFromFileHandle(fh)
+        frameIndex = None
+        frameInfo = {}
+        if isinstance(frames, Frame):
+            frame = frames
+        else:
+            frameIndex = int(find_surface(frames) or len(frames) // 2)
+            frame = frames[frameIndex]
+            ## Frame.loadFromFileHandle sets the time or depth of each frame in a stack
+            if 'time' in frame.info():
+                frameInfo['time'] = frame.info()['time']
+            if 'transform' in frame.info():
+                frameInfo['transform'] = pg.SRTTransform3D(frame.info()['transform']).saveState()
+
+        img = frame.displayImage()
+        levels, scales = self._pyramid(img)
+        shapes = [l.shape for l in levels]
+        thumb = Thumbnail(img.shape, shapes, scales, frameIndex, frameInfo, levels=levels)
+        header = {
+            'source': source,
+            'shape': img.shape,
+            'shapes': shapes,
+            'scales': scales,
+            'frameIndex': frameIndex,
+            'frameInfo': frameInfo,
+        }
+        self._store(fh, header, levels)
+        thumb.fileName = self._entryPath(fh)
+        return thumb
+
+    def _pyramid(self, img):
+        levels = []
+        scales = []
+        scale = 1
+        while True:
+            if max(img.shape[:2]) <= self.maxSize:
+                levels.append(img)
+                scales.append(scale)
+            if min(img.shape[:2]) < 2 or max(img.shape[:2]) // 2 < self.minSize:
+                break
+            dtype = img.dtype
+            img = pg.downsample(pg.downsample(img, 2, axis=0), 2, axis=1)
+            if np.issubdtype(dtype, np.integer):
+                img = img.astype(dtype)
+            scale *= 2
+        return levels, scales
+
+    def _store(self, fh, header, levels):
+        ## failures (eg. read-only data directories) are reported but not raised
+        fileName = self._entryPath(fh)
+        try:
+            os.makedirs(os.path.dirname(fileName), exist_ok=True)
+            fd, tmpName = tempfile.mkstemp(dir=os.path.dirname(fileName), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    for data in reversed(levels):
+                        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmpName, fileName)
+            except Exception:
+                os.remove(tmpName)
+                raise
+        except Exception:
+            printExc("Could not store thumbnail for %s:" % fh.name())
+
+
+def listImageFiles(dirHandle):
+    """Return handles for all previewable image files in *dirHandle*, including those in ImageSequence_
+    subdirectories.
+    """
+    files = []
+    for f in dirHandle:
+        if f.isDir():
+            if f.shortName().startswith("ImageSequence_"):
+                files.extend(listImageFiles(f))
+        elif isImageFile(f):
+            files.append(f)
+    return files
+
+
+class ThumbnailBuilder(threading.Thread):
+    """Background thread that builds missing or outdated thumbnails for queued files."""
+
+    def __init__(self):
+        threading.Thread.__init__(self, name="ThumbnailBuilder", daemon=True)
+        self.queue = queue.Queue()
+
+    def add(self, handles):
+        for fh in handles:
+            self.queue.put(fh)
+
+    def run(self):
+        while True:
+            fh = self.queue.get()
+            try:
+                cache = fh.parent().thumbnailCache()
+                if cache.get(fh) is None:
+                    cache.build(fh)
+            except Exception:
+                printExc("Error building thumbnail for %s:" % fh.name())
+
+
+def buildInBackground(handles):
+    """Build thumbnails for *handles* (file handles, or directory handles whose image files should all be
+    previewed) in a background thread.
+    """
+    global _builder
+    files = []
+    for fh in handles:
+        if fh.isDir():
+            files.extend(listImageFiles(fh))
+        elif isImageFile(fh):
+            files.append(fh)
+    if len(files) == 0:
+        return
+    if _builder is None:
+        _builder = ThumbnailBuilder()
+        _builder.start()
+    _builder.add(files)
@@ -22,6 +22,7 @@ if __name__ == "__main__":
 
 from acq4.util import Qt
 from acq4.util.DataManager import DirHandle
+from acq4.util.DataManager.logindex import LogWindowIndex
 from acq4.util.HelpfulException import HelpfulException
 from acq4.util.codeEditor import invokeCodeEditor
 from acq4.util.future import Future
@@ -105,6 +106,7 @@ class LogWindow(Qt.QMainWindow):
         self.entriesSaved = 0
         self.entriesVisible = 0
         self.logFile = None
+        self.logIndex = None  # LogWindowIndex for self.logFile
         # start a new temp log file, destroying anything left over from the last session.
         configfile.writeConfigFile("", self.fileName())
         # weak references to all Log Buttons get added to this list, so it's easy to make them all do things, like flash red.
@@ -309,12 +311,13 @@ class LogWindow(Qt.QMainWindow):
             temp = {}
 
         with self.lock:
+            if self.logIndex is not None:
+                self.logIndex.close()
             if dh.exists("log.txt"):
                 self.logFile = dh["log.txt"]
-                try:
-                    tempCount = max(e["id"] for e in configfile.readConfigFile(self.logFile.name()).values())
-                except IndexError:
-                    tempCount = 0
+                self.logIndex = LogWindowIndex(self.logFile.name())
+                self.logIndex.sync()
+                tempCount = self.logIndex.maxEntryId() or 0
                 newTemp = {}
                 for v in temp.values():
                     # renumber the entries to be relative to the existing file
@@ -325,6 +328,7 @@ class LogWindow(Qt.QMainWindow):
                 self.entriesSaved = tempCount
             else:
                 self.logFile = dh.createFile("log.txt")
+                self.logIndex = LogWindowIndex(self.logFile.name())
                 self.saveEntries(temp)
 
         self.logMsg(f"Moved log storage from {oldfName} to {self.fileName()}.")
@@ -376,6 +380,8 @@ class LogWidget(Qt.QWidget):
             ],
         )
         self.entryArray = self.entryArrayBuffer[:0]
+        self.logIndex = None  # LogWindowIndex of the file being displayed (see loadFile)
+        self.indexedEntries = {}  # entries decoded from logIndex, by sequence number
 
         self.filtersChanged()
 
@@ -388,11 +394,31 @@ class LogWidget(Qt.QWidget):
         self.sigScrollToAnchor.connect(self.scrollToAnchor, Qt.Qt.QueuedConnection)
 
     def loadFile(self, f):
-        """Load the file, f. f must be able to be read by configfile.py"""
-        logConf = configfile.readConfigFile(f)
+        """Display the log file, f (a log.txt file written by LogWindow).
+
+        The file is read through a LogWindowIndex, so that filtering runs as a query on the index and only the
+        entries that pass the filters are decoded.
+        """
+        if self.logIndex is not None:
+            self.logIndex.close()
+        self.logIndex = LogWindowIndex(f)
+        self.indexedEntries = {}
+        self.filterEntries()  # puts all entries through current filters and displays the ones that pass
+
+    def unloadFile(self):
+        """Stop displaying the file loaded with loadFile."""
+        if self.logIndex is not None:
+            self.logIndex.close()
+        self.logIndex = None
+        self.indexedEntries = {}
+        self.setEntries([])
+        self.clear()
+
+    def setEntries(self, entries):
+        """Replace the list of entries available for display."""
         self.entries = []
         self.entryArrayBuffer = np.zeros(
-            len(logConf),
+            len(entries),
             dtype=[
                 ("index", "int32"),
                 ("importance", "int32"),
@@ -403,8 +429,7 @@ class LogWidget(Qt.QWidget):
         )
         self.entryArray = self.entryArrayBuffer[:]
 
-        for i, (k, v) in enumerate(logConf.items()):
-            v["id"] = k[9:]  # record unique ID to facilitate HTML generation (javascript needs this ID)
+        for i, v in enumerate(entries):
             self.entries.append(v)
             self.entryArray[i] = np.array(
                 [
@@ -424,7 +449,21 @@ class LogWidget(Qt.QWidget):
                     ("entryId", "int32"),
                 ],
             )
-        self.filterEntries()  # puts all entries through current filters and displays the ones that pass
+
+    def queryIndex(self):
+        """Set self.entries to the entries in the loaded log file that pass the current filters."""
+        self.logIndex.sync()
+        seqs = self.logIndex.query(
+            minImportance=self.importanceFilter + 1,
+            msgTypes=self.typeFilters + [""],
+            directory=self.dirFilter if self.dirFilter is not False else None,
+        )
+        ## decoded entries are kept so that their generated html is cached across filter changes
+        missing = [i for i in seqs if i not in self.indexedEntries]
+        for i, (k, v) in zip(missing, self.logIndex.load(missing)):
+            v["id"] = k[9:]  # record unique ID to facilitate HTML generation (javascript needs this ID)
+            self.indexedEntries[i] = v
+        self.setEntries([self.indexedEntries[i] for i in seqs])
 
     def addEntry(self, entry):
         # All incoming messages begin here
@@ -500,24 +539,29 @@ class LogWidget(Qt.QWidget):
 
     def filterEntries(self):
         """Runs each entry in self.entries through the filters and displays if it makes it through."""
-        # make self.entries a record array, then filtering will be much faster (to OR true/false arrays, + them)
-        # TODO FutureWarning: elementwise comparison failed; returning scalar instead, but in the future will perform elementwise comparison
-        typeMask = self.entryArray["msgType"] == ""
-        for t in self.typeFilters:
-            typeMask += self.entryArray["msgType"] == t
-        mask = (self.entryArray["importance"] > self.importanceFilter) * typeMask
-        if self.dirFilter is not False:
-            _d = np.ascontiguousarray(self.entryArray["directory"])
-            j = len(self.dirFilter)
-            i = len(_d)
-            _d = _d.view(np.byte).reshape(i, 100)[:, :j]
-            _d = _d.reshape(i * j).view("|S%d" % j)
-            mask *= _d == self.dirFilter
+        if self.logIndex is not None:
+            ## entries were already filtered by the index query
+            self.queryIndex()
+            indices = list(range(len(self.entries)))
+        else:
+            # make self.entries a record array, then filtering will be much faster (to OR true/false arrays, + them)
+            # TODO FutureWarning: elementwise comparison failed; returning scalar instead, but in the future will perform elementwise comparison
+            typeMask = self.entryArray["msgType"] == ""
+            for t in self.typeFilters:
+                typeMask += self.entryArray["msgType"] == t
+            mask = (self.entryArray["importance"] > self.importanceFilter) * typeMask
+            if self.dirFilter is not False:
+                _d = np.ascontiguousarray(self.entryArray["directory"])
+                j = len(self.dirFilter)
+                i = len(_d)
+                _d = _d.view(np.byte).reshape(i, 100)[:, :j]
+                _d = _d.reshape(i * j).view("|S%d" % j)
+                mask *= _d == self.dirFilter
+            indices = list(self.entryArray[mask]["index"])
 
         self.ui.output.clear()
         global Stylesheet
         self.ui.output.document().setDefaultStyleSheet(Stylesheet)
-        indices = list(self.entryArray[mask]["index"])
         self.displayEntry([self.entries[i] for i in indices])
 
     def checkDisplay(self, entry):
@@ -10,10 +10,68 @@ Includes:
 """
 from __future__ import print_function
 
+import collections
 import copy
 from collections.abc import Sequence
 
 
+class CaselessDict(collections.OrderedDict):
+    """Case-insensitive dict. Values can be set and retrieved using keys of any case.
+    Note that when iterating, the original case is returned for each key."""
+
+    def __init__(self, *args):
+        collections.OrderedDict.__init__(self, {})  ## requirement for the empty {} here seems to be a python bug?
+        self.keyMap = collections.OrderedDict([(k.lower(), k) for k in collections.OrderedDict.keys(self)])
+        if len(args) == 0:
+            return
+        elif len(args) == 1 and isinstance(args[0], dict):
+            for k in args[0]:
+                self[k] = args[0][k]
+        else:
+            raise Exception("CaselessDict may only be instantiated with a single dict.")
+
+    # def keys(self):
+    # return self.keyMap.values()
+
+    def __setitem__(self, key, val):
+        kl = key.lower()
+        if kl in self.keyMap:
+            collections.OrderedDict.__setitem__(self, self.keyMap[kl], val)
+        else:
+            collections.OrderedDict.__setitem__(self, key, val)
+            self.keyMap[kl] = key
+
+    def __getitem__(self, key):
+        kl = key.lower()
+        if kl not in self.keyMap:
+            raise KeyError(key)
+        return collections.OrderedDict.__getitem__(self, self.keyMap[kl])
+
+    def __contains__(self, key):
+        return key.lower() in self.keyMap
+
+    def update(self, d):
+        for k, v in d.items():
+            self[k] = v
+
+    def copy(self):
+        return CaselessDict(collections.OrderedDict.copy(self))
+
+    def __delitem__(self, key):
+        kl = key.lower()
+        if kl not in self.keyMap:
+            raise KeyError(key)
+        collections.OrderedDict.__delitem__(self, self.keyMap[kl])
+        del self.keyMap[kl]
+
+    def __deepcopy__(self, memo):
+        raise Exception("deepcopy not implemented")
+
+    def clear(self):
+        collections.OrderedDict.clear(self)
+        self.keyMap.clear()
+
+
 ## Template methods
 def wrapMethod(methodName):
     return lambda self, *a, **k: getattr(self._data_, methodName)(*a, **k)
@@ -7,67 +7,11 @@ import acq4.util.DataManager
 import acq4.util.debug as debug
 from acq4 import Manager
 from acq4.util import DataManager, functions
+from acq4.util.advancedTypes import CaselessDict
 from acq4.util.database.database import SqliteDatabase, parseColumnDefs, TableData
 from pyqtgraph.widgets.ProgressDialog import ProgressDialog
 
 
-class CaselessDict(OrderedDict):
-    """Case-insensitive dict. Values can be set and retrieved using keys of any case.
-    Note that when iterating, the original case is returned for each key."""
-
-    def __init__(self, *args):
-        OrderedDict.__init__(self, {})  ## requirement for the empty {} here seems to be a python bug?
-        self.keyMap = OrderedDict([(k.lower(), k) for k in OrderedDict.keys(self)])
-        if len(args) == 0:
-            return
-        elif len(args) == 1 and isinstance(args[0], dict):
-            for k in args[0]:
-                self[k] = args[0][k]
-        else:
-            raise Exception("CaselessDict may only be instantiated with a single dict.")
-
-    # def keys(self):
-    # return self.keyMap.values()
-
-    def __setitem__(self, key, val):
-        kl = key.lower()
-        if kl in self.keyMap:
-            OrderedDict.__setitem__(self, self.keyMap[kl], val)
-        else:
-            OrderedDict.__setitem__(self, key, val)
-            self.keyMap[kl] = key
-
-    def __getitem__(self, key):
-        kl = key.lower()
-        if kl not in self.keyMap:
-            raise KeyError(key)
-        return OrderedDict.__getitem__(self, self.keyMap[kl])
-
-    def __contains__(self, key):
-        return key.lower() in self.keyMap
-
-    def update(self, d):
-        for k, v in d.items():
-            self[k] = v
-
-    def copy(self):
-        return CaselessDict(OrderedDict.copy(self))
-
-    def __delitem__(self, key):
-        kl = key.lower()
-        if kl not in self.keyMap:
-            raise KeyError(key)
-        OrderedDict.__delitem__(self, self.keyMap[kl])
-        del self.keyMap[kl]
-
-    def __deepcopy__(self, memo):
-        raise Exception("deepcopy not implemented")
-
-    def clear(self):
-        OrderedDict.clear(self)
-        self.keyMap.clear()
-
-
 class AnalysisDatabase(SqliteDatabase):
     """Defines the structure for DBs used for analysis. Essential features are:
      - a table of control parameters "DbParameters"
@@ -90,7 +34,8 @@ class AnalysisDatabase(SqliteDatabase):
     Version = '1'
 
 
-    def __init__(self, dbFile, dataModel, baseDir=None):
+    def __init__(self, dbFile, dataModel, baseDir=None, wal=None):
+        """*wal* sets the journal mode of the database file; see SqliteDatabase."""
         create = False
         self.tableConfigCache = None
         self.columnConfigCache = CaselessDict()
@@ -106,7 +51,7 @@ class AnalysisDatabase(SqliteDatabase):
         
         if not create:
             ## load DB and check version before initializing
-            db = SqliteDatabase(dbFile)
+            db = SqliteDatabase(dbFile, wal=False)
             if not db.hasTable('DbParameters'):
                 raise Exception("Invalid analysis database -- no DbParameters table.")
             recs = db.select('DbParameters', ['Value'], where={'Param': 'DB Version'})
@@ -119,7 +64,7 @@ class AnalysisDatabase(SqliteDatabase):
             if version != AnalysisDatabase.Version:
                 self._convertDB(dbFile, version)
         
-        SqliteDatabase.__init__(self, dbFile)
+        SqliteDatabase.__init__(self, dbFile, wal=wal)
         self.file = dbFile
         
         if create:
@@ -762,23 +707,23 @@ class AnalysisDatabase(SqliteDatabase):
             raise Exception("Can not describe data of type '%s'" % type(data))
         return columns
 
-    def select(self, table, columns='*', where=None, sql='', toDict=True, toArray=False, distinct=False, limit=None, offset=None):
+    def select(self, table, columns='*', where=None, sql='', toDict=True, toArray=False, distinct=False, limit=None, offset=None, lazyBlobs=False):
         """Extends select to convert directory/file columns back into Dir/FileHandles. If the file doesn't exist, you will still get a handle, but it may not be the correct type."""
         prof = debug.Profiler("AnalysisDatabase.select()", disabled=True)
         
-        data = SqliteDatabase.select(self, table, columns, where=where, sql=sql, distinct=distinct, limit=limit, offset=offset, toDict=True, toArray=False)
-        data = TableData(data)
+        q = SqliteDatabase.select(self, table, columns, where=where, sql=sql, distinct=distinct, limit=limit, offset=offset, toDict=False, toArray=False)
+        data = self._queryToColumns(q, lazyBlobs=lazyBlobs and toArray)
         prof.mark("got data from SQliteDatabase")
         
         config = self.getColumnConfig(table)
         
-        ## convert file/dir handles
+        ## convert file/dir handles; each distinct value is only looked up once
         for column, conf in config.items():
-            if column not in data.columnNames():
+            if column not in data:
                 continue
             
             if conf.get('Type', '').startswith('directory'):
-                rids = set([d[column] for d in data])
+                rids = set(data[column])
                 linkTable = conf['Link']
                 handles = dict([(rid, self.getDir(linkTable, rid)) for rid in rids if rid is not None])
                 handles[None] = None
@@ -795,14 +740,17 @@ class AnalysisDatabase(SqliteDatabase):
                             sep = '/'
                         name = name.replace(sep, os.sep) ## make sure file handles have an operating-system-appropriate separator (/ for Unix, \ for Windows)
                         return self.baseDir()[name]
-                data[column] = list(map(getHandle, data[column]))
+                handles = {name: getHandle(name) for name in set(data[column])}
+                data[column] = list(map(handles.get, data[column]))
                 
         prof.mark("converted file/dir handles")
                 
-        ret = data.originalData()
         if toArray:
-            ret = data.toArray()
+            ret = self._columnsToArray(data)
             prof.mark("converted data to array")
+        else:
+            names = list(data.keys())
+            ret = [OrderedDict(zip(names, rec)) for rec in zip(*data.values())]
         prof.finish()
         return ret
     
@@ -816,10 +764,26 @@ class AnalysisDatabase(SqliteDatabase):
         #if batch is False:
             #raise Exception("AnalysisDatabase only implements batch mode.")
 
-        #links = self.listTableLinks(table)
-        config = self.getColumnConfig(table)
+        data = TableData(data).copy()  ## have to copy here since we might be changing some values
+        self._convertHandleColumns(table, data)
+        newData = SqliteDatabase._prepareData(self, table, data, ignoreUnknownColumns, batch)
         
+        return newData
+
+    def _prepareColumns(self, table, data, ignoreUnknownColumns=False):
+        """
+        Extends SqliteDatabase._prepareColumns() to convert Dir/FileHandles, as in _prepareData().
+        """
+        if isinstance(data, np.ndarray):
+            data = OrderedDict([(k, data[k]) for k in data.dtype.names])
         data = TableData(data).copy()  ## have to copy here since we might be changing some values
+        self._convertHandleColumns(table, data)
+        return SqliteDatabase._prepareColumns(self, table, data.originalData(), ignoreUnknownColumns)
+
+    def _convertHandleColumns(self, table, data):
+        ## Replace DirHandles with their rowids and FileHandles with file names in TableData *data*
+        #links = self.listTableLinks(table)
+        config = self.getColumnConfig(table)
         dataCols = set(data.columnNames())
         for colName, colConf in config.items():
             if colName not in dataCols:
@@ -857,10 +821,6 @@ class AnalysisDatabase(SqliteDatabase):
                             print("f:", f)
                             raise
                 data[colName] = files
-
-        newData = SqliteDatabase._prepareData(self, table, data, ignoreUnknownColumns, batch)
-        
-        return newData
         
         
         
@@ -5,9 +5,8 @@ import sqlite3
 
 import numpy as np
 
-import acq4.util.advancedTypes as advancedTypes
 import acq4.util.debug as debug
-import acq4.util.functions as functions
+from acq4.util.advancedTypes import CaselessDict
 # :MC: BROKEN in python3; buffer has no analogous function, so maybe we can use a string? nope, then we don't know to
 # de-pickle the contents.
 from acq4.util.pythonVersionCompat import buffer
@@ -24,20 +23,38 @@ class SqliteDatabase:
     regardless of the type specified by its column.
     """
 
-    def __init__(self, fileName=':memory:'):
+    def __init__(self, fileName=':memory:', wal=None):
+        """
+        If *wal* is True, file databases are switched to write-ahead logging, which makes writes much
+        faster. The switch is persistent, and WAL is not supported on network filesystems, so by default
+        (wal=None) only newly created files are switched and existing files keep their journal mode.
+        Use wal=False to never switch. Databases in WAL mode use relaxed syncing.
+        """
         ## decide on an appropriate name for this connection.
         ## For file connections, the name should always be the name of the file
         ## to avoid opening more than one connection to the same file.
         if fileName != ':memory:':
             fileName = os.path.abspath(fileName)
+            if wal is None:
+                wal = not os.path.exists(fileName) or os.path.getsize(fileName) == 0
         self._connectionName = fileName
         self.db = sqlite3.connect(self._connectionName)
         self.db.row_factory = sqlite3.Row
         self.db.isolation_level = None
+        if wal and fileName != ':memory:':
+            self.db.execute('PRAGMA journal_mode=WAL')
+        if self.journalMode() == 'wal':
+            self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('PRAGMA temp_store=MEMORY')
+        self.db.execute('PRAGMA cache_size=-65536')  ## 64MB
         self.tables = None
         self._transactions = []
         self._readTableList()
 
+    def journalMode(self):
+        """Return the journal mode of the database ('delete', 'wal', 'memory', ...)."""
+        return self.db.execute('PRAGMA journal_mode').fetchone()[0].lower()
+
     def close(self):
         if self.db is None:
             return
@@ -96,7 +113,7 @@ class SqliteDatabase:
         return self.exe(*args, **kargs)
 
     def select(self, table, columns='*', where=None, sql='', toDict=True, toArray=False, distinct=False, limit=None,
-               offset=None):
+               offset=None, lazyBlobs=False):
         """
         Construct and execute a SELECT statement, returning the results.
         
@@ -112,7 +129,10 @@ class SqliteDatabase:
         offset         (int) Omit a certain number of results from the beginning of the list
         sql            Optional string to be appended to the SQL query (will be inserted before limit/offset arguments)
         toDict         If True, return a list-of-dicts (this is the default)
-        toArray        if True, return a numpy record array
+        toArray        if True, return a numpy record array. The array is built one column at a time,
+                       which is much faster than toDict for large results.
+        lazyBlobs      If True (and toArray is True), values from BLOB columns are returned as
+                       PickledValue objects that are only unpickled when their load() method is called.
         ============== ================================================================
         """
         p = debug.Profiler("SqliteDatabase.select", disabled=True)
@@ -136,7 +156,10 @@ class SqliteDatabase:
 
         cmd = "SELECT %s %s FROM %s %s %s %s %s" % (distinct, columns, table, whereStr, sql, limit, offset)
         p.mark("generated command")
-        q = self.exe(cmd, toDict=toDict, toArray=toArray)
+        if toArray:
+            q = self._columnsToArray(self._queryToColumns(self.exe(cmd, toDict=False), lazyBlobs=lazyBlobs))
+        else:
+            q = self.exe(cmd, toDict=toDict)
         p.finish()
         return q
 
@@ -205,8 +228,10 @@ class SqliteDatabase:
         ret = []
 
         with self.transaction():
-            ## Rememember that _prepareData may change the number of columns!
-            records = TableData(self._prepareData(table, records, ignoreUnknownColumns=ignoreExtraColumns, batch=True))
+            ## Rememember that _prepareColumns may change the number of columns!
+            ## Values are converted one column at a time and bound by position, which avoids building
+            ## a dict for every record.
+            records = self._prepareColumns(table, records, ignoreUnknownColumns=ignoreExtraColumns)
             p.mark("prepared data")
 
             columns = list(records.keys())
@@ -215,22 +240,22 @@ class SqliteDatabase:
                 insert += " OR REPLACE"
             # print "Insert:", columns
             cmd = "%s INTO %s (%s) VALUES (%s)" % (
-            insert, table, quoteList(columns), ','.join([':' + f for f in columns]))
+            insert, table, quoteList(columns), ','.join(['?'] * len(columns)))
 
-            numRecs = len(records)
+            numRecs = len(records[columns[0]]) if len(columns) > 0 else 0
             if chunkAll:  ## insert all records in one go.
-                self.exe(cmd, records, batch=True)
+                self.db.executemany(cmd, zip(*records.values()))
                 yield (numRecs, numRecs)
                 return
 
             chunkSize = int(chunkSize)  ## just make sure
             offset = 0
             i = 0
-            while offset < len(records):
+            while offset < numRecs:
                 # print len(columns), len(records[0]), len(self.tableSchema(table))
-                chunk = records[offset:offset + chunkSize]
-                self.exe(cmd, chunk, batch=True)
-                offset += len(chunk)
+                chunk = [col[offset:offset + chunkSize] for col in records.values()]
+                self.db.executemany(cmd, zip(*chunk))
+                offset += len(chunk[0])
                 yield (offset, numRecs)
             p.mark("Transaction done")
 
@@ -376,25 +401,9 @@ class SqliteDatabase:
         ## Returns a dict-of-lists if batch=True, otherwise list-of-dicts
         data = TableData(data)
 
-        converters = {}
-
         ## determine the conversion functions to use for each column.
         schema = self.tableSchema(table)
-        for k in schema:
-            if k in converters:
-                continue
-
-            typ = schema[k].lower()
-            if typ == 'blob':
-                converters[k] = lambda obj: buffer(pickle.dumps(obj))
-            elif typ == 'int':
-                converters[k] = int
-            elif typ == 'real':
-                converters[k] = float
-            elif typ == 'text':
-                converters[k] = str
-            else:
-                converters[k] = lambda obj: obj
+        converters = {k: self._columnConverter(schema[k]) for k in schema}
 
         if batch:
             newData = dict([(k, []) for k in data.columnNames() if not (ignoreUnknownColumns and (k not in schema))])
@@ -430,6 +439,125 @@ class SqliteDatabase:
         # print "new data:", newData
         return newData
 
+    @staticmethod
+    def _columnConverter(typ):
+        ## return the function used to convert values for storage in a column of type *typ*
+        typ = typ.lower()
+        if typ == 'blob':
+            return lambda obj: buffer(obj.data if isinstance(obj, PickledValue) else pickle.dumps(obj))
+        elif typ == 'int':
+            return int
+        elif typ == 'real':
+            return float
+        elif typ == 'text':
+            return str
+        else:
+            return lambda obj: obj
+
+    def _prepareColumns(self, table, data, ignoreUnknownColumns=False):
+        ## Column-wise version of _prepareData (internal use only).
+        ## *data* may be any format accepted by TableData; record arrays and dicts of arrays are
+        ## converted without iterating over records.
+        ## Returns an OrderedDict {column: list of values}.
+        schema = self.tableSchema(table)
+        if isinstance(data, np.ndarray):
+            data = collections.OrderedDict([(k, data[k]) for k in data.dtype.names])
+        else:
+            data = TableData(data)
+            if data.mode != 'dict':
+                data = collections.OrderedDict([(k, data[k]) for k in data.columnNames()])
+            else:
+                data = data.originalData()
+
+        columns = collections.OrderedDict()
+        for k, vals in data.items():
+            if k not in schema:
+                if ignoreUnknownColumns:
+                    continue
+                if k.lower() != 'rowid':
+                    raise Exception("Column '%s' not present in table '%s'" % (k, table))
+                columns[k] = vals.tolist() if isinstance(vals, np.ndarray) else list(vals)
+                continue
+
+            typ = schema[k].lower()
+            if isinstance(vals, np.ndarray) and vals.dtype.kind in 'biuf':
+                ## fast path: convert the whole column at once
+                if typ == 'real':
+                    columns[k] = vals.astype(float).tolist()
+                    continue
+                elif typ == 'int' and (vals.dtype.kind != 'f' or np.all(np.isfinite(vals))):
+                    columns[k] = vals.astype(np.int64).tolist()
+                    continue
+                elif typ not in ('int', 'text', 'blob'):
+                    columns[k] = vals.tolist()
+                    continue
+
+            convert = self._columnConverter(typ)
+            newVals = []
+            for v in vals:
+                if v is None:
+                    newVals.append(None)
+                    continue
+                try:
+                    newVals.append(convert(v))
+                except:
+                    newVals.append(v)
+                    print("Warning: Setting %s column %s.%s with type %s" % (schema[k], table, k, str(type(v))))
+            columns[k] = newVals
+
+        ## all columns must have the same length; dicts of lists may be ragged
+        n = max([len(v) for v in columns.values()] + [0])
+        for k, v in columns.items():
+            if len(v) < n:
+                v.extend([None] * (n - len(v)))
+        return columns
+
+    def _queryToColumns(self, q, lazyBlobs=False):
+        ## Return an OrderedDict {column: list of values} containing all results of the query.
+        ## Pickled BLOB values are unpickled (or wrapped in PickledValue if lazyBlobs is True).
+        if q.description is None:
+            return collections.OrderedDict()
+        names = [d[0] for d in q.description]
+        q.row_factory = None  ## plain tuples are much faster to fetch than sqlite3.Row
+        rows = q.fetchall()
+        columns = collections.OrderedDict()
+        for i, vals in enumerate(zip(*rows) if len(rows) > 0 else [()] * len(names)):
+            if not set(map(type, vals)).isdisjoint((bytes, buffer)):
+                if lazyBlobs:
+                    vals = [PickledValue(v) if isinstance(v, (bytes, buffer)) else v for v in vals]
+                else:
+                    vals = [pickle.loads(v) if isinstance(v, (bytes, buffer)) else v for v in vals]
+            columns[names[i]] = list(vals)
+        return columns
+
+    def _columnsToArray(self, columns):
+        ## Convert an OrderedDict of columns into a record array.
+        ## Columns containing only floats (and None) become float, only ints become int, and everything else
+        ## becomes object.
+        if len(columns) == 0 or len(next(iter(columns.values()))) == 0:
+            # return np.array([])  ## need to return empty array *with correct columns*, but this is very difficult, so just return None
+            return None
+        dtype = []
+        for k, vals in columns.items():
+            types = set(map(type, vals))
+            if types <= {float, int, type(None)} and float in types:
+                dtype.append((k, float))
+            elif types == {int}:
+                dtype.append((k, int))
+            else:
+                dtype.append((k, object))
+        arr = np.empty(len(next(iter(columns.values()))), dtype=dtype)
+        for k, t in dtype:
+            if t is float:
+                arr[k] = [np.nan if v is None else v for v in columns[k]]
+            elif t is object:
+                col = np.empty(len(arr), dtype=object)
+                col[:] = columns[k]
+                arr[k] = col
+            else:
+                arr[k] = columns[k]
+        return arr
+
     def _queryToDict(self, q):
         prof = debug.Profiler("_queryToDict", disabled=True)
         res = []
@@ -438,22 +566,7 @@ class SqliteDatabase:
         return res
 
     def _queryToArray(self, q):
-        prof = debug.Profiler("_queryToArray", disabled=True)
-        recs = self._queryToDict(q)
-        prof.mark("got records")
-        if len(recs) < 1:
-            # return np.array([])  ## need to return empty array *with correct columns*, but this is very difficult, so just return None
-            return None
-        rec1 = recs[0]
-        dtype = functions.suggestRecordDType(rec1, singleRecord=True)
-        # print rec1, dtype
-        arr = np.empty(len(recs), dtype=dtype)
-        arr[0] = tuple(rec1.values())
-        for i in range(1, len(recs)):
-            arr[i] = tuple(recs[i].values())
-        prof.mark('converted to array')
-        prof.finish()
-        return arr
+        return self._columnsToArray(self._queryToColumns(q))
 
     def _readRecord(self, rec):
         prof = debug.Profiler("_readRecord", disabled=True)
@@ -464,8 +577,8 @@ class SqliteDatabase:
             name = names[i]
             ## Unpickle byte arrays into their original objects.
             ## (Hopefully they were stored as pickled data in the first place!)
-            if isinstance(val, buffer):
-                val = pickle.loads(str(val))
+            if isinstance(val, (bytes, buffer)):
+                val = pickle.loads(val)
             data[name] = val
         prof.finish()
         return data
@@ -473,10 +586,10 @@ class SqliteDatabase:
     def _readTableList(self):
         """Reads the schema for each table, extracting the column names and types."""
         names = self("select name from sqlite_master where type='table' or type='view'")
-        tables = advancedTypes.CaselessDict()
+        tables = CaselessDict()
         for table in names:
             table = table['name']
-            columns = advancedTypes.CaselessDict()
+            columns = CaselessDict()
             recs = self('PRAGMA table_info(%s)' % table)
             for rec in recs:
                 columns[rec['name']] = rec['type']
@@ -485,6 +598,24 @@ class SqliteDatabase:
         self.tables = tables
 
 
+class PickledValue:
+    """A pickled value read from a BLOB column (see SqliteDatabase.select(lazyBlobs=True)).
+
+    Call load() to unpickle the value. Storing a PickledValue into a BLOB column writes the original
+    pickled data back without unpickling it.
+    """
+    __slots__ = ['data']
+
+    def __init__(self, data):
+        self.data = data
+
+    def load(self):
+        return pickle.loads(self.data)
+
+    def __repr__(self):
+        return "<PickledValue %d bytes>" % len(self.data)
+
+
 def quoteList(strns):
     """Given a list of strings, return a single string like '"string1", "string2",...'
         Note: in SQLite, double quotes are for escaping table and column names; 
@@ -562,10 +693,15 @@ class TableData:
         else:
             raise Exception("Cannot create TableData from object '%s' (type='%s')" % (str(data), type(data)))
 
-        for fn in ['__getitem__', '__setitem__']:
-            setattr(self, fn, getattr(self, '_TableData' + fn + self.mode))
         self.copy = getattr(self, 'copy_' + self.mode)
 
+    ## special methods are looked up on the class, so these dispatch to the implementation for self.mode
+    def __getitem__(self, arg):
+        return getattr(self, '_TableData__getitem__' + self.mode)(arg)
+
+    def __setitem__(self, arg, val):
+        return getattr(self, '_TableData__setitem__' + self.mode)(arg, val)
+
     def originalData(self):
         return self.data
 
@@ -85,3 +85,64 @@ def testBatchInsert():
     
     for i, row in enumerate(db.iterSelect('t', limit=1)):
         assert tuple(row[0].values()) == tuple(data[i])
+
+
+def testColumnarInsert():
+    db = SqliteDatabase()
+    db("create table 't' ('int' int, 'real' real, 'text' text, 'blob' blob)")
+
+    data = {
+        'int': np.arange(1000),
+        'real': np.linspace(0, 1, 1000),
+        'text': ['row%d' % i for i in range(1000)],
+        'blob': [None if i % 2 else {'i': i} for i in range(1000)],
+    }
+    for n, nmax in db.iterInsert('t', data, chunkSize=300):
+        assert nmax == 1000
+    assert n == 1000
+
+    result = db.select('t', toArray=True)
+    assert result.dtype['int'] == int and result.dtype['real'] == float
+    assert np.all(result['int'] == data['int'])
+    assert np.all(result['real'] == data['real'])
+    assert list(result['text']) == data['text']
+    assert list(result['blob']) == data['blob']
+
+    ## lazily loaded blobs are written back without being unpickled
+    lazy = db.select('t', toArray=True, lazyBlobs=True)
+    assert lazy['blob'][0].load() == {'i': 0}
+    db('delete from t')
+    db.insert('t', lazy)
+    assert list(db.select('t', toArray=True)['blob']) == data['blob']
+
+
+def testJournalMode():
+    import shutil, sqlite3, tempfile
+    tmp = tempfile.mkdtemp()
+    try:
+        ## new files use write-ahead logging
+        db = SqliteDatabase(os.path.join(tmp, 'new.sqlite'))
+        assert db.journalMode() == 'wal'
+        db.close()
+
+        ## existing files keep their journal mode unless asked to switch
+        fileName = os.path.join(tmp, 'old.sqlite')
+        conn = sqlite3.connect(fileName)
+        conn.execute("create table 't' ('int' int)")
+        conn.commit()
+        conn.close()
+        db = SqliteDatabase(fileName)
+        assert db.journalMode() == 'delete'
+        db.close()
+        db = SqliteDatabase(fileName, wal=False)
+        assert db.journalMode() == 'delete'
+        db.close()
+        db = SqliteDatabase(fileName, wal=True)
+        assert db.journalMode() == 'wal'
+        db.close()
+
+        db = SqliteDatabase(os.path.join(tmp, 'nowal.sqlite'), wal=False)
+        assert db.journalMode() == 'delete'
+        db.close()
+    finally:
+        shutil.rmtree(tmp)
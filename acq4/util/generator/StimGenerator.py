@@ -9,6 +9,8 @@ entering python code used to generate waveforms. Functions available
 for evaluation are provided in waveforms.py.
 """
 
+import functools
+import threading
 from collections import OrderedDict
 
 import numpy as np
@@ -18,12 +20,104 @@ import types
 
 import pyqtgraph.units as units
 from acq4.util import Qt
+from acq4.util.Mutex import Mutex
 from . import waveforms
 from .SeqParamSet import SequenceParamSet
 from .StimParamSet import StimParamSet
 
 Ui_Form = Qt.importTemplate('.GeneratorTemplate')
 
+## functions provided in waveforms module; these are made available to generator functions
+WAVE_FUNCTIONS = {name: obj for name, obj in vars(waveforms).items() if type(obj) is types.FunctionType}
+
+_MISSING = object()
+
+
+@functools.lru_cache(maxsize=64)
+def compileFunction(fn):
+    """Compile a generator function string.
+
+    Returns (code, isExpression). Expressions are evaluated with eval(); anything else is
+    treated as the body of a function whose return value is stored in 'output' by exec().
+    """
+    try:  # first try eval() without line breaks for backward compatibility
+        return compile(fn.replace('\n', ''), '<stimulus>', 'eval'), True
+    except SyntaxError:  # next try exec() as contents of a function
+        code = "def fn():\n" + "\n".join(["    "+l for l in fn.split('\n')]) + "\noutput=fn()\n"
+        try:
+            return compile(code, '<stimulus>', 'exec'), False
+        except SyntaxError as err:
+            err.lineno -= 1
+            raise err
+
+
+class WaveformCache(object):
+    """Thread-safe LRU cache of generated waveforms, limited to *maxBytes* of array data.
+
+    clear() increments *generation*; set() may be given the generation a value was computed in
+    so that results from a background thread started before the cache was cleared are dropped.
+    wait() lets one thread wait for a value being generated by another.
+    """
+    def __init__(self, maxBytes=256 * 1024**2):
+        self.maxBytes = maxBytes
+        self.generation = 0
+        self._data = OrderedDict()
+        self._size = 0
+        self._lock = Mutex()
+        self._changed = threading.Condition()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self._data:
+                self._size -= self._nbytes(self._data.pop(key))
+            self._data[key] = value
+            self._size += self._nbytes(value)
+            while self._size > self.maxBytes and len(self._data) > 1:
+                self._size -= self._nbytes(self._data.popitem(last=False)[1])
+        with self._changed:
+            self._changed.notify_all()
+
+    def wait(self, key, thread, default=None):
+        """Return the value for *key*, waiting for it to be set as long as *thread* is running.
+        Returns *default* if the thread finishes without setting it.
+        """
+        with self._changed:
+            while thread.is_alive():
+                value = self.get(key, _MISSING)
+                if value is not _MISSING:
+                    return value
+                ## thread exits without notifying; poll so we notice
+                self._changed.wait(0.05)
+        return self.get(key, default)
+
+    def nbytes(self):
+        """Return the total size of the cached arrays."""
+        with self._lock:
+            return self._size
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+            self.generation += 1
+
+    @staticmethod
+    def _nbytes(value):
+        return getattr(value, 'nbytes', 0)
+
 
 class StimGenerator(Qt.QWidget):
     
@@ -46,9 +140,9 @@ class StimGenerator(Qt.QWidget):
         
         self.pSpace = None    ## cached sequence parameter space
         
-        self.cache = {}       ## cached waveforms
-        self.cacheRate = None
-        self.cacheNPts = None
+        self.cache = WaveformCache()  ## cached waveforms
+        self._namespace = None        ## cached evaluation namespace (units, extra params, numpy)
+        self._pregenerating = None    ## (thread, keys) of the last pregenerate() call
         
         self.meta = {  ## holds some extra information about signals (units, expected scale and range, etc)
                        ## mostly information useful in configuring SpinBoxes
@@ -122,7 +216,8 @@ class StimGenerator(Qt.QWidget):
         self.stimParams.setMeta(axis, self.meta[axis])
 
     def clearCache(self):
-        self.cache = {}
+        self.cache.clear()
+        self._namespace = None
     
     def functionString(self):
         return str(self.ui.functionText.toPlainText())
@@ -310,13 +405,56 @@ class StimGenerator(Qt.QWidget):
         ## d should look like: { 'param1': [val1, val2, ...],  ...  }
         return d
         
-    def flatParamSpace(self):
-        """return a list of every point in the parameter space"""
+    def flatParamSpace(self, rate=None, nPts=None):
+        """return a list of every point in the parameter space
+
+        If *rate* and *nPts* are given, the waveforms for all points are also generated and
+        cached in a background thread (see pregenerate()).
+        """
         l = self.listSequences()
-        shape = tuple(l.values())
+        shape = tuple(len(v) for v in l.values())
         ar = np.ones(shape)
-        return np.argwhere(ar)
-        
+        points = np.argwhere(ar)
+        if rate is not None and nPts is not None:
+            names = list(l.keys())
+            self.pregenerate(rate, nPts, [dict(zip(names, map(int, p))) for p in points])
+        return points
+
+    def pregenerate(self, rate, nPts, paramList):
+        """Generate the waveforms for each of the parameter dicts in *paramList* in a background
+        thread, so that later calls to getSingle() return immediately.
+
+        Generation stops early if the cache is cleared (eg. because the function or parameters
+        changed), or after as many waveforms as the cache can hold. Meanwhile, getSingle() waits
+        for waveforms that are still queued here rather than generating them a second time.
+        Errors are not reported here; they are raised when the affected waveform is requested
+        with getSingle(). Returns the started thread.
+        """
+        fn = self.functionString()
+        seq = self.paramSpace()
+        ns = self.namespace()
+        offset = self.offset
+        generation = self.cache.generation
+        paramList = paramList[:max(1, self.cache.maxBytes // max(1, nPts * 8))]
+        keys = [self._cacheKey(fn, seq, rate, nPts, params) for params in paramList]
+
+        def run():
+            for key, params in zip(keys, paramList):
+                if self.cache.generation != generation:
+                    return
+                if key in self.cache:
+                    continue
+                try:
+                    ret, message = self._generate(fn, seq, ns, offset, rate, nPts, params)
+                except Exception:
+                    return
+                self.cache.set(key, ret, generation)
+
+        thread = threading.Thread(target=run, name="StimGenerator.pregenerate", daemon=True)
+        self._pregenerating = (thread, set(keys))
+        thread.start()
+        return thread
+
     def setError(self, msg=None):
         if msg is None or msg == '':
             self.ui.errorText.setText('')
@@ -336,31 +474,53 @@ class StimGenerator(Qt.QWidget):
         """
         if params is None:
             params = {}
-            
-        if self.cacheRate != rate or self.cacheNPts != nPts:
-            self.clearCache()
-            
-        paramKey = tuple(params.items())
-        if paramKey in self.cache:
-            return self.cache[paramKey]
-            
-        self.cacheRate = rate
-        self.cacheNPts = nPts
-            
-        ## create namespace with generator functions. 
-        ##   - iterates over all functions provided in waveforms module
-        ##   - wrap each function to automatically provide rate and nPts arguments
-        ns = {}
-        #arg = {'rate': rate * self.timeScale, 'nPts': nPts}
+
+        fn = self.functionString()
+        seq = self.paramSpace() # -- this is where the Laser bug was happening -- seq becomes 'Pulse_sum', but params was {'power.Pulse_sum': x}, so the default value is always used instead (fixed by removing 'power.' before the params are sent to stimGenerator, but perhaps there is a better place to fix this)
+        key = self._cacheKey(fn, seq, rate, nPts, params)
+        ret = self.cache.get(key, _MISSING)
+        if ret is _MISSING and self._pregenerating is not None and key in self._pregenerating[1]:
+            ret = self.cache.wait(key, self._pregenerating[0], _MISSING)
+        if ret is not _MISSING:
+            return ret
+
+        generation = self.cache.generation
+        ret, message = self._generate(fn, seq, self.namespace(), self.offset, rate, nPts, params)
+        self.setError(message)
+        self.cache.set(key, ret, generation)
+        return ret
+
+    def namespace(self):
+        """Return the namespace shared by all evaluations of the generator function: units,
+        extra parameters (see setEvalNames) and numpy.
+        """
+        if self._namespace is None:
+            ns = {}
+            ns.update(units.allUnits)
+            ns.update(self.extraParams)
+            ns['np'] = np
+            self._namespace = ns
+        return self._namespace
+
+    @staticmethod
+    def _cacheKey(fn, seq, rate, nPts, params):
+        ## only sequence parameters affect the output; other keys in params are ignored
+        return (fn, rate, nPts, tuple(params.get(k) for k in seq))
+
+    @staticmethod
+    def _generate(fn, seq, baseNs, offset, rate, nPts, params):
+        """Evaluate generator function *fn* and return (waveform, message).
+
+        Does not touch any widgets, so it may be called from a background thread.
+        """
+        ## create namespace with generator functions.
+        ##   - wrap each function in waveforms to automatically provide rate and nPts arguments
         arg = {'rate': rate, 'nPts': nPts}
-        ns.update(arg)  ## copy rate and nPts to eval namespace
-        for i in dir(waveforms):
-            obj = getattr(waveforms, i)
-            if type(obj) is types.FunctionType:
-                ns[i] = self.makeWaveFunction(i, arg)
-        
+        ns = dict(arg)  ## copy rate and nPts to eval namespace
+        for name, func in WAVE_FUNCTIONS.items():
+            ns[name] = functools.partial(func, arg)
+
         ## add current sequence parameter values into namespace
-        seq = self.paramSpace() # -- this is where the Laser bug was happening -- seq becomes 'Pulse_sum', but params was {'power.Pulse_sum': x}, so the default value is always used instead (fixed by removing 'power.' before the params are sent to stimGenerator, but perhaps there is a better place to fix this)
         for k in seq:
             if k in params:  ## select correct value from sequence list
                 try:
@@ -371,62 +531,26 @@ class StimGenerator(Qt.QWidget):
             else:  ## just use single value
                 ns[k] = float(seq[k][0])
 
-        ## add units into namespace
-        ns.update(units.allUnits)
-        
-        ## add extra parameters to namespace
-        ns.update(self.extraParams)
+        ## add units, extra parameters and numpy
+        ns.update(baseNs)
 
         ## evaluate and return
-        fn = self.functionString()
-        
-        ## build global namespace with numpy imported
-        #gns = {}
-        ns['np'] = np
-        
-        #print "function: '%s'" % fn
         if fn.strip() == '':
             ret = np.zeros(nPts)
         else:
-            try:  # first try eval() without line breaks for backward compatibility
-                ret = eval(fn.replace('\n', ''), ns, {})
-            except SyntaxError:  # next try exec() as contents of a function
-                try:
-                    run = "\noutput=fn()\n"
-                    code = "def fn():\n" + "\n".join(["    "+l for l in fn.split('\n')]) + run
-                    #print "--- Code: ---"
-                    #print code
-                    #print "-------------"
-                    lns = {}
-                    exec(code, ns, lns)
-                    ret = lns['output']
-                except SyntaxError as err:
-                    err.lineno -= 1
-                    raise err
-                
-            
+            code, isExpression = compileFunction(fn)
+            if isExpression:
+                ret = eval(code, ns, {})
+            else:
+                exec(code, ns)
+                ret = ns['output']
+
         if isinstance(ret, np.ndarray):
-            #ret *= self.scale
-            ret += self.offset
-            #print "===eval===", ret.min(), ret.max(), self.scale
+            ret += offset
         elif ret is not None:
             raise TypeError("Function must return ndarray or None.")
-        
-        if 'message' in arg:
-            self.setError(arg['message'])
-        else:
-            self.setError()
-            
-        self.cache[paramKey] = ret
-        return ret
-        
-    def makeWaveFunction(self, name, arg):
-        ## Creates a copy of a wave function (such as steps or pulses) with the first parameter filled in
-        ## Must be in its own function so that obj is properly scoped to the lambda function.
-        obj = getattr(waveforms, name)
-        return lambda *args, **kwargs: obj(arg, *args, **kwargs)
-        
 
+        return ret, arg.get('message')
 
 
 ## Old sequence parsing functions for backward compatibility:
@@ -129,6 +129,14 @@ class BgSubtractCtrl(Qt.QWidget):
             self._cachedDeferredSave = do_save
         return self._cachedDeferredSave
 
+    def processingOptions(self) -> dict:
+        """Return the background frame and the subtract / divide options, as accepted by DisplayEngine.process()."""
+        return {
+            "background": self.getBackgroundFrame(),
+            "subtract": self.ui.subtractBgBtn.isChecked(),
+            "divide": self.ui.divideBgBtn.isChecked(),
+        }
+
     def processImage(self, data: np.ndarray) -> np.ndarray:
         return remove_background_from_image(
             data,
@@ -1,6 +1,7 @@
 import numpy as np
 
 from acq4.util import Qt
+from .display_engine import DisplayEngine
 
 Ui_Form = Qt.importTemplate(".contrast_ctrl_template")
 
@@ -121,29 +122,20 @@ class ContrastCtrl(Qt.QWidget):
         # Note that histogram is linked to image item; this is what determines
         # the final appearance of the image.
 
+        if not self.useAutoGain:
+            return
+        self.updateWithStats(*DisplayEngine.measure(data))
+
+    def updateWithStats(self, minVal, maxVal, centerMin, centerMax) -> None:
+        """Update auto gain given the range of values in the whole image and in its center.
+
+        Thread safe; this is used when the image range has already been measured (see DisplayEngine).
+        """
         if not self.useAutoGain:
             return
         cw = self.centerAutoGainWeight
-        (w, h) = data.shape
-        center = data[w // 2 - w // 6 : w // 2 + w // 6, h // 2 - h // 6 : h // 2 + h // 6]
-
-        reduced = data
-        while reduced.size > 2 ** 16:
-            ax = np.argmax(reduced.shape)
-            sl = [slice(None, None)] * data.ndim
-            sl[ax] = slice(None, None, 2)
-            reduced = reduced[tuple(sl)]
-
-        minVal = reduced.min() * (1.0 - cw) + center.min() * cw
-        maxVal = reduced.max() * (1.0 - cw) + center.max() * cw
-
-        # If there is inf/nan in the image, strip it out before computing min/max
-        if any([np.isnan(minVal), np.isinf(minVal), np.isnan(minVal), np.isinf(minVal)]):
-            nanMask = np.isnan(reduced)
-            infMask = np.isinf(reduced)
-            valid = reduced[~nanMask * ~infMask]
-            minVal = valid.min() * (1.0 - cw) + center.min() * cw
-            maxVal = valid.max() * (1.0 - cw) + center.max() * cw
+        minVal = minVal * (1.0 - cw) + centerMin * cw
+        maxVal = maxVal * (1.0 - cw) + centerMax * cw
 
         # Smooth min/max range to avoid noise
         if self.lastMinMax is None:
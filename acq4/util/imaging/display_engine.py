@@ -0,0 +1,91 @@
+from typing import Optional
+
+import numpy as np
+
+from acq4.util.Mutex import Mutex
+
+
+class DisplayEngine:
+    """Prepares live camera frames for display.
+
+    Frames are displayed at (approximately) screen resolution: rather than processing every sensor
+    pixel, process() works on a strided view of the frame that is decimated by an integer factor
+    (see setDecimation). Background subtraction or division is done in a single pass from that view
+    into an output array, and the range needed for auto gain is measured on the (usually much
+    smaller) result.
+
+    Each processed image is written to a newly allocated array, never one that was returned
+    earlier: the GUI may still be drawing a previous image while the next frame is processed.
+    """
+
+    def __init__(self):
+        self.decimation = 1
+        self.lock = Mutex()
+
+    def setDecimation(self, step):
+        """Set the integer factor by which frames are decimated in both dimensions."""
+        self.decimation = max(1, int(step))
+
+    @staticmethod
+    def decimationForPixelSize(pixelSize):
+        """Return the decimation that gives about one image pixel per screen pixel, given the
+        number of (full resolution) image pixels per screen pixel along each axis.
+        """
+        return max(1, int(min(pixelSize)))
+
+    def process(self, data: np.ndarray, background: Optional[np.ndarray] = None, subtract=False, divide=False):
+        """Return (image, decimation, stats) for displaying *data*.
+
+        *image* is the frame decimated by *decimation*, with the background subtracted or divided
+        out if requested. If there is nothing to do, it is *data* itself (frame data is never
+        modified in place).
+        *stats* is (min, max, centerMin, centerMax), measured over the whole image and over its
+        central third, ignoring non-finite values.
+        """
+        with self.lock:
+            step = self.decimation
+            src = data[::step, ::step] if step > 1 else data
+            if background is not None and background.shape != data.shape:
+                background = None  # stale background from a different frame size
+            if background is not None and (divide or subtract):
+                bg = background[::step, ::step] if step > 1 else background
+                out = np.empty(src.shape, dtype=np.result_type(src.dtype, bg.dtype, np.float32))
+                if divide:
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        np.divide(src, bg, out=out)
+                else:
+                    np.subtract(src, bg, out=out)
+            elif step > 1:
+                out = np.ascontiguousarray(src)
+            else:
+                out = data
+            return out, step, self.measure(out)
+
+    @staticmethod
+    def measure(image, maxSamples=2 ** 16):
+        """Return (min, max, centerMin, centerMax) of *image*, ignoring non-finite values.
+
+        The whole-image range is estimated from a strided subsample of at most *maxSamples* pixels.
+        """
+        w, h = image.shape[:2]
+        center = image[w // 2 - w // 6: w // 2 + w // 6, h // 2 - h // 6: h // 2 + h // 6]
+        reduced = image
+        while reduced.size > maxSamples:
+            sl = [slice(None)] * image.ndim
+            sl[np.argmax(reduced.shape)] = slice(None, None, 2)
+            reduced = reduced[tuple(sl)]
+        return _finiteRange(reduced) + _finiteRange(center)
+
+
+def _finiteRange(data):
+    if data.size == 0:
+        return (0, 0)
+    mn = data.min()
+    mx = data.max()
+    if data.dtype.kind == 'f' and not (np.isfinite(mn) and np.isfinite(mx)):
+        valid = data[np.isfinite(data)]
+        if valid.size == 0:
+            return (0, 0)
+        mn = valid.min()
+        mx = valid.max()
+    return (mn, mx)
@@ -170,10 +170,9 @@ class Frame:
         if bg_removal is not None:
             self._bg_removal = dh[bg_removal]
 
-    def imageItem(self) -> ImageItem:
-        """
-        Return an ImageItem suitable for pinning. This can apply background removal and contrast control if those
-        were saved with the frame (see loadLinkedFiles).
+    def displayImage(self) -> np.ndarray:
+        """Return the image data with background removal applied, if it was saved with the frame
+        (see loadLinkedFiles).
         """
         data = self.getImage()
         if self._bg_removal is not None:
@@ -184,6 +183,14 @@ class Frame:
                 subtract=bg_info.get("subtract"),
                 divide=bg_info.get("divide"),
             )
+        return data
+
+    def imageItem(self) -> ImageItem:
+        """
+        Return an ImageItem suitable for pinning. This can apply background removal and contrast control if those
+        were saved with the frame (see loadLinkedFiles).
+        """
+        data = self.displayImage()
         levels = None
         lut = None
         contrast = self.info().get("contrastInfo", None)
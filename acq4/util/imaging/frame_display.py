@@ -1,3 +1,5 @@
+import threading
+
 import pyqtgraph as pg
 from acq4.util import Qt, ptime
 from acq4.util.cuda import shouldUseCuda, cupy
@@ -5,6 +7,52 @@ from acq4.util.debug import printExc
 from pyqtgraph.debug import Profiler
 from .bg_subtract_ctrl import BgSubtractCtrl
 from .contrast_ctrl import ContrastCtrl
+from .display_engine import DisplayEngine
+
+
+class DisplayImageItem(pg.ImageItem):
+    """ImageItem that displays decimated frames.
+
+    Transforms given to setTransform() map full-resolution frame pixels into the parent, as usual;
+    the scaling needed to display a decimated image in the same place is applied beneath them.
+    """
+
+    sigViewChanged = Qt.Signal()
+
+    def __init__(self):
+        pg.ImageItem.__init__(self)
+        self._decimation = 1
+        self._baseTransform = Qt.QTransform()
+        # empty child whose coordinates are full-resolution frame pixels (see getArrayRegion)
+        self._fullResItem = pg.ImageItem()
+        self._fullResItem.setParentItem(self)
+
+    def decimation(self):
+        return self._decimation
+
+    def setDecimation(self, step):
+        if step != self._decimation:
+            self._decimation = step
+            self.setTransform(self._baseTransform)
+            self._fullResItem.setTransform(Qt.QTransform.fromScale(1.0 / step, 1.0 / step))
+
+    def setTransform(self, tr, combine=False):
+        if combine:
+            tr = tr * self._baseTransform
+        self._baseTransform = Qt.QTransform(tr)
+        pg.ImageItem.setTransform(self, Qt.QTransform.fromScale(self._decimation, self._decimation) * tr)
+
+    def getArrayRegion(self, roi, data, axes=(0, 1), **kwds):
+        """Return the region of full-resolution frame *data* selected by *roi*.
+
+        Like roi.getArrayRegion(data, self), but correct when the image is displayed decimated: the
+        ROI is mapped into full-resolution pixel coordinates rather than those of the displayed image.
+        """
+        return roi.getArrayRegion(data, self._fullResItem, axes, **kwds)
+
+    def viewTransformChanged(self):
+        pg.ImageItem.viewTransformChanged(self)
+        self.sigViewChanged.emit()
 
 
 class FrameDisplay(Qt.QObject):
@@ -15,6 +63,9 @@ class FrameDisplay(Qt.QObject):
     * frame rate limiting
     * contrast control widget
     * background subtraction control widget
+    * optional display at screen resolution (decimate=True): frames are decimated to about one
+      pixel per screen pixel before background removal and auto gain. Code that samples frame
+      data through the image item must then use DisplayImageItem.getArrayRegion.
     """
 
     # Allow subclasses to override these:
@@ -22,16 +73,19 @@ class FrameDisplay(Qt.QObject):
     bgSubtractClass = BgSubtractCtrl
 
     imageUpdated = Qt.Signal(object)  # emits frame when the image is redrawn
-    sigDrawNewFrame = Qt.Signal(object)  # frame
+    sigDrawNewFrame = Qt.Signal(object, object)  # (image data, decimation)
 
-    def __init__(self, maxFPS=30):
+    def __init__(self, maxFPS=30, decimate=False):
         Qt.QObject.__init__(self)
 
         self._maxFPS = maxFPS
         self._sPerFrame = 1.0 / maxFPS
         self._msPerFrame = int(self._sPerFrame * 1000)
-        self._imageItem = pg.ImageItem()  # Implicitly depends on global setConfigOption state
+        self._imageItem = DisplayImageItem()  # Implicitly depends on global setConfigOption state
         self._imageItem.setAutoDownsample(True)
+        self._decimate = decimate
+        self.displayEngine = DisplayEngine()
+        self._imageItem.sigViewChanged.connect(self._updateDecimation)
         self.contrastCtrl = self.contrastClass()
         self.contrastCtrl.setImageItem(self._imageItem)
         self.bgCtrl = self.bgSubtractClass()
@@ -43,6 +97,10 @@ class FrameDisplay(Qt.QObject):
         self.lastDrawTime = None
         self.displayFps = None
         self.hasQuit = False
+        # set to False when checkForDraw is called separately for each new frame (eg. as a parallel camera
+        # frame processor; see CameraInterface)
+        self.drawOnNewFrame = True
+        self._drawLock = threading.Lock()
 
         # Check for new frame updates every 16ms
         # Some checks may be skipped even if there is a new frame waiting to avoid drawing more than
@@ -87,13 +145,23 @@ class FrameDisplay(Qt.QObject):
         # integrate new frame into background
         self.bgCtrl.includeNewFrame(frame)
         # possibly draw the frame and update auto gain (rate limited)
-        self.checkForDraw(frame)
+        if self.drawOnNewFrame:
+            self.checkForDraw(frame)
         # annotate frame with background and contrast info
         frame.addInfo(backgroundInfo=self.bgCtrl.deferredSave(), contrastInfo=self.contrastCtrl.saveState())
 
     def checkForDraw(self, frame=None):
         if self.hasQuit:
             return
+        if not self._drawLock.acquire(blocking=False):
+            # another thread is already preparing a frame for display
+            return
+        try:
+            self._checkForDraw(frame)
+        finally:
+            self._drawLock.release()
+
+    def _checkForDraw(self, frame):
         try:
             # If we last drew a frame < 1/30s ago, return.
             t = ptime.time()
@@ -117,21 +185,21 @@ class FrameDisplay(Qt.QObject):
             data = self.currentFrame.getImage()
             prof()
 
-            # divide the background out of the current frame if needed
-            data = self.bgCtrl.processImage(data)
+            # decimate to screen resolution and divide the background out in a single pass
+            data, decimation, stats = self.displayEngine.process(data, **self.bgCtrl.processingOptions())
             prof()
 
             # Set new levels if auto gain is enabled
-            self.contrastCtrl.updateWithImage(data)
+            self.contrastCtrl.updateWithStats(*stats)
             prof()
 
-            self.sigDrawNewFrame.emit(data)
+            self.sigDrawNewFrame.emit(data, decimation)
             prof.finish()
 
         except Exception:
             printExc("Error while drawing new frames:")
 
-    def _drawFrameInGui(self, data):
+    def _drawFrameInGui(self, data, decimation):
         # We will now draw a new frame (even if the frame is unchanged)
         t = ptime.time()
         if (self.lastDrawTime is not None) and (t - self.lastDrawTime < self._sPerFrame):
@@ -140,12 +208,35 @@ class FrameDisplay(Qt.QObject):
             fps = 1.0 / (t - self.lastDrawTime)
             self.displayFps = fps
         self.lastDrawTime = t
+        self._imageItem.setDecimation(decimation)
         if shouldUseCuda():
             self._imageItem.updateImage(cupy.asarray(data))
         else:
-            self._imageItem.updateImage(data.copy())
+            # no copy needed: neither frame data nor DisplayEngine output arrays are modified after this
+            self._imageItem.updateImage(data)
 
         self.imageUpdated.emit(self.currentFrame)
+        self._updateDecimation()
+
+    def _updateDecimation(self):
+        # Choose the decimation that gives about one displayed pixel per screen pixel
+        if not self._decimate or self._imageItem is None:
+            return
+        item = self._imageItem
+        o = item.mapToDevice(Qt.QPointF(0, 0))
+        x = item.mapToDevice(Qt.QPointF(1, 0))
+        y = item.mapToDevice(Qt.QPointF(0, 1))
+        if o is None or x is None or y is None:
+            return
+        w = pg.Point(x - o).length()
+        h = pg.Point(y - o).length()
+        if w == 0 or h == 0:
+            return
+        # item coordinates are decimated pixels; convert to full-resolution pixels per screen pixel
+        step = self.displayEngine.decimationForPixelSize((item.decimation() / w, item.decimation() / h))
+        if step != self.displayEngine.decimation:
+            self.displayEngine.setDecimation(step)
+            self._updateFrame = True  # redraw at the new resolution
 
     def quit(self):
         self._imageItem = None
@@ -17,7 +17,8 @@ class ImagingCtrl(Qt.QWidget):
     * Save frame, pin frame
     * Record stack
     * FPS display
-    * Internal FrameDisplay that handles rendering the image.
+    * Internal FrameDisplay that handles rendering the image (at screen resolution if
+      *decimate* is True; see FrameDisplay).
     * Contrast controls
     * Background subtraction controls
 
@@ -44,10 +45,10 @@ class ImagingCtrl(Qt.QWidget):
 
     frameDisplayClass = FrameDisplay  # let subclasses override this class
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, decimate=False):
         Qt.QWidget.__init__(self, parent)
 
-        self.frameDisplay = self.frameDisplayClass()
+        self.frameDisplay = self.frameDisplayClass(decimate=decimate)
 
         self.pinnedFrames = []
         self.stackShape = None
@@ -140,7 +141,10 @@ class ImagingCtrl(Qt.QWidget):
 
         self.recordThread.newFrame(frame)
         if self.ui.recordStackBtn.isChecked():
-            self.ui.stackSizeLabel.setText("%d frames" % self.recordThread.stackSize)
+            text = "%d frames" % self.recordThread.stackSize
+            if self.recordThread.droppedFrames > 0:
+                text += " (%d dropped)" % self.recordThread.droppedFrames
+            self.ui.stackSizeLabel.setText(text)
 
         self.frameDisplay.newFrame(frame)
         self.sigUpdateUi.emit()
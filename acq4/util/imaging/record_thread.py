@@ -1,13 +1,13 @@
+import threading
 from typing import Callable, Optional
 
+import h5py
 import numpy as np
-import time
 from MetaArray import MetaArray
 
 from acq4 import Manager
 from acq4.util import Qt
 from acq4.util import debug
-from acq4.util.Mutex import Mutex
 from acq4.util.Thread import Thread
 
 try:
@@ -19,13 +19,19 @@ except ImportError:
 
 
 class RecordThread(Thread):
-    """Class for offloading image recording to a worker thread."""
+    """Class for offloading image recording to a worker thread.
+
+    Frames to be recorded are held in a bounded queue; the worker thread is woken as soon as frames
+    arrive. If frames arrive faster than they can be written and the queue fills up, newFrame()
+    waits up to *blockTimeout* seconds for space (back-pressure) and then drops the frame. Dropped
+    frames are counted in droppedFrames and recorded in the stack's meta-info.
+    """
 
     sigRecordingFailed = Qt.Signal()
     sigRecordingFinished = Qt.Signal(object, object)  # file handle, num frames
     sigSavedFrame = Qt.Signal(object)
 
-    def __init__(self, ui):
+    def __init__(self, ui, maxQueueBytes=1e9, blockTimeout=0.0, chunkFrames=1):
         Thread.__init__(self)
         self.m = Manager.getManager()
 
@@ -34,13 +40,18 @@ class RecordThread(Thread):
         self._recording = False
         self.currentFrame = None
         self.frameLimit = None
+        self.maxQueueBytes = maxQueueBytes
+        self.blockTimeout = blockTimeout
+        self.chunkFrames = chunkFrames
 
         # Interaction with worker thread:
-        self.lock = Mutex(Qt.QMutex.Recursive)
+        self.lock = threading.Condition(threading.RLock())
         self.newFrames = []  # list of frames and the files they should be sored / appended to.
+        self._queuedBytes = 0  # total size of stack frames waiting in newFrames
+        self._droppedFrames = 0  # number of frames dropped from the current stack
 
         # Attributes private to worker thread:
-        self.currentStack = None  # file handle of currently recorded stack
+        self.currentStack = None  # StackWriter for the currently recorded stack
         self.startFrameTime = None
         self.lastFrameTime = None
         self.currentFrameNum = 0
@@ -56,6 +67,8 @@ class RecordThread(Thread):
 
         self.frameLimit = frameLimit
         self._stackSize = 0
+        with self.lock:
+            self._droppedFrames = 0
         self._recording = True
 
     def stopRecording(self):
@@ -66,7 +79,8 @@ class RecordThread(Thread):
         self._stackSize = 0
         self._recording = False
         with self.lock:
-            self.newFrames.append(False)
+            self.newFrames.append({'stop': True, 'droppedFrames': self._droppedFrames})
+            self.lock.notify_all()
 
     @property
     def recording(self):
@@ -85,6 +99,7 @@ class RecordThread(Thread):
                     'stack': False,
                 }
             )
+            self.lock.notify_all()
 
     def newFrame(self, frame=None):
         """Inform the recording thread that a new frame has arrived.
@@ -97,7 +112,14 @@ class RecordThread(Thread):
         self.currentFrame = frame
         with self.lock:
             if self.recording:
-                self.newFrames.append({'frame': self.currentFrame, 'dir': self.m.getCurrentDir(), 'stack': True})
+                nbytes = frame.getImage().nbytes
+                if not self.lock.wait_for(self._hasQueueSpace, timeout=self.blockTimeout):
+                    self._droppedFrames += 1
+                else:
+                    self.newFrames.append(
+                        {'frame': self.currentFrame, 'dir': self.m.getCurrentDir(), 'stack': True, 'nbytes': nbytes})
+                    self._queuedBytes += nbytes
+                    self.lock.notify_all()
                 self._stackSize += 1
             framesLeft = len(self.newFrames)
         if self.recording and self.frameLimit is not None and self._stackSize >= self.frameLimit:
@@ -105,6 +127,9 @@ class RecordThread(Thread):
             self.stopRecording()
         return framesLeft
 
+    def _hasQueueSpace(self):
+        return self._queuedBytes < self.maxQueueBytes or self.stopThread
+
     @property
     def stackSize(self):
         """The total number of frames requested for storage in the current
@@ -112,6 +137,11 @@ class RecordThread(Thread):
         """
         return self._stackSize
 
+    @property
+    def droppedFrames(self):
+        """The number of frames in the current stack that were dropped because the write queue was full."""
+        return self._droppedFrames
+
     def quit(self):
         """Stop the recording thread.
 
@@ -120,57 +150,62 @@ class RecordThread(Thread):
         with self.lock:
             self.stopThread = True
             self.newFrames = []
+            self._queuedBytes = 0
             self.currentFrame = None
+            self.lock.notify_all()
 
     def run(self):
         # run is invoked in the worker thread automatically after calling start()
-        while True:
-            with self.lock:
-                if self.stopThread:
-                    break
-                newFrames = self.newFrames[:]
-                self.newFrames = []
+        try:
+            while True:
+                with self.lock:
+                    self.lock.wait_for(lambda: self.stopThread or len(self.newFrames) > 0)
+                    if self.stopThread:
+                        break
+                    newFrames = self.newFrames
+                    self.newFrames = []
 
-            try:
-                self.handleFrames(newFrames)
-            except Exception:
-                debug.printExc("Error in image recording thread:")
-                self.sigRecordingFailed.emit()
-
-            time.sleep(100e-3)
+                try:
+                    self.handleFrames(newFrames)
+                except Exception:
+                    debug.printExc("Error in image recording thread:")
+                    self._abortStack()
+                    with self.lock:
+                        # frames in the failed batch were never written; release their queue space
+                        self._queuedBytes = sum(f.get('nbytes', 0) for f in self.newFrames)
+                        self.lock.notify_all()
+                    self.sigRecordingFailed.emit()
+        finally:
+            self._abortStack()
 
     def handleFrames(self, frames):
         # Write as many frames into the stack as possible.
-        # If False appears in the list of frames, it indicates the end of a stack
+        # A 'stop' item in the list of frames indicates the end of a stack
         # and any further frames are written to a new stack.
-
-        recFrames = []
         for frame in frames:
-            if frame is False:
+            if frame.get('stop', False):
                 # stop current recording
-                if len(recFrames) > 0:
-                    # write prior frames now
-                    self.writeFrames(recFrames, dh)
-                    recFrames = []
-
                 if self.currentStack is not None:
                     dur = self.lastFrameTime - self.startFrameTime
                     if dur > 0:
                         fps = (self.currentFrameNum + 1) / dur
                     else:
                         fps = 0
-                    self.currentStack.setInfo({'frames': self.currentFrameNum, 'duration': dur, 'averageFPS': fps})
-                    self.sigRecordingFinished.emit(self.currentStack, self.currentFrameNum)
+                    fh = self.currentStack.close()
+                    fh.setInfo({
+                        'frames': self.currentFrameNum,
+                        'duration': dur,
+                        'averageFPS': fps,
+                        'droppedFrames': frame['droppedFrames'],
+                    })
+                    self.sigRecordingFinished.emit(fh, self.currentFrameNum)
                     self.currentStack = None
                     self.currentFrameNum = 0
                 continue
 
-            data = frame['frame'].getImage()
-            info = frame['frame'].info()
             dh = frame['dir']
-            stack = frame['stack']
 
-            if stack is False:
+            if frame['stack'] is False:
                 # Store single frame to new file
                 try:
                     fileName = 'image.tif' if HAVE_IMAGEFILE else 'image.ma'
@@ -181,39 +216,91 @@ class RecordThread(Thread):
                     raise
                 continue
 
-            else:
-                # Store frame to current (or new) stack
-                recFrames.append((data, info))
+            # Store frame to current (or new) stack
+            try:
+                info = frame['frame'].info()
+                self.writeFrames([(frame['frame'].getImage(), info)], dh)
                 self.lastFrameTime = info['time']
-
-        if len(recFrames) > 0:
-            self.writeFrames(recFrames, dh)
-            self.currentFrameNum += len(recFrames)
+                self.currentFrameNum += 1
+            finally:
+                with self.lock:
+                    self._queuedBytes -= frame['nbytes']
+                    self.lock.notify_all()
 
     def writeFrames(self, frames, dh):
-        newRec = self.currentStack is None
-
-        if newRec:
-            self.startFrameTime = frames[0][1]['time']
+        for data, info in frames:
+            if self.currentStack is None:
+                self.startFrameTime = info['time']
+                self.currentStack = StackWriter(dh, data, info, chunkFrames=self.chunkFrames)
+            else:
+                self.currentStack.write(data, info)
 
-        times = [f[1]['time'] for f in frames]
-        translations = np.array([f[1]['transform'].getTranslation() for f in frames])
-        arrayInfo = [
+    def _abortStack(self):
+        # close the file for a stack that could not be completed
+        if self.currentStack is not None:
+            try:
+                self.currentStack.close()
+            except Exception:
+                debug.printExc("Error closing image stack:")
+            self.currentStack = None
+            self.currentFrameNum = 0
+
+
+class StackWriter:
+    """Writes a video stack to a MetaArray file that stays open until the stack is closed.
+
+    The file is created with the first frame, then the 'data' dataset and its Time axis values are
+    preallocated in blocks of *growFrames* frames and filled in place, one frame at a time, directly
+    from each image buffer. *chunkFrames* sets how many frames share an HDF5 chunk. The datasets are
+    trimmed to the number of frames actually written when the stack is closed.
+    """
+
+    def __init__(self, dh, data, info, chunkFrames=1, growFrames=256):
+        self.startTime = info['time']
+        self.growFrames = growFrames
+        data = np.ascontiguousarray(data)
+        chunks = (chunkFrames,) + data.shape
+        ma = MetaArray(data[np.newaxis, ...], info=[
             {
                 'name': 'Time',
-                'values': np.array(times) - self.startFrameTime,
+                'values': np.array([0.0]),
                 'units': 's',
-                'translation': translations,
+                'translation': self._translation(info)[np.newaxis, :],
             },
             {'name': 'X'},
             {'name': 'Y'},
-        ]
-        imgs = [f[0][np.newaxis, ...] for f in frames]
-
-        data = MetaArray(np.concatenate(imgs, axis=0), info=arrayInfo)
-        if newRec:
-            self.currentStack = dh.writeFile(
-                data, 'video', autoIncrement=True, info=frames[0][1], appendAxis='Time', appendKeys=['translation']
-            )
-        else:
-            data.write(self.currentStack.name(), appendAxis='Time', appendKeys=['translation'])
+        ])
+        self.fileHandle = dh.writeFile(
+            ma, 'video', autoIncrement=True, info=info, appendAxis='Time', appendKeys=['translation'], chunks=chunks
+        )
+        # keep enough chunk cache to hold a partially-written chunk
+        cacheBytes = max(1024 ** 2, 2 * chunkFrames * data.nbytes)
+        self._file = h5py.File(self.fileHandle.name(), 'r+', rdcc_nbytes=cacheBytes)
+        self._data = self._file['data']
+        self._times = self._file['info/0/values']
+        self._translations = self._file['info/0/translation']
+        self.count = 1
+
+    @staticmethod
+    def _translation(info):
+        return np.asarray(info['transform'].getTranslation(), dtype=float)
+
+    def write(self, data, info):
+        """Append one frame to the stack."""
+        if self.count == len(self._data):
+            n = self.count + self.growFrames
+            for ds in (self._data, self._times, self._translations):
+                ds.resize(n, axis=0)
+        self._data.write_direct(np.ascontiguousarray(data), dest_sel=np.s_[self.count])
+        self._times[self.count] = info['time'] - self.startTime
+        self._translations[self.count] = self._translation(info)
+        self.count += 1
+
+    def close(self):
+        """Trim the preallocated datasets, close the file and return its file handle."""
+        if self._file is not None:
+            for ds in (self._data, self._times, self._translations):
+                ds.resize(self.count, axis=0)
+            self._file.close()
+            self._file = None
+        return self.fileHandle
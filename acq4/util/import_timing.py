@@ -0,0 +1,116 @@
+"""
+Measure the time spent importing each module, like ``python -X importtime``, but from within a running process
+so that the report can be produced on request (see the --import-times option of ``python -m acq4``).
+
+ImportTimer installs itself at the front of sys.meta_path and times the execution of every module imported while
+it is installed. The time for a module includes the modules it imports (cumulative), and self time excludes them.
+"""
+import sys
+import threading
+import time
+
+
+class _TimedLoader:
+    """Wraps a module loader to time exec_module."""
+
+    def __init__(self, timer, loader):
+        self._timer = timer
+        self._loader = loader
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._timer._enter(module.__name__)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._timer._exit(module.__name__)
+            ## don't leave the wrapper attached to the module
+            if getattr(module, '__loader__', None) is self:
+                module.__loader__ = self._loader
+            if getattr(module.__spec__, 'loader', None) is self:
+                module.__spec__.loader = self._loader
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+
+class ImportTimer:
+    """Record the import time of each module imported while installed.
+
+    Can be used as a context manager::
+
+        with ImportTimer() as timer:
+            import somepackage
+        print(timer.report())
+
+    Only imports made from the thread that installed the timer are recorded.
+    """
+
+    def __init__(self):
+        self.records = []  # (name, selfTime, cumulativeTime, depth) in the order imports finish
+        self._stack = []
+        self._thread = None
+        self._finding = False
+
+    def install(self):
+        self._thread = threading.get_ident()
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, *args):
+        self.uninstall()
+
+    def find_spec(self, name, path=None, target=None):
+        if self._finding or threading.get_ident() != self._thread:
+            return None
+        ## ask the remaining finders, then wrap the loader of whatever they found
+        self._finding = True
+        try:
+            for finder in sys.meta_path[sys.meta_path.index(self) + 1:]:
+                findSpec = getattr(finder, 'find_spec', None)
+                if findSpec is None:
+                    continue
+                spec = findSpec(name, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._finding = False
+        if spec.loader is None or not hasattr(spec.loader, 'exec_module'):
+            return spec
+        spec.loader = _TimedLoader(self, spec.loader)
+        return spec
+
+    def _enter(self, name):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def _exit(self, name):
+        name, start, childTime = self._stack.pop()
+        cumulative = time.perf_counter() - start
+        if len(self._stack) > 0:
+            self._stack[-1][2] += cumulative
+        self.records.append((name, cumulative - childTime, cumulative, len(self._stack)))
+
+    def totalTime(self):
+        """Return the total time spent in top-level imports."""
+        return sum(r[2] for r in self.records if r[3] == 0)
+
+    def report(self, limit=40, sort='cumulative'):
+        """Return a table of the *limit* slowest imports, sorted by 'cumulative' or 'self' time."""
+        col = 2 if sort == 'cumulative' else 1
+        records = sorted(self.records, key=lambda r: r[col], reverse=True)[:limit]
+        lines = [f"Import times: {len(self.records)} modules, {self.totalTime():0.2f} s total",
+                 f"{'self [ms]':>10} | {'cumulative [ms]':>15} | module"]
+        for name, selfTime, cumulative, depth in records:
+            lines.append(f"{selfTime * 1e3:>10.1f} | {cumulative * 1e3:>15.1f} | {name}")
+        return "\n".join(lines)
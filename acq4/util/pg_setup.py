@@ -1,9 +1,10 @@
-from scipy.signal import butter, lfilter, sosfilt
-
 import pyqtgraph as pg
 
 
 def butter_transform(x, y, order, cutoff):
+    # scipy.signal is slow to import; only load it if the filter is used
+    from scipy.signal import butter, sosfilt
+
     sample_rate = (len(x) - 1) / (x[-1] - x[0])
     sos = butter(order, cutoff, fs=sample_rate, btype="low", analog=False, output="sos")
     return x, sosfilt(sos, y)
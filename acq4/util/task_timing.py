@@ -0,0 +1,167 @@
+"""
+Timing instrumentation for Manager tasks.
+
+Each run of a Manager.Task produces a TaskTiming record that lists how long was spent in every
+stage of the run (reserving devices, configuring and starting each device, waiting for the task to
+finish, stopping, collecting results, storing data, ...). Finished records are collected by a
+TaskTimingStats instance owned by the Manager, which keeps a rolling history that can be summarized,
+histogrammed, or exported.
+"""
+import csv
+import json
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from acq4.util.Mutex import Mutex
+
+
+class TaskTiming:
+    """Timing record for a single run of a Manager task.
+
+    Call mark() at the end of each stage; the time elapsed since the previous mark (or since the
+    record was created) is attributed to that stage. Stages that apply to a single device are
+    marked with the device name.
+    """
+
+    def __init__(self, taskId, devices=()):
+        self.taskId = taskId
+        self.devices = list(devices)
+        self.startTime = time.time()  # wall-clock time, for reference only
+        self.stages = []  # list of (stage, device, duration)
+        self.error = None
+        self.finished = False
+        self._start = self._last = time.perf_counter()
+
+    def mark(self, stage, device=None):
+        """Record the time elapsed since the last mark as belonging to *stage*."""
+        now = time.perf_counter()
+        self.stages.append((stage, device, now - self._last))
+        self._last = now
+
+    def finish(self, error=None):
+        """Close the record. *error* may describe why the task did not complete; an error already
+        recorded (for example the exception that caused the task to be aborted) is kept.
+        """
+        if error is not None and self.error is None:
+            self.error = error
+        self.finished = True
+
+    def duration(self):
+        """Total time covered by the record (up to the last mark)."""
+        return self._last - self._start
+
+    def total(self, stage, device=None):
+        """Return the time spent in *stage*, summed over all devices unless *device* is given."""
+        return sum(dt for s, d, dt in self.stages if s == stage and (device is None or d == device))
+
+    def byDevice(self):
+        """Return {device: total time} for all device-specific stages."""
+        times = OrderedDict()
+        for stage, dev, dt in self.stages:
+            if dev is not None:
+                times[dev] = times.get(dev, 0.0) + dt
+        return times
+
+    def saveState(self):
+        return {
+            'taskId': self.taskId,
+            'startTime': self.startTime,
+            'duration': self.duration(),
+            'error': self.error,
+            'stages': [{'stage': s, 'device': d, 'duration': dt} for s, d, dt in self.stages],
+        }
+
+    def __repr__(self):
+        stages = ", ".join(f"{s if d is None else s + ' ' + d}={dt * 1000:0.1f}ms" for s, d, dt in self.stages)
+        return f"<TaskTiming task={self.taskId} {stages}>"
+
+
+class TaskTimingStats:
+    """Rolling history of TaskTiming records.
+
+    Keeps the most recent *maxRecords* records and provides summary statistics and histograms of
+    the time spent in each (stage, device) pair. Thread-safe; records are usually added from task
+    threads while being read from the GUI.
+    """
+
+    def __init__(self, maxRecords=1000):
+        self.lock = Mutex(recursive=True)
+        self.records = deque(maxlen=maxRecords)
+
+    def setMaxRecords(self, n):
+        with self.lock:
+            self.records = deque(self.records, maxlen=n)
+
+    def add(self, record):
+        with self.lock:
+            self.records.append(record)
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+
+    def __len__(self):
+        return len(self.records)
+
+    def durations(self):
+        """Return an ordered dict mapping (stage, device) to an array of the durations recorded for
+        that stage, one value per task in which it occurred.
+        """
+        with self.lock:
+            records = list(self.records)
+        times = OrderedDict()
+        for rec in records:
+            perTask = OrderedDict()
+            for stage, dev, dt in rec.stages:
+                perTask[(stage, dev)] = perTask.get((stage, dev), 0.0) + dt
+            for key, dt in perTask.items():
+                times.setdefault(key, []).append(dt)
+            times.setdefault(('total', None), []).append(rec.duration())
+        return OrderedDict((k, np.array(v)) for k, v in times.items())
+
+    def summary(self):
+        """Return a list of dicts (one per stage/device) with the count, mean, median, 95th
+        percentile and maximum durations, sorted by decreasing mean.
+        """
+        rows = []
+        for (stage, dev), dt in self.durations().items():
+            rows.append({
+                'stage': stage,
+                'device': dev,
+                'count': len(dt),
+                'mean': float(dt.mean()),
+                'median': float(np.median(dt)),
+                'p95': float(np.percentile(dt, 95)),
+                'max': float(dt.max()),
+            })
+        rows.sort(key=lambda r: r['mean'], reverse=True)
+        return rows
+
+    def histogram(self, stage, device=None, bins=50):
+        """Return (counts, binEdges) for the durations of *stage* / *device*."""
+        dt = self.durations().get((stage, device))
+        if dt is None or len(dt) == 0:
+            return np.zeros(0, dtype=int), np.zeros(0)
+        return np.histogram(dt, bins=bins)
+
+    def export(self, fileName):
+        """Write all records to *fileName*, as JSON if the name ends in .json, otherwise as CSV with
+        one row per stage.
+        """
+        with self.lock:
+            records = [rec.saveState() for rec in self.records]
+        if fileName.endswith('.json'):
+            with open(fileName, 'w') as fh:
+                json.dump(records, fh, indent=2)
+            return
+        with open(fileName, 'w', newline='') as fh:
+            writer = csv.writer(fh)
+            writer.writerow(['taskId', 'startTime', 'stage', 'device', 'duration', 'error'])
+            for rec in records:
+                for st in rec['stages']:
+                    writer.writerow([
+                        rec['taskId'], rec['startTime'], st['stage'], st['device'] or '', st['duration'],
+                        rec['error'] or ''
+                    ])
@@ -0,0 +1,84 @@
+import pytest
+
+import pyqtgraph as pg
+from pyqtgraph.flowchart import Flowchart
+from pyqtgraph.multiprocess import CanceledError
+
+import acq4.util.flowchart  # noqa: F401  registers acq4's flowchart node types
+from acq4.analysis.tools.BatchProcessor import BatchProcessor, detectAndAnalyze
+
+app = pg.mkQApp()
+
+
+def makeCharts():
+    """Detector doubles its input (after sleeping that many ms, so items finish out of order) and
+    fails for negative inputs; analyzer returns the protocol dir it was given plus an offset."""
+    detector = Flowchart(terminals={'dataIn': {'io': 'in'}, 'events': {'io': 'out'}})
+    node = detector.createNode('PythonEval', name='detect')
+    node.setCode("""
+        import time
+        if args['input'] < 0:
+            raise ValueError("negative input %d" % args['input'])
+        time.sleep(args['input'] * 1e-3)
+        return {'output': args['input'] * 2}
+    """)
+    detector.connectTerminals(detector['dataIn'], node['input'])
+    detector.connectTerminals(node['output'], detector['events'])
+
+    analyzer = Flowchart(terminals={
+        'events': {'io': 'in'}, 'fileHandle': {'io': 'in'}, 'offset': {'io': 'in'}, 'dataOut': {'io': 'out'}})
+    node = analyzer.createNode('PythonEval', name='analyze')
+    node.addInput('fileHandle')
+    node.addInput('offset')
+    node.setCode("return {'output': (args['fileHandle'], args['input'] + args['offset'])}")
+    analyzer.connectTerminals(analyzer['events'], node['input'])
+    analyzer.connectTerminals(analyzer['fileHandle'], node['fileHandle'])
+    analyzer.connectTerminals(analyzer['offset'], node['offset'])
+    analyzer.connectTerminals(node['output'], analyzer['dataOut'])
+    return {'detector': detector, 'analyzer': analyzer}
+
+
+@pytest.fixture(scope='module')
+def processor():
+    proc = BatchProcessor(workers=2)
+    yield proc
+    proc.shutdown()
+
+
+def test_batch_order_and_failures(processor):
+    charts = makeCharts()
+    values = [40, 30, -1, 20, 10, 0, -2, 5]
+    items = [(v, f'site{i}') for i, v in enumerate(values)]
+    results = processor.run(detectAndAnalyze, items, charts, {'offset': 1}, chunkSize=1)
+
+    # results come back in the order of the items, whichever worker finished first
+    assert len(results) == len(items)
+    for (fh, dh), (ok, result) in zip(items, results):
+        if fh < 0:
+            assert not ok
+            assert f"ValueError: negative input {fh}" in result
+            # failed items are retried serially, where the same error is raised in this process
+            with pytest.raises(ValueError):
+                detectAndAnalyze(charts, {'offset': 1}, (fh, dh))
+        else:
+            assert ok
+            events, stats = result
+            assert events == {'events': fh * 2}
+            assert stats == (dh, fh * 2 + 1)
+            assert (events, stats) == detectAndAnalyze(charts, {'offset': 1}, (fh, dh))
+
+    # without an analyzer chart, no stats are computed
+    results = processor.run(detectAndAnalyze, [(3, 'a')], {'detector': charts['detector']})
+    assert results == [(True, ({'events': 6}, None))]
+
+
+def test_batch_cancel(processor, monkeypatch):
+    charts = makeCharts()
+    items = [(50, f'site{i}') for i in range(20)]
+    monkeypatch.setattr(pg.ProgressDialog, 'wasCanceled', lambda self: True)
+    with pytest.raises(CanceledError):
+        processor.run(detectAndAnalyze, items, charts, {'offset': 0}, chunkSize=1, progressDialog="Testing..")
+    monkeypatch.undo()
+
+    # the pool is still usable after a batch is canceled
+    assert processor.run(detectAndAnalyze, [(1, 'a')], charts, {'offset': 0}) == [(True, ({'events': 2}, ('a', 2)))]
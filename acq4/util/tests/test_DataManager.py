@@ -1,5 +1,6 @@
 from __future__ import print_function
 import tempfile, shutil, atexit, os
+import numpy as np
 import acq4.util.DataManager as dm
 from acq4.util.DirTreeWidget import DirTreeWidget
 import pyqtgraph as pg
@@ -75,3 +76,201 @@ def test_datamanager():
 
 
 
+
+
+def test_sqlite_index():
+    sqlRoot = tempfile.mkdtemp(dir=root)
+    dm.setIndexFormat('sqlite')
+    try:
+        rh = dm.getDirHandle(sqlRoot)
+        rh.setInfo({'test_int': 1, 'test_list': [1, 2, 3]})
+        assert os.path.isfile(os.path.join(sqlRoot, '.index.sqlite'))
+        assert rh.indexFormat() == 'sqlite'
+        assert rh.info()['test_list'] == [1, 2, 3]
+
+        d1 = rh.mkdir('subdir', info={'a': 'b'})
+        assert d1.info()['a'] == 'b'
+        assert rh.isManaged('subdir')
+        assert rh.ls() == ['subdir']
+        d1.setInfo({'c': 2})
+        assert d1.info()['a'] == 'b' and d1.info()['c'] == 2
+    finally:
+        dm.setIndexFormat('text')
+
+    # convert back to text and check that all entries survive the round trip
+    before = rh._readIndex()
+    converted = rh.migrateIndex('text', recursive=True)
+    assert sorted(converted) == sorted([sqlRoot, d1.name()])
+    assert os.path.isfile(os.path.join(sqlRoot, '.index'))
+    assert os.path.isfile(os.path.join(sqlRoot, '.index.sqlite.bak'))
+    assert rh.indexFormat() == 'text'
+    assert rh._readIndex() == before
+    assert rh.ls() == ['subdir']  # backups are hidden
+    assert d1.info()['c'] == 2
+
+
+def test_thumbnails():
+    from MetaArray import MetaArray
+    from acq4.util.DataManager import thumbnails
+
+    th = dm.getDirHandle(tempfile.mkdtemp(dir=root))
+    info = {'pixelSize': [1e-6, 1e-6], 'transform': {'pos': (1e-3, 2e-3, 0), 'scale': (1e-6, 1e-6, 1)}}
+    data = np.random.normal(100, 1, size=(5, 300, 200))
+    data[3] += 10 * ((np.indices((300, 200)) // 10).sum(axis=0) % 2)  # sharpest frame
+    stack = MetaArray(data, info=[{'name': 'Depth', 'values': np.arange(5) * 1e-6}, {'name': 'X'}, {'name': 'Y'}, {}])
+    fh = th.writeFile(stack, 'stack.ma', info)
+
+    cache = thumbnails.ThumbnailCache(th, maxSize=256, minSize=32)
+    assert cache.get(fh) is None
+    thumb = cache.build(fh)
+    assert thumb.frameIndex == 3
+    assert [l.shape for l in thumb.levels] == [(150, 100), (75, 50), (37, 25)]
+    assert thumb.scales == [2, 4, 8]
+    assert thumbnails.THUMBNAIL_DIR not in th.ls()
+
+    # cached entries are reused until the file changes
+    assert cache.get(fh).frameIndex == 3
+    frame = cache.get(fh).frame(fh)
+    origin = frame.mapFromFrameToGlobal(np.array([0., 0., 0.]))
+    assert np.allclose(origin, [1e-3, 2e-3, 3e-6])
+    assert np.allclose(frame.mapFromFrameToGlobal(np.array([1., 0., 0.])) - origin, [2e-6, 0, 0])
+    stack.write(fh.name())
+    os.utime(fh.name(), ns=(0, 0))
+    assert cache.get(fh) is None
+
+    frames = th.representativeFramesForAllImages()
+    assert len(frames) == 1 and frames[0].shape == (300, 200)
+
+
+def test_mosaic_useTiles():
+    from acq4.analysis.modules.MosaicEditor.MosaicEditor import MosaicEditor
+
+    th = dm.getDirHandle(tempfile.mkdtemp(dir=root))
+    info = {'pixelSize': [1e-6, 1e-6], 'transform': {'pos': (0, 0, 0), 'scale': (1e-6, 1e-6, 1)}}
+    large = th.writeFile(np.zeros((1100, 1200), dtype=np.uint16), 'large.ma', info)
+    small = th.writeFile(np.zeros((300, 200), dtype=np.uint16), 'small.ma', info)
+    stack = th.writeFile(np.ones((3, 1100, 1200), dtype=np.uint16), 'stack.ma', info)
+    untransformed = th.writeFile(np.zeros((1100, 1200), dtype=np.uint16), 'untransformed.ma', {'pixelSize': [1e-6, 1e-6]})
+
+    assert MosaicEditor.useTiles(large)
+    assert MosaicEditor.useTiles(large, {'name': 'large.ma'})
+    # images saved with a filter, stacks and small images keep the filter and frame controls
+    assert not MosaicEditor.useTiles(large, {'name': 'large.ma', 'filter': {}})
+    assert not MosaicEditor.useTiles(small)
+    assert not MosaicEditor.useTiles(stack)
+    assert not MosaicEditor.useTiles(untransformed)
+
+
+def test_metaarray_select():
+    from MetaArray import MetaArray
+
+    rh = dm.getDirHandle(root)
+    mh = rh.mkdir('metaarray')
+    t = np.arange(1000) * 1e-4
+    data = np.random.normal(size=(3, 1000))
+    info = [
+        {'name': 'Channel', 'cols': [{'name': 'command'}, {'name': 'primary'}, {'name': 'secondary'}]},
+        {'name': 'Time', 'values': t},
+        {},
+    ]
+    ma = MetaArray(data, info=info)
+    ma.write(os.path.join(mh.name(), 'chunked.ma'))
+    ma.write(os.path.join(mh.name(), 'contiguous.ma'), mappable=True)
+
+    for name in ['chunked.ma', 'contiguous.ma']:
+        fh = mh[name]
+        for mmap in (False, True):
+            sel = fh.read(select={'Channel': 'primary', 'Time': (0.01, 0.02)}, mmap=mmap)
+            assert np.all(sel.asarray() == data[1, 100:200])
+            assert np.allclose(sel.xvals('Time'), t[100:200])
+
+            # columns are returned in the requested order
+            sel = fh.read(select={'Channel': ['secondary', 'command']}, mmap=mmap)
+            assert sel.listColumns('Channel') == ['secondary', 'command']
+            assert np.all(sel.asarray() == data[[2, 0]])
+
+            assert np.all(fh.read(mmap=mmap).asarray() == data)
+
+    assert isinstance(mh['contiguous.ma'].read(mmap=True).asarray(), np.memmap)
+
+
+def test_readClampData():
+    from MetaArray import MetaArray
+    from acq4.analysis.dataModels import PatchEPhys
+
+    mh = dm.getDirHandle(root).mkdir('clamp', autoIncrement=True)
+    data = np.random.normal(size=(3, 1000))
+    info = [
+        {'name': 'Channel', 'cols': [{'name': 'command'}, {'name': 'primary'}, {'name': 'secondary'}]},
+        {'name': 'Time', 'values': np.arange(1000) * 1e-4},
+        {'ClampState': {'mode': 'IC'}, 'DAQ': {'primary': {'rate': 10000.}}},
+    ]
+    MetaArray(data, info=info).write(os.path.join(mh.name(), 'Clamp1.ma'))
+    fh = mh['Clamp1.ma']
+
+    clamp = PatchEPhys.readClampData(fh)
+    assert clamp.listColumns('Channel') == ['command', 'primary']
+    assert np.all(PatchEPhys.getClampPrimary(clamp).asarray() == data[1])
+    assert np.all(PatchEPhys.getClampCommand(clamp).asarray() == data[0])
+    assert PatchEPhys.getClampMode(clamp) == 'IC'
+    assert clamp.infoCopy()[2]['DAQ']['primary']['rate'] == 10000.
+    assert np.all(PatchEPhys.getClampPrimary(fh).asarray() == data[1])
+
+
+def test_log_index():
+    import pyqtgraph.configfile as configfile
+    from acq4.util.DataManager.logindex import LogWindowIndex
+
+    lh = dm.getDirHandle(tempfile.mkdtemp(dir=root))
+    for i in range(4):
+        lh.logMsg('message %d' % i, tags={'importance': i})
+    sub = lh.mkdir('sub')
+    sub.logMsg('sub message')
+    lh.logMsg('last message')
+
+    log = lh.readLog()
+    assert [e['__message__'] for e in log] == ['message 0', 'message 1', 'message 2', 'message 3', 'last message']
+    assert [e['__message__'] for e in lh.readLog(minImportance=2)] == ['message 2', 'message 3']
+    log = lh.readLog(recursive=1)
+    assert [e['__message__'] for e in log][-2:] == ['sub message', 'last message']
+    assert log[-2]['subdir'] == os.path.join('sub', '')
+    assert lh.ls() == ['sub']  # log and index files are hidden
+
+    # subdirectory logs are merged in time order, even when entries were not written in order and the
+    # parent directory has no log of its own
+    top = dm.getDirHandle(tempfile.mkdtemp(dir=root))
+    for name, stamps in [('a', [3.0, 1.0]), ('b', [2.0, 0.5])]:
+        with open(top.mkdir(name)._logFile(), 'a') as fd:
+            for t in stamps:
+                fd.write("%s\n" % repr({'__timestamp__': t, '__message__': '%s %s' % (name, t)}))
+    assert [e['__timestamp__'] for e in top.readLog(recursive=1)] == [0.5, 1.0, 2.0, 3.0]
+
+    # LogWindow log files are indexed by importance, type and directory
+    fileName = os.path.join(lh.name(), 'log.txt')
+    entries = {}
+    for i in range(20):
+        entries['LogEntry_%d' % i] = {
+            'message': 'entry %d\nsecond line' % i,
+            'timestamp': '2024-01-01T00:00:%02d+00:00' % i,
+            'importance': i % 10,
+            'msgType': ['status', 'error'][i % 2],
+            'id': i + 1,
+            'currentDir': os.path.join(lh.name(), 'sub%d' % (i % 3)),
+            'exception': None,
+        }
+    configfile.writeConfigFile(entries, fileName)
+    index = LogWindowIndex(fileName)
+    selected = index.entries(minImportance=5, msgTypes=['error'], directory=os.path.join(lh.name(), 'sub1'))
+    expected = [
+        k for k, v in entries.items()
+        if v['importance'] >= 5 and v['msgType'] == 'error' and v['currentDir'].endswith('sub1')
+    ]
+    assert [k for k, v in selected] == expected
+    assert all(v == entries[k] for k, v in selected)
+    assert index.maxEntryId() == 20
+
+    # appended entries are picked up by the next query
+    configfile.appendConfigFile({'LogEntry_20': dict(entries['LogEntry_19'], id=21)}, fileName)
+    assert len(index.entries()) == 21
+    assert index.maxEntryId() == 21
+    index.close()
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from acq4.analysis.tools.ResultCache import ResultCache, stateHash
+
+
+def test_hit_and_miss():
+    cache = ResultCache(tempfile.mkdtemp())
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'events': np.arange(5)}
+
+    key = cache.makeKey('events', ('file.ma', 1, 2), {'threshold': 3})
+    assert key not in cache
+    assert cache.get(key, 'missing') == 'missing'
+    assert np.all(cache.getOrCompute(key, compute)['events'] == np.arange(5))
+    assert key in cache
+    assert np.all(cache.getOrCompute(key, compute)['events'] == np.arange(5))
+    assert len(calls) == 1
+
+    # a change to the source file identity or to the analysis state is a different key
+    assert cache.makeKey('events', ('file.ma', 1, 3), {'threshold': 3}) not in cache
+    assert cache.makeKey('events', ('file.ma', 1, 2), {'threshold': 4}) not in cache
+
+    cache.clear()
+    assert key not in cache
+    cache.getOrCompute(key, compute)
+    assert len(calls) == 2
+
+
+def test_array_keys():
+    a = np.zeros(10000)
+    b = a.copy()
+    b[5000] = 1
+    # repr() of both arrays is the same, as numpy abbreviates large arrays
+    assert repr(a) == repr(b)
+    assert ResultCache.makeKey(a) != ResultCache.makeKey(b)
+    assert ResultCache.makeKey(a) == ResultCache.makeKey(a.copy())
+    assert ResultCache.makeKey(a) != ResultCache.makeKey(a.astype(np.float32))
+    assert ResultCache.makeKey(a) != ResultCache.makeKey(a.reshape(100, 100))
+    assert stateHash({'x': a, 'pos': (1, 2)}) == stateHash({'x': a.copy(), 'pos': (3, 4)})
+    assert stateHash({'x': a}) != stateHash({'x': b})
+
+
+def test_size_limit():
+    cache = ResultCache(tempfile.mkdtemp(), maxBytes=4000)  # room for three entries of ~1.1 kB
+    keys = [cache.makeKey(i) for i in range(4)]
+    for i, key in enumerate(keys[:3]):
+        cache.set(key, np.zeros(1000, dtype=np.uint8))
+        # make the order of use unambiguous on filesystems with coarse timestamps
+        t = time.time() - 100 + i
+        os.utime(cache._entryPath(key), (t, t))
+    assert all(key in cache for key in keys[:3])
+
+    # reading an entry makes it the most recently used
+    assert cache.get(keys[0]) is not None
+
+    cache.set(keys[3], np.zeros(1000, dtype=np.uint8))
+    assert keys[1] not in cache and keys[2] not in cache
+    assert keys[0] in cache and keys[3] in cache
+    assert cache.size() <= cache.maxBytes * 0.8
+
+    # the newest entry is kept even if it is larger than the limit
+    big = cache.makeKey('big')
+    cache.set(big, np.zeros(10000, dtype=np.uint8))
+    assert big in cache
+    assert [os.path.basename(f) for _, _, f in cache.entries()] == [big + '.pkl']
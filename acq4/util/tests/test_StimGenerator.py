@@ -0,0 +1,100 @@
+import threading
+
+import numpy as np
+
+import pyqtgraph as pg
+from acq4.util.generator.StimGenerator import StimGenerator, WaveformCache, compileFunction
+
+app = pg.mkQApp()
+
+
+def test_waveformCache():
+    cache = WaveformCache(maxBytes=3000)
+    for i in range(3):
+        cache.set(i, np.zeros(125))  # 1000 bytes each
+    assert cache.nbytes() == 3000
+    assert cache.get(0) is not None  # 0 is now the most recently used
+
+    cache.set(3, np.zeros(125))
+    assert 1 not in cache
+    assert all(i in cache for i in (0, 2, 3))
+    assert cache.nbytes() == 3000
+
+    # replacing an entry does not count it twice
+    cache.set(3, np.zeros(250))
+    assert cache.nbytes() == 3000 and 2 not in cache
+
+    # an entry larger than the budget is kept until the next one arrives
+    cache.set(4, np.zeros(1000))
+    assert cache.get(4) is not None and cache.nbytes() == 8000
+
+    # values computed before clear() are dropped
+    generation = cache.generation
+    cache.clear()
+    assert cache.nbytes() == 0 and 4 not in cache
+    cache.set(5, np.zeros(10), generation)
+    assert 5 not in cache
+    cache.set(5, np.zeros(10), cache.generation)
+    assert 5 in cache
+
+
+def test_waveformCache_wait():
+    cache = WaveformCache()
+    ready = threading.Event()
+
+    def run():
+        ready.wait()
+        cache.set('a', np.ones(3))
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    ready.set()
+    assert np.all(cache.wait('a', thread) == 1)
+    thread.join()
+    # the thread is gone and never set this key
+    assert cache.wait('b', thread, 'missing') == 'missing'
+
+
+def test_compileFunction():
+    compileFunction.cache_clear()
+    code, isExpression = compileFunction('np.ones(nPts)')
+    assert isExpression
+    assert compileFunction('np.ones(nPts)')[0] is code
+    assert compileFunction.cache_info().hits == 1
+
+    code, isExpression = compileFunction('x = 1\nreturn np.ones(nPts) * x')
+    assert not isExpression
+
+
+def test_cacheKey():
+    seq = {'amp': (1.0, [1.0, 2.0]), 'width': (2.0, [2.0, 3.0, 4.0])}
+    key = StimGenerator._cacheKey('fn', seq, 1000, 10, {'amp': 1, 'width': 0})
+    # parameters that are not sequence parameters do not affect the key
+    assert key == StimGenerator._cacheKey('fn', seq, 1000, 10, {'amp': 1, 'width': 0, 'test': True})
+    assert key != StimGenerator._cacheKey('fn', seq, 2000, 10, {'amp': 1, 'width': 0})
+    assert key != StimGenerator._cacheKey('fn', seq, 1000, 20, {'amp': 1, 'width': 0})
+    assert key != StimGenerator._cacheKey('fn', seq, 1000, 10, {'amp': 1})
+    assert key != StimGenerator._cacheKey('fn2', seq, 1000, 10, {'amp': 1, 'width': 0})
+
+
+def test_pregenerate():
+    gen = StimGenerator()
+    gen.loadState({
+        'function': 'np.ones(nPts) * amp',
+        'params': {'amp': {'default': 1.0, 'sequence': 'list', 'list': '[1, 2, 3]'}},
+        'advancedMode': True,
+    })
+    assert list(gen.listSequences()['amp']) == [1, 2, 3]
+
+    points = gen.flatParamSpace(1000, 10)
+    assert points.tolist() == [[0], [1], [2]]
+    gen._pregenerating[0].join()
+    for i in range(3):
+        wave = gen.cache.get(gen._cacheKey(gen.functionString(), gen.paramSpace(), 1000, 10, {'amp': i}))
+        assert np.all(wave == i + 1)
+        assert gen.getSingle(1000, 10, {'amp': i}) is wave
+
+    # changing the function drops waveforms pregenerated for the old one
+    gen.ui.functionText.setPlainText('np.zeros(nPts) + amp')
+    assert all(key[0] == gen.functionString() for key in gen.cache._data)
+    assert np.all(gen.getSingle(1000, 10, {'amp': 2}) == 3)
@@ -0,0 +1,27 @@
+import numpy as np
+
+from acq4.util.Canvas.items.TiledImageCanvasItem import TileCache, chooseLevel
+
+
+def test_chooseLevel():
+    scales = [1, 2, 4, 8]
+    assert chooseLevel(scales, 0.5) == 0
+    assert chooseLevel(scales, 1.0) == 0
+    assert chooseLevel(scales, 3.0) == 1
+    assert chooseLevel(scales, 100.0) == 3
+
+
+def test_tileCache():
+    cache = TileCache(maxBytes=3000)
+    for i in range(3):
+        cache.set(i, np.zeros(1000, dtype=np.uint8))
+    assert cache.get(0) is not None  # 0 is now the most recently used
+
+    cache.set(3, np.zeros(1000, dtype=np.uint8))
+    assert cache.get(1) is None
+    assert all(cache.get(i) is not None for i in (0, 2, 3))
+    assert cache.nbytes == 3000
+
+    # an entry larger than the budget is still kept until the next one arrives
+    cache.set(4, np.zeros(5000, dtype=np.uint8))
+    assert cache.get(4) is not None and cache.nbytes == 5000
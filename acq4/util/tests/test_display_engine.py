@@ -0,0 +1,93 @@
+import numpy as np
+
+from acq4.util.imaging.background import remove_background_from_image
+from acq4.util.imaging.display_engine import DisplayEngine
+
+
+def test_display_engine():
+    data = np.arange(64 * 48, dtype=np.uint16).reshape(64, 48)
+    bg = np.linspace(1, 2, data.size, dtype=np.float32).reshape(data.shape)
+    engine = DisplayEngine()
+
+    # nothing to do: frame is passed through without a copy
+    img, step, stats = engine.process(data)
+    assert img is data and step == 1
+    assert stats[:2] == (data.min(), data.max())
+
+    for subtract, divide in [(True, False), (False, True)]:
+        img, step, stats = engine.process(data, bg, subtract, divide)
+        expected = remove_background_from_image(data, bg, subtract, divide)
+        assert np.allclose(img, expected)
+        assert np.isclose(stats[0], expected.min()) and np.isclose(stats[1], expected.max())
+
+    engine.setDecimation(4)
+    img1, step, _ = engine.process(data)
+    assert step == 4 and np.array_equal(img1, data[::4, ::4])
+    img2, _, _ = engine.process(data, bg, subtract=True)
+    assert np.allclose(img2, (data - bg)[::4, ::4])
+
+    # output arrays are never reused; the display may still be drawing an earlier one
+    a, _, _ = engine.process(data)
+    b, _, _ = engine.process(data)
+    assert a is not b and not np.shares_memory(a, b)
+
+    # a background of the wrong shape is ignored; non-finite values are excluded from the range
+    img, _, _ = engine.process(data, bg[:10], subtract=True)
+    assert np.array_equal(img, data[::4, ::4])
+    zeroBg = np.zeros(data.shape, dtype=np.float32)
+    _, _, stats = engine.process(data, zeroBg, divide=True)
+    assert all(np.isfinite(stats))
+
+    assert DisplayEngine.decimationForPixelSize((0.5, 0.7)) == 1
+    assert DisplayEngine.decimationForPixelSize((2.1, 3.5)) == 2
+
+
+def test_display_image_item_roi():
+    import pyqtgraph as pg
+    from acq4.util.imaging.frame_display import DisplayImageItem
+
+    pg.mkQApp()
+    data = np.zeros((400, 300))
+    data[100:200, 50:150] = 1
+    view = pg.ViewBox()
+    img = DisplayImageItem()
+    view.addItem(img)
+    roi = pg.EllipseROI((110, 60), (80, 80))
+    view.addItem(roi)
+    results = []
+    for step in [1, 4]:
+        # ROI regions are taken from full-resolution frames, whatever the displayed decimation
+        img.setDecimation(step)
+        img.setImage(data[::step, ::step])
+        results.append(img.getArrayRegion(roi, data))
+    assert results[0].shape == (80, 80)
+    assert np.array_equal(results[0], results[1])
+    assert results[0].max() == 1
+
+
+def test_imaging_ctrl_decimate(monkeypatch):
+    import pyqtgraph as pg
+    from acq4 import Manager
+    from acq4.util.imaging import Frame, ImagingCtrl
+
+    app = pg.mkQApp()
+    monkeypatch.setattr(Manager, 'getManager', lambda: None)  # used only when recording
+    for decimate in [False, True]:
+        ctrl = ImagingCtrl(decimate=decimate)
+        try:
+            display = ctrl.frameDisplay
+            view = pg.GraphicsView()
+            vb = pg.ViewBox()
+            view.setCentralItem(vb)
+            view.resize(200, 200)
+            vb.addItem(display.imageItem())
+            vb.setRange(xRange=(0, 2000), yRange=(0, 2000), padding=0)
+            view.show()
+            app.processEvents()
+            display.newFrame(Frame(np.zeros((2000, 2000), dtype=np.uint16), {}))
+            app.processEvents()
+            # about 10 sensor pixels per screen pixel
+            assert (display.displayEngine.decimation > 1) == decimate
+            view.close()
+        finally:
+            ctrl.quit()
@@ -0,0 +1,19 @@
+import os
+
+import acq4.filetypes
+from acq4.filetypes.filetypes import BUILTIN_FILE_TYPES, getFileType, listFileTypes
+
+
+def test_builtin_file_types_match_directory():
+    path = os.path.dirname(acq4.filetypes.__file__)
+    modules = {f[:-3] for f in os.listdir(path) if f.endswith('.py')} - {'__init__', 'filetypes', 'FileType'}
+    assert set(BUILTIN_FILE_TYPES) == modules
+    for name, modName in BUILTIN_FILE_TYPES.items():
+        assert modName == f'acq4.filetypes.{name}'
+
+
+def test_listFileTypes():
+    typs = listFileTypes()
+    assert typs[:len(BUILTIN_FILE_TYPES)] == list(BUILTIN_FILE_TYPES)
+    assert len(set(typs)) == len(typs)
+    assert getFileType('MetaArray').__name__ == 'MetaArray'
@@ -0,0 +1,28 @@
+import sys
+
+from acq4.util.import_timing import ImportTimer
+
+
+def test_import_timer(tmp_path, monkeypatch):
+    (tmp_path / 'timedpkg').mkdir()
+    (tmp_path / 'timedpkg' / '__init__.py').write_text('import time\ntime.sleep(0.02)\nfrom . import child\n')
+    (tmp_path / 'timedpkg' / 'child.py').write_text('import time\ntime.sleep(0.05)\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    try:
+        with ImportTimer() as timer:
+            import timedpkg
+        assert timer not in sys.meta_path
+
+        records = {r[0]: r for r in timer.records}
+        _, selfTime, cumulative, depth = records['timedpkg']
+        assert depth == 0
+        assert records['timedpkg.child'][3] == 1
+        assert 0.02 <= selfTime < cumulative
+        assert cumulative >= records['timedpkg.child'][2] >= 0.05
+        # loaders are restored after import
+        assert not hasattr(timedpkg.__loader__, '_timer')
+        assert 'timedpkg.child' in timer.report()
+    finally:
+        sys.modules.pop('timedpkg', None)
+        sys.modules.pop('timedpkg.child', None)
@@ -0,0 +1,72 @@
+import numpy as np
+
+from acq4.analysis.tools.poissonScore import PoissonAmpScore, PoissonScore, eventCounts
+
+
+def _events(times, rng):
+    ev = np.empty(len(times), dtype=[('time', float), ('amp', float)])
+    ev['time'] = times
+    ev['amp'] = rng.normal(size=len(times))
+    return ev
+
+
+def _sites(rng, nSites=200, tMax=0.5):
+    sites = []
+    rates = []
+    for _ in range(nSites):
+        reps = rng.integers(1, 4)
+        sites.append([_events(np.sort(rng.uniform(1e-3, tMax, size=rng.integers(0, 8))), rng) for _ in range(reps)])
+        rates.append(list(rng.uniform(0.5, 20, size=reps)))
+    # sites with no events at all, with a single event, and with simultaneous events in different trials
+    sites += [[_events([], rng)], [_events([], rng), _events([], rng)], [_events([0.1], rng)],
+              [_events([], rng), _events([0.2], rng)], [_events([0.1, 0.3], rng), _events([0.1, 0.2], rng)]]
+    rates += [5.0, [2.0, 4.0], 5.0, [3.0, 1.0], 10.0]
+    return sites, rates
+
+
+def test_eventCounts():
+    assert list(eventCounts(np.array([0.3, 0.1, 0.2, 0.1]))) == [3, 1, 2, 1]
+    assert len(eventCounts(np.array([]))) == 0
+
+
+def test_scoreMany_matches_score():
+    rng = np.random.default_rng(0)
+    sites, rates = _sites(rng)
+    for cls, kwds in [(PoissonScore, {}), (PoissonAmpScore, {'ampMean': 0.0, 'ampStdev': 1.0})]:
+        for normalize in (True, False):
+            expected = np.array([cls.score(ev, r, tMax=0.5, normalize=normalize, **kwds)
+                                 for ev, r in zip(sites, rates)])
+            scores = cls.scoreMany(sites, rates, tMax=0.5, normalize=normalize, **kwds)
+            assert scores.shape == expected.shape
+            assert np.allclose(scores, expected, rtol=1e-10), (cls, normalize)
+
+    # no sites, or only empty ones
+    assert len(PoissonScore.scoreMany([], [], tMax=0.5)) == 0
+    empty = PoissonScore.scoreMany([[_events([], rng)]] * 3, [5.0] * 3, tMax=0.5)
+    assert np.allclose(empty, PoissonScore.score([_events([], rng)], 5.0, tMax=0.5))
+
+
+def _reference_mapScore(cls, x, n):
+    # one score at a time, as mapScore did before mapScores was added
+    table = cls.normalizationTable
+    nind = max(0, np.log(n) / np.log(2))
+    n1 = np.clip(int(np.floor(nind)), 0, table.shape[1] - 2)
+    mapped1 = []
+    for i in [n1, n1 + 1]:
+        norm = table[:, i]
+        ind = np.argwhere(norm[0] > x)
+        ind = len(norm[0]) - 1 if len(ind) == 0 else max(1, ind[0, 0])
+        x1, x2 = norm[0, ind - 1:ind + 1]
+        y1, y2 = norm[1, ind - 1:ind + 1]
+        s = 0.0 if x1 == x2 else (x - x1) / float(x2 - x1)
+        mapped1.append(y1 + s * (y2 - y1))
+    return mapped1[0] + (mapped1[1] - mapped1[0]) * (nind - n1)
+
+
+def test_mapScores():
+    rng = np.random.default_rng(1)
+    x = np.concatenate([[1.0, 1.0], rng.uniform(1, 1e4, size=50), 10 ** rng.uniform(4, 12, size=20)])
+    n = np.concatenate([[0.5, 1.0], 2 ** rng.uniform(-3, 10, size=70)])
+    for cls in (PoissonScore, PoissonAmpScore):
+        mapped = cls.mapScores(x, n)
+        assert np.allclose(mapped, [_reference_mapScore(cls, xi, ni) for xi, ni in zip(x, n)], rtol=1e-12)
@@ -0,0 +1,99 @@
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import pyqtgraph as pg
+import acq4.util.DataManager as dm
+from acq4 import Manager
+from acq4.util.imaging import Frame
+from acq4.util.imaging.record_thread import RecordThread
+
+app = pg.mkQApp()
+
+
+class MockManager:
+    def __init__(self):
+        self.dh = dm.getDirHandle(tempfile.mkdtemp())
+
+    def getCurrentDir(self):
+        return self.dh
+
+
+def makeFrame(i):
+    return Frame(np.full((32, 32), i, dtype=np.uint16), {'time': i * 0.01, 'transform': pg.SRTTransform3D()})
+
+
+def waitFor(condition, timeout=10.0):
+    start = time.time()
+    while not condition():
+        assert time.time() - start < timeout, "timed out"
+        time.sleep(0.01)
+
+
+def recordedStack(man):
+    # the stack's info is set once all of its frames are written
+    waitFor(lambda: 'video_000.ma' in man.dh.ls() and 'droppedFrames' in man.dh['video_000.ma'].info())
+    return man.dh['video_000.ma']
+
+
+def test_full_queue_drops_frames(monkeypatch):
+    man = MockManager()
+    monkeypatch.setattr(Manager, 'getManager', lambda: man)
+    frameBytes = makeFrame(0).getImage().nbytes
+    rt = RecordThread(None, maxQueueBytes=2.5 * frameBytes, blockTimeout=0)
+    try:
+        rt.startRecording()
+        # the worker is not running, so nothing leaves the queue; frames beyond its capacity are dropped
+        for i in range(5):
+            rt.newFrame(makeFrame(i))
+        assert rt.stackSize == 5
+        assert rt.droppedFrames == 2
+        assert len(rt.newFrames) == 3
+
+        rt.start()
+        rt.stopRecording()
+        fh = recordedStack(man)
+        assert fh.info()['droppedFrames'] == 2
+        assert fh.info()['frames'] == 3
+        data = fh.read()
+        assert data.shape == (3, 32, 32)
+        assert list(data.asarray()[:, 0, 0]) == [0, 1, 2]
+
+        # the count starts over with the next stack
+        rt.startRecording()
+        assert rt.droppedFrames == 0
+        rt.stopRecording()
+    finally:
+        rt.quit()
+        rt.wait()
+
+
+def test_full_queue_blocks(monkeypatch):
+    man = MockManager()
+    monkeypatch.setattr(Manager, 'getManager', lambda: man)
+    frameBytes = makeFrame(0).getImage().nbytes
+    rt = RecordThread(None, maxQueueBytes=frameBytes, blockTimeout=10)
+    try:
+        rt.startRecording()
+        rt.newFrame(makeFrame(0))
+
+        # with the queue full, newFrame waits for the worker to make room instead of dropping the frame
+        sender = threading.Thread(target=lambda: [rt.newFrame(makeFrame(i)) for i in (1, 2)])
+        sender.start()
+        time.sleep(0.2)
+        assert sender.is_alive()
+        assert len(rt.newFrames) == 1
+
+        rt.start()
+        sender.join(10)
+        assert not sender.is_alive()
+        rt.stopRecording()
+        fh = recordedStack(man)
+        assert rt.droppedFrames == 0
+        assert fh.info()['droppedFrames'] == 0
+        assert fh.read().shape[0] == 3
+    finally:
+        rt.quit()
+        rt.wait()
@@ -0,0 +1,112 @@
+import json
+
+import numpy as np
+import pytest
+
+import pyqtgraph as pg
+from acq4.Manager import DeviceLocker, Task
+from acq4.devices.Device import Device, DeviceTask
+from acq4.util.task_timing import TaskTiming, TaskTimingStats
+
+
+def test_task_timing(tmp_path):
+    stats = TaskTimingStats(maxRecords=3)
+    for i in range(5):
+        rec = TaskTiming(i, ['DAQ', 'Clamp'])
+        rec.mark('reserve')
+        rec.mark('configure', 'DAQ')
+        rec.mark('configure', 'Clamp')
+        rec.mark('wait')
+        rec.finish()
+        assert rec.finished
+        assert rec.total('configure') == rec.total('configure', 'DAQ') + rec.total('configure', 'Clamp')
+        assert list(rec.byDevice().keys()) == ['DAQ', 'Clamp']
+        stats.add(rec)
+
+    assert len(stats) == 3
+    durations = stats.durations()
+    assert set(durations.keys()) == {
+        ('reserve', None), ('configure', 'DAQ'), ('configure', 'Clamp'), ('wait', None), ('total', None)}
+    assert all(len(v) == 3 for v in durations.values())
+
+    summary = stats.summary()
+    assert summary[0]['stage'] == 'total'
+    assert all(r['count'] == 3 for r in summary)
+
+    counts, edges = stats.histogram('configure', 'DAQ', bins=4)
+    assert counts.sum() == 3 and len(edges) == 5
+    assert len(stats.histogram('store')[0]) == 0
+
+    stats.export(str(tmp_path / 'timing.json'))
+    records = json.load(open(tmp_path / 'timing.json'))
+    assert [r['taskId'] for r in records] == [2, 3, 4]
+    assert np.isclose(sum(s['duration'] for s in records[0]['stages']), records[0]['duration'])
+
+    stats.export(str(tmp_path / 'timing.csv'))
+    lines = open(tmp_path / 'timing.csv').read().splitlines()
+    assert len(lines) == 1 + 3 * 4
+
+    stats.clear()
+    assert len(stats) == 0
+
+
+class MockManager:
+    """The parts of the Manager used by Manager.Task."""
+    def __init__(self):
+        self.devices = {}
+        self.timings = []
+
+    def declareInterface(self, name, types, obj):
+        self.devices[name] = obj
+
+    def getDevice(self, name):
+        return self.devices[name]
+
+    def reserveDevices(self, devices):
+        return DeviceLocker(self, [self.getDevice(d) for d in devices])
+
+    def taskTimingFinished(self, timing):
+        self.timings.append(timing)
+
+
+def _makeDevices(man):
+    class GoodDevice(Device):
+        def createTask(self, cmd, task):
+            return DeviceTask(self, cmd, task)
+
+    class FailingTask(DeviceTask):
+        def start(self):
+            raise ValueError("device failed to start")
+
+    class FailingDevice(Device):
+        def createTask(self, cmd, task):
+            return FailingTask(self, cmd, task)
+
+    GoodDevice(man, {}, 'Good')
+    FailingDevice(man, {}, 'Bad')
+
+
+def test_task_timing_manager():
+    pg.mkQApp()
+    man = MockManager()
+    _makeDevices(man)
+
+    task = Task(man, {'protocol': {'duration': 0}, 'Good': {}})
+    task.execute(processEvents=False)
+    task.getResult()
+    assert len(man.timings) == 1
+    timing = man.timings[0]
+    assert timing.finished and timing.error is None
+    assert [(s, d) for s, d, _ in timing.stages] == [
+        ('reserve', None), ('configure', 'Good'), ('start', 'Good'), ('wait', None), ('stop', 'Good'),
+        ('getResult', 'Good'), ('release', None)]
+
+    # the exception that caused the task to abort is recorded, not just the abort
+    task = Task(man, {'protocol': {'duration': 0}, 'Good': {}, 'Bad': {}})
+    with pytest.raises(ValueError):
+        task.execute(processEvents=False)
+    assert len(man.timings) == 2
+    timing = man.timings[1]
+    assert timing.finished
+    assert timing.error == "ValueError: device failed to start"
+    assert timing.saveState()['error'] == timing.error
@@ -0,0 +1,86 @@
+"""Measure how long the Manager takes to load a set of mock devices, serially and in parallel.
+
+The mock devices initialize almost instantly, so each one is given an artificial *latency* (a sleep in
+__init__) standing in for the serial handshakes and homing queries of real hardware. The default device set
+resembles a four-pipette patch rig: a microscope stage, four manipulator + pipette pairs (each pipette names its
+manipulator as parentDevice, so the pair must load in order) and four pressure controllers. None of these
+classes declares threadedInit, so each device opts in with 'threadedInit: True' in its config, as a rig's
+configuration would. Devices are loaded with Manager._loadDevices using each of the requested deviceInitThreads
+values.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from acq4.util import Qt  # noqa: E402
+
+LATENCY = 0.0
+
+
+def slowInit(cls):
+    """Return a subclass of device class *cls* whose __init__ takes an extra LATENCY seconds."""
+    def __init__(self, *args, **kwds):
+        time.sleep(LATENCY)
+        cls.__init__(self, *args, **kwds)
+    return type('Slow' + cls.__name__, (cls,), {'__init__': __init__})
+
+
+def deviceConfigs(nPipettes, nOther):
+    devs = {'Stage': {'driver': 'SlowMockStage'}}
+    for i in range(nPipettes):
+        devs[f'Manipulator{i}'] = {'driver': 'SlowMockStage'}
+        devs[f'Pipette{i}'] = {'driver': 'SlowPipette', 'parentDevice': f'Manipulator{i}', 'pitch': 30, 'yaw': 0}
+    for i in range(nOther):
+        devs[f'Pressure{i}'] = {'driver': 'SlowMockPressureControl'}
+    for conf in devs.values():
+        conf['threadedInit'] = True
+    return devs
+
+
+def main():
+    global LATENCY
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pipettes', type=int, default=4, help='Number of manipulator + pipette pairs')
+    parser.add_argument('--other', type=int, default=4, help='Number of independent pressure controllers')
+    parser.add_argument('--latency', type=float, default=0.25, help='Simulated I/O time per device, in seconds')
+    parser.add_argument('--threads', type=int, nargs='+', default=[0, 2, 4, 8],
+                        help='deviceInitThreads values to test (0 = serial)')
+    args = parser.parse_args()
+    LATENCY = args.latency
+
+    app = Qt.QApplication([])
+    from acq4.Manager import Manager
+    from acq4.devices.MockStage import MockStage
+    from acq4.devices.MockPressureControl import MockPressureControl
+    from acq4.devices.Pipette import Pipette
+    for cls in [MockStage, MockPressureControl, Pipette]:
+        globals()['Slow' + cls.__name__] = slowInit(cls)
+
+    man = Manager()
+    man.configDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config', 'example')
+    devs = deviceConfigs(args.pipettes, args.other)
+    print(f"{len(devs)} devices, {args.latency * 1e3:.0f} ms latency each")
+    print(f"{'threads':>8} {'total (s)':>10} {'slowest device (s)':>19}")
+    for threads in args.threads:
+        ## load a fresh set of devices each time
+        devs = {f'{name}_{threads}': dict(conf) for name, conf in deviceConfigs(args.pipettes, args.other).items()}
+        for conf in devs.values():
+            if 'parentDevice' in conf:
+                conf['parentDevice'] += f'_{threads}'
+        start = time.perf_counter()
+        man._loadDevices(devs, threads)
+        total = time.perf_counter() - start
+        slowest = max(man.deviceInitTimes[name] for name in devs)
+        print(f"{threads:>8} {total:>10.2f} {slowest:>19.3f}")
+
+    ## skip device shutdown
+    os._exit(0)
+
+
+if __name__ == '__main__':
+    main()
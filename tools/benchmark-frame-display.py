@@ -0,0 +1,63 @@
+"""Measure the CPU time needed to prepare live camera frames for display.
+
+For several sensor sizes, compares the full-resolution path (background removal on the whole
+frame, auto gain measurement, copy for display) with DisplayEngine, which decimates frames to the
+display size and removes the background in a single pass into a newly allocated array (as used by
+cameras configured with decimateDisplay: True). Only the processing done before the image is handed
+to pyqtgraph is timed.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from acq4.util.imaging.background import remove_background_from_image  # noqa: E402
+from acq4.util.imaging.display_engine import DisplayEngine  # noqa: E402
+
+
+def fullResolution(data, bg, subtract, divide):
+    data = remove_background_from_image(data, bg, subtract, divide)
+    DisplayEngine.measure(data)
+    return data.copy()
+
+
+def timeit(fn, frames, repeat):
+    fn(frames[0])  # warm up / allocate buffers
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(frames[i % len(frames)])
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[512, 1024, 2048, 4096],
+                        help='Sensor sizes (square, in pixels) to test')
+    parser.add_argument('--display', type=int, default=1000, help='Size of the on-screen image, in pixels')
+    parser.add_argument('--repeat', type=int, default=50, help='Number of frames to time for each case')
+    args = parser.parse_args()
+
+    modes = [('raw', False, False), ('subtract', True, False), ('divide', False, True)]
+    print(f"display size {args.display}px; times in ms per frame")
+    print(f"{'sensor':>8} {'mode':>9} {'full res':>9} {'engine':>9} {'speedup':>8} {'decimation':>10}")
+    for size in args.sizes:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(100, 4000, size=(size, size), dtype=np.uint16) for _ in range(4)]
+        bg = rng.uniform(100, 200, size=(size, size)).astype(np.float32)
+        engine = DisplayEngine()
+        engine.setDecimation(DisplayEngine.decimationForPixelSize((size / args.display, size / args.display)))
+        for mode, subtract, divide in modes:
+            full = timeit(lambda d: fullResolution(d, bg, subtract, divide), frames, args.repeat)
+            fast = timeit(lambda d: engine.process(d, bg, subtract, divide), frames, args.repeat)
+            print(f"{size:>8} {mode:>9} {full * 1e3:>9.2f} {fast * 1e3:>9.2f} {full / fast:>7.1f}x "
+                  f"{engine.decimation:>10}")
+
+
+if __name__ == '__main__':
+    main()
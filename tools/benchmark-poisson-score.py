@@ -0,0 +1,71 @@
+"""Measure the time needed to compute Poisson scores for a complete photostimulation map.
+
+For several map sizes, compares scoring each site separately with PoissonScore.score (as
+MapAnalyzer used to do) against scoring all sites in one call to PoissonScore.scoreMany. Sites
+are simulated with a few repeated trials, each containing spontaneous events from a Poisson
+process with a randomly chosen rate.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from acq4.analysis.tools.poissonScore import PoissonAmpScore, PoissonScore  # noqa: E402
+
+
+def makeMap(nSites, reps, tMax, maxRate, rng):
+    sites = []
+    rates = []
+    for _ in range(nSites):
+        siteRates = rng.uniform(0.5, maxRate, size=reps)
+        trials = []
+        for rate in siteRates:
+            n = rng.poisson(rate * tMax)
+            ev = np.empty(n, dtype=[('time', float), ('amp', float)])
+            ev['time'] = np.sort(rng.uniform(1e-3, tMax, size=n))
+            ev['amp'] = rng.normal(size=n)
+            trials.append(ev)
+        sites.append(trials)
+        rates.append(list(siteRates))
+    return sites, rates
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sites', type=int, nargs='+', default=[100, 500, 2000],
+                        help='Number of sites in the simulated map')
+    parser.add_argument('--reps', type=int, default=3, help='Number of trials per site')
+    parser.add_argument('--tmax', type=float, default=0.5, help='Length of the scored window (s)')
+    parser.add_argument('--rate', type=float, default=20.0, help='Maximum spontaneous event rate (Hz)')
+    args = parser.parse_args()
+
+    ampArgs = {'ampMean': 0.0, 'ampStdev': 1.0}
+    # load normalization tables before timing
+    PoissonScore.mapScore(1.0, 1.0)
+    PoissonAmpScore.mapScore(1.0, 1.0)
+
+    print(f"{args.reps} trials per site, {args.tmax} s window; times in ms per map")
+    print(f"{'sites':>6} {'score':>16} {'per site':>9} {'batched':>9} {'speedup':>8} {'max rel. err':>13}")
+    rng = np.random.default_rng(0)
+    for nSites in args.sites:
+        sites, rates = makeMap(nSites, args.reps, args.tmax, args.rate, rng)
+        for cls, kwds in [(PoissonScore, {}), (PoissonAmpScore, ampArgs)]:
+            start = time.perf_counter()
+            single = np.array([cls.score(ev, r, tMax=args.tmax, **kwds) for ev, r in zip(sites, rates)])
+            tSingle = time.perf_counter() - start
+            start = time.perf_counter()
+            batch = cls.scoreMany(sites, rates, tMax=args.tmax, **kwds)
+            tBatch = time.perf_counter() - start
+            err = np.max(np.abs(batch - single) / np.abs(single))
+            print(f"{nSites:>6} {cls.__name__:>16} {tSingle * 1e3:>9.1f} {tBatch * 1e3:>9.1f} "
+                  f"{tSingle / tBatch:>7.1f}x {err:>13.2g}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""Convert the meta-info index of acq4 data directories between the 'text' (.index) and 'sqlite' (.index.sqlite)
+formats.
+
+By default the previous index file is kept with a '.bak' suffix.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from acq4.util.DataManager.index import FORMATS, migrateIndex  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', nargs='+', help='Data directory to convert')
+    parser.add_argument('-f', '--format', default='sqlite', choices=FORMATS, help='Index format to convert to')
+    parser.add_argument('-r', '--recursive', action='store_true', help='Also convert all subdirectories')
+    parser.add_argument('--delete-old', action='store_true', help='Remove the previous index file instead of keeping a .bak copy')
+    args = parser.parse_args()
+
+    for path in args.path:
+        if not os.path.isdir(path):
+            parser.error(f"{path} is not a directory")
+        converted = migrateIndex(path, fmt=args.format, recursive=args.recursive, keepOld=not args.delete_old)
+        for d in converted:
+            print(f"Converted {d}")
+        print(f"{path}: {len(converted)} director{'y' if len(converted) == 1 else 'ies'} converted to {args.format}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Replay recorded test pulses through the analyzer of a patch pipette state and report what it detects.
+
+Reads MultiPatch logs (and TestPulses hdf5 files without a log) from the given files or directories, feeds the
+pulses recorded in STATE through a new analyzer for each pipette and state period, and prints how often each
+detection occurred and how fast the analyzer ran. For example, to compare two slow detection thresholds:
+
+    python tools/replay-patch-analysis.py /data/2024* --state "cell detect" --sweep slowDetectionThreshold=0.2e6,0.3e6
+
+With --synthetic, random series are generated instead of reading logs, to benchmark the analyzer. --batch feeds
+pulses a few at a time, as the states do live, instead of all at once.
+"""
+
+import argparse
+import ast
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from acq4.devices.PatchPipette.replay import AnalysisReplay, readLogFiles  # noqa: E402
+
+
+def parseValue(text):
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+
+def syntheticSegments(count, length, rng):
+    """Random resistance series: a noisy baseline near 5 MOhm that steps up partway through half of them."""
+    segments = []
+    for i in range(count):
+        times = np.cumsum(rng.uniform(0.09, 0.11, size=length))
+        resistance = rng.normal(5e6, 0.05e6, size=length)
+        if i % 2 == 0:
+            resistance[length // 2:] += rng.uniform(0.1e6, 1e6)
+        segments.append(np.column_stack([times, resistance]))
+    return segments
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*', help='MultiPatch log / TestPulses files, or directories to search')
+    parser.add_argument('--state', default='cell detect', help='Patch pipette state whose analyzer to replay')
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                        help='Override a state configuration parameter (may be repeated)')
+    parser.add_argument('--sweep', default=None, metavar='NAME=V1,V2,...',
+                        help='Replay once for each value of a configuration parameter')
+    parser.add_argument('--all-states', action='store_true',
+                        help='Replay pulses recorded in any state, not only in --state')
+    parser.add_argument('--batch', type=int, default=None, help='Number of pulses per analyzer call')
+    parser.add_argument('--segments', action='store_true', help='Print the outcome of every segment')
+    parser.add_argument('--synthetic', type=int, default=None, metavar='N',
+                        help='Replay N random series instead of reading files')
+    parser.add_argument('--length', type=int, default=1000, help='Number of pulses per synthetic series')
+    args = parser.parse_args()
+
+    config = {}
+    for item in args.set:
+        name, value = item.split('=', 1)
+        config[name] = parseValue(value)
+
+    if args.synthetic is not None:
+        segments = syntheticSegments(args.synthetic, args.length, np.random.default_rng(0))
+    else:
+        if len(args.paths) == 0:
+            parser.error('give paths to read, or --synthetic')
+        segments = list(readLogFiles(args.paths, state=None if args.all_states else args.state))
+        if len(segments) == 0:
+            sys.exit(f'No test pulses recorded in state {args.state!r} found.')
+
+    if args.sweep is None:
+        runs = [config]
+    else:
+        name, values = args.sweep.split('=', 1)
+        runs = [dict(config, **{name: parseValue(v)}) for v in values.split(',')]
+
+    for runConfig in runs:
+        replay = AnalysisReplay(args.state, runConfig)
+        if len(runConfig) > 0:
+            print(", ".join(f"{k}={v!r}" for k, v in runConfig.items()))
+        print(replay.run(segments, batchSize=args.batch).report(segments=args.segments))
+        print()
+
+
+if __name__ == '__main__':
+    main()